@@ -42,6 +42,7 @@ The EasyBlock class should serve as a base class for all easyblocks.
 import copy
 import glob
 import inspect
+import json
 import os
 import re
 import stat
@@ -49,17 +50,19 @@ import tempfile
 import time
 import traceback
 from datetime import datetime
+from multiprocessing.pool import ThreadPool
 from distutils.version import LooseVersion
 
 import easybuild.tools.environment as env
 from easybuild.base import fancylogger
 from easybuild.framework.easyconfig import EASYCONFIGS_PKG_SUBDIR
-from easybuild.framework.easyconfig.easyconfig import ITERATE_OPTIONS, EasyConfig, ActiveMNS, get_easyblock_class
-from easybuild.framework.easyconfig.easyconfig import get_module_path, letter_dir_for, resolve_template
+from easybuild.framework.easyconfig.easyconfig import ITERATE_OPTIONS, EasyConfig, EasyConfigRecord, ActiveMNS
+from easybuild.framework.easyconfig.easyconfig import get_easyblock_class, get_module_path, letter_dir_for
+from easybuild.framework.easyconfig.easyconfig import resolve_template
 from easybuild.framework.easyconfig.format.format import SANITY_CHECK_PATHS_DIRS, SANITY_CHECK_PATHS_FILES
 from easybuild.framework.easyconfig.parser import fetch_parameters_from_easyconfig
 from easybuild.framework.easyconfig.style import MAX_LINE_LENGTH
-from easybuild.framework.easyconfig.tools import get_paths_for
+from easybuild.framework.easyconfig.tools import BUILD_FINGERPRINT_FILE, det_build_fingerprint, get_paths_for
 from easybuild.framework.easyconfig.templates import TEMPLATE_NAMES_EASYBLOCK_RUN_STEP, template_constant_dict
 from easybuild.framework.extension import resolve_exts_filter_template
 from easybuild.tools import config, run
@@ -69,7 +72,7 @@ from easybuild.tools.build_log import print_error, print_msg, print_warning
 from easybuild.tools.config import FORCE_DOWNLOAD_ALL, FORCE_DOWNLOAD_PATCHES, FORCE_DOWNLOAD_SOURCES
 from easybuild.tools.config import build_option, build_path, get_log_filename, get_repository, get_repositorypath
 from easybuild.tools.config import install_path, log_path, package_path, source_paths
-from easybuild.tools.environment import restore_env, sanitize_env
+from easybuild.tools.environment import restore_env, sanitize_env, snapshot_env
 from easybuild.tools.filetools import CHECKSUM_TYPE_MD5, CHECKSUM_TYPE_SHA256
 from easybuild.tools.filetools import adjust_permissions, apply_patch, back_up_file, change_dir, convert_name
 from easybuild.tools.filetools import compute_checksum, copy_file, check_lock, create_lock, derive_alt_pypi_url
@@ -90,8 +93,9 @@ from easybuild.tools.modules import Lmod, curr_module_paths, invalidate_module_c
 from easybuild.tools.modules import get_software_root_env_var_name, get_software_version_env_var_name
 from easybuild.tools.package.utilities import package
 from easybuild.tools.py2vs3 import extract_method_name, string_type
-from easybuild.tools.repository.repository import init_repository
+from easybuild.tools.repository.repository import session_repository
 from easybuild.tools.systemtools import det_parallelism, use_group
+from easybuild.tools.timing import TIMING_STEP, get_timings, reset_timings, timed, timings_summary, timings_to_json
 from easybuild.tools.utilities import INDENT_4SPACES, get_class_for, quote_str
 from easybuild.tools.utilities import remove_unwanted_chars, time2str, trace_msg
 from easybuild.tools.version import this_is_easybuild, VERBOSE_VERSION, VERSION
@@ -164,6 +168,8 @@ class EasyBlock(object):
         self.is_extension = False
 
         # easyconfig for this application
+        if isinstance(ec, EasyConfigRecord):
+            ec = ec.materialize()
         if isinstance(ec, EasyConfig):
             self.cfg = ec
         else:
@@ -176,6 +182,8 @@ class EasyBlock(object):
         self.mod_filepath = self.module_generator.get_module_filepath()
         self.mod_file_backup = None
         self.set_default_module = self.cfg.set_default_module
+        # dependencies to load in generated module file, see det_module_load_deps
+        self.module_load_deps = None
 
         # modules footer/header
         self.modules_footer = None
@@ -224,7 +232,7 @@ class EasyBlock(object):
         self.orig_modulepath = os.getenv('MODULEPATH')
 
         # keep track of initial environment we start in, so we can restore it if needed
-        self.initial_environ = copy.deepcopy(os.environ)
+        self.initial_environ = snapshot_env()
         self.reset_environ = None
         self.tweaked_env_vars = {}
 
@@ -888,7 +896,7 @@ class EasyBlock(object):
         """
         env.reset_changes()
         if self.reset_environ is None:
-            self.reset_environ = copy.deepcopy(os.environ)
+            self.reset_environ = snapshot_env()
         else:
             restore_env(self.reset_environ)
 
@@ -1033,14 +1041,17 @@ class EasyBlock(object):
 
         return txt
 
-    def make_module_dep(self, unload_info=None):
+    def det_module_load_deps(self):
         """
-        Make the dependencies for the module file.
+        Determine which dependencies should be loaded in the generated module file.
 
-        :param unload_info: dictionary with full module names as keys and module name to unload first as corr. value
+        The result only depends on the dependencies & toolchain, and on the existing module tree,
+        so it is determined only once per build and shared between the fake and final module files.
+
+        :return: dict with list of names of modules to load ('deps'), and list of lists of module names
+                 for multi_deps for which the first version should be loaded by default ('multi_deps_defaults')
         """
         mns = ActiveMNS()
-        unload_info = unload_info or {}
 
         # include toolchain as first dependency to load
         tc_mod = None
@@ -1066,6 +1077,12 @@ class EasyBlock(object):
                 deps.append(modname)
         self.log.debug("List of deps to load in generated module (before excluding any): %s", deps)
 
+        # reuse previously determined result, unless the considered dependencies changed in the meantime
+        key = (tc_mod, tuple(tc_dep_mods or []), tuple(deps), self.installdir_mod, self.mod_subdir)
+        if self.module_load_deps is not None and self.module_load_deps['key'] == key:
+            self.log.debug("Reusing list of deps to load in generated module: %s", self.module_load_deps['deps'])
+            return self.module_load_deps
+
         # exclude dependencies that extend $MODULEPATH and form the path to the top of the module tree (if any)
         full_mod_subdir = os.path.join(self.installdir_mod, self.mod_subdir)
         init_modpaths = mns.det_init_modulepaths(self.cfg)
@@ -1103,6 +1120,32 @@ class EasyBlock(object):
 
         self.log.debug("List of retained deps to load in generated module: %s", deps)
 
+        # build map of dep name to list of module names corresponding to each version
+        # first entry in multi_deps is list of first versions for each multi-dep
+        multi_dep_mod_names = {}
+        for deplist in self.cfg.multi_deps:
+            for dep in deplist:
+                multi_dep_mod_names.setdefault(dep['name'], [])
+                multi_dep_mod_names[dep['name']].append(dep['short_mod_name'])
+
+        self.module_load_deps = {
+            'key': key,
+            'deps': deps,
+            'multi_deps_defaults': [depmods for (_, depmods) in sorted(multi_dep_mod_names.items())],
+        }
+        return self.module_load_deps
+
+    def make_module_dep(self, unload_info=None):
+        """
+        Make the dependencies for the module file.
+
+        :param unload_info: dictionary with full module names as keys and module name to unload first as corr. value
+        """
+        unload_info = unload_info or {}
+
+        module_load_deps = self.det_module_load_deps()
+        deps = module_load_deps['deps']
+
         # include load statements for retained dependencies
         recursive_unload = self.cfg['recursive_module_unload']
         depends_on = self.cfg['module_depends_on']
@@ -1124,23 +1167,11 @@ class EasyBlock(object):
 
         # load first version listed in multi_deps as a default, if desired
         if self.cfg['multi_deps_load_default']:
-
-            # build map of dep name to list of module names corresponding to each version
-            # first entry in multi_deps is list of first versions for each multi-dep
-            multi_dep_mod_names = {}
-            for deplist in self.cfg.multi_deps:
-                for dep in deplist:
-                    multi_dep_mod_names.setdefault(dep['name'], [])
-                    multi_dep_mod_names[dep['name']].append(dep['short_mod_name'])
-
-            multi_dep_load_defaults = []
-            for depname, depmods in sorted(multi_dep_mod_names.items()):
+            for depmods in module_load_deps['multi_deps_defaults']:
                 stmt = self.module_generator.load_module(depmods[0], multi_dep_mods=depmods,
                                                          recursive_unload=recursive_unload,
                                                          depends_on=depends_on)
-                multi_dep_load_defaults.append(stmt)
-
-            dep_stmts.extend(multi_dep_load_defaults)
+                dep_stmts.append(stmt)
 
         return ''.join(dep_stmts)
 
@@ -1435,7 +1466,7 @@ class EasyBlock(object):
         :param extra_modules: list of extra modules to load (these are loaded *before* loading the 'self' module)
         """
         # take a copy of the current environment before loading the fake module, so we can restore it
-        env = copy.deepcopy(os.environ)
+        env = snapshot_env()
 
         # create fake module
         fake_mod_path = self.make_module_step(fake=True)
@@ -2670,12 +2701,14 @@ class EasyBlock(object):
         if os.path.isdir(self.installdir):
             change_dir(self.installdir)
 
-        # run sanity check commands
-        for command in commands:
-
+        # helper function to run a single sanity check command
+        def run_sanity_check_cmd(command):
+            """Run sanity check command, return output and exit code."""
             trace_msg("running command '%s' ..." % command)
+            return run_cmd(command, simple=False, log_ok=False, log_all=False, trace=False)
 
-            out, ec = run_cmd(command, simple=False, log_ok=False, log_all=False, trace=False)
+        def check_sanity_check_cmd_result(command, out, ec):
+            """Check result of running sanity check command."""
             if ec != 0:
                 fail_msg = "sanity check command %s exited with code %s (output: %s)" % (command, ec, out)
                 self.sanity_check_fail_msgs.append(fail_msg)
@@ -2685,6 +2718,26 @@ class EasyBlock(object):
 
             trace_msg("result for command '%s': %s" % (command, ('FAILED', 'OK')[ec == 0]))
 
+        # run sanity check commands, concurrently if desired;
+        # commands all run in the same environment (with fake module loaded) and working directory,
+        # results are processed in the order in which the commands were specified
+        max_parallel = min(build_option('parallel_sanity_check_commands') or 1, len(commands))
+        if max_parallel > 1:
+            self.log.info("Running %d sanity check commands using %d threads", len(commands), max_parallel)
+            pool = ThreadPool(max_parallel)
+            try:
+                results = pool.map(run_sanity_check_cmd, commands)
+            finally:
+                pool.close()
+                pool.join()
+
+            for command, (out, ec) in zip(commands, results):
+                check_sanity_check_cmd_result(command, out, ec)
+        else:
+            for command in commands:
+                out, ec = run_sanity_check_cmd(command)
+                check_sanity_check_cmd_result(command, out, ec)
+
         # also run sanity check for extensions (unless we are an extension ourselves)
         if not extension:
             self._sanity_check_step_extensions()
@@ -2781,21 +2834,24 @@ class EasyBlock(object):
         else:
             trace_msg("generating module file @ %s" % self.mod_filepath)
 
-        txt = self.module_generator.MODULE_SHEBANG
-        if txt:
-            txt += '\n'
+        parts = []
+        if self.module_generator.MODULE_SHEBANG:
+            parts.append(self.module_generator.MODULE_SHEBANG + '\n')
 
         if self.modules_header:
-            txt += self.modules_header + '\n'
-
-        txt += self.make_module_description()
-        txt += self.make_module_group_check()
-        txt += self.make_module_deppaths()
-        txt += self.make_module_dep()
-        txt += self.make_module_extend_modpath()
-        txt += self.make_module_req()
-        txt += self.make_module_extra()
-        txt += self.make_module_footer()
+            parts.append(self.modules_header + '\n')
+
+        parts.extend([
+            self.make_module_description(),
+            self.make_module_group_check(),
+            self.make_module_deppaths(),
+            self.make_module_dep(),
+            self.make_module_extend_modpath(),
+            self.make_module_req(),
+            self.make_module_extra(),
+            self.make_module_footer(),
+        ])
+        txt = ''.join(parts)
 
         if self.dry_run:
             # only report generating actual module file during dry run, don't mention temporary module files
@@ -2805,7 +2861,8 @@ class EasyBlock(object):
                     self.dry_run_msg(INDENT_4SPACES + line)
         else:
             write_file(mod_filepath, txt)
-            self.log.info("Module file %s written: %s", mod_filepath, txt)
+            self.log.info("Module file %s written (%d bytes)", mod_filepath, len(txt))
+            self.log.debug("Contents of module file %s: %s", mod_filepath, txt)
 
             # if backup module file is there, print diff with newly generated module file
             if self.mod_file_backup and not fake:
@@ -2966,6 +3023,17 @@ class EasyBlock(object):
         Run step, returns false when execution should be stopped
         """
         self.log.info("Starting %s step", step)
+        with timed(TIMING_STEP, step):
+            self._run_step(step, step_methods)
+
+        if self.cfg['stop'] == step:
+            self.log.info("Stopping after %s step.", step)
+            raise StopException(step)
+
+    def _run_step(self, step, step_methods):
+        """
+        Run methods for specified step, including pre- and post-step hooks.
+        """
         self.update_config_template_run_step()
 
         run_hook(step, self.hooks, pre_step_hook=True, args=[self])
@@ -2995,10 +3063,6 @@ class EasyBlock(object):
 
         run_hook(step, self.hooks, post_step_hook=True, args=[self])
 
-        if self.cfg['stop'] == step:
-            self.log.info("Stopping after %s step.", step)
-            raise StopException(step)
-
     @staticmethod
     def get_steps(run_test_cases=True, iteration_count=1):
         """Return a list of all steps to be performed."""
@@ -3189,6 +3253,7 @@ def build_and_install_one(ecdict, init_env):
     # restore original environment, and then sanitize it
     _log.info("Resetting environment")
     run.errors_found_in_log = 0
+    reset_timings()
     restore_env(init_env)
     sanitize_env()
 
@@ -3283,15 +3348,15 @@ def build_and_install_one(ecdict, init_env):
             try:
                 # upload easyconfig (and patch files) to central repository
                 currentbuildstats = app.cfg['buildstats']
-                repo = init_repository(get_repository(), get_repositorypath())
+                # changes are committed at the end of the session, see commit_session_repositories
+                repo = session_repository(get_repository(), get_repositorypath())
                 if 'original_spec' in ecdict:
                     block = det_full_ec_version(app.cfg) + ".block"
                     repo.add_easyconfig(ecdict['original_spec'], app.name, block, buildstats, currentbuildstats)
                 repo.add_easyconfig(spec, app.name, det_full_ec_version(app.cfg), buildstats, currentbuildstats)
                 for patch in app.patches:
                     repo.add_patch(patch['path'], app.name)
-                repo.commit("Built %s" % app.full_mod_name)
-                del repo
+                repo.queue_commit("Built %s" % app.full_mod_name)
             except EasyBuildError as err:
                 _log.warning("Unable to commit easyconfig to repository: %s", err)
 
@@ -3335,6 +3400,24 @@ def build_and_install_one(ecdict, init_env):
         app.close_log()
         application_log = app.logfile
 
+    timings = get_timings()
+    for category, (total_time, cnt) in timings_summary(timings).items():
+        _log.info("Time spent on %d '%s' operation(s): %.2f sec", cnt, category, total_time)
+
+    if application_log and build_option('dump_timings'):
+        timings_file = os.path.splitext(application_log)[0] + '_timings.json'
+        # log directory in installation directory was made read-only already (if desired),
+        # so temporarily grant write permission to dump timings file next to log file
+        read_only_logdir = success and build_option('read_only_installdir')
+        if read_only_logdir:
+            adjust_permissions(new_log_dir, stat.S_IWUSR, add=True, recursive=False)
+        write_file(timings_file, timings_to_json(timings))
+        if read_only_logdir:
+            perms = stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH
+            adjust_permissions(timings_file, perms, add=False, recursive=False)
+            adjust_permissions(new_log_dir, perms, add=False, recursive=False)
+        print_msg("Timing information for this installation dumped to %s" % timings_file, log=_log, silent=silent)
+
     req_time = time2str(end_timestamp - start_timestamp)
     print_msg("%s: Installation %s %s (took %s)" % (summary, ended, succ, req_time), log=_log, silent=silent)
 
@@ -3406,6 +3489,16 @@ def reproduce_build(app, reprod_dir_root):
         copy_file(hooks_path, target)
         _log.info("Dumped hooks file %s which is (potentially) required for reproduction to %s", hooks_path, target)
 
+    # record fingerprint for build inputs, which is used to determine whether a rebuild is required
+    # (see --rebuild-if-changed)
+    fingerprint_path = os.path.join(reprod_dir, BUILD_FINGERPRINT_FILE)
+    try:
+        fingerprint = det_build_fingerprint(app.cfg, easyblock_class=type(app))
+        write_file(fingerprint_path, json.dumps(fingerprint, indent=4, sort_keys=True))
+        _log.info("Build fingerprint %s recorded in %s", fingerprint['fingerprint'], fingerprint_path)
+    except EasyBuildError as err:
+        _log.warning("Unable to record build fingerprint in %s: %s", fingerprint_path, err)
+
     return reprod_dir
 
 
@@ -3446,7 +3539,7 @@ def build_easyconfigs(easyconfigs, output_dir, test_results):
     # keep track of environment right before initiating builds
     # note: may be different from ORIG_OS_ENVIRON, since EasyBuild may have defined additional env vars itself by now
     # e.g. via easyconfig.handle_allowed_system_deps
-    base_env = copy.deepcopy(os.environ)
+    base_env = snapshot_env()
     succes = []
 
     for app in apps:
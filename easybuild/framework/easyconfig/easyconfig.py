@@ -42,8 +42,11 @@ Easyconfig module that contains the EasyConfig class.
 import copy
 import difflib
 import functools
+import hashlib
+import json
 import os
 import re
+import sys
 from distutils.version import LooseVersion
 from contextlib import contextmanager
 
@@ -64,16 +67,17 @@ from easybuild.tools.build_log import EasyBuildError, print_warning, print_msg
 from easybuild.tools.config import GENERIC_EASYBLOCK_PKG, LOCAL_VAR_NAMING_CHECK_ERROR, LOCAL_VAR_NAMING_CHECK_LOG
 from easybuild.tools.config import LOCAL_VAR_NAMING_CHECK_WARN
 from easybuild.tools.config import Singleton, build_option, get_module_naming_scheme
+from easybuild.tools.filetools import CHECKSUM_TYPE_SHA256, compute_checksum
 from easybuild.tools.filetools import convert_name, copy_file, create_index, decode_class_name, encode_class_name
 from easybuild.tools.filetools import find_backup_name_candidate, find_easyconfigs, load_index
-from easybuild.tools.filetools import read_file, write_file
+from easybuild.tools.filetools import read_file, write_file, write_file_atomic
 from easybuild.tools.hooks import PARSE, load_hooks, run_hook
 from easybuild.tools.module_naming_scheme.mns import DEVEL_MODULE_SUFFIX
 from easybuild.tools.module_naming_scheme.utilities import avail_module_naming_schemes, det_full_ec_version
 from easybuild.tools.module_naming_scheme.utilities import det_hidden_modname, is_valid_module_name
 from easybuild.tools.modules import modules_tool
 from easybuild.tools.py2vs3 import OrderedDict, create_base_metaclass, string_type
-from easybuild.tools.systemtools import check_os_dependency, pick_dep_version
+from easybuild.tools.systemtools import check_os_dependencies, pick_dep_version
 from easybuild.tools.toolchain.toolchain import SYSTEM_TOOLCHAIN_NAME, is_system_toolchain
 from easybuild.tools.toolchain.toolchain import TOOLCHAIN_CAPABILITIES, TOOLCHAIN_CAPABILITY_CUDA
 from easybuild.tools.toolchain.utilities import get_toolchain, search_toolchain
@@ -107,7 +111,13 @@ except ImportError as err:
 
 _easyconfig_files_cache = {}
 _easyconfigs_cache = {}
+# index of Python modules available in easyblocks package directories: dir path -> (mtime, set of module names)
+_easyblock_modules_index = {}
 _path_indexes = {}
+# contents of files in which toolchain hierarchies are cached across sessions: file path -> dict with cache entries
+_toolchain_hierarchy_cache_files = {}
+# candidate subtoolchains (+ corresponding module names) for dependencies, see robot_find_subtoolchain_for_dep
+_subtoolchain_cands_cache = {}
 
 
 def handle_deprecated_or_replaced_easyconfig_parameters(ec_method):
@@ -195,8 +205,101 @@ def triage_easyconfig_params(variables, ec):
     return ec_params, unknown_keys
 
 
+def det_toolchain_hierarchy_cache_key(toolchain, incl_capabilities=False):
+    """
+    Determine key for toolchain hierarchy in cache that is persisted across sessions,
+    taking into account the EasyBuild version, relevant build options and the known (sub)toolchains.
+    """
+    _, all_tc_classes = search_toolchain('')
+    tc_classes = sorted((tc_class.NAME, str(getattr(tc_class, 'SUBTOOLCHAIN', None)),
+                         getattr(tc_class, 'OPTIONAL', False)) for tc_class in all_tc_classes)
+
+    key_data = [
+        str(VERSION),
+        toolchain['name'],
+        toolchain['version'],
+        incl_capabilities,
+        build_option('add_dummy_to_minimal_toolchains'),
+        build_option('add_system_to_minimal_toolchains'),
+        build_option('robot_path'),
+        tc_classes,
+    ]
+    return hashlib.sha256(json.dumps(key_data, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def load_toolchain_hierarchy_cache(path):
+    """
+    Load toolchain hierarchies cached in specified file (only read once per session).
+    """
+    if path not in _toolchain_hierarchy_cache_files:
+        cached = {}
+        if os.path.exists(path):
+            try:
+                cached = json.loads(read_file(path))
+            except ValueError as err:
+                _log.warning("Ignoring cached toolchain hierarchies in %s, failed to load them: %s", path, err)
+
+        _toolchain_hierarchy_cache_files[path] = cached
+
+    return _toolchain_hierarchy_cache_files[path]
+
+
+def save_toolchain_hierarchy_cache(path, key, toolchain_hierarchy, ec_lookups):
+    """
+    Add toolchain hierarchy to file in which toolchain hierarchies are cached across sessions.
+
+    :param path: path to cache file
+    :param key: key for toolchain hierarchy (see det_toolchain_hierarchy_cache_key)
+    :param toolchain_hierarchy: toolchain hierarchy to cache
+    :param ec_lookups: list of (name, version, path) tuples for easyconfig files that were considered
+    """
+    easyconfigs = []
+    for name, version, ec_path in ec_lookups:
+        checksum = None
+        if ec_path is not None:
+            checksum = compute_checksum(ec_path, checksum_type=CHECKSUM_TYPE_SHA256)
+        easyconfigs.append([name, version, ec_path, checksum])
+
+    cached = load_toolchain_hierarchy_cache(path)
+    cached[key] = {'hierarchy': toolchain_hierarchy, 'easyconfigs': easyconfigs}
+
+    # also retain entries that were added by other sessions in the meantime
+    if os.path.exists(path):
+        try:
+            for other_key, entry in json.loads(read_file(path)).items():
+                cached.setdefault(other_key, entry)
+        except ValueError as err:
+            _log.warning("Overwriting cached toolchain hierarchies in %s, failed to load them: %s", path, err)
+
+    # cache file may be shared by concurrent sessions, so make sure it's never seen partially written
+    write_file_atomic(path, json.dumps(cached, indent=1, sort_keys=True))
+    _log.info("Cached hierarchy for toolchain %s/%s in %s", toolchain_hierarchy[-1]['name'],
+              toolchain_hierarchy[-1]['version'], path)
+
+
+def check_toolchain_hierarchy_cache_entry(entry):
+    """
+    Check whether cached toolchain hierarchy is still valid,
+    i.e. whether the same easyconfig files are found and whether they were not changed.
+    """
+    for name, version, path, checksum in entry['easyconfigs']:
+        if robot_find_easyconfig(name, version) != path:
+            _log.debug("Location of easyconfig for %s v%s changed, cached toolchain hierarchy is stale", name, version)
+            return False
+        if path is not None and compute_checksum(path, checksum_type=CHECKSUM_TYPE_SHA256) != checksum:
+            _log.debug("Easyconfig %s was changed, cached toolchain hierarchy is stale", path)
+            return False
+
+    return True
+
+
 def toolchain_hierarchy_cache(func):
-    """Function decorator to cache (and retrieve cached) toolchain hierarchy queries."""
+    """
+    Function decorator to cache (and retrieve cached) toolchain hierarchy queries.
+
+    Toolchain hierarchies are also cached across sessions in the file specified via --toolchain-hierarchy-cache
+    (if any), along with the checksums of the easyconfig files that were considered to determine them.
+    """
     cache = {}
 
     @functools.wraps(func)
@@ -209,7 +312,23 @@ def toolchain_hierarchy_cache(func):
             _log.debug("Using cache to return hierarchy for toolchain %s: %s", str(toolchain), cache[cache_key])
             return cache[cache_key]
         else:
-            toolchain_hierarchy = func(toolchain, incl_capabilities)
+            toolchain_hierarchy = None
+
+            cache_path = build_option('toolchain_hierarchy_cache')
+            if cache_path:
+                persistent_key = det_toolchain_hierarchy_cache_key(toolchain, incl_capabilities)
+                entry = load_toolchain_hierarchy_cache(cache_path).get(persistent_key)
+                if entry is not None and check_toolchain_hierarchy_cache_entry(entry):
+                    toolchain_hierarchy = entry['hierarchy']
+                    _log.info("Using hierarchy for toolchain %s cached in %s: %s",
+                              str(toolchain), cache_path, toolchain_hierarchy)
+
+            if toolchain_hierarchy is None:
+                ec_lookups = []
+                toolchain_hierarchy = func(toolchain, incl_capabilities, ec_lookups=ec_lookups)
+                if cache_path:
+                    save_toolchain_hierarchy_cache(cache_path, persistent_key, toolchain_hierarchy, ec_lookups)
+
             cache[cache_key] = toolchain_hierarchy
             return cache[cache_key]
 
@@ -257,7 +376,7 @@ def det_subtoolchain_version(current_tc, subtoolchain_name, optional_toolchains,
 
 
 @toolchain_hierarchy_cache
-def get_toolchain_hierarchy(parent_toolchain, incl_capabilities=False):
+def get_toolchain_hierarchy(parent_toolchain, incl_capabilities=False, ec_lookups=None):
     r"""
     Determine list of subtoolchains for specified parent toolchain.
     Result starts with the most minimal subtoolchains first, ends with specified toolchain.
@@ -281,7 +400,15 @@ def get_toolchain_hierarchy(parent_toolchain, incl_capabilities=False):
 
     :param parent_toolchain: dictionary with name/version of parent toolchain
     :param incl_capabilities: also register toolchain capabilities in result
+    :param ec_lookups: list to which (name, version, path) tuples are added for all easyconfig files being looked up
     """
+    def find_easyconfig(name, version):
+        """Find easyconfig file for specified software name/version, and keep track of it."""
+        path = robot_find_easyconfig(name, version)
+        if ec_lookups is not None:
+            ec_lookups.append((name, version, path))
+        return path
+
     # obtain list of all possible subtoolchains
     _, all_tc_classes = search_toolchain('')
     subtoolchains = dict((tc_class.NAME, getattr(tc_class, 'SUBTOOLCHAIN', None)) for tc_class in all_tc_classes)
@@ -307,7 +434,7 @@ def get_toolchain_hierarchy(parent_toolchain, incl_capabilities=False):
         if not isinstance(subtoolchain_names, list):
             subtoolchain_names = [subtoolchain_names]
         # grab the easyconfig of the current toolchain and search the dependencies for a version of the subtoolchain
-        path = robot_find_easyconfig(current_tc_name, current_tc_version)
+        path = find_easyconfig(current_tc_name, current_tc_version)
         if path is None:
             raise EasyBuildError("Could not find easyconfig for %s toolchain version %s",
                                  current_tc_name, current_tc_version)
@@ -331,7 +458,7 @@ def get_toolchain_hierarchy(parent_toolchain, incl_capabilities=False):
             ])
 
             # find easyconfig file for this dep and parse it
-            ecfile = robot_find_easyconfig(dep['name'], det_full_ec_version(dep))
+            ecfile = find_easyconfig(dep['name'], det_full_ec_version(dep))
             if ecfile is None:
                 raise EasyBuildError("Could not find easyconfig for dependency %s with version %s",
                                      dep['name'], det_full_ec_version(dep))
@@ -350,7 +477,7 @@ def get_toolchain_hierarchy(parent_toolchain, incl_capabilities=False):
             # only do this for composite toolchains, not single-compiler toolchains, whose
             # versions match those of the component instead of being e.g. "2018a".
             if dep in composite_toolchains:
-                ecfile = robot_find_easyconfig(dep, current_tc_version)
+                ecfile = find_easyconfig(dep, current_tc_version)
                 if ecfile is not None:
                     cands.append({'name': dep, 'version': current_tc_version})
 
@@ -811,7 +938,7 @@ class EasyConfig(object):
         validate presence of OS dependencies
         osdependencies should be a single list
         """
-        not_found = []
+        os_deps = []
         for dep in self['osdependencies']:
             # make sure we have a tuple
             if isinstance(dep, string_type):
@@ -819,9 +946,12 @@ class EasyConfig(object):
             elif not isinstance(dep, tuple):
                 raise EasyBuildError("Non-tuple value type for OS dependency specification: %s (type %s)",
                                      dep, type(dep))
+            os_deps.append(dep)
+
+        # check all (candidate) OS dependencies in one go
+        found = check_os_dependencies(flatten(os_deps))
 
-            if not any([check_os_dependency(cand_dep) for cand_dep in dep]):
-                not_found.append(dep)
+        not_found = [dep for dep in os_deps if not any(found[cand_dep] for cand_dep in dep)]
 
         if not_found:
             raise EasyBuildError("One or more OS dependencies were not found: %s", not_found)
@@ -1723,12 +1853,190 @@ class EasyConfig(object):
         return res
 
 
+class EasyConfigRecord(object):
+    """
+    Compact record for a parsed easyconfig, which only retains what is required to resolve dependencies
+    (name, version, toolchain, module names, ...).
+
+    A full EasyConfig instance is only (re)created from the easyconfig file when other information is required,
+    for example when the easyconfig is actually going to be built; attribute access and easyconfig parameter lookups
+    that can not be served from the record itself are transparently forwarded to it.
+    """
+    # easyconfig parameters that are retained in the record
+    PARAMS = ['name', 'version', 'versionprefix', 'versionsuffix', 'toolchain']
+    # names of attributes in which retained easyconfig parameters are stored, if different from parameter name;
+    # the 'toolchain' attribute of an EasyConfig instance is a Toolchain instance, which must not be shadowed
+    PARAM_ATTRS = {'toolchain': 'toolchain_spec'}
+
+    __slots__ = ['name', 'version', 'versionprefix', 'versionsuffix', 'toolchain_spec',
+                 'path', 'hidden', 'validate', 'full_mod_name', 'short_mod_name', 'mod_subdir', '_ec']
+
+    def __init__(self, ec, validate=True):
+        """
+        Create record for specified EasyConfig instance.
+
+        :param ec: parsed easyconfig (EasyConfig instance)
+        :param validate: whether or not to perform validation when full EasyConfig instance is recreated
+        """
+        for param in self.PARAMS:
+            object.__setattr__(self, self.PARAM_ATTRS.get(param, param), copy.deepcopy(ec[param]))
+
+        object.__setattr__(self, 'path', ec.path)
+        object.__setattr__(self, 'hidden', ec.hidden)
+        object.__setattr__(self, 'validate', validate)
+        object.__setattr__(self, 'full_mod_name', ec.full_mod_name)
+        object.__setattr__(self, 'short_mod_name', ec.short_mod_name)
+        object.__setattr__(self, 'mod_subdir', ec.mod_subdir)
+        object.__setattr__(self, '_ec', None)
+
+    def materialize(self):
+        """Return full EasyConfig instance for this record (parsing the easyconfig file again if needed)."""
+        if self._ec is None:
+            _log.debug("Creating full EasyConfig instance for %s", self.path)
+            object.__setattr__(self, '_ec', EasyConfig(self.path, validate=self.validate, hidden=self.hidden))
+        return self._ec
+
+    def __getattr__(self, attr):
+        """Forward lookup of attributes that are not retained in this record to full EasyConfig instance."""
+        # don't trigger (re)parsing the easyconfig file for special methods (e.g. __deepcopy__, __getstate__)
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        return getattr(self.materialize(), attr)
+
+    def __setattr__(self, attr, value):
+        """Set attribute in full EasyConfig instance (retained information is read-only)."""
+        if attr in self.__slots__:
+            raise EasyBuildError("Attribute '%s' of EasyConfigRecord instance can not be changed", attr)
+        setattr(self.materialize(), attr, value)
+
+    def __contains__(self, key):
+        """Check whether specified easyconfig parameter is known."""
+        return key in self.PARAMS or key in self.materialize()
+
+    def __getitem__(self, key):
+        """Return value of specified easyconfig parameter."""
+        if key in self.PARAMS and self._ec is None:
+            return getattr(self, self.PARAM_ATTRS.get(key, key))
+        return self.materialize()[key]
+
+    def __setitem__(self, key, value):
+        """Set value of specified easyconfig parameter (in full EasyConfig instance)."""
+        ec = self.materialize()
+        ec[key] = value
+        if key in self.PARAMS:
+            object.__setattr__(self, self.PARAM_ATTRS.get(key, key), ec[key])
+
+    def get(self, key, default=None, resolve=True):
+        """Return value of specified easyconfig parameter, with 'default' as fallback."""
+        if key in self.PARAMS and self._ec is None:
+            return getattr(self, self.PARAM_ATTRS.get(key, key))
+        return self.materialize().get(key, default=default, resolve=resolve)
+
+    @classmethod
+    def det_cmp_key(cls, ec):
+        """
+        Determine key to compare specified record or EasyConfig instance with, which is cheap to compute
+        (i.e. never requires parsing the easyconfig file): path, whether module is hidden,
+        retained easyconfig parameters and build specifications (never used for records, see process_easyconfig).
+        """
+        if isinstance(ec, EasyConfigRecord):
+            params = [getattr(ec, cls.PARAM_ATTRS.get(param, param)) for param in cls.PARAMS]
+            build_specs = None
+        else:
+            params = [ec[param] for param in cls.PARAMS]
+            build_specs = ec.build_specs
+
+        # toolchain specification is a dict, which is not hashable
+        params = [tuple(sorted(x.items())) if isinstance(x, dict) else x for x in params]
+        if build_specs:
+            build_specs = tuple(sorted((key, repr(val)) for (key, val) in build_specs.items()))
+
+        return (ec.path, ec.hidden, tuple(params), build_specs or None)
+
+    # equality and hash value are based on information that is available without parsing the easyconfig file,
+    # to avoid that comparing records (e.g. via 'in', or using them in a set) requires full EasyConfig instances
+    def __eq__(self, ec):
+        """Is this record equivalent to the provided one (or to the provided EasyConfig instance)?"""
+        if not isinstance(ec, (EasyConfig, EasyConfigRecord)):
+            return False
+        return self.det_cmp_key(self) == self.det_cmp_key(ec)
+
+    def __ne__(self, ec):
+        """Is this record not equivalent to the provided one (or to the provided EasyConfig instance)?"""
+        return not self.__eq__(ec)
+
+    def __hash__(self):
+        """Return hash value for this record."""
+        return hash(self.det_cmp_key(self))
+
+    def __repr__(self):
+        """Return string representation of this record."""
+        return "EasyConfigRecord(%s)" % self.path
+
+
 def det_installversion(version, toolchain_name, toolchain_version, prefix, suffix):
     """Deprecated 'det_installversion' function, to determine exact install version, based on supplied parameters."""
     old_fn = 'framework.easyconfig.easyconfig.det_installversion'
     _log.nosupport('Use det_full_ec_version from easybuild.tools.module_generator instead of %s' % old_fn, '2.0')
 
 
+def avail_easyblock_modules():
+    """
+    Determine names of software-specific easyblock modules that can be imported,
+    by scanning the directories of the easybuild.easyblocks package (incl. those for included easyblocks).
+
+    The result of scanning each directory is cached, and reused as long as the directory is not modified.
+
+    :return: set of module names (without 'easybuild.easyblocks.' prefix),
+             or None if the available easyblock modules can not be determined by scanning directories
+    """
+    try:
+        import easybuild.easyblocks
+    except ImportError as err:
+        _log.debug("Failed to import easybuild.easyblocks package, so no easyblocks modules are available: %s", err)
+        return None
+
+    modules = set()
+    for path in easybuild.easyblocks.__path__:
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError as err:
+            # not a (existing) directory (e.g. a zip file), so we can't determine which modules are available
+            _log.debug("Failed to stat easyblocks package path %s, not using index of easyblock modules: %s", path, err)
+            return None
+
+        cached = _easyblock_modules_index.get(path)
+        if cached is None or cached[0] != mtime:
+            if not os.path.isdir(path):
+                return None
+            # all files are taken into account (.py, .pyc, .so, ...), as well as subpackages
+            cached = (mtime, set(entry.split('.')[0] for entry in os.listdir(path)))
+            _easyblock_modules_index[path] = cached
+
+        modules.update(cached[1])
+
+    return modules
+
+
+def is_avail_easyblock_module(modulepath):
+    """
+    Check whether easyblock module with specified module path can be imported (without actually importing it).
+
+    :return: False if the specified module is known to be not available, True otherwise
+    """
+    if modulepath in sys.modules:
+        return True
+
+    prefix = 'easybuild.easyblocks.'
+    modname = modulepath[len(prefix):] if modulepath.startswith(prefix) else None
+    # only software-specific easyblocks are indexed
+    if modname is None or '.' in modname:
+        return True
+
+    modules = avail_easyblock_modules()
+    return modules is None or modname in modules
+
+
 def get_easyblock_class(easyblock, name=None, error_on_failed_import=True, error_on_missing_easyblock=None, **kwargs):
     """
     Get class for a particular easyblock (or use default)
@@ -1767,11 +2075,15 @@ def get_easyblock_class(easyblock, name=None, error_on_failed_import=True, error
             # modulepath will be the namespace + encoded modulename (from the classname)
             modulepath = get_module_path(class_name, generic=False)
             modulepath_imported = False
-            try:
-                __import__(modulepath, globals(), locals(), [''])
-                modulepath_imported = True
-            except ImportError as err:
-                _log.debug("Failed to import module '%s': %s" % (modulepath, err))
+            # avoid trying to import easyblock modules that are known to be not available,
+            # since failing imports are expensive (and very common for extensions)
+            modulepath_avail = is_avail_easyblock_module(modulepath)
+            if modulepath_avail:
+                try:
+                    __import__(modulepath, globals(), locals(), [''])
+                    modulepath_imported = True
+                except ImportError as err:
+                    _log.debug("Failed to import module '%s': %s" % (modulepath, err))
 
             # check if determining module path based on software name would have resulted in a different module path
             if modulepath_imported:
@@ -1785,6 +2097,8 @@ def get_easyblock_class(easyblock, name=None, error_on_failed_import=True, error
 
             # try and find easyblock
             try:
+                if not modulepath_avail:
+                    raise ImportError("No module named '%s'" % modulepath)
                 _log.debug("getting class for %s.%s" % (modulepath, class_name))
                 cls = get_class_for(modulepath, class_name)
                 _log.info("Successfully obtained %s class instance from %s" % (class_name, modulepath))
@@ -1907,7 +2221,7 @@ def resolve_template(value, tmpl_dict):
     return value
 
 
-def process_easyconfig(path, build_specs=None, validate=True, parse_only=False, hidden=None):
+def process_easyconfig(path, build_specs=None, validate=True, parse_only=False, hidden=None, compact=False):
     """
     Process easyconfig, returning some information for each block
     :param path: path to easyconfig file
@@ -1915,6 +2229,8 @@ def process_easyconfig(path, build_specs=None, validate=True, parse_only=False,
     :param validate: whether or not to perform validation
     :param parse_only: only parse easyconfig superficially (faster, but results in partial info)
     :param hidden: indicate whether corresponding module file should be installed hidden ('.'-prefixed)
+    :param compact: only retain a compact record for parsed easyconfigs (see EasyConfigRecord),
+                    not supported in combination with build specifications
     """
     blocks = retrieve_blocks_in_spec(path, build_option('only_blocks'))
 
@@ -1924,7 +2240,7 @@ def process_easyconfig(path, build_specs=None, validate=True, parse_only=False,
     # only cache when no build specifications are involved (since those can't be part of a dict key)
     cache_key = None
     if build_specs is None:
-        cache_key = (path, validate, hidden, parse_only)
+        cache_key = (path, validate, hidden, parse_only, compact)
         if cache_key in _easyconfigs_cache:
             return [e.copy() for e in _easyconfigs_cache[cache_key]]
 
@@ -1944,6 +2260,9 @@ def process_easyconfig(path, build_specs=None, validate=True, parse_only=False,
         easyconfig = {
             'ec': ec,
         }
+        if compact and build_specs is None:
+            # full EasyConfig instance is only retained for as long as needed to determine dependencies below
+            easyconfig['ec'] = EasyConfigRecord(ec, validate=validate)
         easyconfigs.append(easyconfig)
 
         if not parse_only:
@@ -2118,6 +2437,33 @@ def verify_easyconfig_filename(path, specs, parsed_ec=None):
     _log.info("Contents of %s verified against easyconfig filename, matches %s", path, specs)
 
 
+def det_subtoolchain_mod_names(dep, toolchain_hierarchy):
+    """
+    Determine module name for specified dependency for each of the toolchains in the specified toolchain hierarchy;
+    results are cached per dependency (name, version, versionsuffix) and toolchain hierarchy.
+
+    :param dep: dependency specification (dict)
+    :param toolchain_hierarchy: list of toolchains (dicts)
+    :return: list of (toolchain, module name) tuples (module name is None if it could not be determined)
+    """
+    key = (dep['name'], dep.get('version'), dep.get('versionsuffix', ''), dep.get('hidden', False),
+           dep.get('external_module', False), tuple((tc['name'], tc['version']) for tc in toolchain_hierarchy))
+
+    if key not in _subtoolchain_cands_cache:
+        newdep = copy.deepcopy(dep)
+        res = []
+        for tc in toolchain_hierarchy:
+            # try to determine module name using this particular subtoolchain;
+            # this may fail if no easyconfig is available in robot search path
+            # and the module naming scheme requires an easyconfig file
+            newdep['toolchain'] = tc
+            res.append((tc, ActiveMNS().det_full_module_name(newdep, require_result=False)))
+
+        _subtoolchain_cands_cache[key] = res
+
+    return _subtoolchain_cands_cache[key]
+
+
 def robot_find_subtoolchain_for_dep(dep, modtool, parent_tc=None, parent_first=False):
     """
     Find the subtoolchain to use for a dependency
@@ -2159,13 +2505,7 @@ def robot_find_subtoolchain_for_dep(dep, modtool, parent_tc=None, parent_first=F
 
     cand_subtcs = []
 
-    for tc in toolchain_hierarchy:
-        # try to determine module name using this particular subtoolchain;
-        # this may fail if no easyconfig is available in robot search path
-        # and the module naming scheme requires an easyconfig file
-        newdep['toolchain'] = tc
-        mod_name = ActiveMNS().det_full_module_name(newdep, require_result=False)
-
+    for tc, mod_name in det_subtoolchain_mod_names(newdep, toolchain_hierarchy):
         # if the module name can be determined, subtoolchain is an actual candidate
         if mod_name:
             # check whether module already exists or not (but only if that info will actually be used)
@@ -2423,7 +2763,11 @@ class ActiveMNS(BaseActiveMNS):
         :param raise_error: boolean indicating whether or not an error should be raised
                             if a full easyconfig is required but not found
         """
-        if not isinstance(ec, EasyConfig) and self.requires_full_easyconfig(ec.keys()):
+        if isinstance(ec, EasyConfigRecord):
+            if self.requires_full_easyconfig(ec.PARAMS):
+                ec = ec.materialize()
+
+        elif not isinstance(ec, EasyConfig) and self.requires_full_easyconfig(ec.keys()):
 
             self.log.debug("A parsed easyconfig is required by the module naming scheme, so finding one for %s" % ec)
 
@@ -30,6 +30,7 @@ This is the original pure python code, to be exec'ed rather then parsed
 :author: Stijn De Weirdt (Ghent University)
 :author: Kenneth Hoste (Ghent University)
 """
+import logging
 import os
 import pprint
 import re
@@ -495,7 +496,9 @@ class FormatOneZero(EasyConfigFormatConfigObj):
                     comment_key = before_comment.rstrip()
                     self.comments['iterinline'].setdefault(last_param_key, {})[comment_key] = '  ' + comment
 
-        self.log.debug("Extracted comments:\n%s", pprint.pformat(self.comments, width=120))
+        # only pretty print extracted comments when debug logging is enabled, since that's relatively expensive
+        if self.log.isEnabledFor(logging.DEBUG):
+            self.log.debug("Extracted comments:\n%s", pprint.pformat(self.comments, width=120))
 
 
 def retrieve_blocks_in_spec(spec, only_blocks, silent=False):
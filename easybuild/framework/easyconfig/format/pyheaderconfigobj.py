@@ -30,6 +30,7 @@ The main easyconfig format class
 :author: Kenneth Hoste (Ghent University)
 """
 import copy
+import hashlib
 import re
 import sys
 
@@ -45,6 +46,12 @@ from easybuild.tools.systemtools import get_shared_lib_ext
 
 _log = fancylogger.getLogger('easyconfig.format.pyheaderconfigobj', fname=False)
 
+# cache for template of environment in which pyheaders are exec'ed, one per combination of format class and builtins
+_pyheader_env_templates = {}
+
+# cache for code objects obtained by compiling pyheaders, indexed by checksum of pyheader text
+_pyheader_code_cache = {}
+
 
 def build_easyconfig_constants_dict():
     """Make a dictionary with all constants that can be used"""
@@ -174,26 +181,37 @@ class EasyConfigFormatConfigObj(EasyConfigFormat):
 
     def parse_pyheader(self, pyheader):
         """Parse the python header, assign to docstring and cfg"""
-        global_vars = self.pyheader_env()
-        self.log.debug("pyheader initial global_vars %s", global_vars)
+        # fresh copy of dictionary with constants that can be used in easyconfig files,
+        # use it as 'globals' dict in exec call so parsed easyconfig parameters are added to it
+        cfg = self.pyheader_env()
+        env_keys = list(cfg.keys())
+        self.log.debug("pyheader initial global_vars %s", cfg)
         self.log.debug("pyheader text being exec'ed: %s", pyheader)
 
         # check for use of deprecated magic easyconfigs variables
-        for magic_var in build_easyconfig_variables_dict():
-            if re.search(magic_var, pyheader, re.M):
-                _log.nosupport("Magic 'global' easyconfigs variable %s should no longer be used" % magic_var, '2.0')
-
-        # copy dictionary with constants that can be used in easyconfig files,
-        # use it as 'globals' dict in exec call so parsed easyconfig parameters are added to it
-        cfg = copy.deepcopy(global_vars)
+        magic_vars_regex = _pyheader_env_templates[self._pyheader_env_key()]['magic_vars_regex']
+        res = magic_vars_regex and magic_vars_regex.search(pyheader)
+        if res:
+            _log.nosupport("Magic 'global' easyconfigs variable %s should no longer be used" % res.group(0), '2.0')
 
         try:
+            # pyheaders are compiled only once, the resulting code object is cached
+            # (easyconfig files are often parsed multiple times in a single session)
+            if isinstance(pyheader, bytes):
+                key = hashlib.sha1(pyheader).hexdigest()
+            else:
+                key = hashlib.sha1(pyheader.encode('utf-8')).hexdigest()
+            code = _pyheader_code_cache.get(key)
+            if code is None:
+                code = compile(pyheader, '<string>', 'exec')
+                _pyheader_code_cache[key] = code
+
             # cfg dict is used as globals dict;
             # we should *not* pass a separate (empty) locals dict to exec,
             # otherwise problems may occur when using Python 3 and
             # parsing easyconfig files that use local variables in list comprehensions
             # cfr. https://github.com/easybuilders/easybuild-framework/pull/2895
-            exec(pyheader, cfg)
+            exec(code, cfg)
         except Exception as err:  # pylint: disable=broad-except
             err_msg = str(err)
             exc_tb = sys.exc_info()[2]
@@ -201,11 +219,9 @@ class EasyConfigFormatConfigObj(EasyConfigFormat):
                 err_msg += " (line %d)" % exc_tb.tb_next.tb_lineno
             raise EasyBuildError("Parsing easyconfig file failed: %s",  err_msg)
 
-        self.log.debug("pyheader parsed cfg: %s", cfg)
-
         # get rid of constants from parsed easyconfig file, they are not valid easyconfig parameters
-        for key in global_vars:
-            self.log.debug("Removing key '%s' from parsed cfg (constant, not an easyconfig parameter)", key)
+        self.log.debug("Removing keys from parsed cfg (constants, not easyconfig parameters): %s", env_keys)
+        for key in env_keys:
             del cfg[key]
 
         self.log.debug("pyheader final parsed cfg: %s", cfg)
@@ -217,8 +233,15 @@ class EasyConfigFormatConfigObj(EasyConfigFormat):
 
         self.pyheader_localvars = cfg
 
-    def pyheader_env(self):
-        """Create the global/local environment to use with eval/execfile"""
+    def _pyheader_env_key(self):
+        """Determine key for cached template of environment in which pyheader is exec'ed"""
+        builtins = self.PYHEADER_ALLOWED_BUILTINS
+        if builtins is not None:
+            builtins = tuple(builtins)
+        return (self.__class__, builtins)
+
+    def _build_pyheader_env(self):
+        """Build the global/local environment to use with eval/execfile"""
         global_vars = {}
 
         # all variables
@@ -242,6 +265,34 @@ class EasyConfigFormatConfigObj(EasyConfigFormat):
 
         return global_vars
 
+    def pyheader_env(self):
+        """
+        Create the global/local environment to use with eval/execfile
+
+        The environment is only built once (per format class), a copy of it is returned;
+        only values that could be modified in place (like the SYSTEM constant, which is a dict) are copied deeply,
+        all other values are immutable and can be shared safely
+        """
+        key = self._pyheader_env_key()
+        template = _pyheader_env_templates.get(key)
+        if template is None:
+            global_vars = self._build_pyheader_env()
+            magic_vars = build_easyconfig_variables_dict()
+            template = {
+                'global_vars': global_vars,
+                'magic_vars_regex': None,
+                'mutable_keys': [k for (k, v) in global_vars.items() if isinstance(v, (dict, list, set))],
+            }
+            if magic_vars:
+                template['magic_vars_regex'] = re.compile('|'.join(re.escape(x) for x in sorted(magic_vars)), re.M)
+            _pyheader_env_templates[key] = template
+
+        global_vars = template['global_vars'].copy()
+        for key in template['mutable_keys']:
+            global_vars[key] = copy.deepcopy(global_vars[key])
+
+        return global_vars
+
     def _validate_pyheader(self):
         """
         Basic validation of pyheader localvars.
@@ -28,14 +28,20 @@ Style tests for easyconfig files using pycodestyle.
 
 :author: Ward Poelmans (Ghent University)
 """
+import json
+import os
 import re
 import sys
 
 from easybuild.base import fancylogger
 from easybuild.framework.easyconfig.easyconfig import EasyConfig
 from easybuild.tools.build_log import EasyBuildError, print_msg
-from easybuild.tools.py2vs3 import reload, string_type
+from easybuild.tools.config import build_option
+from easybuild.tools.filetools import CHECKSUM_TYPE_SHA256, compute_checksum, read_file, write_file_atomic
+from easybuild.tools.py2vs3 import StringIO, reload, string_type
+from easybuild.tools.systemtools import map_parallel
 from easybuild.tools.utilities import only_if_module_is_available
+from easybuild.tools.version import VERSION
 
 try:
     import pycodestyle
@@ -57,6 +63,15 @@ PARAM_DEF_REGEX = re.compile(r"^(?P<key>[a-z_]+)\s*=\s*")
 
 MAX_LINE_LENGTH = 120
 
+# number of easyconfig files handed out at once to each process when running style checks in parallel
+STYLE_CHECK_CHUNK_SIZE = 10
+
+# placeholder for path to easyconfig file in cached output of style check
+STYLE_OUTPUT_PATH_PLACEHOLDER = '<path>'
+
+# style guide used to check individual easyconfig files, see _check_easyconfig_style
+_style_guide = {'guide': None}
+
 
 # Any function starting with _eb_check_ (see EB_CHECK variable) will be
 # added to the tests if the test number is added to the select list.
@@ -104,13 +119,90 @@ def _eb_check_trailing_whitespace(physical_line, lines, line_number, checker_sta
     return result
 
 
-@only_if_module_is_available(('pycodestyle', 'pep8'))
-def check_easyconfigs_style(easyconfigs, verbose=False):
+class CheckResultsCache(object):
     """
-    Check the given list of easyconfigs for style
-    :param: easyconfigs list of file paths to easyconfigs
-    :param: verbose print our statistics and be verbose about the errors and warning
-    :return: the number of warnings and errors
+    Cache for results of checks on easyconfig files (style check, contribution checks),
+    indexed by the checksum (and name) of the easyconfig file, so checks can be skipped for unchanged easyconfig files.
+
+    Since easyconfig files with the same contents may be located elsewhere, cached results should not include
+    the full path to the easyconfig file (see also style_output_to_template).
+    """
+
+    def __init__(self, path=None):
+        """
+        Initialise cache, load previously cached results (if any)
+
+        :param path: path to file in which cached results are stored (None implies no caching across sessions)
+        """
+        self.path = path
+        self.results = {}
+        if path and os.path.exists(path):
+            try:
+                self.results = json.loads(read_file(path))
+            except ValueError as err:
+                _log.warning("Ignoring cached check results in %s, failed to load them: %s", path, err)
+
+    def key(self, check, path, extra=None):
+        """
+        Determine key for result of specified check on specified easyconfig file.
+
+        :param check: name of check
+        :param path: path to easyconfig file
+        :param extra: additional string to include in key (e.g. checksum of easyblock used to perform the check)
+        :return: key (string), or None if no key can be determined (if specified file does not exist)
+        """
+        if path is None or not os.path.isfile(path):
+            return None
+        checksum = compute_checksum(path, checksum_type=CHECKSUM_TYPE_SHA256)
+        # name of easyconfig file is included, since it may be mentioned in the check results
+        return ':'.join([check, str(VERSION), checksum, os.path.basename(path), extra or ''])
+
+    def get(self, key):
+        """Get cached check result for specified key (None if no result is available)."""
+        return self.results.get(key)
+
+    def set(self, key, result):
+        """Cache check result for specified key (results for None key are not cached)."""
+        if key is not None:
+            self.results[key] = result
+
+    def save(self):
+        """Store cached check results (if a path was specified)."""
+        if self.path:
+            write_file_atomic(self.path, json.dumps(self.results, indent=1, sort_keys=True))
+            _log.info("Cached results for %d checks stored in %s", len(self.results), self.path)
+
+
+def style_output_to_template(output, path):
+    """
+    Replace path to easyconfig file at start of lines in output of style check with a placeholder,
+    so output can be cached regardless of location of the easyconfig file.
+    """
+    prefix = path + ':'
+    lines = output.split('\n')
+    for idx, line in enumerate(lines):
+        if line.startswith(prefix):
+            lines[idx] = STYLE_OUTPUT_PATH_PLACEHOLDER + line[len(path):]
+    return '\n'.join(lines)
+
+
+def style_output_from_template(template, path):
+    """
+    Determine output of style check for easyconfig file at specified path from template (see style_output_to_template).
+    """
+    prefix = STYLE_OUTPUT_PATH_PLACEHOLDER + ':'
+    lines = template.split('\n')
+    for idx, line in enumerate(lines):
+        if line.startswith(prefix):
+            lines[idx] = path + line[len(STYLE_OUTPUT_PATH_PLACEHOLDER):]
+    return '\n'.join(lines)
+
+
+def _init_style_guide(verbose=False):
+    """
+    Create pycodestyle style guide to check easyconfig files with.
+
+    :param verbose: be verbose about the errors and warnings
     """
     # importing autopep8 changes some pep8 functions.
     # We reload it to be sure to get the real pep8 functions.
@@ -138,6 +230,19 @@ def check_easyconfigs_style(easyconfigs, verbose=False):
     )
     options.verbose = int(verbose)
 
+    return styleguide
+
+
+@only_if_module_is_available(('pycodestyle', 'pep8'))
+def check_easyconfigs_style(easyconfigs, verbose=False):
+    """
+    Check the given list of easyconfigs for style
+    :param: easyconfigs list of file paths to easyconfigs
+    :param: verbose print our statistics and be verbose about the errors and warning
+    :return: the number of warnings and errors
+    """
+    styleguide = _init_style_guide(verbose=verbose)
+
     result = styleguide.check_files(easyconfigs)
 
     if verbose:
@@ -146,30 +251,84 @@ def check_easyconfigs_style(easyconfigs, verbose=False):
     return result.total_errors
 
 
-def cmdline_easyconfigs_style_check(ecs):
+def _check_easyconfig_style(path):
+    """
+    Check style of a single easyconfig file, using a style guide that is only created once (per process).
+
+    :return: tuple with number of warnings and errors, and output produced by the style check
+    """
+    if _style_guide['guide'] is None:
+        _style_guide['guide'] = _init_style_guide()
+
+    # capture output of style check, so results for different files can be reported in a deterministic order
+    orig_stdout = sys.stdout
+    sys.stdout = StringIO()
+    try:
+        errors = _style_guide['guide'].input_file(path)
+        output = sys.stdout.getvalue()
+    finally:
+        sys.stdout = orig_stdout
+
+    return (errors, output)
+
+
+@only_if_module_is_available(('pycodestyle', 'pep8'))
+def cmdline_easyconfigs_style_check(ecs, cache=None):
     """
     Run easyconfigs style check of each of the specified easyconfigs, triggered from 'eb' command line
 
+    Easyconfig files are checked in parallel (see map_parallel),
+    results for easyconfig files that were checked before (and were not changed since) are taken from the cache.
+
     :param ecs: list of easyconfigs to check, could be either file paths or EasyConfig instances
+    :param cache: CheckResultsCache instance to use (if None, one is created based on --check-contrib-cache)
     :return: True when style check passed on all easyconfig files, False otherwise
     """
     print_msg("\nRunning style check on %d easyconfig(s)...\n" % len(ecs), prefix=False)
-    style_check_passed = True
+
+    paths = []
     for ec in ecs:
         # if an EasyConfig instance is provided, just grab the corresponding file path
         if isinstance(ec, EasyConfig):
-            path = ec.path
+            paths.append(ec.path)
         elif isinstance(ec, string_type):
-            path = ec
+            paths.append(ec)
         else:
             raise EasyBuildError("Value of unknown type encountered in cmdline_easyconfigs_style_check: %s (type: %s)",
                                  ec, type(ec))
 
-        if check_easyconfigs_style([path]) == 0:
+    save_cache = cache is None
+    if cache is None:
+        cache = CheckResultsCache(build_option('check_contrib_cache'))
+
+    keys = [cache.key('style', path) for path in paths]
+    to_check = [path for (path, key) in zip(paths, keys) if cache.get(key) is None]
+    _log.info("Style check results for %d/%d easyconfig files found in cache", len(paths) - len(to_check), len(paths))
+
+    # start from a fresh style guide, see _init_style_guide
+    _style_guide['guide'] = None
+    results = dict(zip(to_check, map_parallel(_check_easyconfig_style, to_check, chunksize=STYLE_CHECK_CHUNK_SIZE)))
+
+    style_check_passed = True
+    for path, key in zip(paths, keys):
+        if path in results:
+            errors, output = results[path]
+            cache.set(key, [errors, style_output_to_template(output, path)])
+        else:
+            errors, template = cache.get(key)
+            output = style_output_from_template(template, path)
+
+        if output:
+            sys.stdout.write(output)
+
+        if errors == 0:
             res = 'PASS'
         else:
             res = 'FAIL'
             style_check_passed = False
         print_msg('[%s] %s' % (res, path), prefix=False)
 
+    if save_cache:
+        cache.save()
+
     return style_check_passed
@@ -38,6 +38,9 @@ alongside the EasyConfig class to represent parsed easyconfig files.
 """
 import copy
 import glob
+import hashlib
+import inspect
+import json
 import os
 import re
 import sys
@@ -49,14 +52,15 @@ from easybuild.framework.easyconfig import EASYCONFIGS_PKG_SUBDIR
 from easybuild.framework.easyconfig.easyconfig import EASYCONFIGS_ARCHIVE_DIR, ActiveMNS, EasyConfig
 from easybuild.framework.easyconfig.easyconfig import create_paths, get_easyblock_class, process_easyconfig
 from easybuild.framework.easyconfig.format.yeb import quote_yaml_special_chars
-from easybuild.framework.easyconfig.style import cmdline_easyconfigs_style_check
+from easybuild.framework.easyconfig.style import CheckResultsCache, cmdline_easyconfigs_style_check
 from easybuild.tools.build_log import EasyBuildError, print_msg, print_warning
-from easybuild.tools.config import build_option
+from easybuild.tools.config import build_option, install_path, log_path
 from easybuild.tools.environment import restore_env
-from easybuild.tools.filetools import find_easyconfigs, is_patch_file, read_file, resolve_path, which, write_file
+from easybuild.tools.filetools import CHECKSUM_TYPE_SHA256, compute_checksum, find_easyconfigs, is_patch_file
+from easybuild.tools.filetools import read_file, resolve_path, which, write_file
 from easybuild.tools.github import fetch_easyconfigs_from_pr, download_repo
 from easybuild.tools.multidiff import multidiff
-from easybuild.tools.py2vs3 import OrderedDict
+from easybuild.tools.py2vs3 import OrderedDict, string_type
 from easybuild.tools.toolchain.toolchain import is_system_toolchain
 from easybuild.tools.toolchain.utilities import search_toolchain
 from easybuild.tools.utilities import only_if_module_is_available, quote_str
@@ -86,6 +90,13 @@ except ImportError:
 
 _log = fancylogger.getLogger('easyconfig.tools', fname=False)
 
+# name of file in reprod directory in which build fingerprint is recorded
+BUILD_FINGERPRINT_FILE = 'fingerprint.json'
+
+# build options that affect the installation, and hence are part of the build fingerprint
+BUILD_FINGERPRINT_OPTIONS = ['filter_deps', 'filter_env_vars', 'hide_deps', 'minimal_toolchains', 'optarch',
+                             'rpath', 'rpath_filter']
+
 
 def skip_available(easyconfigs, modtool):
     """Skip building easyconfigs for existing modules."""
@@ -101,6 +112,161 @@ def skip_available(easyconfigs, modtool):
     return retained_easyconfigs
 
 
+def det_easyblock_checksums(easyblock_class):
+    """
+    Determine SHA256 checksums for source files of (software-specific and generic) easyblocks that are used
+    by specified easyblock class, i.e. the ones that are also archived in the reprod directory.
+
+    :param easyblock_class: easyblock class
+    :return: list of (filename, checksum) tuples
+    """
+    res = []
+    for klass in inspect.getmro(easyblock_class):
+        # if we reach EasyBlock or ExtensionEasyBlock class, we are done (see also reproduce_build)
+        if klass.__name__ in ['EasyBlock', 'ExtensionEasyBlock', 'object']:
+            break
+        path = inspect.getsourcefile(klass)
+        if path is None:
+            _log.warning("Source file for easyblock class %s not found, so not included in build fingerprint",
+                         klass.__name__)
+        else:
+            res.append((os.path.basename(path), compute_checksum(path, checksum_type=CHECKSUM_TYPE_SHA256)))
+    return res
+
+
+def det_patch_checksums(ec):
+    """
+    Determine SHA256 checksums for patch files of specified easyconfig,
+    for those that are located next to the easyconfig file.
+    """
+    res = []
+    if ec.path:
+        ec_dir = os.path.dirname(ec.path)
+        for patch in ec['patches']:
+            if isinstance(patch, (list, tuple)):
+                patch = patch[0]
+            if isinstance(patch, string_type):
+                path = os.path.join(ec_dir, patch)
+                if os.path.isfile(path):
+                    res.append((patch, compute_checksum(path, checksum_type=CHECKSUM_TYPE_SHA256)))
+    return res
+
+
+def det_installed_build_fingerprint(ec):
+    """
+    Obtain the build fingerprint that was recorded when the specified software was installed.
+
+    :param ec: easyconfig (or dependency specification) for installed software
+    :return: dict with recorded fingerprint & build inputs, or None if no fingerprint was recorded
+    """
+    # imported here to avoid circular import (easyblock module imports from this module)
+    from easybuild.framework.easyblock import REPROD
+
+    res = None
+    try:
+        installdir = os.path.join(os.path.abspath(install_path()), ActiveMNS().det_install_subdir(ec))
+        # fingerprint is recorded in reprod subdirectory of log directory in installation directory
+        path = os.path.join(installdir, log_path(ec=ec), REPROD, BUILD_FINGERPRINT_FILE)
+        if os.path.isfile(path):
+            res = json.loads(read_file(path))
+    except (EasyBuildError, ValueError) as err:
+        _log.warning("Failed to obtain recorded build fingerprint for %s: %s", ec['name'], err)
+
+    return res
+
+
+def det_build_fingerprint(ec, dep_fingerprints=None, easyblock_class=None):
+    """
+    Determine fingerprint for build inputs of specified easyconfig, which includes
+    the easyconfig file contents, patch & easyblock checksums, fingerprints for dependencies (incl. toolchain),
+    and the values for build options that affect the installation.
+
+    :param ec: parsed easyconfig (EasyConfig instance)
+    :param dep_fingerprints: dict with (already determined) fingerprints for dependencies, by module name;
+                             for other dependencies, the fingerprint recorded at installation time is used
+    :param easyblock_class: easyblock class used to install software (determined based on easyconfig if None)
+    :return: dict with fingerprint and build inputs
+    """
+    if dep_fingerprints is None:
+        dep_fingerprints = {}
+
+    if easyblock_class is None:
+        easyblock_class = get_easyblock_class(build_option('easyblock') or ec['easyblock'], name=ec['name'])
+
+    deps = {}
+    for dep in ec.all_dependencies:
+        dep_mod_name = dep.get('full_mod_name') or ActiveMNS().det_full_module_name(dep)
+        if dep.get('external_module', False):
+            deps[dep_mod_name] = 'external'
+        elif dep_mod_name in dep_fingerprints:
+            deps[dep_mod_name] = dep_fingerprints[dep_mod_name]
+        else:
+            installed_fingerprint = det_installed_build_fingerprint(dep)
+            if installed_fingerprint:
+                deps[dep_mod_name] = installed_fingerprint['fingerprint']
+            else:
+                deps[dep_mod_name] = None
+
+    inputs = {
+        'build_options': dict((opt, build_option(opt)) for opt in BUILD_FINGERPRINT_OPTIONS),
+        'dependencies': deps,
+        'easyblocks': det_easyblock_checksums(easyblock_class),
+        'easyconfig': hashlib.sha256(ec.rawtxt.encode('utf-8')).hexdigest(),
+        'patches': det_patch_checksums(ec),
+    }
+    # make sure tuples are represented as lists, so build inputs are the same after reading them back in
+    inputs = json.loads(json.dumps(inputs, sort_keys=True, default=str))
+
+    return {
+        'fingerprint': hashlib.sha256(json.dumps(inputs, sort_keys=True).encode('utf-8')).hexdigest(),
+        'inputs': inputs,
+    }
+
+
+def skip_unchanged(easyconfigs, modtool):
+    """
+    Skip building easyconfigs for existing modules, if the inputs of the build have not changed,
+    according to the build fingerprint that was recorded when the software was installed.
+
+    Easyconfigs for which dependencies (incl. toolchain) will be rebuilt are also retained,
+    since fingerprints of dependencies are part of the build fingerprint.
+
+    Only used when --rebuild-if-changed is enabled (see skip_available otherwise), since determining build fingerprints
+    requires a full EasyConfig instance for each easyconfig (even if only a compact record was retained for it).
+
+    :param easyconfigs: list of parsed easyconfigs, ordered such that dependencies come first
+    :param modtool: modules tool instance
+    :return: list of retained easyconfigs
+    """
+    module_names = [ec['full_mod_name'] for ec in easyconfigs]
+    modules_exist = modtool.exist(module_names, maybe_partial=False)
+
+    fingerprints = {}
+    retained_easyconfigs = []
+    for ec, mod_name, mod_exists in zip(easyconfigs, module_names, modules_exist):
+        fingerprint = det_build_fingerprint(ec['ec'], dep_fingerprints=fingerprints)
+        fingerprints[mod_name] = fingerprint['fingerprint']
+
+        if not mod_exists:
+            _log.debug("%s is not installed yet, so retaining it", mod_name)
+            retained_easyconfigs.append(ec)
+            continue
+
+        installed_fingerprint = det_installed_build_fingerprint(ec['ec'])
+        if installed_fingerprint is None:
+            _log.info("No build fingerprint found for %s, so retaining it", mod_name)
+            retained_easyconfigs.append(ec)
+        elif installed_fingerprint['fingerprint'] != fingerprint['fingerprint']:
+            changed = [key for key in sorted(fingerprint['inputs'])
+                       if installed_fingerprint.get('inputs', {}).get(key) != fingerprint['inputs'][key]]
+            _log.info("Build inputs for %s have changed (%s), so retaining it", mod_name, ', '.join(changed))
+            retained_easyconfigs.append(ec)
+        else:
+            _log.info("%s is already installed (module found) and build inputs are unchanged, skipping", mod_name)
+
+    return retained_easyconfigs
+
+
 def find_resolved_modules(easyconfigs, avail_modules, modtool, retain_all_deps=False):
     """
     Find easyconfigs in 1st argument which can be fully resolved using modules specified in 2nd argument
@@ -121,9 +287,12 @@ def find_resolved_modules(easyconfigs, avail_modules, modtool, retain_all_deps=F
             easyconfig._config = copy.copy(easyconfig._config)
         else:
             easyconfig = easyconfig.copy()
-        deps = []
+        # list of (dependency, retain) tuples;
+        # retain is None for dependencies that require checking whether a corresponding module exists
+        deps_info = []
         for dep in easyconfig['dependencies']:
             dep_mod_name = dep.get('full_mod_name', ActiveMNS().det_full_module_name(dep))
+            retain = False
 
             # always treat external modules as resolved,
             # since no corresponding easyconfig can be found for them
@@ -133,19 +302,36 @@ def find_resolved_modules(easyconfigs, avail_modules, modtool, retain_all_deps=F
             elif retain_all_deps and dep_mod_name not in avail_modules:
                 # if all dependencies should be retained, include dep unless it has been already
                 _log.debug("Retaining new dep %s in 'retain all deps' mode", dep_mod_name)
-                deps.append(dep)
+                retain = True
 
             # retain dep if it is (still) in the list of easyconfigs
             elif dep_mod_name in ec_mod_names:
                 _log.debug("Dep %s is (still) in list of easyconfigs, retaining it", dep_mod_name)
-                deps.append(dep)
+                retain = True
+
+            # check whether corresponding module exists if it's not available yet (see below)
+            elif dep_mod_name not in avail_modules:
+                retain = None
+
+            deps_info.append((dep, dep_mod_name, retain))
+
+        # retain deps if corresponding module is not available yet;
+        # fallback to checking with modtool.exist is required,
+        # for hidden modules and external modules where module name may be partial;
+        # existence of modules is checked for all dependencies at once
+        mod_names_to_check = [mod_name for (_, mod_name, retain) in deps_info if retain is None]
+        if mod_names_to_check:
+            mods_exist = dict(zip(mod_names_to_check, modtool.exist(mod_names_to_check, skip_avail=True)))
+        else:
+            mods_exist = {}
 
-            # retain dep if corresponding module is not available yet;
-            # fallback to checking with modtool.exist is required,
-            # for hidden modules and external modules where module name may be partial
-            elif dep_mod_name not in avail_modules and not modtool.exist([dep_mod_name], skip_avail=True)[0]:
+        deps = []
+        for dep, dep_mod_name, retain in deps_info:
+            if retain is None and not mods_exist[dep_mod_name]:
                 # no module available (yet) => retain dependency as one to be resolved
                 _log.debug("No module available for dep %s, retaining it", dep)
+                retain = True
+            if retain:
                 deps.append(dep)
 
         # update list of dependencies with only those unresolved
@@ -524,6 +710,8 @@ def review_pr(paths=None, pr=None, colored=True, branch='develop'):
     else:
         raise EasyBuildError("No PR # or easyconfig path specified")
 
+    max_related = build_option('review_pr_max_related')
+
     lines = []
     ecs, _ = parse_easyconfigs([(fp, False) for fp in pr_files], validate=False)
     for ec in ecs:
@@ -534,7 +722,7 @@ def review_pr(paths=None, pr=None, colored=True, branch='develop'):
             pr_msg = "new PR"
         _log.debug("File in %s %s has these related easyconfigs: %s" % (pr_msg, ec['spec'], files))
         if files:
-            lines.append(multidiff(ec['spec'], files, colored=colored))
+            lines.append(multidiff(ec['spec'], files, colored=colored, max_files=max_related))
         else:
             lines.extend(['', "(no related easyconfigs found for %s)\n" % os.path.basename(ec['spec'])])
 
@@ -664,15 +852,27 @@ def run_contrib_checks(ecs):
         else:
             print_msg("\n>> One or more %s checks FAILED!" % label, prefix=False)
 
+    # results of checks for easyconfig files that were checked before (and were not changed since) are cached
+    cache = CheckResultsCache(build_option('check_contrib_cache'))
+
     # start by running style checks
-    style_check_ok = cmdline_easyconfigs_style_check(ecs)
+    style_check_ok = cmdline_easyconfigs_style_check(ecs, cache=cache)
     print_result(style_check_ok, "style")
 
     # check whether SHA256 checksums are in place
     print_msg("\nChecking for SHA256 checksums in %d easyconfig(s)...\n" % len(ecs), prefix=False)
     sha256_checksums_ok = True
     for ec in ecs:
-        sha256_checksum_fails = check_sha256_checksums([ec])
+        # result of SHA256 checksums check also depends on the easyblock being used
+        eb_class = get_easyblock_class(ec['easyblock'], name=ec['name'])
+        eb_checksums = ','.join(checksum for (_, checksum) in det_easyblock_checksums(eb_class))
+        key = cache.key('sha256', ec.path, extra=eb_checksums)
+
+        sha256_checksum_fails = cache.get(key)
+        if sha256_checksum_fails is None:
+            sha256_checksum_fails = check_sha256_checksums([ec])
+            cache.set(key, sha256_checksum_fails)
+
         if sha256_checksum_fails:
             sha256_checksums_ok = False
             msgs = ['[FAIL] %s' % ec.path] + sha256_checksum_fails
@@ -682,6 +882,8 @@ def run_contrib_checks(ecs):
 
     print_result(sha256_checksums_ok, "SHA256 checksums")
 
+    cache.save()
+
     return style_check_ok and sha256_checksums_ok
 
 
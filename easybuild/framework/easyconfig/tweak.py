@@ -35,6 +35,7 @@ Easyconfig module that provides functionality for tweaking existing eaysconfig (
 :author: Alan O'Cais (Juelich Supercomputing Centre)
 :author: Maxime Boissonneault (Universite Laval, Calcul Quebec, Compute Canada)
 """
+import bisect
 import copy
 import functools
 import glob
@@ -46,7 +47,8 @@ from distutils.version import LooseVersion
 from easybuild.base import fancylogger
 from easybuild.framework.easyconfig.constants import EASYCONFIG_CONSTANTS
 from easybuild.framework.easyconfig.default import get_easyconfig_parameter_default
-from easybuild.framework.easyconfig.easyconfig import EasyConfig, create_paths, process_easyconfig
+from easybuild.framework.easyconfig.easyconfig import EASYCONFIGS_ARCHIVE_DIR, EasyConfig, create_paths
+from easybuild.framework.easyconfig.easyconfig import process_easyconfig
 from easybuild.framework.easyconfig.easyconfig import get_toolchain_hierarchy, ActiveMNS
 from easybuild.framework.easyconfig.format.one import EB_FORMAT_EXTENSION
 from easybuild.framework.easyconfig.format.format import DEPENDENCY_PARAMETERS
@@ -56,10 +58,11 @@ from easybuild.toolchains.compiler.systemcompiler import TC_CONSTANT_SYSTEM
 from easybuild.toolchains.gcccore import GCCcore
 from easybuild.tools.build_log import EasyBuildError, print_warning
 from easybuild.tools.config import build_option
-from easybuild.tools.filetools import read_file, write_file
+from easybuild.tools.filetools import create_index, load_index, mkdir, read_file, write_file
 from easybuild.tools.module_naming_scheme.utilities import det_full_ec_version
 from easybuild.tools.py2vs3 import string_type
-from easybuild.tools.robot import resolve_dependencies, robot_find_easyconfig, search_easyconfigs
+from easybuild.tools.robot import resolve_dependencies, robot_find_easyconfig
+from easybuild.tools.systemtools import map_parallel
 from easybuild.tools.toolchain.toolchain import SYSTEM_TOOLCHAIN_NAME
 from easybuild.tools.toolchain.toolchain import TOOLCHAIN_CAPABILITIES
 from easybuild.tools.utilities import flatten, nub, quote_str
@@ -70,6 +73,9 @@ _log = fancylogger.getLogger('easyconfig.tweak', fname=False)
 
 EASYCONFIG_TEMPLATE = "TEMPLATE"
 
+# catalogs of available easyconfig files, shared across all queries in a tweak session (see get_easyconfig_catalog)
+_easyconfig_catalogs = {}
+
 
 def ec_filename_for(path):
     """
@@ -85,6 +91,9 @@ def ec_filename_for(path):
 
 def tweak(easyconfigs, build_specs, modtool, targetdirs=None):
     """Tweak list of easyconfigs according to provided build specifications."""
+    # start from a fresh catalog of available easyconfigs
+    _easyconfig_catalogs.clear()
+
     # keep track of originally listed easyconfigs (via their path)
     listed_ec_paths = [ec['spec'] for ec in easyconfigs]
 
@@ -179,8 +188,8 @@ def tweak(easyconfigs, build_specs, modtool, targetdirs=None):
         orig_ecs = easyconfigs
         _log.debug("Software name/version found, so not applying build specifications recursively: %s" % build_specs)
 
-    # generate tweaked easyconfigs, and continue with those instead
-    tweaked_easyconfigs = []
+    # determine which tweaked easyconfigs should be generated first, so they can be generated in parallel
+    tweak_jobs, listed_jobs = [], []
     for orig_ec in orig_ecs:
         # Only return tweaked easyconfigs for easyconfigs which were listed originally on the command line
         # (and use the prepended path so that they are found first).
@@ -189,15 +198,18 @@ def tweak(easyconfigs, build_specs, modtool, targetdirs=None):
 
         tc_name = orig_ec['ec']['toolchain']['name']
 
-        new_ec_file = None
+        job = None
         verification_build_specs = copy.copy(build_specs)
         if orig_ec['spec'] in listed_ec_paths:
             if modifying_toolchains_or_deps:
                 if tc_name in src_to_dst_tc_mapping:
-                    new_ec_file = map_easyconfig_to_target_tc_hierarchy(orig_ec['spec'], src_to_dst_tc_mapping,
-                                                                        targetdir=tweaked_ecs_path,
-                                                                        update_build_specs=pruned_build_specs,
-                                                                        update_dep_versions=update_dependencies)
+                    job = {
+                        'spec': orig_ec['spec'],
+                        'targetdir': tweaked_ecs_path,
+                        'toolchain_mapping': src_to_dst_tc_mapping,
+                        'build_specs': pruned_build_specs,
+                        'update_dep_versions': update_dependencies,
+                    }
                     # Need to update the toolchain in the build_specs to match the toolchain mapping
                     keys = verification_build_specs.keys()
                     if 'toolchain_name' in keys:
@@ -207,25 +219,106 @@ def tweak(easyconfigs, build_specs, modtool, targetdirs=None):
                     if 'toolchain' in keys:
                         verification_build_specs['toolchain'] = src_to_dst_tc_mapping[tc_name]
             else:
-                new_ec_file = tweak_one(orig_ec['spec'], None, build_specs, targetdir=tweaked_ecs_path)
+                job = {'spec': orig_ec['spec'], 'targetdir': tweaked_ecs_path, 'build_specs': build_specs}
 
-            if new_ec_file:
-                new_ecs = process_easyconfig(new_ec_file, build_specs=verification_build_specs)
-                tweaked_easyconfigs.extend(new_ecs)
+            if job:
+                listed_jobs.append((len(tweak_jobs), verification_build_specs))
         else:
             # Place all tweaked dependency easyconfigs in the directory appended to the robot path
             if modifying_toolchains_or_deps:
                 if tc_name in src_to_dst_tc_mapping:
                     # Note pruned_build_specs are not passed down for dependencies
-                    map_easyconfig_to_target_tc_hierarchy(orig_ec['spec'], src_to_dst_tc_mapping,
-                                                          targetdir=tweaked_ecs_deps_path,
-                                                          update_dep_versions=update_dependencies)
+                    job = {
+                        'spec': orig_ec['spec'],
+                        'targetdir': tweaked_ecs_deps_path,
+                        'toolchain_mapping': src_to_dst_tc_mapping,
+                        'update_dep_versions': update_dependencies,
+                    }
             else:
-                tweak_one(orig_ec['spec'], None, build_specs, targetdir=tweaked_ecs_deps_path)
+                job = {'spec': orig_ec['spec'], 'targetdir': tweaked_ecs_deps_path, 'build_specs': build_specs}
+
+        if job:
+            tweak_jobs.append(job)
+
+    # generate tweaked easyconfigs (in parallel, if possible);
+    # catalog of available easyconfigs and other cached information is determined upfront,
+    # so it is shared with the worker processes (rather than each worker process determining it again)
+    if modifying_toolchains_or_deps:
+        get_easyconfig_catalog()
+        mapped_ecs = [ec for ec in orig_ecs if ec['ec']['toolchain']['name'] in src_to_dst_tc_mapping]
+        prime_toolchain_mapping_caches(mapped_ecs, src_to_dst_tc_mapping, update_dependencies)
+    # target directories are created upfront, to avoid that worker processes race to create them
+    for targetdir in nub(job['targetdir'] for job in tweak_jobs if job['targetdir']):
+        mkdir(targetdir, parents=True)
+    results = map_parallel(tweak_easyconfig_job, tweak_jobs)
+    for job, (new_ec_file, error) in zip(tweak_jobs, results):
+        if error:
+            raise EasyBuildError("Failed to generate tweaked easyconfig for %s: %s", job['spec'], error)
+        for catalog in _easyconfig_catalogs.values():
+            catalog.add(new_ec_file)
+
+    # continue with tweaked easyconfigs for easyconfigs that were listed originally, in the same order
+    tweaked_easyconfigs = []
+    for idx, verification_build_specs in listed_jobs:
+        new_ec_file = results[idx][0]
+        if new_ec_file:
+            new_ecs = process_easyconfig(new_ec_file, build_specs=verification_build_specs)
+            tweaked_easyconfigs.extend(new_ecs)
 
     return tweaked_easyconfigs
 
 
+def tweak_easyconfig_job(job):
+    """
+    Generate tweaked easyconfig file, as specified by provided job (see tweak),
+    either by mapping it to a target toolchain hierarchy or by applying build specifications via tweak_one.
+
+    This may be run in a separate process, so errors are not raised but returned as a message.
+
+    :param job: dict with location of original easyconfig file ('spec'), target directory ('targetdir'),
+                toolchain mapping ('toolchain_mapping', if any), build specifications ('build_specs', if any),
+                and whether or not dependency versions should be updated ('update_dep_versions')
+    :return: tuple with location of tweaked easyconfig file and error message (None if no error occurred)
+    """
+    try:
+        if 'toolchain_mapping' in job:
+            new_ec_file = map_easyconfig_to_target_tc_hierarchy(job['spec'], job['toolchain_mapping'],
+                                                                targetdir=job['targetdir'],
+                                                                update_build_specs=job.get('build_specs'),
+                                                                update_dep_versions=job['update_dep_versions'])
+        else:
+            new_ec_file = tweak_one(job['spec'], None, job['build_specs'], targetdir=job['targetdir'])
+    except EasyBuildError as err:
+        return None, err.msg
+
+    return new_ec_file, None
+
+
+def prime_toolchain_mapping_caches(ecs, toolchain_mapping, update_dep_versions):
+    """
+    Determine (and hence cache) toolchain hierarchies and version suffix mappings that are required to map
+    the specified easyconfigs to a target toolchain hierarchy (see map_easyconfig_to_target_tc_hierarchy).
+
+    :param ecs: list of parsed easyconfigs (dicts with 'spec' and 'ec' keys)
+    :param toolchain_mapping: mapping between source toolchain and target toolchain
+    :param update_dep_versions: boolean indicating whether dependency versions will be updated
+    """
+    try:
+        target_tcs = {}
+        for target_tc in toolchain_mapping.values():
+            target_tcs[(target_tc['name'], target_tc['version'])] = target_tc
+        for key in sorted(target_tcs):
+            get_toolchain_hierarchy(target_tcs[key])
+
+        if update_dep_versions:
+            for ec in ecs:
+                if ec['ec']['versionsuffix'] or list_deps_versionsuffixes(ec['spec']):
+                    map_common_versionsuffixes('Python', ec['ec']['toolchain'], toolchain_mapping)
+    except EasyBuildError as err:
+        # errors will be reported again when the easyconfig is being tweaked
+        _log.debug("Failed to determine cached information required to map easyconfigs to target toolchain: %s", err)
+
+
 def tweak_one(orig_ec, tweaked_ec, tweaks, targetdir=None):
     """
     Tweak an easyconfig file with the given list of tweaks, using replacement via regular expressions.
@@ -834,6 +927,160 @@ def map_toolchain_hierarchies(source_toolchain, target_toolchain, modtool):
     return tc_mapping
 
 
+def det_regex_literal_prefix(regex):
+    """
+    Determine literal prefix of specified regular expression, i.e. the string that all matches must start with.
+
+    :param regex: regular expression (only anchored regular expressions can have a non-empty literal prefix)
+    :return: literal prefix (empty string if it can not be determined)
+    """
+    if not regex.startswith('^') or '|' in regex:
+        return ''
+
+    prefix = []
+    idx = 1
+    while idx < len(regex):
+        char, step = regex[idx], 1
+        if char == '\\':
+            # escaped special characters are literal, special sequences like \d are not
+            next_char = regex[idx + 1:idx + 2]
+            if next_char and not next_char.isalnum():
+                char, step = next_char, 2
+            else:
+                break
+        elif char in '.^$*+?{}[]()':
+            break
+
+        # characters followed by a quantifier may be optional, those can not be part of the prefix
+        quantifier = regex[idx + step:idx + step + 1]
+        if quantifier in ['*', '?', '{']:
+            break
+
+        prefix.append(char)
+        if quantifier == '+':
+            break
+        idx += step
+
+    return ''.join(prefix)
+
+
+class EasyConfigCatalog(object):
+    """
+    Catalog of easyconfig files available in a list of paths, indexed by filename.
+
+    Searching for easyconfig files whose name starts with a particular software name (like for --try-toolchain
+    and --try-update-deps) only involves the (sorted) filenames that start with the literal prefix of the query,
+    rather than scanning the index of all available easyconfig files over and over again.
+    """
+
+    def __init__(self, paths, ignore_dirs=None):
+        """
+        Create catalog of easyconfig files in specified paths.
+
+        :param paths: list of paths to easyconfig files
+        :param ignore_dirs: list of directories to ignore
+        """
+        if ignore_dirs is None:
+            ignore_dirs = ['.git', '.svn']
+
+        self.paths = paths
+        # sorted list of (filename, relative path) tuples for each path
+        self.entries = {}
+        # values of easyconfig parameters for each easyconfig file, see get_params
+        self.params = {}
+        # easyconfig files that were added to the catalog after it was created (i.e., tweaked easyconfig files)
+        self.added = set()
+
+        for path in self.paths:
+            path_index = load_index(path, ignore_dirs=ignore_dirs)
+            if path_index is None or build_option('ignore_index'):
+                if os.path.exists(path):
+                    path_index = create_index(path, ignore_dirs=ignore_dirs)
+                else:
+                    path_index = []
+            self.entries[path] = sorted((os.path.basename(relpath), relpath) for relpath in path_index)
+
+        _log.debug("Created catalog of easyconfig files in %s", self.paths)
+
+    def add(self, ec_path):
+        """Add (or update) specified easyconfig file in catalog (if it is located in one of the paths)."""
+        self.params.pop(ec_path, None)
+        self.added.add(ec_path)
+        for path in self.paths:
+            if ec_path.startswith(os.path.join(path, '')):
+                entry = (os.path.basename(ec_path), os.path.relpath(ec_path, path))
+                idx = bisect.bisect_left(self.entries[path], entry)
+                if self.entries[path][idx:idx + 1] != [entry]:
+                    self.entries[path].insert(idx, entry)
+
+    def search(self, query):
+        """
+        Search for easyconfig files using specified query (case-sensitive regular expression for filename).
+
+        Yields the same result as search_easyconfigs with consider_extra_paths disabled (including the order in which
+        matching easyconfig files are listed, and the filtering of archived easyconfigs).
+
+        :param query: regular expression for names of easyconfig files
+        :return: list of paths to matching easyconfig files
+        """
+        # same escaping as done by search_file
+        query = re.sub('([+])', r'\\\1', query)
+        try:
+            regex = re.compile(query)
+        except re.error as err:
+            raise EasyBuildError("Invalid search query: %s", err)
+
+        prefix = det_regex_literal_prefix(query)
+
+        hits, archived_hits = [], []
+        for path in self.paths:
+            entries = self.entries[path]
+            path_hits = []
+            for filename, relpath in entries[bisect.bisect_left(entries, (prefix,)):]:
+                if not filename.startswith(prefix):
+                    break
+                if regex.search(filename):
+                    path_hits.append(os.path.join(path, relpath))
+
+            for hit in sorted(path_hits):
+                if EASYCONFIGS_ARCHIVE_DIR in hit.split(os.path.sep):
+                    archived_hits.append(hit)
+                else:
+                    hits.append(hit)
+
+        if build_option('consider_archived_easyconfigs'):
+            hits.extend(archived_hits)
+
+        return hits
+
+    def get_params(self, ec_path, names):
+        """
+        Get values of specified easyconfig parameters for specified easyconfig file,
+        without reading and scanning the easyconfig file more than once.
+        """
+        params = self.params.setdefault(ec_path, {})
+        missing = [name for name in names if name not in params]
+        if missing:
+            values = fetch_parameters_from_easyconfig(read_file(ec_path), missing)
+            params.update(zip(missing, values))
+
+        return [params[name] for name in names]
+
+
+def get_easyconfig_catalog():
+    """Return catalog of easyconfig files in robot search path (only created once per search path)."""
+    search_path = build_option('robot_path')
+    if not search_path:
+        search_path = [os.getcwd()]
+    ignore_dirs = build_option('ignore_dirs')
+
+    key = (tuple(search_path), tuple(ignore_dirs or []))
+    if key not in _easyconfig_catalogs:
+        _easyconfig_catalogs[key] = EasyConfigCatalog(search_path, ignore_dirs=ignore_dirs)
+
+    return _easyconfig_catalogs[key]
+
+
 def map_versionsuffixes_cache(func):
     """Function decorator to cache (and retrieve cached) versionsuffixes mapping between toolchains."""
     cache = {}
@@ -879,7 +1126,7 @@ def map_common_versionsuffixes(software_name, original_toolchain, toolchain_mapp
         cand_paths, toolchain_suffix = get_matching_easyconfig_candidates(prefix_stub, toolchain)
         for path in cand_paths:
 
-            version, versionsuffix = fetch_parameters_from_easyconfig(read_file(path), ['version', 'versionsuffix'])
+            version, versionsuffix = get_easyconfig_catalog().get_params(path, ['version', 'versionsuffix'])
 
             if version is None:
                 raise EasyBuildError("Failed to extract 'version' value from %s", path)
@@ -934,8 +1181,7 @@ def get_matching_easyconfig_candidates(prefix_stub, toolchain):
     else:
         toolchain_suffix = '-%s-%s' % (toolchain['name'], toolchain['version'])
     regex_search_query = '^%s.*' % prefix_stub + toolchain_suffix
-    cand_paths = search_easyconfigs(regex_search_query, consider_extra_paths=False, print_result=False,
-                                    case_sensitive=True)
+    cand_paths = get_easyconfig_catalog().search(regex_search_query)
     return cand_paths, toolchain_suffix
 
 
@@ -1060,6 +1306,8 @@ def map_easyconfig_to_target_tc_hierarchy(ec_spec, toolchain_mapping, targetdir=
     tweaked_spec = os.path.join(targetdir or tempfile.gettempdir(), ec_filename)
 
     parsed_ec.dump(tweaked_spec, always_overwrite=False, backup=True)
+    for catalog in _easyconfig_catalogs.values():
+        catalog.add(tweaked_spec)
     _log.debug("Dumped easyconfig tweaked via --try-* to %s", tweaked_spec)
 
     return tweaked_spec
@@ -1141,6 +1389,7 @@ def find_potential_version_mappings(dep, toolchain_mapping, versionsuffix_mappin
     candidate_ver_list.append(r'.*')  # Include a major version search
     potential_version_mappings, highest_version = [], None
 
+    catalog = get_easyconfig_catalog()
     for candidate_ver in candidate_ver_list:
 
         # if any potential version mappings were found already at this point, we don't add more
@@ -1154,12 +1403,13 @@ def find_potential_version_mappings(dep, toolchain_mapping, versionsuffix_mappin
                     toolchain_suffix = '-%s-%s' % (toolchain['name'], toolchain['version'])
                 full_versionsuffix = toolchain_suffix + versionsuffix + EB_FORMAT_EXTENSION
                 depver = '^' + prefix_to_version + candidate_ver + full_versionsuffix
-                cand_paths = search_easyconfigs(depver, consider_extra_paths=False, print_result=False,
-                                                case_sensitive=True)
+                cand_paths = catalog.search(depver)
 
                 # filter out easyconfigs that have been tweaked in this instance, they are not relevant here
+                # (this also ensures that the result doesn't depend on the order in which easyconfigs are tweaked)
                 tweaked_ecs_paths, _ = alt_easyconfig_paths(tempfile.gettempdir(), tweaked_ecs=True)
-                cand_paths = [path for path in cand_paths if not path.startswith(tweaked_ecs_paths)]
+                cand_paths = [path for path in cand_paths
+                              if not path.startswith(tweaked_ecs_paths) and path not in catalog.added]
 
                 # if SYSTEM_TOOLCHAIN_NAME is used, it produces regex of the form
                 # <name>-<version_regex>.eb, which can map to incompatible toolchains.
@@ -1168,7 +1418,7 @@ def find_potential_version_mappings(dep, toolchain_mapping, versionsuffix_mappin
                 if toolchain['name'] == SYSTEM_TOOLCHAIN_NAME:
                     cand_paths_filtered = []
                     for path in cand_paths:
-                        tc_candidate = fetch_parameters_from_easyconfig(read_file(path), ['toolchain'])[0]
+                        tc_candidate = catalog.get_params(path, ['toolchain'])[0]
                         if isinstance(tc_candidate, dict) and tc_candidate['name'] == SYSTEM_TOOLCHAIN_NAME:
                             cand_paths_filtered += [path]
                         if isinstance(tc_candidate, string_type) and tc_candidate == TC_CONSTANT_SYSTEM:
@@ -1178,7 +1428,7 @@ def find_potential_version_mappings(dep, toolchain_mapping, versionsuffix_mappin
 
                 # add what is left to the possibilities
                 for path in cand_paths:
-                    version = fetch_parameters_from_easyconfig(read_file(path), ['version'])[0]
+                    version = catalog.get_params(path, ['version'])[0]
                     if version:
                         if highest_version is None or LooseVersion(version) > LooseVersion(highest_version):
                             highest_version = version
@@ -35,7 +35,6 @@ Main entry point for EasyBuild: build software from .eb input file
 :author: Ward Poelmans (Ghent University)
 :author: Fotis Georgatos (Uni.Lu, NTUA)
 """
-import copy
 import os
 import stat
 import sys
@@ -52,10 +51,12 @@ from easybuild.framework.easyconfig.style import cmdline_easyconfigs_style_check
 from easybuild.framework.easyconfig.tools import categorize_files_by_type, dep_graph
 from easybuild.framework.easyconfig.tools import det_easyconfig_paths, dump_env_script, get_paths_for
 from easybuild.framework.easyconfig.tools import parse_easyconfigs, review_pr, run_contrib_checks, skip_available
+from easybuild.framework.easyconfig.tools import skip_unchanged
 from easybuild.framework.easyconfig.tweak import obtain_ec_for, tweak
-from easybuild.tools.config import find_last_log, get_repository, get_repositorypath, build_option
+from easybuild.tools.config import find_last_log, build_option
 from easybuild.tools.containers.common import containerize
 from easybuild.tools.docs import list_software
+from easybuild.tools.environment import snapshot_env
 from easybuild.tools.filetools import adjust_permissions, cleanup, copy_file, copy_files, dump_index, load_index
 from easybuild.tools.filetools import read_file, register_lock_cleanup_signal_handlers, write_file
 from easybuild.tools.github import check_github, close_pr, new_branch_github, find_easybuild_easyconfig
@@ -67,7 +68,7 @@ from easybuild.tools.options import set_up_configuration, use_color
 from easybuild.tools.robot import check_conflicts, dry_run, missing_deps, resolve_dependencies, search_easyconfigs
 from easybuild.tools.package.utilities import check_pkg_support
 from easybuild.tools.parallelbuild import submit_jobs
-from easybuild.tools.repository.repository import init_repository
+from easybuild.tools.repository.repository import commit_session_repositories
 from easybuild.tools.testing import create_test_report, overall_test_report, regtest, session_state
 
 _log = None
@@ -105,50 +106,54 @@ def build_and_install_software(ecs, init_session_state, exit_on_failure=True):
     # obtain a copy of the starting environment so each build can start afresh
     # we shouldn't use the environment from init_session_state, since relevant env vars might have been set since
     # e.g. via easyconfig.handle_allowed_system_deps
-    init_env = copy.deepcopy(os.environ)
+    init_env = snapshot_env()
 
     res = []
-    for ec in ecs:
-        ec_res = {}
-        try:
-            (ec_res['success'], app_log, err) = build_and_install_one(ec, init_env)
-            ec_res['log_file'] = app_log
-            if not ec_res['success']:
-                ec_res['err'] = EasyBuildError(err)
-        except Exception as err:
-            # purposely catch all exceptions
-            ec_res['success'] = False
-            ec_res['err'] = err
-            ec_res['traceback'] = traceback.format_exc()
-
-        # keep track of success/total count
-        if ec_res['success']:
-            test_msg = "Successfully built %s" % ec['spec']
-        else:
-            test_msg = "Build of %s failed" % ec['spec']
-            if 'err' in ec_res:
-                test_msg += " (err: %s)" % ec_res['err']
-
-        # dump test report next to log file
-        test_report_txt = create_test_report(test_msg, [(ec, ec_res)], init_session_state)
-        if 'log_file' in ec_res and ec_res['log_file']:
-            test_report_fp = "%s_test_report.md" % '.'.join(ec_res['log_file'].split('.')[:-1])
-            parent_dir = os.path.dirname(test_report_fp)
-            # parent dir for test report may not be writable at this time, e.g. when --read-only-installdir is used
-            if os.stat(parent_dir).st_mode & 0o200:
-                write_file(test_report_fp, test_report_txt)
-            else:
-                adjust_permissions(parent_dir, stat.S_IWUSR, add=True, recursive=False)
-                write_file(test_report_fp, test_report_txt)
-                adjust_permissions(parent_dir, stat.S_IWUSR, add=False, recursive=False)
-
-        if not ec_res['success'] and exit_on_failure:
-            if 'traceback' in ec_res:
-                raise EasyBuildError(ec_res['traceback'])
+    try:
+        for ec in ecs:
+            ec_res = {}
+            try:
+                (ec_res['success'], app_log, err) = build_and_install_one(ec, init_env)
+                ec_res['log_file'] = app_log
+                if not ec_res['success']:
+                    ec_res['err'] = EasyBuildError(err)
+            except Exception as err:
+                # purposely catch all exceptions
+                ec_res['success'] = False
+                ec_res['err'] = err
+                ec_res['traceback'] = traceback.format_exc()
+
+            # keep track of success/total count
+            if ec_res['success']:
+                test_msg = "Successfully built %s" % ec['spec']
             else:
-                raise EasyBuildError(test_msg)
-
-        res.append((ec, ec_res))
+                test_msg = "Build of %s failed" % ec['spec']
+                if 'err' in ec_res:
+                    test_msg += " (err: %s)" % ec_res['err']
+
+            # dump test report next to log file
+            test_report_txt = create_test_report(test_msg, [(ec, ec_res)], init_session_state)
+            if 'log_file' in ec_res and ec_res['log_file']:
+                test_report_fp = "%s_test_report.md" % '.'.join(ec_res['log_file'].split('.')[:-1])
+                parent_dir = os.path.dirname(test_report_fp)
+                # parent dir for test report may not be writable at this time, e.g. when --read-only-installdir is used
+                if os.stat(parent_dir).st_mode & 0o200:
+                    write_file(test_report_fp, test_report_txt)
+                else:
+                    adjust_permissions(parent_dir, stat.S_IWUSR, add=True, recursive=False)
+                    write_file(test_report_fp, test_report_txt)
+                    adjust_permissions(parent_dir, stat.S_IWUSR, add=False, recursive=False)
+
+            if not ec_res['success'] and exit_on_failure:
+                if 'traceback' in ec_res:
+                    raise EasyBuildError(ec_res['traceback'])
+                else:
+                    raise EasyBuildError(test_msg)
+
+            res.append((ec, ec_res))
+    finally:
+        # commit changes to easyconfigs repository in one go, rather than once for every installation
+        commit_session_repositories()
 
     return res
 
@@ -394,10 +399,19 @@ def main(args=None, logfile=None, do_build=None, testing=False, modtool=None):
 
     # skip modules that are already installed unless forced, or unless an option is used that warrants not skipping
     if not (forced or dry_run_mode or options.extended_dry_run or pr_options or options.inject_checksums):
-        retained_ecs = skip_available(easyconfigs, modtool)
+        if options.rebuild_if_changed:
+            # consider full dependency graph, so changes in dependencies are taken into account;
+            # (this requires full EasyConfig instances, so it's only done when --rebuild-if-changed is used)
+            if options.robot:
+                easyconfigs = resolve_dependencies(easyconfigs, modtool, retain_all_deps=True)
+            retained_ecs = skip_unchanged(easyconfigs, modtool)
+            skip_msg = "%s is already installed (module found) and build inputs are unchanged, skipping"
+        else:
+            retained_ecs = skip_available(easyconfigs, modtool)
+            skip_msg = "%s is already installed (module found), skipping"
         if not testing:
             for skipped_ec in [ec for ec in easyconfigs if ec not in retained_ecs]:
-                print_msg("%s is already installed (module found), skipping" % skipped_ec['full_mod_name'])
+                print_msg(skip_msg % skipped_ec['full_mod_name'])
         easyconfigs = retained_ecs
 
     # keep track for which easyconfigs we should set the corresponding module as default
@@ -493,9 +507,6 @@ def main(args=None, logfile=None, do_build=None, testing=False, modtool=None):
     overall_success = correct_builds_cnt == len(ordered_ecs)
     success_msg = "Build succeeded for %s out of %s" % (correct_builds_cnt, len(ordered_ecs))
 
-    repo = init_repository(get_repository(), get_repositorypath())
-    repo.cleanup()
-
     # dump/upload overall test report
     test_report_msg = overall_test_report(ecs_with_res, len(paths), overall_success, success_msg, init_session_state)
     if test_report_msg is not None:
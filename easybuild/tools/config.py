@@ -79,6 +79,8 @@ CONT_TYPES = [CONT_TYPE_DOCKER, CONT_TYPE_SINGULARITY]
 DEFAULT_CONT_TYPE = CONT_TYPE_SINGULARITY
 
 DEFAULT_BRANCH = 'develop'
+DEFAULT_COPY_THREADS = 8
+DEFAULT_GITHUB_DOWNLOAD_CACHE_SIZE = 1024  # in MiB
 DEFAULT_INDEX_MAX_AGE = 7 * 24 * 60 * 60  # 1 week (in seconds)
 DEFAULT_JOB_BACKEND = 'GC3Pie'
 DEFAULT_LOGFILE_FORMAT = ("easybuild", "easybuild-%(name)s-%(version)s-%(date)s.%(time)s.log")
@@ -109,6 +111,12 @@ EBROOT_ENV_VAR_ACTIONS = [ERROR, IGNORE, UNSET, WARN]
 LOADED_MODULES_ACTIONS = [ERROR, IGNORE, PURGE, UNLOAD, WARN]
 DEFAULT_ALLOW_LOADED_MODULES = ('EasyBuild',)
 
+COPY_MODE_HARDLINK = 'hardlink'
+COPY_MODE_PARALLEL = 'parallel'
+COPY_MODE_SERIAL = 'serial'
+COPY_MODES = [COPY_MODE_HARDLINK, COPY_MODE_PARALLEL, COPY_MODE_SERIAL]
+DEFAULT_COPY_MODE = COPY_MODE_SERIAL
+
 FORCE_DOWNLOAD_ALL = 'all'
 FORCE_DOWNLOAD_PATCHES = 'patches'
 FORCE_DOWNLOAD_SOURCES = 'sources'
@@ -161,6 +169,7 @@ BUILD_OPTIONS_CMDLINE = {
     None: [
         'aggregate_regtest',
         'backup_modules',
+        'check_contrib_cache',
         'container_config',
         'container_image_format',
         'container_image_name',
@@ -178,6 +187,7 @@ BUILD_OPTIONS_CMDLINE = {
         'force_download',
         'from_pr',
         'git_working_dirs_path',
+        'github_download_cache',
         'github_user',
         'github_org',
         'group',
@@ -189,8 +199,10 @@ BUILD_OPTIONS_CMDLINE = {
         'job_max_jobs',
         'job_max_walltime',
         'job_output_dir',
+        'job_pack_max_time',
         'job_polling_interval',
         'job_target_resource',
+        'list_software_cache',
         'locks_dir',
         'modules_footer',
         'modules_header',
@@ -199,6 +211,7 @@ BUILD_OPTIONS_CMDLINE = {
         'optarch',
         'package_tool_options',
         'parallel',
+        'parallel_sanity_check_commands',
         'pr_branch_name',
         'pr_commit_msg',
         'pr_descr',
@@ -207,12 +220,15 @@ BUILD_OPTIONS_CMDLINE = {
         'pr_title',
         'rpath_filter',
         'regtest_output_dir',
+        'review_pr_max_related',
         'silence_deprecation_warnings',
         'skip',
         'stop',
         'subdir_user_modules',
+        'system_facts_cache',
         'test_report_env_filter',
         'testoutput',
+        'toolchain_hierarchy_cache',
         'wait_on_lock',
         'umask',
         'zip_logs',
@@ -226,6 +242,7 @@ BUILD_OPTIONS_CMDLINE = {
         'debug',
         'debug_lmod',
         'dump_autopep8',
+        'dump_timings',
         'enforce_checksums',
         'extended_dry_run',
         'experimental',
@@ -284,6 +301,15 @@ BUILD_OPTIONS_CMDLINE = {
     DEFAULT_BRANCH: [
         'pr_target_branch',
     ],
+    DEFAULT_COPY_MODE: [
+        'copy_mode',
+    ],
+    DEFAULT_COPY_THREADS: [
+        'copy_threads',
+    ],
+    DEFAULT_GITHUB_DOWNLOAD_CACHE_SIZE: [
+        'github_download_cache_size',
+    ],
     DEFAULT_INDEX_MAX_AGE: [
         'index_max_age',
     ],
@@ -513,6 +539,11 @@ def init_build_options(build_options=None, cmdline_options=None):
 def build_option(key, **kwargs):
     """Obtain value specified build option."""
 
+    # if build options were not initialised yet, don't create an (empty) BuildOptions instance when a default is
+    # specified, since BuildOptions is a singleton (which would prevent initialising the build options later)
+    if 'default' in kwargs and BuildOptions not in Singleton._instances:
+        return kwargs['default']
+
     build_options = BuildOptions()
     if key in build_options:
         return build_options[key]
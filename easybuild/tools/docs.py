@@ -36,6 +36,8 @@ Documentation-related functionality
 """
 import copy
 import inspect
+import json
+import multiprocessing
 import os
 from distutils.version import LooseVersion
 
@@ -55,13 +57,15 @@ from easybuild.framework.easyconfig.tweak import find_matching_easyconfigs
 from easybuild.framework.extension import Extension
 from easybuild.tools.build_log import EasyBuildError, print_msg
 from easybuild.tools.config import build_option
-from easybuild.tools.filetools import read_file
+from easybuild.tools.filetools import CHECKSUM_TYPE_SHA256, compute_checksum, read_file, write_file_atomic
 from easybuild.tools.modules import modules_tool
 from easybuild.tools.py2vs3 import OrderedDict, ascii_lowercase, sort_looseversions
+from easybuild.tools.systemtools import det_parallelism
 from easybuild.tools.toolchain.toolchain import DUMMY_TOOLCHAIN_NAME, SYSTEM_TOOLCHAIN_NAME, is_system_toolchain
 from easybuild.tools.toolchain.utilities import search_toolchain
 from easybuild.tools.utilities import INDENT_2SPACES, INDENT_4SPACES
 from easybuild.tools.utilities import import_available_modules, mk_rst_table, nub, quote_str
+from easybuild.tools.version import VERSION
 
 
 _log = fancylogger.getLogger('tools.docs')
@@ -73,6 +77,9 @@ SIMPLE = 'simple'
 FORMAT_TXT = 'txt'
 FORMAT_RST = 'rst'
 
+# number of easyconfig files handed to a worker process at once in list_software
+LIST_SOFTWARE_CHUNK_SIZE = 50
+
 
 def generate_doc(name, params):
     """Generate documentation by calling function with specified name, using supplied parameters."""
@@ -498,6 +505,74 @@ def gen_list_easyblocks(list_easyblocks, format_strings):
     return '\n'.join(txt)
 
 
+def get_software_info(ec_path, only_installed=False):
+    """
+    Extract information on software from specified easyconfig file that is relevant for list_software.
+
+    Only the required fields are retained, to avoid having to keep parsed easyconfigs around.
+
+    :param ec_path: path to easyconfig file
+    :param only_installed: also include module name (requires full parse of easyconfig file)
+    :return: tuple with software name and dict with software info
+    """
+    # full EasyConfig instance is only required when module name is needed
+    # this is significantly slower (5-10x) than a 'shallow' parse via EasyConfigParser
+    if only_installed:
+        ec = process_easyconfig(ec_path, validate=False, parse_only=True)[0]['ec']
+    else:
+        ec = EasyConfigParser(filename=ec_path).get_config_dict()
+
+    if is_system_toolchain(ec['toolchain']['name']):
+        toolchain = SYSTEM_TOOLCHAIN_NAME
+    else:
+        toolchain = '%s/%s' % (ec['toolchain']['name'], ec['toolchain']['version'])
+
+    keys = ['description', 'homepage', 'version', 'versionsuffix']
+
+    info = {'toolchain': toolchain}
+    for key in keys:
+        info[key] = ec.get(key, '')
+
+    # make sure values like homepage & versionsuffix get properly templated
+    if isinstance(ec, dict):
+        template_values = template_constant_dict(ec)
+        for key in keys:
+            if '%(' in info[key]:
+                try:
+                    info[key] = info[key] % template_values
+                except (KeyError, TypeError, ValueError) as err:
+                    _log.debug("Ignoring failure to resolve templates: %s", err)
+
+    if only_installed:
+        info['mod_name'] = ec.full_mod_name
+
+    return (ec['name'], info)
+
+
+def det_software_info_cache_key(ec_path):
+    """
+    Determine key for information on software obtained from specified easyconfig file (see get_software_info),
+    in cache that is persisted across sessions (see --list-software-cache).
+    """
+    checksum = compute_checksum(ec_path, checksum_type=CHECKSUM_TYPE_SHA256)
+    # name of easyconfig file is included, since file extension determines how easyconfig file is parsed
+    return ':'.join([str(VERSION), checksum, os.path.basename(ec_path)])
+
+
+def load_software_info_cache(path):
+    """
+    Load information on software that was cached in specified file (see --list-software-cache).
+    """
+    cached = {}
+    if os.path.exists(path):
+        try:
+            cached = json.loads(read_file(path))
+        except ValueError as err:
+            _log.warning("Ignoring cached information on software in %s, failed to load it: %s", path, err)
+
+    return cached
+
+
 def list_software(output_format=FORMAT_TXT, detailed=False, only_installed=False):
     """
     Show list of supported software
@@ -510,49 +585,69 @@ def list_software(output_format=FORMAT_TXT, detailed=False, only_installed=False
     silent = build_option('silent')
 
     ec_paths = find_matching_easyconfigs('*', '*', build_option('robot_path') or [])
-    ecs = []
     cnt = len(ec_paths)
-    for idx, ec_path in enumerate(ec_paths):
-        # full EasyConfig instance is only required when module name is needed
-        # this is significantly slower (5-10x) than a 'shallow' parse via EasyConfigParser
-        if only_installed:
-            ec = process_easyconfig(ec_path, validate=False, parse_only=True)[0]['ec']
-        else:
-            ec = EasyConfigParser(filename=ec_path).get_config_dict()
 
-        ecs.append(ec)
-        print_msg('\r', prefix=False, newline=False, silent=silent)
-        print_msg("Processed %d/%d easyconfigs..." % (idx+1, cnt), newline=False, silent=silent)
+    # information on software can be cached across sessions, by checksum of easyconfig file;
+    # module names are not cached, since these depend on the active module naming scheme (and toolchain hierarchies)
+    cache_path = None
+    if not only_installed:
+        cache_path = build_option('list_software_cache')
+
+    cached, cache_keys = {}, {}
+    if cache_path:
+        cached = load_software_info_cache(cache_path)
+        for ec_path in ec_paths:
+            cache_keys[ec_path] = det_software_info_cache_key(ec_path)
+
+    todo_ec_paths = [ec_path for ec_path in ec_paths if cache_keys.get(ec_path) not in cached]
+    cached_cnt = cnt - len(todo_ec_paths)
+    if cached_cnt:
+        _log.info("Using cached information on software for %d easyconfig files", cached_cnt)
+
+    # parsing easyconfig files is CPU-bound, so use multiple processes when possible;
+    # full parse (required to determine module name) is done in this process,
+    # since it relies on (and populates) caches for easyconfigs and toolchains
+    pool = None
+    if not only_installed and len(todo_ec_paths) > 1:
+        nprocs = min(det_parallelism(par=build_option('parallel')), len(todo_ec_paths))
+        if nprocs > 1:
+            _log.info("Using %d processes to parse %d easyconfig files", nprocs, len(todo_ec_paths))
+            pool = multiprocessing.Pool(processes=nprocs)
+
+    if pool is None:
+        infos = (get_software_info(ec_path, only_installed=only_installed) for ec_path in todo_ec_paths)
+    else:
+        infos = pool.imap(get_software_info, todo_ec_paths, chunksize=LIST_SOFTWARE_CHUNK_SIZE)
+
+    software_infos = {}
+    try:
+        for idx, (ec_path, (name, info)) in enumerate(zip(todo_ec_paths, infos)):
+            software_infos[ec_path] = (name, info)
+            print_msg('\r', prefix=False, newline=False, silent=silent)
+            print_msg("Processed %d/%d easyconfigs..." % (cached_cnt+idx+1, cnt), newline=False, silent=silent)
+    finally:
+        if pool is not None:
+            # either all results were consumed, or an error occurred, so remaining work can be discarded
+            pool.terminate()
+            pool.join()
     print_msg('', prefix=False, silent=silent)
 
     software = {}
-    for ec in ecs:
-        software.setdefault(ec['name'], [])
-        if is_system_toolchain(ec['toolchain']['name']):
-            toolchain = SYSTEM_TOOLCHAIN_NAME
+    for ec_path in ec_paths:
+        if ec_path in software_infos:
+            name, info = software_infos[ec_path]
         else:
-            toolchain = '%s/%s' % (ec['toolchain']['name'], ec['toolchain']['version'])
-
-        keys = ['description', 'homepage', 'version', 'versionsuffix']
-
-        info = {'toolchain': toolchain}
-        for key in keys:
-            info[key] = ec.get(key, '')
-
-        # make sure values like homepage & versionsuffix get properly templated
-        if isinstance(ec, dict):
-            template_values = template_constant_dict(ec)
-            for key in keys:
-                if '%(' in info[key]:
-                    try:
-                        info[key] = info[key] % template_values
-                    except (KeyError, TypeError, ValueError) as err:
-                        _log.debug("Ignoring failure to resolve templates: %s", err)
-
-        software[ec['name']].append(info)
-
-        if only_installed:
-            software[ec['name']][-1].update({'mod_name': ec.full_mod_name})
+            name, info = cached[cache_keys[ec_path]]
+        software.setdefault(name, []).append(info)
+
+    if cache_path:
+        # only entries for easyconfig files that were considered are retained, to avoid that cache keeps growing
+        new_cached = dict((cache_keys[ec_path], software_infos.get(ec_path) or cached[cache_keys[ec_path]])
+                          for ec_path in ec_paths)
+        if software_infos or len(new_cached) != len(cached):
+            # cache file may be shared by concurrent sessions, so make sure it's never seen partially written
+            write_file_atomic(cache_path, json.dumps(new_cached, indent=1, sort_keys=True))
+            _log.info("Cached information on software for %d easyconfig files in %s", len(new_cached), cache_path)
 
     print_msg("Found %d different software packages" % len(software), silent=silent)
 
@@ -30,6 +30,7 @@ Utility module for modifying os.environ
 """
 import copy
 import os
+from contextlib import contextmanager
 
 from easybuild.base import fancylogger
 from easybuild.tools.build_log import EasyBuildError, dry_run_msg
@@ -45,6 +46,10 @@ _log = fancylogger.getLogger('environment', fname=False)
 
 _changes = {}
 
+# stack of journals for active environment transactions (see env_transaction);
+# each journal is a list of (key, old value, new value) tuples, with None as value for undefined variables
+_env_journal = []
+
 
 def write_changes(filename):
     """
@@ -87,14 +92,16 @@ def setvar(key, value, verbose=True):
 
     :param verbose: include message in dry run output for defining this environment variable
     """
-    if key in os.environ:
-        oldval_info = "previous value: '%s'" % os.environ[key]
-    else:
-        oldval_info = "previously undefined"
+    oldval = os.environ.get(key)
     # os.putenv() is not necessary. os.environ will call this.
     os.environ[key] = value
     _changes[key] = value
-    _log.info("Environment variable %s set to %s (%s)", key, value, oldval_info)
+
+    if _env_journal:
+        # logging is deferred to the end of the active transaction
+        _env_journal[-1].append((key, oldval, value))
+    else:
+        _log.info("Environment variable %s set to %s (%s)", key, value, _oldval_info(oldval))
 
     if verbose and build_option('extended_dry_run'):
         quoted_value = shell_quote(value)
@@ -103,6 +110,88 @@ def setvar(key, value, verbose=True):
         dry_run_msg("  export %s=%s" % (key, quoted_value), silent=build_option('silent'))
 
 
+def setvars(env_vars, verbose=True):
+    """
+    Define multiple environment variables in a single transaction, see setvar
+
+    :param env_vars: dict with environment variables to define, or list of (key, value) tuples
+    :param verbose: include messages in dry run output for defining these environment variables
+    """
+    if isinstance(env_vars, dict):
+        env_vars = sorted(env_vars.items())
+
+    with env_transaction():
+        for key, value in env_vars:
+            setvar(key, value, verbose=verbose)
+
+
+def _oldval_info(oldval):
+    """Return string describing previous value of an environment variable, for use in log messages."""
+    if oldval is None:
+        return "previously undefined"
+    else:
+        return "previous value: '%s'" % oldval
+
+
+def log_env_journal(journal):
+    """
+    Log a single summary record for the specified journal of environment changes
+
+    :param journal: list of (key, old value, new value) tuples (None as value means undefined)
+    """
+    # only retain first old value and last new value for each environment variable
+    keys, changes = [], {}
+    for key, oldval, newval in journal:
+        if key in changes:
+            changes[key] = (changes[key][0], newval)
+        else:
+            keys.append(key)
+            changes[key] = (oldval, newval)
+
+    lines = []
+    for key in keys:
+        oldval, newval = changes[key]
+        if newval is None:
+            lines.append("unset %s (value was: %s)" % (key, oldval))
+        else:
+            lines.append("%s set to %s (%s)" % (key, newval, _oldval_info(oldval)))
+
+    if lines:
+        _log.info("Environment changes (%d variables):\n  %s", len(lines), '\n  '.join(lines))
+
+
+@contextmanager
+def env_transaction(rollback=False):
+    """
+    Context manager to group changes to the environment (via setvar/unset_env_vars) in a transaction:
+    changes are recorded in a journal rather than logged one by one,
+    and a single summary log record is emitted when the (outermost) transaction ends.
+
+    :param rollback: undo changes recorded in the journal when the transaction ends
+    """
+    journal = []
+    _env_journal.append(journal)
+    try:
+        yield journal
+    finally:
+        _env_journal.pop()
+
+        if rollback:
+            # restore first recorded old value for every changed key, in reverse order
+            for key, oldval, _ in reversed(journal):
+                if oldval is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = oldval
+            _log.info("Rolled back %d changes to environment", len(journal))
+
+        elif _env_journal:
+            # changes get reported by enclosing transaction
+            _env_journal[-1].extend(journal)
+        else:
+            log_env_journal(journal)
+
+
 def unset_env_vars(keys, verbose=True):
     """
     Unset the keys given in the environment
@@ -115,9 +204,12 @@ def unset_env_vars(keys, verbose=True):
 
     for key in list(keys):
         if key in os.environ:
-            _log.info("Unsetting environment variable %s (value: %s)" % (key, os.environ[key]))
             old_environ[key] = os.environ[key]
             del os.environ[key]
+            if _env_journal:
+                _env_journal[-1].append((key, old_environ[key], None))
+            else:
+                _log.info("Unsetting environment variable %s (value: %s)" % (key, old_environ[key]))
             if verbose and build_option('extended_dry_run'):
                 dry_run_msg("  unset %s  # value was: %s" % (key, old_environ[key]), silent=build_option('silent'))
 
@@ -153,36 +245,47 @@ def read_environment(env_vars, strict=False):
     return result
 
 
+def snapshot_env():
+    """
+    Return snapshot of current environment, which can be passed to restore_env.
+
+    A shallow copy into a regular dict is sufficient (keys & values are strings),
+    and is a lot cheaper than a deep copy of os.environ.
+    """
+    return dict(os.environ)
+
+
+def diff_env(old, new):
+    """
+    Determine differences between two environments.
+
+    :return: tuple with dict of variables to (re)define and list of variables to undefine to go from old to new
+    """
+    to_set = dict((key, val) for (key, val) in new.items() if old.get(key) != val)
+    to_unset = [key for key in old if key not in new]
+    return to_set, to_unset
+
+
 def modify_env(old, new, verbose=True):
     """
     Compares two os.environ dumps. Adapts final environment.
-    """
-    old_keys = list(old.keys())
-    new_keys = list(new.keys())
 
-    for key in new_keys:
-        # set them all. no smart checking for changed/identical values
-        if key in old_keys:
-            # hmm, smart checking with debug logging
-            if not new[key] == old[key]:
-                _log.debug("Key in new environment found that is different from old one: %s (%s)", key, new[key])
-                setvar(key, new[key], verbose=verbose)
-        else:
-            _log.debug("Key in new environment found that is not in old one: %s (%s)", key, new[key])
-            setvar(key, new[key], verbose=verbose)
+    Only environment variables for which the value differs are touched;
+    changes are logged as a single summary record.
+    """
+    to_set, to_unset = diff_env(old, new)
 
-    for key in old_keys:
-        if key not in new_keys:
-            _log.debug("Key in old environment found that is not in new one: %s (%s)", key, old[key])
-            os.unsetenv(key)
-            del os.environ[key]
+    with env_transaction():
+        for key in sorted(to_set):
+            setvar(key, to_set[key], verbose=verbose)
+        unset_env_vars(sorted(to_unset), verbose=False)
 
 
 def restore_env(env):
     """
     Restore active environment based on specified dictionary.
     """
-    modify_env(os.environ, env, verbose=False)
+    modify_env(snapshot_env(), env, verbose=False)
 
 
 def sanitize_env():
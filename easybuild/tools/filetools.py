@@ -40,27 +40,35 @@ Set of file tools.
 """
 import datetime
 import difflib
+import errno
+import fcntl
 import fileinput
 import glob
 import hashlib
 import imp
 import inspect
+import json
 import os
 import re
 import shutil
 import signal
+import socket
 import stat
 import sys
 import tempfile
+import threading
 import time
 import zlib
+from multiprocessing.pool import ThreadPool
 
 from easybuild.base import fancylogger
 from easybuild.tools import run
 # import build_log must stay, to use of EasyBuildLog
 from easybuild.tools.build_log import EasyBuildError, dry_run_msg, print_msg, print_warning
-from easybuild.tools.config import DEFAULT_WAIT_ON_LOCK_INTERVAL, GENERIC_EASYBLOCK_PKG, build_option, install_path
+from easybuild.tools.config import COPY_MODE_HARDLINK, COPY_MODE_PARALLEL, DEFAULT_WAIT_ON_LOCK_INTERVAL
+from easybuild.tools.config import GENERIC_EASYBLOCK_PKG, build_option, install_path
 from easybuild.tools.py2vs3 import HTMLParser, std_urllib, string_type
+from easybuild.tools.timing import TIMING_ADJUST_PERMISSIONS, TIMING_DOWNLOAD, record_timing
 from easybuild.tools.utilities import nub, remove_unwanted_chars
 
 try:
@@ -155,9 +163,39 @@ EXTRACT_CMDS = {
     '.tar.z':   "tar xzf %(filepath)s",
 }
 
+# ioctl request to share the contents of a file with another file on a copy-on-write filesystem,
+# see ioctl_ficlone(2) (Linux only, supported on e.g. Btrfs and XFS)
+FICLONE = 0x40049409
+
+# build options that imply that permissions of installed files are changed, which affects the source files too
+# when files are hard linked rather than copied (see --copy-mode)
+HARDLINK_UNSAFE_OPTIONS = ['group', 'group_writable_installdir', 'read_only_installdir', 'set_gid_bit', 'sticky_bit',
+                           'umask']
+
 # global set of names of locks that were created in this session
 global_lock_names = set()
 
+# name of file in lock directory that holds metadata on the owner of the lock (host, pid, start time)
+LOCK_OWNER_FILE = 'owner.json'
+# interval (in seconds) at which the owner file of locks held in this session is touched
+LOCK_HEARTBEAT_INTERVAL = 60
+# lock is considered stale if the heartbeat of the lock owner wasn't updated for this long (in seconds)
+LOCK_STALE_TIMEOUT = 10 * LOCK_HEARTBEAT_INTERVAL
+# margin (in seconds) for clock skew between hosts, since heartbeat is compared with current time on this host
+LOCK_CLOCK_SKEW_MARGIN = 5 * LOCK_HEARTBEAT_INTERVAL
+# suffix for directory that is created to claim the removal of a stale lock
+LOCK_TAKEOVER_SUFFIX = '.takeover'
+# files used to determine the identity of a process (Linux only)
+BOOT_ID_PATH = '/proc/sys/kernel/random/boot_id'
+PROC_PID_NS_PATH = '/proc/%s/ns/pid'
+PROC_STAT_PATH = '/proc/%s/stat'
+# initial/maximum time (in seconds) between checks whether a lock was released
+LOCK_POLL_MIN_INTERVAL = 0.1
+LOCK_POLL_MAX_INTERVAL = 5
+
+# event used to stop the thread that keeps the heartbeat of locks held in this session alive
+_lock_heartbeat = {'event': None, 'thread': None}
+
 
 class ZlibChecksum(object):
     """
@@ -247,6 +285,79 @@ def write_file(path, data, append=False, forced=False, backup=False, always_over
         raise EasyBuildError("Failed to write to %s: %s", path, err)
 
 
+def _create_tmp_file_next_to(path):
+    """
+    Create an empty temporary file in the same directory as the specified path, and return its location.
+
+    The file is created with os.open rather than tempfile.mkstemp, so the permissions are determined by the umask
+    (files created by mkstemp are only accessible by the owner); the umask is not changed (not even temporarily),
+    since it applies to the whole process (incl. other threads that may be creating files).
+    """
+    dirpath, filename = os.path.split(os.path.abspath(path))
+    mkdir(dirpath, parents=True)
+
+    while True:
+        tmp_path = os.path.join(dirpath, '.%s.%s' % (filename, hashlib.md5(os.urandom(16)).hexdigest()[:8]))
+        try:
+            os.close(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666))
+            return tmp_path
+        except OSError as err:
+            if err.errno != errno.EEXIST:
+                raise
+
+
+def write_file_atomic(path, data, forced=False):
+    """
+    Write given contents to file at given path atomically,
+    by writing to a temporary file in the same directory first, and then renaming it;
+    this avoids that a partially written file is ever seen at the specified location (e.g. by another session).
+
+    :param path: location of file
+    :param data: contents to write to file
+    :param forced: force actually writing file in (extended) dry run mode
+    """
+    # early exit in 'dry run' mode
+    if not forced and build_option('extended_dry_run'):
+        dry_run_msg("file written: %s" % path, silent=build_option('silent'))
+        return
+
+    tmp_path = None
+    try:
+        tmp_path = _create_tmp_file_next_to(path)
+        write_file(tmp_path, data, forced=True)
+        os.rename(tmp_path, path)
+    except (EasyBuildError, IOError, OSError) as err:
+        if tmp_path:
+            remove_file(tmp_path)
+        raise EasyBuildError("Failed to write %s: %s", path, err)
+
+
+def copy_file_atomic(path, target_path, forced=False):
+    """
+    Copy file at given path to target path atomically,
+    by copying it to a temporary file in the target directory first, and then renaming it
+    (see also write_file_atomic); the file contents are streamed, rather than read into memory first.
+
+    :param path: location of file to copy
+    :param target_path: location to copy file to
+    :param forced: force actually copying file in (extended) dry run mode
+    """
+    # early exit in 'dry run' mode
+    if not forced and build_option('extended_dry_run'):
+        dry_run_msg("copied file %s to %s" % (path, target_path), silent=build_option('silent'))
+        return
+
+    tmp_path = None
+    try:
+        tmp_path = _create_tmp_file_next_to(target_path)
+        shutil.copyfile(path, tmp_path)
+        os.rename(tmp_path, target_path)
+    except (EasyBuildError, IOError, OSError) as err:
+        if tmp_path:
+            remove_file(tmp_path)
+        raise EasyBuildError("Failed to copy %s to %s: %s", path, target_path, err)
+
+
 def is_binary(contents):
     """
     Check whether given bytestring represents the contents of a binary file or not.
@@ -594,6 +705,7 @@ def download_file(filename, url, path, forced=False):
     used_urllib = std_urllib
     switch_to_requests = False
 
+    start_time = time.time()
     while not downloaded and attempt_cnt < max_attempts:
         attempt_cnt += 1
         try:
@@ -641,6 +753,8 @@ def download_file(filename, url, path, forced=False):
                 _log.info("Downloading using requests package instead of urllib2")
                 used_urllib = requests
 
+    record_timing(TIMING_DOWNLOAD, url, start_time, attempts=attempt_cnt, success=downloaded)
+
     if downloaded:
         _log.info("Successful download of file %s from url %s to path %s" % (filename, url, path))
         return path
@@ -1382,6 +1496,7 @@ def adjust_permissions(provided_path, permission_bits, add=True, onlyfiles=False
     failed_paths = []
     fail_cnt = 0
     err_msg = None
+    start_time = time.time()
     for path in allpaths:
         try:
             # don't change permissions if path is a symlink, since we're not checking where the symlink points to
@@ -1433,6 +1548,8 @@ def adjust_permissions(provided_path, permission_bits, add=True, onlyfiles=False
                 failed_paths.append(path)
                 err_msg = err
 
+    record_timing(TIMING_ADJUST_PERMISSIONS, provided_path, start_time, paths=len(allpaths))
+
     if failed_paths:
         raise EasyBuildError("Failed to chmod/chown several paths: %s (last error: %s)", failed_paths, err_msg)
 
@@ -1530,6 +1647,201 @@ def det_lock_path(lock_name):
     return os.path.join(locks_dir, lock_name + '.lock')
 
 
+def det_lock_owner_path(lock_path):
+    """
+    Determine path to file with metadata on owner of specified lock.
+    """
+    return os.path.join(lock_path, LOCK_OWNER_FILE)
+
+
+def read_lock_owner(lock_path):
+    """
+    Read metadata on owner of specified lock (host, pid, user, start time, last heartbeat).
+
+    :return: dict with owner metadata, or None if it's not available
+    """
+    owner_path = det_lock_owner_path(lock_path)
+    owner = None
+    try:
+        with open(owner_path) as handle:
+            owner = json.load(handle)
+        # last modification time of owner file is the last heartbeat
+        owner['heartbeat'] = os.stat(owner_path).st_mtime
+    except (IOError, OSError, ValueError) as err:
+        _log.debug("No (valid) owner metadata available for lock %s: %s", lock_path, err)
+        owner = None
+
+    return owner
+
+
+def det_process_identity(pid='self'):
+    """
+    Determine identity of process with specified PID (current process by default), i.e. the boot ID of the system,
+    the PID namespace and the start time of the process (in clock ticks since boot).
+
+    Together with the hostname, this uniquely identifies a process, even when PIDs are reused or when processes
+    are running in containers that share the hostname (but use a separate PID namespace).
+    Only supported on Linux; for other processes than the current one, the PID namespace is not determined,
+    since that's only accessible for processes owned by the same user.
+
+    :return: dict with boot ID, PID namespace (only for current process) and start time; None if not available
+    """
+    boot_id = read_file(BOOT_ID_PATH, log_error=False)
+    proc_stat = read_file(PROC_STAT_PATH % pid, log_error=False)
+    if boot_id is None or proc_stat is None:
+        _log.debug("Failed to determine identity of process %s: %s or %s not available",
+                   pid, BOOT_ID_PATH, PROC_STAT_PATH % pid)
+        return None
+
+    try:
+        pid_ns = None
+        if pid == 'self':
+            pid_ns = os.readlink(PROC_PID_NS_PATH % pid)
+        # name of command (2nd field) may include spaces, so only consider fields after the closing bracket;
+        # start time is 22nd field, see 'man proc'
+        start_time = int(proc_stat.rsplit(')', 1)[1].split()[19])
+    except (IndexError, OSError, ValueError) as err:
+        _log.debug("Failed to determine identity of process %s: %s", pid, err)
+        return None
+
+    return {'boot_id': boot_id.strip(), 'pid_ns': pid_ns, 'pid_start': start_time}
+
+
+def is_stale_lock(lock_path, owner=None):
+    """
+    Determine whether specified lock is stale, i.e. whether the process that created it is no longer around.
+
+    A lock is considered stale if the heartbeat of the lock owner was not updated in the last LOCK_STALE_TIMEOUT
+    seconds (with an additional margin of LOCK_CLOCK_SKEW_MARGIN seconds, since the heartbeat of a lock owned by
+    a process on another host may be recorded using a clock that is not in sync with the clock of this host).
+
+    A lock that was created on this host is also considered stale if it's confirmed that the process that created it
+    is gone, i.e. if the lock was created during the current boot in the same PID namespace (see
+    det_process_identity), and there's no longer a process with that PID that was started at the same time.
+    Just checking whether a process with that PID exists is not sufficient, since PIDs get reused,
+    and containers may share the hostname but use a separate PID namespace.
+
+    Locks without (valid) owner metadata are never considered stale.
+    """
+    if owner is None:
+        owner = read_lock_owner(lock_path)
+
+    if owner is None:
+        return False
+
+    if owner.get('host') == socket.gethostname() and None not in (owner.get('pid'), owner.get('pid_start')):
+        this_proc = det_process_identity()
+        same_pid_ns = this_proc and all(owner.get(key) == this_proc[key] for key in ('boot_id', 'pid_ns'))
+        if same_pid_ns:
+            lock_proc = det_process_identity(pid=owner.get('pid'))
+            if lock_proc is None or lock_proc['pid_start'] != owner['pid_start']:
+                _log.info("Process %s that owns lock %s no longer exists", owner.get('pid'), lock_path)
+                return True
+
+    heartbeat_age = time.time() - owner['heartbeat']
+    if heartbeat_age > LOCK_STALE_TIMEOUT + LOCK_CLOCK_SKEW_MARGIN:
+        _log.info("Heartbeat for lock %s is %d seconds old (stale timeout: %d seconds, clock skew margin: %d seconds)",
+                  lock_path, heartbeat_age, LOCK_STALE_TIMEOUT, LOCK_CLOCK_SKEW_MARGIN)
+        return True
+
+    return False
+
+
+def is_same_lock_owner(owner1, owner2):
+    """
+    Check whether specified lock owner metadata corresponds to the same lock owner.
+    """
+    return owner1 is not None and owner2 is not None and all(owner1.get(key) == owner2.get(key)
+                                                             for key in ('host', 'pid', 'start', 'pid_start'))
+
+
+def remove_stale_lock(lock_path, owner):
+    """
+    Remove specified stale lock, if it is still owned by the specified (stale) lock owner.
+
+    To avoid that several sessions try to remove the same stale lock at the same time (and that one of them
+    removes a lock that was created by a live process after the stale lock was removed by another session),
+    removing a stale lock is claimed first by atomically creating a separate directory next to the lock.
+    The owner of the lock is checked again while holding that claim, and only then the lock is removed.
+
+    :return: True if stale lock was removed, False otherwise
+    """
+    takeover_path = lock_path + LOCK_TAKEOVER_SUFFIX
+    try:
+        os.mkdir(takeover_path)
+    except OSError as err:
+        _log.info("Failed to claim removal of stale lock %s via %s: %s", lock_path, takeover_path, err)
+        # claim left behind by a session that died while removing a stale lock is removed,
+        # so removing the stale lock can be tried again later
+        try:
+            if time.time() - os.stat(takeover_path).st_mtime > LOCK_STALE_TIMEOUT + LOCK_CLOCK_SKEW_MARGIN:
+                _log.info("Removing stale claim %s to remove stale lock %s", takeover_path, lock_path)
+                os.rmdir(takeover_path)
+        except OSError as err:
+            _log.debug("Failed to remove stale claim %s: %s", takeover_path, err)
+        return False
+
+    try:
+        # make sure that the lock is still the stale lock, and not a lock that replaced it in the meantime
+        # (e.g. created by a live process after another session removed the stale lock)
+        if not is_same_lock_owner(read_lock_owner(lock_path), owner):
+            _log.info("Lock %s was replaced by another lock in the meantime, so not removing it", lock_path)
+            return False
+
+        print_warning("Removing stale lock %s (created by process %s on host %s at %s)",
+                      lock_path, owner.get('pid'), owner.get('host'), owner.get('start'),
+                      log=_log, silent=build_option('silent'))
+        # move verified stale lock out of the way first, so a new lock can be created while it's being removed
+        stale_lock_path = '%s.stale.%s.%s' % (lock_path, socket.gethostname(), os.getpid())
+        try:
+            os.rename(lock_path, stale_lock_path)
+        except OSError as err:
+            raise EasyBuildError("Failed to move stale lock %s to %s: %s", lock_path, stale_lock_path, err)
+        remove_dir(stale_lock_path)
+    finally:
+        try:
+            os.rmdir(takeover_path)
+        except OSError as err:
+            _log.warning("Failed to remove %s: %s", takeover_path, err)
+
+    return True
+
+
+def _lock_heartbeat_loop(stop_event):
+    """
+    Periodically touch the owner files of the locks that were created in this session, until stop event is set.
+    """
+    while not stop_event.wait(LOCK_HEARTBEAT_INTERVAL):
+        for lock_name in list(global_lock_names):
+            owner_path = det_lock_owner_path(det_lock_path(lock_name))
+            try:
+                os.utime(owner_path, None)
+            except OSError as err:
+                _log.debug("Failed to update heartbeat for lock %s: %s", lock_name, err)
+
+
+def start_lock_heartbeat():
+    """
+    Start thread that keeps the heartbeat of the locks that were created in this session alive (if not running yet).
+    """
+    thread = _lock_heartbeat['thread']
+    if thread is None or not thread.is_alive():
+        stop_event = threading.Event()
+        thread = threading.Thread(target=_lock_heartbeat_loop, args=(stop_event,), name='lock-heartbeat')
+        thread.daemon = True
+        thread.start()
+        _lock_heartbeat.update({'event': stop_event, 'thread': thread})
+
+
+def stop_lock_heartbeat():
+    """
+    Stop thread that keeps the heartbeat of the locks that were created in this session alive (if running).
+    """
+    if _lock_heartbeat['event'] is not None:
+        _lock_heartbeat['event'].set()
+    _lock_heartbeat.update({'event': None, 'thread': None})
+
+
 def create_lock(lock_name):
     """Create lock with specified name."""
 
@@ -1543,6 +1855,18 @@ def create_lock(lock_name):
         # clean up the error message a bit, get rid of the "Failed to create directory" part + quotes
         stripped_err = str(err).split(':', 1)[1].strip().replace("'", '').replace('"', '')
         raise EasyBuildError("Failed to create lock %s: %s", lock_path, stripped_err)
+
+    # record who owns the lock, so other sessions can determine whether the lock is stale
+    owner = {
+        'host': socket.gethostname(),
+        'pid': os.getpid(),
+        'user': os.environ.get('USER'),
+        'start': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    owner.update(det_process_identity() or {})
+    write_file(det_lock_owner_path(lock_path), json.dumps(owner, sort_keys=True), forced=True)
+    start_lock_heartbeat()
+
     _log.info("Lock created: %s", lock_path)
 
 
@@ -1552,8 +1876,14 @@ def check_lock(lock_name):
 
     If it exists, either wait until it's released, or raise an error
     (depending on --wait-on-lock configuration option).
+    Stale locks (see is_stale_lock) are removed rather than waited for.
     """
     lock_path = det_lock_path(lock_name)
+
+    owner = read_lock_owner(lock_path)
+    if owner is not None and is_stale_lock(lock_path, owner=owner):
+        remove_stale_lock(lock_path, owner)
+
     if os.path.exists(lock_path):
         _log.info("Lock %s exists!", lock_path)
 
@@ -1578,15 +1908,30 @@ def check_lock(lock_name):
 
         # wait limit could be zero (no waiting), -1 (no waiting limit) or non-zero value (waiting limit in seconds)
         if wait_limit != 0:
-            wait_time = 0
+            # check whether lock was released with exponential backoff (capped by waiting interval),
+            # so a released lock is noticed quickly, without hammering the (possibly shared) filesystem;
+            # a message is printed every time another waiting interval starts
+            start_time = time.time()
+            wait_time, next_msg_time = 0, 0
+            poll_interval = min(LOCK_POLL_MIN_INTERVAL, wait_interval)
             while os.path.exists(lock_path) and (wait_limit == -1 or wait_time < wait_limit):
-                print_msg("lock %s exists, waiting %d seconds..." % (lock_path, wait_interval),
-                          silent=build_option('silent'))
-                time.sleep(wait_interval)
-                wait_time += wait_interval
+                if wait_time >= next_msg_time:
+                    print_msg("lock %s exists, waiting %d seconds..." % (lock_path, wait_interval),
+                              silent=build_option('silent'))
+                    next_msg_time += wait_interval
+
+                    # lock owner may have died while we were waiting
+                    owner = read_lock_owner(lock_path)
+                    if owner is not None and is_stale_lock(lock_path, owner=owner):
+                        if remove_stale_lock(lock_path, owner):
+                            continue
+
+                time.sleep(poll_interval)
+                poll_interval = min(poll_interval * 2, LOCK_POLL_MAX_INTERVAL, wait_interval)
+                wait_time = time.time() - start_time
 
             if os.path.exists(lock_path) and wait_limit != -1 and wait_time >= wait_limit:
-                error_msg = "Maximum wait time for lock %s to be released reached: %s sec >= %s sec"
+                error_msg = "Maximum wait time for lock %s to be released reached: %d sec >= %d sec"
                 raise EasyBuildError(error_msg, lock_path, wait_time, wait_limit)
             else:
                 _log.info("Lock %s was released!", lock_path)
@@ -1605,6 +1950,8 @@ def remove_lock(lock_name):
     remove_dir(lock_path)
     if lock_name in global_lock_names:
         global_lock_names.remove(lock_name)
+    if not global_lock_names:
+        stop_lock_heartbeat()
     _log.info("Lock removed: %s", lock_path)
 
 
@@ -2111,6 +2458,135 @@ def copy_files(paths, target_dir, force_in_dry_run=False):
             copy_file(path, target_dir)
 
 
+def _list_dir_entries(path):
+    """
+    List entries in specified directory, as tuples with name and flags indicating whether entry is symlink/directory.
+
+    Uses os.scandir if available, which avoids additional stat calls for each entry.
+    """
+    if hasattr(os, 'scandir'):
+        entries = [(e.name, e.is_symlink(), e.is_dir()) for e in os.scandir(path)]
+    else:
+        entries = []
+        for name in os.listdir(path):
+            entry_path = os.path.join(path, name)
+            entries.append((name, os.path.islink(entry_path), os.path.isdir(entry_path)))
+    return entries
+
+
+def _copy_tree_file(paths, hardlink=False):
+    """
+    Copy a single file as part of copying a directory tree (see copy_tree).
+
+    Files are hard linked if requested (and possible), reflinked if supported by the filesystem (Linux only),
+    or copied otherwise (using sendfile, where shutil.copyfile supports it).
+
+    :param paths: tuple with path of file to copy and target path
+    :param hardlink: try to create hard link rather than copying
+    :return: tuple with size of file and method used to copy it ('hardlink', 'reflink' or 'copy')
+    """
+    path, target_path = paths
+    size = os.path.getsize(path)
+
+    if os.path.lexists(target_path) and (hardlink or os.path.islink(target_path)):
+        os.remove(target_path)
+
+    # note: os.link doesn't follow symlinks (on Linux), so always copy files that symlinks point to
+    if hardlink and not os.path.islink(path):
+        try:
+            os.link(path, target_path)
+            return (size, 'hardlink')
+        except OSError as err:
+            _log.debug("Failed to hard link %s to %s, copying instead: %s", path, target_path, err)
+
+    method = 'copy'
+    if sys.platform.startswith('linux'):
+        try:
+            with open(path, 'rb') as src_fh:
+                with open(target_path, 'wb') as target_fh:
+                    fcntl.ioctl(target_fh.fileno(), FICLONE, src_fh.fileno())
+            method = 'reflink'
+        except (IOError, OSError):
+            pass
+
+    if method == 'copy':
+        shutil.copyfile(path, target_path)
+
+    shutil.copystat(path, target_path)
+
+    return (size, method)
+
+
+def copy_tree(path, target_path, symlinks=False, ignore=None, dirs_exist_ok=False, hardlink=False, threads=None):
+    """
+    Copy a directory tree, copying files concurrently.
+
+    Directories and symlinks are created first (while walking the source tree), files are copied concurrently
+    using a pool of threads (see _copy_tree_file), and finally the permissions and timestamps of directories
+    are copied (bottom up, so read-only directories don't get in the way).
+
+    :param path: the original directory path
+    :param target_path: path to copy the directory to
+    :param symlinks: copy symbolic links as symbolic links (rather than copying the files they point to)
+    :param ignore: function to determine which entries to ignore (same semantics as for shutil.copytree)
+    :param dirs_exist_ok: boolean indicating whether it's OK if the target directory (or subdirectories) already exist
+    :param hardlink: hard link files rather than copying them, if possible
+    :param threads: number of threads to use to copy files
+    """
+    start_time = time.time()
+
+    dirs, files = [], []
+
+    def walk(src_dir, target_dir):
+        """Walk specified source directory, create target directory and symlinks, and collect files to copy."""
+        entries = _list_dir_entries(src_dir)
+
+        ignored = set()
+        if ignore:
+            ignored = ignore(src_dir, [e[0] for e in entries])
+
+        if not (dirs_exist_ok and os.path.isdir(target_dir)):
+            os.makedirs(target_dir)
+        dirs.append((src_dir, target_dir))
+
+        for name, is_symlink, is_dir in entries:
+            if name in ignored:
+                continue
+            src, target = os.path.join(src_dir, name), os.path.join(target_dir, name)
+            if is_symlink and symlinks:
+                if os.path.lexists(target):
+                    os.remove(target)
+                os.symlink(os.readlink(src), target)
+            elif os.path.isdir(src) if is_symlink else is_dir:
+                walk(src, target)
+            else:
+                files.append((src, target))
+
+    walk(path, target_path)
+
+    threads = max(1, min(threads or 1, len(files)))
+    if threads > 1:
+        pool = ThreadPool(threads)
+        try:
+            results = pool.map(lambda paths: _copy_tree_file(paths, hardlink=hardlink), files)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [_copy_tree_file(paths, hardlink=hardlink) for paths in files]
+
+    for src_dir, target_dir in reversed(dirs):
+        shutil.copystat(src_dir, target_dir)
+
+    elapsed = max(time.time() - start_time, 1e-6)
+    total_size = sum(size for (size, _) in results)
+    methods = [method for (_, method) in results]
+    _log.info("Copied %d files (%.1f MB) from %s to %s in %.2f sec using %d threads (%.1f MB/s; "
+              "%d hard linked, %d reflinked, %d copied)", len(files), total_size / 1024.0 ** 2, path, target_path,
+              elapsed, threads, total_size / 1024.0 ** 2 / elapsed,
+              methods.count('hardlink'), methods.count('reflink'), methods.count('copy'))
+
+
 def copy_dir(path, target_path, force_in_dry_run=False, dirs_exist_ok=False, **kwargs):
     """
     Copy a directory from specified location to specified location
@@ -2122,7 +2598,9 @@ def copy_dir(path, target_path, force_in_dry_run=False, dirs_exist_ok=False, **k
 
     shutil.copytree is used if the target path does not exist yet;
     if the target path already exists, the 'copy' function will be used to copy the contents of
-    the source path to the target path
+    the source path to the target path;
+    if --copy-mode is set to 'parallel' or 'hardlink', the copy_tree function is used instead
+    (files are not hard linked if permissions of copied files are going to be changed, see HARDLINK_UNSAFE_OPTIONS)
 
     Additional specified named arguments are passed down to shutil.copytree/copy if used.
     """
@@ -2133,35 +2611,50 @@ def copy_dir(path, target_path, force_in_dry_run=False, dirs_exist_ok=False, **k
             if not dirs_exist_ok and os.path.exists(target_path):
                 raise EasyBuildError("Target location %s to copy %s to already exists", target_path, path)
 
-            # note: in Python >= 3.8 shutil.copytree works just fine thanks to the 'dirs_exist_ok' argument,
-            # but since we need to be more careful in earlier Python versions we use our own implementation
-            # in case the target directory exists and 'dirs_exist_ok' is enabled
-            if dirs_exist_ok and os.path.exists(target_path):
-                # if target directory already exists (and that's allowed via dirs_exist_ok),
-                # we need to be more careful, since shutil.copytree will fail (in Python < 3.8)
-                # if target directory already exists;
-                # so, recurse via 'copy' function to copy files/dirs in source path to target path
-                # (NOTE: don't use distutils.dir_util.copy_tree here, see
-                # https://github.com/easybuilders/easybuild-framework/issues/3306)
-
-                entries = os.listdir(path)
-
-                # take into account 'ignore' function that is supported by shutil.copytree
-                # (but not by 'copy_file' function used by 'copy')
-                ignore = kwargs.get('ignore')
-                if ignore:
-                    ignored_entries = ignore(path, entries)
-                    entries = [x for x in entries if x not in ignored_entries]
-
-                # determine list of paths to copy
-                paths_to_copy = [os.path.join(path, x) for x in entries]
-
-                copy(paths_to_copy, target_path,
-                     force_in_dry_run=force_in_dry_run, dirs_exist_ok=dirs_exist_ok, **kwargs)
-
+            copy_mode = build_option('copy_mode')
+            if copy_mode == COPY_MODE_HARDLINK:
+                # hard linked files share their inode with the source file, so changing the permissions or contents
+                # of the copy also affects the source file; don't hard link if permissions of (installed) files
+                # will be changed by EasyBuild
+                perms_opts = [opt for opt in HARDLINK_UNSAFE_OPTIONS if build_option(opt)]
+                if perms_opts:
+                    _log.info("Not hard linking files when copying %s to %s since these options are used: %s",
+                              path, target_path, ', '.join(perms_opts))
+                    copy_mode = COPY_MODE_PARALLEL
+
+            if copy_mode in [COPY_MODE_HARDLINK, COPY_MODE_PARALLEL] and set(kwargs) <= set(['symlinks', 'ignore']):
+                copy_tree(path, target_path, dirs_exist_ok=dirs_exist_ok, hardlink=copy_mode == COPY_MODE_HARDLINK,
+                          threads=build_option('copy_threads'), **kwargs)
             else:
-                # if dirs_exist_ok is not enabled or target directory doesn't exist, just use shutil.copytree
-                shutil.copytree(path, target_path, **kwargs)
+                # note: in Python >= 3.8 shutil.copytree works just fine thanks to the 'dirs_exist_ok' argument,
+                # but since we need to be more careful in earlier Python versions we use our own implementation
+                # in case the target directory exists and 'dirs_exist_ok' is enabled
+                if dirs_exist_ok and os.path.exists(target_path):
+                    # if target directory already exists (and that's allowed via dirs_exist_ok),
+                    # we need to be more careful, since shutil.copytree will fail (in Python < 3.8)
+                    # if target directory already exists;
+                    # so, recurse via 'copy' function to copy files/dirs in source path to target path
+                    # (NOTE: don't use distutils.dir_util.copy_tree here, see
+                    # https://github.com/easybuilders/easybuild-framework/issues/3306)
+
+                    entries = os.listdir(path)
+
+                    # take into account 'ignore' function that is supported by shutil.copytree
+                    # (but not by 'copy_file' function used by 'copy')
+                    ignore = kwargs.get('ignore')
+                    if ignore:
+                        ignored_entries = ignore(path, entries)
+                        entries = [x for x in entries if x not in ignored_entries]
+
+                    # determine list of paths to copy
+                    paths_to_copy = [os.path.join(path, x) for x in entries]
+
+                    copy(paths_to_copy, target_path,
+                         force_in_dry_run=force_in_dry_run, dirs_exist_ok=dirs_exist_ok, **kwargs)
+
+                else:
+                    # if dirs_exist_ok is not enabled or target directory doesn't exist, just use shutil.copytree
+                    shutil.copytree(path, target_path, **kwargs)
 
             _log.info("%s copied to %s", path, target_path)
         except (IOError, OSError, shutil.Error) as err:
@@ -33,6 +33,7 @@ import base64
 import copy
 import getpass
 import glob
+import hashlib
 import os
 import random
 import re
@@ -50,7 +51,8 @@ from easybuild.framework.easyconfig.easyconfig import process_easyconfig
 from easybuild.framework.easyconfig.parser import EasyConfigParser
 from easybuild.tools.build_log import EasyBuildError, print_msg, print_warning
 from easybuild.tools.config import build_option
-from easybuild.tools.filetools import apply_patch, change_dir, copy_dir, copy_easyblocks, copy_framework_files
+from easybuild.tools.filetools import apply_patch, change_dir, copy_dir, copy_easyblocks, copy_file, copy_file_atomic
+from easybuild.tools.filetools import copy_framework_files
 from easybuild.tools.filetools import det_patched_files, download_file, extract_file
 from easybuild.tools.filetools import get_easyblock_class_name, mkdir, read_file, symlink, which, write_file
 from easybuild.tools.py2vs3 import HTTPError, URLError, ascii_letters, urlopen
@@ -115,6 +117,10 @@ VALID_CLOSE_PR_REASONS = {
     'retest': 'closing and reopening to trigger tests',
 }
 
+# cache of downloaded files (repository archives, PR diffs), to avoid downloading them again;
+# keys are (account, repo, branch, commit SHA) for repository archives, (account, repo, PR, head SHA) for PR diffs
+_downloaded_files_cache = {}
+
 
 class Githubfs(object):
     """This class implements some higher level functionality on top of the Github api"""
@@ -356,8 +362,8 @@ def download_repo(repo=GITHUB_EASYCONFIGS_REPO, branch='master', account=GITHUB_
     url = URL_SEPARATOR.join([GITHUB_URL, account, repo, 'archive', base_name])
 
     target_path = os.path.join(path, base_name)
-    _log.debug("downloading repo %s/%s as archive from %s to %s" % (account, repo, url, target_path))
-    download_file(base_name, url, target_path, forced=True)
+    cache_key = (account, repo, branch, latest_commit_sha)
+    download_cached_file(base_name, url, target_path, cache_key)
     _log.debug("%s downloaded to %s, extracting now" % (base_name, path))
 
     base_dir = extract_file(target_path, path, forced=True, change_into_dir=False)
@@ -374,6 +380,109 @@ def download_repo(repo=GITHUB_EASYCONFIGS_REPO, branch='master', account=GITHUB_
     return extracted_path
 
 
+def download_cached_file(filename, url, path, cache_key):
+    """
+    Download file from specified URL to specified path, unless it was downloaded before for the same cache key;
+    if so, a copy of the previously downloaded file is used instead.
+
+    Downloaded files are also cached across sessions in the directory specified via --github-download-cache (if any),
+    of which the size is limited via --github-download-cache-size (see prune_github_download_cache).
+
+    :param filename: name of file to download
+    :param url: URL to download file from
+    :param path: path to download file to
+    :param cache_key: key to use in cache of downloaded files (should include commit SHA for which file was obtained)
+    """
+    cached_path = _downloaded_files_cache.get(cache_key)
+    if cached_path is None or not os.path.isfile(cached_path):
+        cached_path = det_github_download_cache_path(filename, cache_key)
+        if cached_path and os.path.isfile(cached_path):
+            # update modification time, so least recently used files are removed first when cache is pruned
+            try:
+                os.utime(cached_path, None)
+            except OSError as err:
+                _log.debug("Failed to update modification time of %s: %s", cached_path, err)
+        else:
+            cached_path = None
+
+    if cached_path:
+        if os.path.realpath(cached_path) != os.path.realpath(path):
+            _log.debug("Using copy of %s downloaded earlier to %s (cache key: %s)", url, cached_path, cache_key)
+            copy_file(cached_path, path)
+        else:
+            _log.debug("Already downloaded %s to %s (cache key: %s)", url, path, cache_key)
+        _downloaded_files_cache[cache_key] = path
+    else:
+        _log.debug("Downloading %s from %s to %s", filename, url, path)
+        if download_file(filename, url, path, forced=True):
+            _downloaded_files_cache[cache_key] = path
+
+            persistent_path = det_github_download_cache_path(filename, cache_key)
+            if persistent_path:
+                # file is copied atomically, so other sessions never see a partially written file
+                copy_file_atomic(path, persistent_path, forced=True)
+                _log.debug("Downloaded file %s cached at %s", path, persistent_path)
+                prune_github_download_cache(os.path.dirname(persistent_path), keep=persistent_path)
+
+
+def det_github_download_cache_path(filename, cache_key):
+    """
+    Determine path for specified downloaded file in the directory specified via --github-download-cache.
+
+    :param filename: name of downloaded file
+    :param cache_key: key for downloaded file (see download_cached_file)
+    :return: path to (potentially) cached file, or None if --github-download-cache is not used
+    """
+    cache_dir = build_option('github_download_cache')
+    if cache_dir:
+        key_hash = hashlib.sha256('/'.join(str(x) for x in cache_key).encode('utf-8')).hexdigest()
+        res = os.path.join(cache_dir, '%s-%s' % (key_hash, filename))
+    else:
+        res = None
+
+    return res
+
+
+def prune_github_download_cache(cache_dir, keep=None):
+    """
+    Remove least recently used files from specified directory of cached downloaded files,
+    until total size doesn't exceed the size specified via --github-download-cache-size (in MiB).
+
+    :param cache_dir: directory of cached downloaded files (see --github-download-cache)
+    :param keep: path to file that should not be removed (e.g. the file that was just added)
+    """
+    max_size = build_option('github_download_cache_size')
+    if max_size is None or max_size < 0:
+        return
+    max_size *= 1024 * 1024
+
+    cached_files = []
+    for filename in os.listdir(cache_dir):
+        # skip temporary files (see copy_file_atomic)
+        if filename.startswith('.'):
+            continue
+        path = os.path.join(cache_dir, filename)
+        try:
+            path_stat = os.stat(path)
+        except OSError as err:
+            # file may have been removed in the meantime by another session
+            _log.debug("Failed to stat %s: %s", path, err)
+            continue
+        cached_files.append((path_stat.st_mtime, path_stat.st_size, path))
+
+    total_size = sum(size for (_, size, _) in cached_files)
+    for (_, size, path) in sorted(cached_files):
+        if total_size <= max_size:
+            break
+        if path != keep:
+            _log.info("Removing %s from GitHub download cache %s (max. size: %d bytes)", path, cache_dir, max_size)
+            try:
+                os.remove(path)
+            except OSError as err:
+                _log.debug("Failed to remove %s: %s", path, err)
+            total_size -= size
+
+
 def fetch_easyblocks_from_pr(pr, path=None, github_user=None):
     """Fetch patched easyconfig files for a particular PR."""
     return fetch_files_from_pr(pr, path, github_user, github_repo=GITHUB_EASYBLOCKS_REPO)
@@ -434,7 +543,8 @@ def fetch_files_from_pr(pr, path=None, github_user=None, github_repo=None):
     # determine list of changed files via diff
     diff_fn = os.path.basename(pr_data['diff_url'])
     diff_filepath = os.path.join(path, diff_fn)
-    download_file(diff_fn, pr_data['diff_url'], diff_filepath, forced=True)
+    cache_key = (github_account, github_repo, pr, pr_data['head']['sha'])
+    download_cached_file(diff_fn, pr_data['diff_url'], diff_filepath, cache_key)
     diff_txt = read_file(diff_filepath)
     _log.debug("Diff for PR #%s:\n%s", pr, diff_txt)
 
@@ -28,7 +28,10 @@ Support for using Slurm as a backend for --job
 :author: Kenneth Hoste (Ghent University)
 """
 import re
+import threading
+import time
 from distutils.version import LooseVersion
+from multiprocessing.pool import ThreadPool
 
 from easybuild.base import fancylogger
 from easybuild.tools.build_log import EasyBuildError, print_msg
@@ -49,6 +52,15 @@ class Slurm(JobBackend):
     # Oldest version tested, may also work with earlier releases
     REQ_VERSION = '16.05'
 
+    # maximum number of jobs that are submitted concurrently
+    SUBMIT_MAX_WORKERS = 8
+    # number of attempts for submitting a job, and time to wait (in seconds) between attempts
+    SUBMIT_MAX_ATTEMPTS = 3
+    SUBMIT_RETRY_WAIT = 10
+    # pattern for errors reported by 'sbatch' that are worth retrying for (e.g. Slurm controller being busy)
+    TRANSIENT_ERROR_REGEX = re.compile(r"Socket timed out|temporarily unable|Unable to contact slurm controller|"
+                                       r"Resource temporarily unavailable|Transient", re.I)
+
     def __init__(self, *args, **kwargs):
         """Constructor."""
 
@@ -88,15 +100,28 @@ class Slurm(JobBackend):
         """
         Initialise the PySlurm job backend.
         """
+        self._queued = []
         self._submitted = []
+        # lock for list of submitted jobs, since jobs are submitted concurrently
+        self._submitted_lock = threading.Lock()
 
     def queue(self, job, dependencies=frozenset()):
         """
         Add a job to the queue.
+        Jobs are only actually submitted when complete() is called.
+
+        :param dependencies: jobs on which this job depends.
+        """
+        self._queued.append((job, list(dependencies)))
+
+    def _submit(self, job, dependencies):
+        """
+        Submit specified job, with specified dependencies (which should already be submitted).
 
         :param dependencies: jobs on which this job depends.
         """
-        submit_cmd = 'sbatch'
+        # --parsable: only print job ID (and cluster name, if any)
+        submit_cmd = 'sbatch --parsable'
 
         if dependencies:
             job.job_specs['dependency'] = self.job_deps_type + ':' + ':'.join(str(d.jobid) for d in dependencies)
@@ -114,36 +139,107 @@ class Slurm(JobBackend):
             else:
                 submit_cmd += ' --%s "%s"' % (key, job.job_specs[key])
 
-        (out, _) = run_cmd(submit_cmd, trace=False)
+        attempt = 1
+        while True:
+            (out, ec) = run_cmd(submit_cmd, log_ok=False, trace=False)
+            if ec == 0:
+                break
+            elif attempt < self.SUBMIT_MAX_ATTEMPTS and self.TRANSIENT_ERROR_REGEX.search(out):
+                self.log.warning("Transient error when submitting job (attempt %d/%d), trying again in %s seconds: %s",
+                                 attempt, self.SUBMIT_MAX_ATTEMPTS, self.SUBMIT_RETRY_WAIT, out)
+                time.sleep(self.SUBMIT_RETRY_WAIT)
+                attempt += 1
+            else:
+                raise EasyBuildError("Failed to submit job using '%s' (exit code %s): %s", submit_cmd, ec, out)
 
-        jobid_regex = re.compile("^Submitted batch job (?P<jobid>[0-9]+)")
+        # output may also include warnings (since stderr is included), so job ID is not necessarily on the first line
+        jobid_regex = re.compile(r"^(Submitted batch job )?(?P<jobid>[0-9]+)(;\S*)?\s*$", re.M)
 
         res = jobid_regex.search(out)
         if res:
             job.jobid = res.group('jobid')
             self.log.info("Job submitted, got job ID %s", job.jobid)
+            # keep track of submitted jobs right away, so user hold is also released if submitting another job fails
+            with self._submitted_lock:
+                self._submitted.append(job)
         else:
             raise EasyBuildError("Failed to determine job ID from output of submission command: %s", out)
 
-        self._submitted.append(job)
+    def _det_submission_levels(self):
+        """
+        Group queued jobs in levels, such that all dependencies of jobs in a particular level are in earlier levels.
+
+        :return: list of lists of (job, dependencies) tuples
+        """
+        levels = []
+        job_levels = {}
+        for job, dependencies in self._queued:
+            # dependencies which are not queued (anymore) are assumed to be submitted already
+            level = max([job_levels[id(d)] + 1 for d in dependencies if id(d) in job_levels] or [0])
+            job_levels[id(job)] = level
+            if level == len(levels):
+                levels.append([])
+            levels[level].append((job, dependencies))
+
+        return levels
 
     def complete(self):
         """
         Complete a bulk job submission.
 
-        Release all user holds on submitted jobs, and disconnect from server.
+        Submit all queued jobs, release all user holds on submitted jobs, and disconnect from server.
+        Jobs are submitted level by level (see _det_submission_levels), with several submissions running concurrently.
+
+        If submitting a job fails, the user holds on the jobs that were already submitted are released
+        (and those jobs are reported) before the error is raised, so they don't remain on hold in the queue.
+        """
+        queued_jobs = [job for (job, _) in self._queued]
+        try:
+            for level_jobs in self._det_submission_levels():
+                workers = min(self.SUBMIT_MAX_WORKERS, len(level_jobs))
+                self.log.info("Submitting %d jobs using %d workers", len(level_jobs), workers)
+                if workers > 1:
+                    pool = ThreadPool(workers)
+                    try:
+                        pool.map(lambda job_and_deps: self._submit(*job_and_deps), level_jobs)
+                    finally:
+                        pool.terminate()
+                        pool.join()
+                else:
+                    for job, dependencies in level_jobs:
+                        self._submit(job, dependencies)
+        except EasyBuildError as err:
+            self.log.warning("Submitting jobs failed, releasing user hold on jobs that were already submitted")
+            self._queued = []
+            # don't let failing to release user holds mask the original error
+            self._release_holds(queued_jobs, log_ok=False)
+            raise err
+
+        self._queued = []
+        self._release_holds(queued_jobs)
+
+    def _release_holds(self, queued_jobs, log_ok=True):
         """
+        Release user holds on submitted jobs, and report submitted jobs (in the order in which they were queued).
+
+        :param queued_jobs: list of jobs that were queued
+        :param log_ok: raise an error if releasing user holds fails
+        """
+        # jobs are added to list of submitted jobs as soon as they're submitted, so order is not deterministic
+        submitted = [job for job in queued_jobs if job in self._submitted]
+        submitted.extend(job for job in self._submitted if job not in submitted)
+
         job_ids = []
-        for job in self._submitted:
+        for job in submitted:
             if job.job_specs['hold']:
                 self.log.info("releasing user hold on job %s" % job.jobid)
                 job_ids.append(job.jobid)
 
         if job_ids:
-            run_cmd("scontrol release %s" % ' '.join(job_ids), trace=False)
+            run_cmd("scontrol release %s" % ' '.join(job_ids), log_ok=log_ok, trace=False)
 
-        submitted_jobs = '; '.join(["%s (%s): %s" % (job.name, job.module, job.jobid) for job in self._submitted])
-        print_msg("List of submitted jobs (%d): %s" % (len(self._submitted), submitted_jobs), log=self.log)
+        submitted_jobs = '; '.join(["%s (%s): %s" % (job.name, job.module, job.jobid) for job in submitted])
+        print_msg("List of submitted jobs (%d): %s" % (len(submitted), submitted_jobs), log=self.log)
 
     def make_job(self, script, name, env_vars=None, hours=None, cores=None):
         """Create and return a job dict with the given parameters."""
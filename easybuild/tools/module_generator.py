@@ -44,7 +44,8 @@ from easybuild.base import fancylogger
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.config import build_option, get_module_syntax, install_path
 from easybuild.tools.filetools import convert_name, mkdir, read_file, remove_file, resolve_path, symlink, write_file
-from easybuild.tools.modules import ROOT_ENV_VAR_NAME_PREFIX, EnvironmentModulesC, Lmod, modules_tool
+from easybuild.tools.modules import MODULE_LOAD_REGEX_LUA, MODULE_LOAD_REGEX_TCL, ROOT_ENV_VAR_NAME_PREFIX
+from easybuild.tools.modules import EnvironmentModulesC, Lmod, modules_tool
 from easybuild.tools.py2vs3 import string_type
 from easybuild.tools.utilities import get_subclasses, quote_str
 
@@ -90,27 +91,35 @@ def dependencies_for(mod_name, modtool, depth=None):
     Obtain a list of dependencies for the given module, determined recursively, up to a specified depth (optionally)
     :param depth: recursion depth (default is None, which corresponds to infinite recursion depth)
     """
-    mod_filepath = modtool.modulefile_path(mod_name)
-    modtxt = read_file(mod_filepath)
-    loadregex = module_load_regex(mod_filepath)
-    mods = loadregex.findall(modtxt)
-
-    if depth is None or depth > 0:
-        if depth and depth > 0:
-            depth = depth - 1
-        # recursively determine dependencies for these dependency modules, until depth is non-positive
-        moddeps = [dependencies_for(mod, modtool, depth=depth) for mod in mods]
-    else:
-        # ignore any deeper dependencies
-        moddeps = []
+    # dependencies for each module (at a particular depth) are only determined once,
+    # modules that are a dependency of several other modules are very common (compilers, binutils, zlib, ...)
+    cache = {}
+
+    def walk(mod_name, depth):
+        """Determine dependencies for specified module, up to specified depth."""
+        key = (mod_name, depth)
+        if key not in cache:
+            # mark as being processed, to avoid infinite recursion when there's a cycle in the dependency graph
+            cache[key] = []
+
+            mods = modtool.module_file_metadata(mod_name)['loads'][:]
+
+            if depth is None or depth > 0:
+                if depth:
+                    depth = depth - 1
+                # add dependencies of dependency modules only if they're not there yet
+                seen = set(mods)
+                for mod in mods[:]:
+                    for dep in walk(mod, depth):
+                        if dep not in seen:
+                            seen.add(dep)
+                            mods.append(dep)
+
+            cache[key] = mods
 
-    # add dependencies of dependency modules only if they're not there yet
-    for moddepdeps in moddeps:
-        for dep in moddepdeps:
-            if dep not in mods:
-                mods.append(dep)
+        return cache[key]
 
-    return mods
+    return walk(mod_name, depth)[:]
 
 
 class ModuleGenerator(object):
@@ -662,7 +671,7 @@ class ModuleGeneratorTcl(ModuleGenerator):
     CHARS_TO_ESCAPE = ['$']
 
     INSTALLDIR_REGEX = r"^set root\s+(?P<installdir>.*)"
-    LOAD_REGEX = r"^\s*(?:module\s+load|depends-on)\s+(\S+)"
+    LOAD_REGEX = MODULE_LOAD_REGEX_TCL
     LOAD_TEMPLATE = "module load %(mod_name)s"
     LOAD_TEMPLATE_DEPENDS_ON = "depends-on %(mod_name)s"
     IS_LOADED_TEMPLATE = 'is-loaded %s'
@@ -1023,7 +1032,7 @@ class ModuleGeneratorLua(ModuleGenerator):
     CHARS_TO_ESCAPE = []
 
     INSTALLDIR_REGEX = r'^local root\s+=\s+"(?P<installdir>.*)"'
-    LOAD_REGEX = r'^\s*(?:load|depends_on)\("(\S+)"'
+    LOAD_REGEX = MODULE_LOAD_REGEX_LUA
     LOAD_TEMPLATE = 'load("%(mod_name)s")'
     LOAD_TEMPLATE_DEPENDS_ON = 'depends_on("%(mod_name)s")'
     IS_LOADED_TEMPLATE = 'isloaded("%s")'
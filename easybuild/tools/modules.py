@@ -50,6 +50,7 @@ from easybuild.tools.filetools import convert_name, mkdir, path_matches, read_fi
 from easybuild.tools.module_naming_scheme.mns import DEVEL_MODULE_SUFFIX
 from easybuild.tools.py2vs3 import subprocess_popen_text
 from easybuild.tools.run import run_cmd
+from easybuild.tools.timing import TIMING_MODULE_CMD, timed
 from easybuild.tools.utilities import get_subclasses, nub
 
 # software root/version environment variable name prefixes
@@ -119,6 +120,51 @@ OUTPUT_MATCHES = {
 MODULE_AVAIL_CACHE = {}
 MODULE_SHOW_CACHE = {}
 
+# magic cookie at start of module files in Tcl syntax
+TCL_MODULE_MAGIC_COOKIE = '#%Module'
+
+# regular expressions for loading of other modules in module files, in Tcl and Lua syntax
+MODULE_LOAD_REGEX_TCL = r"^\s*(?:module\s+load|depends-on)\s+(\S+)"
+MODULE_LOAD_REGEX_LUA = r'^\s*(?:load|depends_on)\("(\S+)"'
+
+# regex for $MODULEPATH extensions;
+# via 'module use ...' or 'prepend-path MODULEPATH' in Tcl modules,
+# or 'prepend_path("MODULEPATH", ...) in Lua modules
+MODPATH_EXT_REGEX = re.compile(r'|'.join([
+    r'^\s*module\s+use\s+(?P<tcl_use>.+)',                         # 'module use' in Tcl module files
+    r'^\s*prepend-path\s+MODULEPATH\s+(?P<tcl_prepend>.+)',        # prepend to $MODULEPATH in Tcl modules
+    r'^\s*prepend_path\(\"MODULEPATH\",\s*(?P<lua_prepend>.+)\)',  # prepend to $MODULEPATH in Lua modules
+]), re.M)
+
+# regular expressions for help/whatis text in module files (which may span multiple lines), in Tcl and Lua syntax
+MODULE_HELP_REGEX_TCL = re.compile(r'^proc ModulesHelp \{ \} \{\n\s*puts stderr \{.*?^\s*\}\s*\n\}\s*$|'
+                                   r'^module-whatis\s+\{.*?\}\s*$', re.M | re.S)
+MODULE_HELP_REGEX_LUA = re.compile(r'\[(=*)\[.*?\]\1\]', re.S)
+
+# regular expressions for 'plain' statements in module files, in Tcl and Lua syntax:
+# statements of which the effect when loading the module doesn't depend on any conditions,
+# except for load statements that are guarded by a check whether the module is loaded already
+# (optionally combined with a check for unloading the module, see ModuleGenerator.load_module)
+MODULE_PLAIN_STMT_REGEX_TCL = re.compile(r'|'.join([
+    r'^$', r'^#', r'^\}$',
+    r'^(set|conflict|prepend-path|append-path|setenv|unsetenv|depends-on|module-whatis)\s',
+    r'^module\s+(load|use)\s',
+    r'^if\s*\{\s*(\[\s*module-info\s+mode\s+remove\s*\]\s*\|\|\s*)?!\s*\[\s*is-loaded\s+\S+\s*\]\s*\}\s*\{$',
+]))
+MODULE_PLAIN_STMT_REGEX_LUA = re.compile(r'|'.join([
+    r'^$', r'^--', r'^end$',
+    r'^local\s+\w+\s*=\s*"[^"]*"$',
+    r'^(conflict|prepend_path|append_path|setenv|unsetenv|load|depends_on|family|help|whatis)\(',
+    r'^if\s+(mode\(\)\s*==\s*"unload"\s+or\s+)?not\s*\(?\s*isloaded\("\S+"\)\s*\)?\s*then$',
+]))
+
+# cache for metadata obtained by parsing module files
+# key: tuple with path to module file, its modification time, size and inode
+# value: dict with list of modules that are loaded ('loads'),
+#        list of (raw) $MODULEPATH extensions as (key, value) tuples ('modpath_exts'),
+#        and whether module file only contains plain statements ('plain')
+MODULE_FILE_METADATA_CACHE = {}
+
 # cache for modules tool version
 # cache key: module command
 # value: corresponding (validated) module version
@@ -153,6 +199,8 @@ class ModulesTool(object):
     VERSION_REGEXP = None
     # modules tool user cache directory
     USER_CACHE_DIR = None
+    # extensions for module files supported by this modules tool (in order of preference)
+    MODULE_FILE_EXTENSIONS = ['']
 
     def __init__(self, mod_paths=None, testing=False):
         """
@@ -575,16 +623,23 @@ class ModulesTool(object):
         else:
             avail_mod_names = self.available()
 
+        # check for module files in $MODULEPATH for all module names in one go,
+        # to avoid running 'module show' for (hidden) modules that are installed
+        mod_files = self.locate_module_files(mod_names)
+
         # differentiate between hidden and visible modules
         mod_names = [(mod_name, not os.path.basename(mod_name).startswith('.')) for mod_name in mod_names]
 
         mods_exist = []
-        for (mod_name, visible) in mod_names:
+        for (mod_name, visible), mod_file in zip(mod_names, mod_files):
             if visible:
-                mod_exists = mod_name in avail_mod_names
+                mod_exists = mod_name in avail_mod_names or mod_file is not None
                 # module name may be partial, so also check via 'module show' as fallback
                 if not mod_exists and maybe_partial:
                     mod_exists = mod_exists_via_show(mod_name)
+            elif mod_file is not None:
+                self.log.debug("Found module file for hidden module %s: %s", mod_name, mod_file)
+                mod_exists = True
             else:
                 # hidden modules are not visible in 'avail', need to use 'show' instead
                 self.log.debug("checking whether hidden module %s exists via 'show'..." % mod_name)
@@ -596,6 +651,34 @@ class ModulesTool(object):
 
         return mods_exist
 
+    def locate_module_files(self, mod_names):
+        """
+        Locate module files for specified (full) module names in the directories listed in $MODULEPATH,
+        without running the modules tool.
+
+        Partial module names, module aliases, symbolic versions, etc. are *not* resolved.
+
+        :param mod_names: list of module names
+        :return: list with path to module file for each of the specified module names (None if not found)
+        """
+        mod_paths = curr_module_paths()
+
+        res = []
+        for mod_name in mod_names:
+            mod_file = None
+            for mod_path in mod_paths:
+                for ext in self.MODULE_FILE_EXTENSIONS:
+                    path = os.path.join(mod_path, mod_name + ext)
+                    if os.path.isfile(path) and is_module_file(path):
+                        mod_file = path
+                        break
+                if mod_file:
+                    break
+            res.append(mod_file)
+
+        self.log.debug("Module files found for %s: %s", mod_names, res)
+        return res
+
     def load(self, modules, mod_paths=None, purge=False, init_env=None, allow_reload=True):
         """
         Load all requested modules.
@@ -688,10 +771,14 @@ class ModulesTool(object):
 
         :param mod_name: module name
         :param strip_ext: strip (.lua) extension from module fileame (if present)"""
-        # (possible relative) path is always followed by a ':', and may be prepended by whitespace
-        # this works for both environment modules and Lmod
-        modpath_re = re.compile(r'^\s*(?P<modpath>[^/\n]*/[^\s]+):$', re.M)
-        modpath = self.get_value_from_modulefile(mod_name, modpath_re)
+        # try to locate module file in $MODULEPATH first, to avoid running 'module show'
+        modpath = self.locate_module_files([mod_name])[0]
+
+        if modpath is None:
+            # (possible relative) path is always followed by a ':', and may be prepended by whitespace
+            # this works for both environment modules and Lmod
+            modpath_re = re.compile(r'^\s*(?P<modpath>[^/\n]*/[^\s]+):$', re.M)
+            modpath = self.get_value_from_modulefile(mod_name, modpath_re)
 
         if strip_ext and modpath.endswith('.lua'):
             modpath = os.path.splitext(modpath)[0]
@@ -760,11 +847,12 @@ class ModulesTool(object):
         full_cmd = ' '.join(cmd_list)
         self.log.debug("Running module command '%s' from %s" % (full_cmd, os.getcwd()))
 
-        proc = subprocess_popen_text(cmd_list, env=environ)
+        with timed(TIMING_MODULE_CMD, full_cmd):
+            proc = subprocess_popen_text(cmd_list, env=environ)
 
-        # stdout will contain python code (to change environment etc)
-        # stderr will contain text (just like the normal module command)
-        (stdout, stderr) = proc.communicate()
+            # stdout will contain python code (to change environment etc)
+            # stderr will contain text (just like the normal module command)
+            (stdout, stderr) = proc.communicate()
         self.log.debug("Output of module command '%s': stdout: %s; stderr: %s" % (full_cmd, stdout, stderr))
 
         # also catch and check exit code
@@ -926,6 +1014,12 @@ class ModulesTool(object):
 
         return read_file(modfilepath)
 
+    def module_file_metadata(self, mod_name):
+        """
+        Obtain metadata for module file of specified module (see parse_module_file).
+        """
+        return parse_module_file(self.modulefile_path(mod_name))
+
     def interpret_raw_path_lua(self, txt):
         """Interpret raw path (Lua syntax): resolve environment variables, join paths where `pathJoin` is specified"""
 
@@ -964,6 +1058,60 @@ class ModulesTool(object):
 
         return res
 
+    def direct_modpath_extensions(self, mod_name):
+        """
+        Determine list of $MODULEPATH extensions made directly by the module file of specified module.
+        """
+        exts = []
+        for key, raw_ext in self.module_file_metadata(mod_name)['modpath_exts']:
+            # need to expand environment variables and join paths, e.g. when --subdir-user-modules is used
+            if key in ['tcl_prepend', 'tcl_use']:
+                ext = self.interpret_raw_path_tcl(raw_ext)
+            else:
+                ext = self.interpret_raw_path_lua(raw_ext)
+            exts.append(ext)
+
+        return exts
+
+    def extend_module_path_for(self, mod_name, modpath_exts=None, seen=None):
+        """
+        Extend $MODULEPATH like loading specified module would, without actually loading it:
+        $MODULEPATH is extended with the $MODULEPATH extensions made by the module itself,
+        and (recursively) by the modules that are loaded by it.
+
+        If the module file includes statements that are not plain (e.g. conditions, see parse_module_file),
+        the module is actually loaded instead, to get the exact same semantics.
+
+        :param mod_name: name of module
+        :param modpath_exts: list of $MODULEPATH extensions made directly by this module (determined if None)
+        :param seen: set of names of modules that were already taken into account
+        """
+        if seen is None:
+            seen = set()
+        seen.add(mod_name)
+
+        if not self.module_file_metadata(mod_name)['plain']:
+            self.log.debug("Loading module %s to extend $MODULEPATH, since it includes statements that are not plain",
+                           mod_name)
+            try:
+                self.load([mod_name], allow_reload=False)
+                return
+            except EasyBuildError as err:
+                self.log.debug("Failed to load module %s, extending $MODULEPATH without loading it: %s", mod_name, err)
+
+        if modpath_exts is None:
+            modpath_exts = self.direct_modpath_extensions(mod_name)
+        if modpath_exts:
+            extend_module_path(modpath_exts)
+
+        # modules loaded by this module are located after $MODULEPATH is extended, like when loading the module
+        for dep in self.module_file_metadata(mod_name)['loads']:
+            if dep not in seen:
+                try:
+                    self.extend_module_path_for(dep, seen=seen)
+                except EasyBuildError as err:
+                    self.log.debug("Ignoring $MODULEPATH extensions of module %s loaded by %s: %s", dep, mod_name, err)
+
     def modpath_extensions_for(self, mod_names):
         """
         Determine dictionary with $MODULEPATH extensions for specified modules.
@@ -979,40 +1127,19 @@ class ModulesTool(object):
         # copy environment so we can restore it
         env = os.environ.copy()
 
-        # regex for $MODULEPATH extensions;
-        # via 'module use ...' or 'prepend-path MODULEPATH' in Tcl modules,
-        # or 'prepend_path("MODULEPATH", ...) in Lua modules
-        modpath_ext_regex = r'|'.join([
-            r'^\s*module\s+use\s+(?P<tcl_use>.+)',                         # 'module use' in Tcl module files
-            r'^\s*prepend-path\s+MODULEPATH\s+(?P<tcl_prepend>.+)',        # prepend to $MODULEPATH in Tcl modules
-            r'^\s*prepend_path\(\"MODULEPATH\",\s*(?P<lua_prepend>.+)\)',  # prepend to $MODULEPATH in Lua modules
-        ])
-        modpath_ext_regex = re.compile(modpath_ext_regex, re.M)
-
         modpath_exts = {}
         for mod_name in mod_names:
-            modtxt = self.read_module_file(mod_name)
-
-            exts = []
-            for modpath_ext in modpath_ext_regex.finditer(modtxt):
-                for key, raw_ext in modpath_ext.groupdict().items():
-                    if raw_ext is not None:
-                        # need to expand environment variables and join paths, e.g. when --subdir-user-modules is used
-                        if key in ['tcl_prepend', 'tcl_use']:
-                            ext = self.interpret_raw_path_tcl(raw_ext)
-                        else:
-                            ext = self.interpret_raw_path_lua(raw_ext)
-                        exts.append(ext)
+            exts = self.direct_modpath_extensions(mod_name)
 
             self.log.debug("Found $MODULEPATH extensions for %s: %s", mod_name, exts)
             modpath_exts.update({mod_name: exts})
 
             if exts:
-                # load this module, since it may extend $MODULEPATH to make other modules available
-                # this is required to obtain the list of $MODULEPATH extensions they make (via 'module show')
-                self.load([mod_name], allow_reload=False)
+                # extend $MODULEPATH like loading this module would, since that may make other modules available;
+                # this is required to locate the module files for those modules
+                self.extend_module_path_for(mod_name, modpath_exts=exts)
 
-        # restore environment (modules may have been loaded above)
+        # restore environment ($MODULEPATH may have been extended above)
         restore_env(env)
 
         return modpath_exts
@@ -1079,12 +1206,11 @@ class ModulesTool(object):
                                dep, dep_full_mod_subdir, full_modpath_exts)
 
             if full_modpath_exts:
-                # load module for this dependency, since it may extend $MODULEPATH to make dependencies available
-                # this is required to obtain the corresponding module file paths (via 'module show')
-                # don't reload module if it is already loaded, since that'll mess up the order in $MODULEPATH
-                self.load([dep], allow_reload=False)
+                # extend $MODULEPATH like loading the module for this dependency would,
+                # since that may make dependencies available; this is required to locate the corresponding module files
+                self.extend_module_path_for(dep, modpath_exts=full_modpath_exts)
 
-        # restore original environment (modules may have been loaded above)
+        # restore original environment ($MODULEPATH may have been extended above)
         restore_env(env)
 
         path = mods_to_top[:]
@@ -1275,6 +1401,8 @@ class Lmod(ModulesTool):
 
     SHOW_HIDDEN_OPTION = '--show-hidden'
 
+    MODULE_FILE_EXTENSIONS = ['.lua', '']
+
     def __init__(self, *args, **kwargs):
         """Constructor, set lmod-specific class variable values."""
         # $LMOD_QUIET needs to be set to avoid EasyBuild tripping over fiddly bits in output
@@ -1542,6 +1670,88 @@ def curr_module_paths():
     return [p for p in os.environ.get('MODULEPATH', '').split(':') if p and os.path.exists(p)]
 
 
+def extend_module_path(paths):
+    """
+    Extend $MODULEPATH with specified paths, in the same way as 'module use' does (i.e. prepend, in order).
+    Paths that are already included in $MODULEPATH are moved to the front.
+    """
+    curr_paths = [p for p in os.environ.get('MODULEPATH', '').split(os.pathsep) if p]
+    new_paths = []
+    for path in paths[::-1] + curr_paths:
+        if path not in new_paths:
+            new_paths.append(path)
+    setvar('MODULEPATH', os.pathsep.join(new_paths), verbose=False)
+
+
+def parse_module_file(path):
+    """
+    Parse specified module file, to determine which modules are loaded and how $MODULEPATH is extended.
+    Result is cached, module files are only parsed again when they are modified
+    (size and inode are taken into account too, since modification time may only have a resolution of 1 second).
+
+    :param path: path to module file
+    :return: dict with list of loaded modules ('loads') and list of (raw) $MODULEPATH extensions ('modpath_exts'),
+             as (key, value) tuples with key indicating the module syntax & type of extension (see MODPATH_EXT_REGEX),
+             and whether module file only contains plain statements ('plain'), i.e. whether the effect of loading
+             the module can be determined without evaluating any conditions (see MODULE_PLAIN_STMT_REGEX_*)
+    """
+    try:
+        path_stat = os.stat(path)
+        key = (path, path_stat.st_mtime, path_stat.st_size, path_stat.st_ino)
+    except OSError as err:
+        raise EasyBuildError("Failed to determine modification time of module file %s: %s", path, err)
+
+    if key in MODULE_FILE_METADATA_CACHE:
+        res = MODULE_FILE_METADATA_CACHE[key]
+    else:
+        txt = read_file(path)
+
+        if path.endswith('.lua'):
+            load_regex = re.compile(MODULE_LOAD_REGEX_LUA, re.M)
+            help_regex, plain_stmt_regex = MODULE_HELP_REGEX_LUA, MODULE_PLAIN_STMT_REGEX_LUA
+        else:
+            load_regex = re.compile(MODULE_LOAD_REGEX_TCL, re.M)
+            help_regex, plain_stmt_regex = MODULE_HELP_REGEX_TCL, MODULE_PLAIN_STMT_REGEX_TCL
+
+        stmts = [line.strip() for line in help_regex.sub('', txt).splitlines()]
+        non_plain_stmts = [stmt for stmt in stmts if not plain_stmt_regex.match(stmt)]
+
+        modpath_exts = []
+        for modpath_ext in MODPATH_EXT_REGEX.finditer(txt):
+            for ext_key, raw_ext in sorted(modpath_ext.groupdict().items()):
+                if raw_ext is not None:
+                    modpath_exts.append((ext_key, raw_ext))
+
+        res = {
+            'loads': load_regex.findall(txt),
+            'modpath_exts': modpath_exts,
+            'plain': not non_plain_stmts,
+        }
+        if non_plain_stmts:
+            _log.debug("Module file %s includes statements that are not plain: %s", path, non_plain_stmts)
+        MODULE_FILE_METADATA_CACHE[key] = res
+        _log.debug("Parsed module file %s: %s", path, res)
+
+    return res
+
+
+def is_module_file(path):
+    """
+    Check whether specified file is a module file:
+    either a file with the .lua extension, or a file that starts with the '#%Module' magic cookie (Tcl syntax).
+    """
+    if path.endswith('.lua'):
+        res = True
+    else:
+        try:
+            with open(path, 'r') as fh:
+                res = fh.read(len(TCL_MODULE_MAGIC_COOKIE)) == TCL_MODULE_MAGIC_COOKIE
+        except (IOError, OSError, UnicodeDecodeError) as err:
+            _log.debug("Failed to check whether %s is a module file: %s", path, err)
+            res = False
+    return res
+
+
 def mk_module_path(paths):
     """
     Create a string representing the list of module paths.
@@ -1577,6 +1787,7 @@ def reset_module_caches():
     """Reset module caches."""
     MODULE_AVAIL_CACHE.clear()
     MODULE_SHOW_CACHE.clear()
+    MODULE_FILE_METADATA_CACHE.clear()
 
 
 def invalidate_module_caches_for(path):
@@ -30,13 +30,15 @@ Module which allows the diffing of multiple files
 """
 
 import difflib
+import hashlib
 import math
 import os
 
 from easybuild.base import fancylogger
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.filetools import read_file
-from easybuild.tools.systemtools import det_terminal_size
+from easybuild.tools.systemtools import det_terminal_size, map_parallel
+from easybuild.tools.utilities import nub
 
 
 SEP_WIDTH = 5
@@ -61,6 +63,16 @@ END_LONG_LINE = '...'
 # restrict displaying of differences to limited number of groups
 MAX_DIFF_GROUPS = 3
 
+# number of consecutive lines that are hashed together to determine similarity between files
+SHINGLE_SIZE = 2
+
+# minimal number of files to diff before a pool of processes is used;
+# starting one takes about as long as determining the differences with dozens of (small) easyconfig files
+PARALLEL_DIFF_MIN_FILES = 50
+
+# cache for differences between files, indexed by checksums of file contents
+_diff_cache = {}
+
 
 _log = fancylogger.getLogger('multidiff', fname=False)
 
@@ -240,55 +252,133 @@ class MultiDiff(object):
         return '\n'.join(output)
 
 
-def multidiff(base, files, colored=True):
+def det_checksum(txt):
+    """Determine checksum for specified text (used as key in cache for differences)."""
+    if not isinstance(txt, bytes):
+        txt = txt.encode('utf-8')
+    return hashlib.sha256(txt).hexdigest()
+
+
+def det_shingles(lines, size=SHINGLE_SIZE):
+    """
+    Determine 'shingles' for specified lines, i.e. set of hashes for each sequence of consecutive non-empty lines.
+
+    :param lines: list of lines
+    :param size: number of consecutive lines to consider in each shingle
+    """
+    lines = [line.strip() for line in lines if line.strip()]
+    return set(hash(tuple(lines[i:i + size])) for i in range(max(len(lines) - size + 1, 1)))
+
+
+def det_similarity(shingles1, shingles2):
+    """Determine similarity (Jaccard index) between two sets of shingles: value between 0.0 and 1.0."""
+    union = shingles1 | shingles2
+    if union:
+        similarity = float(len(shingles1 & shingles2)) / len(union)
+    else:
+        similarity = 1.0
+    return similarity
+
+
+def select_similar_files(base_lines, files_lines, max_files):
+    """
+    Select specified maximum number of files that are most similar to base, based on shingles of their lines.
+
+    :param base_lines: list of lines in base
+    :param files_lines: list of (filepath, lines) tuples
+    :param max_files: maximum number of files to select
+    :return: list of selected (filepath, lines) tuples, in the original order
+    """
+    base_shingles = det_shingles(base_lines)
+    similarities = [det_similarity(base_shingles, det_shingles(lines)) for (_, lines) in files_lines]
+
+    # sort on similarity (most similar first), retain order for files with equal similarity
+    ranked = sorted(range(len(files_lines)), key=lambda idx: (-similarities[idx], idx))
+    selected = sorted(ranked[:max_files])
+
+    _log.info("Selected %d most similar out of %d files (similarity: %s)", len(selected), len(files_lines),
+              ', '.join('%.2f' % similarities[idx] for idx in selected))
+
+    return [files_lines[idx] for idx in selected]
+
+
+def det_diff_lines(lines_pair):
+    """
+    Determine differences for lines of a file compared to lines of base.
+
+    :param lines_pair: tuple with list of lines of file and list of lines of base
+    :return: list of (line number, diff line, squigly line) tuples
+    """
+    lines, base_lines = lines_pair
+    diff = difflib.Differ().compare(lines, base_lines)
+
+    # contruct map of line number to diff lines and mapping between diff lines
+    # example partial diff:
+    #
+    # - toolchain = {'name': 'goolfc', 'version': '2.6.10'}
+    # ?                            -               ^   ^
+    #
+    # + toolchain = {'name': 'goolf', 'version': '1.6.20'}
+    # ?                                           ^   ^
+    #
+    local_diff = {}
+    squigly_dict = {}
+    last_added = None
+    offset = 1
+    for (i, line) in enumerate(diff):
+        # diff line indicating changed characters on line above, a.k.a. a 'squigly' line
+        if line.startswith(QUESTIONMARK):
+            squigly_dict[last_added] = line
+            offset -= 1
+        # diff line indicating addition change
+        elif line.startswith(PLUS):
+            local_diff.setdefault(i + offset, []).append(line)
+            last_added = line
+        # diff line indicated removal change
+        elif line.startswith(MINUS):
+            local_diff.setdefault(i + offset, []).append(line)
+            last_added = line
+            offset -= 1
+
+    diff_lines = []
+    for line_no in sorted(local_diff):
+        for line in local_diff[line_no]:
+            diff_lines.append((line_no, line.rstrip(), squigly_dict.get(line, '').rstrip()))
+
+    return diff_lines
+
+
+def multidiff(base, files, colored=True, max_files=None):
     """
     Generate a diff for multiple files, all compared to base.
     :param base: base to compare with
     :param files: list of files to compare with base
     :param colored: boolean indicating whether a colored multi-diff should be generated
+    :param max_files: maximum number of files to compare with (only the ones most similar to base are considered)
     :return: text with multidiff overview
     """
-    differ = difflib.Differ()
-    base_lines = read_file(base).split('\n')
-    mdiff = MultiDiff(os.path.basename(base), base_lines, files, colored=colored)
+    base_txt = read_file(base)
+    base_lines = base_txt.split('\n')
+
+    files_lines = [(filepath, read_file(filepath).split('\n')) for filepath in files]
+    if max_files is not None and len(files_lines) > max_files:
+        files_lines = select_similar_files(base_lines, files_lines, max_files)
+
+    mdiff = MultiDiff(os.path.basename(base), base_lines, [fp for (fp, _) in files_lines], colored=colored)
+
+    # determine differences with files for which no cached result is available (in parallel, if possible)
+    base_checksum = det_checksum(base_txt)
+    cache_keys = [(base_checksum, det_checksum('\n'.join(lines))) for (_, lines) in files_lines]
+    lines_by_key = dict(zip(cache_keys, [lines for (_, lines) in files_lines]))
+    todo_keys = nub([key for key in cache_keys if key not in _diff_cache])
+    todo = [(lines_by_key[key], base_lines) for key in todo_keys]
+    results = map_parallel(det_diff_lines, todo, min_items=PARALLEL_DIFF_MIN_FILES)
+    _diff_cache.update(zip(todo_keys, results))
 
     # use the MultiDiff class to store the information
-    for filepath in files:
-        lines = read_file(filepath).split('\n')
-        diff = differ.compare(lines, base_lines)
+    for (filepath, _), key in zip(files_lines, cache_keys):
         filename = os.path.basename(filepath)
-
-        # contruct map of line number to diff lines and mapping between diff lines
-        # example partial diff:
-        #
-        # - toolchain = {'name': 'goolfc', 'version': '2.6.10'}
-        # ?                            -               ^   ^
-        #
-        # + toolchain = {'name': 'goolf', 'version': '1.6.20'}
-        # ?                                           ^   ^
-        #
-        local_diff = {}
-        squigly_dict = {}
-        last_added = None
-        offset = 1
-        for (i, line) in enumerate(diff):
-            # diff line indicating changed characters on line above, a.k.a. a 'squigly' line
-            if line.startswith(QUESTIONMARK):
-                squigly_dict[last_added] = line
-                offset -= 1
-            # diff line indicating addition change
-            elif line.startswith(PLUS):
-                local_diff.setdefault(i + offset, []).append((line, filename))
-                last_added = line
-            # diff line indicated removal change
-            elif line.startswith(MINUS):
-                local_diff.setdefault(i + offset, []).append((line, filename))
-                last_added = line
-                offset -= 1
-
-        # construct the multi-diff based on the constructed dict
-        for line_no in local_diff:
-            for (line, filename) in local_diff[line_no]:
-                mdiff.parse_line(line_no, line.rstrip(), filename, squigly_dict.get(line, '').rstrip())
+        for (line_no, line, squigly_line) in _diff_cache[key]:
+            mdiff.parse_line(line_no, line, filename, squigly_line)
 
     return str(mdiff)
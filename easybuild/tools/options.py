@@ -60,7 +60,9 @@ from easybuild.tools import build_log, run  # build_log should always stay there
 from easybuild.tools.build_log import DEVEL_LOG_LEVEL, EasyBuildError
 from easybuild.tools.build_log import init_logging, log_start, print_warning, raise_easybuilderror
 from easybuild.tools.config import CONT_IMAGE_FORMATS, CONT_TYPES, DEFAULT_CONT_TYPE, DEFAULT_ALLOW_LOADED_MODULES
-from easybuild.tools.config import DEFAULT_BRANCH, DEFAULT_FORCE_DOWNLOAD, DEFAULT_INDEX_MAX_AGE
+from easybuild.tools.config import COPY_MODES, DEFAULT_COPY_MODE, DEFAULT_COPY_THREADS
+from easybuild.tools.config import DEFAULT_BRANCH, DEFAULT_FORCE_DOWNLOAD, DEFAULT_GITHUB_DOWNLOAD_CACHE_SIZE
+from easybuild.tools.config import DEFAULT_INDEX_MAX_AGE
 from easybuild.tools.config import DEFAULT_JOB_BACKEND, DEFAULT_LOGFILE_FORMAT, DEFAULT_MAX_FAIL_RATIO_PERMS
 from easybuild.tools.config import DEFAULT_MNS, DEFAULT_MODULE_SYNTAX, DEFAULT_MODULES_TOOL, DEFAULT_MODULECLASSES
 from easybuild.tools.config import DEFAULT_PATH_SUBDIRS, DEFAULT_PKG_RELEASE, DEFAULT_PKG_TOOL, DEFAULT_PKG_TYPE
@@ -266,6 +268,9 @@ class EasyBuildOptions(GeneralOption):
             'only-blocks': ("Only build listed blocks", 'strlist', 'extend', None, 'b', {'metavar': 'BLOCKS'}),
             'rebuild': ("Rebuild software, even if module already exists (don't skip OS dependencies checks)",
                         None, 'store_true', False),
+            'rebuild-if-changed': ("Rebuild software for which module already exists only if build inputs have changed "
+                                   "(or those of any of its dependencies), according to recorded build fingerprint",
+                                   None, 'store_true', False),
             'robot': ("Enable dependency resolution, using easyconfigs in specified paths",
                       'pathlist', 'store_or_None', [], 'r', {'metavar': 'PATH[%sPATH]' % os.pathsep}),
             'robot-paths': ("Additional paths to consider by robot for easyconfigs (--robot paths get priority)",
@@ -352,6 +357,15 @@ class EasyBuildOptions(GeneralOption):
             'consider-archived-easyconfigs': ("Also consider archived easyconfigs", None, 'store_true', False),
             'containerize': ("Generate container recipe/image", None, 'store_true', False, 'C'),
             'copy-ec': ("Copy specified easyconfig(s) to specified location", None, 'store_true', False),
+            'copy-mode': ("Mode for copying directory trees, e.g. into installation directory "
+                          "('serial': copy files one by one; 'parallel': copy files concurrently, "
+                          "using reflinks if supported; 'hardlink': hard link files if possible, "
+                          "fall back to parallel copy otherwise; only safe if source files are not changed "
+                          "afterwards, since they share contents and permissions with the hard linked copies, "
+                          "so not used when EasyBuild changes permissions of installed files)",
+                          'choice', 'store', DEFAULT_COPY_MODE, COPY_MODES),
+            'copy-threads': ("Number of threads to use to copy files in 'parallel' and 'hardlink' copy modes",
+                             int, 'store', DEFAULT_COPY_THREADS),
             'cuda-compute-capabilities': ("List of CUDA compute capabilities to use when building GPU software",
                                           'strlist', 'extend', None),
             'debug-lmod': ("Run Lmod modules tool commands in debug module", None, 'store_true', False),
@@ -364,6 +378,8 @@ class EasyBuildOptions(GeneralOption):
             'devel': ("Enable including of development log messages", None, 'store_true', False),
             'download-timeout': ("Timeout for initiating downloads (in seconds)", float, 'store', None),
             'dump-autopep8': ("Reformat easyconfigs using autopep8 when dumping them", None, 'store_true', False),
+            'dump-timings': ("Dump timing information for installation steps, commands, downloads, etc. "
+                             "to JSON file (in Chrome trace format) next to log file", None, 'store_true', False),
             'easyblock': ("easyblock to use for processing the spec file or dumping the options",
                           None, 'store', None, 'e', {'metavar': 'CLASS'}),
             'enforce-checksums': ("Enforce availability of checksums for all sources/patches, so they can be verified",
@@ -412,6 +428,8 @@ class EasyBuildOptions(GeneralOption):
             'output-format': ("Set output format", 'choice', 'store', FORMAT_TXT, [FORMAT_TXT, FORMAT_RST]),
             'parallel': ("Specify (maximum) level of parallellism used during build procedure",
                          'int', 'store', None),
+            'parallel-sanity-check-commands': ("Maximum number of sanity check commands to run concurrently "
+                                               "(default: run them one by one)", 'int', 'store', None),
             'pre-create-installdir': ("Create installation directory before submitting build jobs",
                                       None, 'store_true', True),
             'pretend': (("Does the build/installation in a test directory located in $HOME/easybuildinstall"),
@@ -428,6 +446,11 @@ class EasyBuildOptions(GeneralOption):
             'silence-deprecation-warnings': ("Silence specified deprecation warnings", 'strlist', 'extend', None),
             'sticky-bit': ("Set sticky bit on newly created directories", None, 'store_true', False),
             'skip-test-cases': ("Skip running test cases", None, 'store_true', False, 't'),
+            'system-facts-cache': ("Path to file in which system facts (CPU model & features, total memory, "
+                                   "OS name & version, ...) are cached across sessions, per host and boot ID",
+                                   None, 'store', None),
+            'toolchain-hierarchy-cache': ("Path to file in which toolchain hierarchies are cached across sessions",
+                                          None, 'store', None),
             'trace': ("Provide more information in output to stdout on progress", None, 'store_true', False, 'T'),
             'umask': ("umask to use (e.g. '022'); non-user write permissions on install directories are removed",
                       None, 'store', None),
@@ -573,6 +596,8 @@ class EasyBuildOptions(GeneralOption):
                                         ['simple', 'detailed']),
             'list-software': ("Show list of supported software", 'choice', 'store_or_None', 'simple',
                               ['simple', 'detailed']),
+            'list-software-cache': ("Path to file in which information on software obtained from easyconfig files "
+                                    "is cached across sessions (used by --list-software)", None, 'store', None),
             'list-toolchains': ("Show list of known toolchains",
                                 None, 'store_true', False),
             'search': ("Search for easyconfig files in the robot search path, print full paths",
@@ -603,11 +628,20 @@ class EasyBuildOptions(GeneralOption):
             'check-github': ("Check status of GitHub integration, and report back", None, 'store_true', False),
             'check-contrib': ("Runs checks to see whether the given easyconfigs are ready to be contributed back",
                               None, 'store_true', False),
+            'check-contrib-cache': ("Path to file in which results of style/contribution checks are cached, "
+                                    "so checks are skipped for easyconfig files that were not changed since",
+                                    None, 'store', None),
             'check-style': ("Run a style check on the given easyconfigs", None, 'store_true', False),
             'cleanup-easyconfigs': ("Clean up easyconfig files for pull request", None, 'store_true', True),
             'dump-test-report': ("Dump test report to specified path", None, 'store_or_None', 'test_report.md'),
             'from-pr': ("Obtain easyconfigs from specified PR", int, 'store', None, {'metavar': 'PR#'}),
             'git-working-dirs-path': ("Path to Git working directories for EasyBuild repositories", str, 'store', None),
+            'github-download-cache': ("Path to directory in which files downloaded from GitHub "
+                                      "(repository archives, pull request diffs) are cached across sessions",
+                                      None, 'store', None),
+            'github-download-cache-size': ("Maximum size (in MiB) of directory specified via --github-download-cache; "
+                                           "least recently used files are removed when it's exceeded",
+                                           int, 'store', DEFAULT_GITHUB_DOWNLOAD_CACHE_SIZE),
             'github-user': ("GitHub username", str, 'store', None),
             'github-org': ("GitHub organization", str, 'store', None),
             'include-easyblocks-from-pr': ("Include easyblocks from specified PR", int, 'store', None,
@@ -638,6 +672,8 @@ class EasyBuildOptions(GeneralOption):
             'sync-pr-with-develop': ("Sync pull request with current 'develop' branch",
                                      int, 'store', None, {'metavar': 'PR#'}),
             'review-pr': ("Review specified pull request", int, 'store', None, {'metavar': 'PR#'}),
+            'review-pr-max-related': ("Maximum number of related easyconfigs to compare with when reviewing "
+                                      "easyconfigs (most similar ones are selected)", int, 'store', None),
             'test-report-env-filter': ("Regex used to filter out variables in environment dump of test report",
                                        None, 'regex', None),
             'update-branch-github': ("Update specified branch in GitHub", str, 'store', None),
@@ -730,6 +766,9 @@ class EasyBuildOptions(GeneralOption):
             'max-jobs': ("Maximum number of concurrent jobs (queued and running, 0 = unlimited)", 'int', 'store', 0),
             'max-walltime': ("Maximum walltime for jobs (in hours)", 'int', 'store', 24),
             'output-dir': ("Output directory for jobs (default: current directory)", None, 'store', os.getcwd()),
+            'pack-max-time': ("Build easyconfigs one after the other in a single job if their estimated total build "
+                              "time (based on build stats in easyconfigs repository) is less than the specified "
+                              "number of minutes (0 = one job per easyconfig)", 'int', 'store', None),
             'polling-interval': ("Interval between polls for status of jobs (in seconds)", float, 'store', 30.0),
             'target-resource': ("Target resource for jobs", None, 'store', None),
         })
@@ -86,29 +86,47 @@ def build_easyconfigs_in_parallel(build_command, easyconfigs, output_dir='easybu
     # keep track of which job builds which module
     module_to_job = {}
 
-    for easyconfig in easyconfigs:
+    # determine estimated build times only once, since that involves reading build stats from the repository;
+    # they're used to determine which easyconfigs should be built together in a single job (if any),
+    # and to determine the walltime for each job
+    repo = init_repository(get_repository(), get_repositorypath())
+    build_times = [det_build_time_estimate(repo, ec) for ec in easyconfigs]
+    ec_build_times = dict((id(ec), build_time) for (ec, build_time) in zip(easyconfigs, build_times))
+
+    job_pack_max_time = build_option('job_pack_max_time')
+    if job_pack_max_time:
+        ec_groups = group_easyconfigs(easyconfigs, build_times, job_pack_max_time * 60)
+        _log.info("Grouped %d easyconfigs into %d jobs", len(easyconfigs), len(ec_groups))
+    else:
+        ec_groups = [[ec] for ec in easyconfigs]
+
+    for ec_group in ec_groups:
         # this is very important, otherwise we might have race conditions
         # e.g. GCC-4.5.3 finds cloog.tar.gz but it was incorrectly downloaded by GCC-4.6.3
         # running this step here, prevents this
         if prepare_first:
-            prepare_easyconfig(easyconfig)
+            for easyconfig in ec_group:
+                prepare_easyconfig(easyconfig)
 
         # the new job will only depend on already submitted jobs
-        _log.info("creating job for ec: %s" % os.path.basename(easyconfig['spec']))
-        new_job = create_job(active_job_backend, build_command, easyconfig, output_dir=output_dir)
-
-        # filter out dependencies marked as external modules
-        deps = [d for d in easyconfig['ec'].all_dependencies if not d.get('external_module', False)]
+        _log.info("creating job for ec(s): %s", ', '.join(os.path.basename(ec['spec']) for ec in ec_group))
+        new_job = create_job(active_job_backend, build_command, ec_group, output_dir=output_dir,
+                             build_times=[ec_build_times[id(ec)] for ec in ec_group])
 
-        dep_mod_names = map(ActiveMNS().det_full_module_name, deps)
-        job_deps = [module_to_job[dep] for dep in dep_mod_names if dep in module_to_job]
+        job_deps = []
+        for easyconfig in ec_group:
+            for dep_mod_name in det_dep_mod_names(easyconfig):
+                # dependencies that are built in the same job are not known in module_to_job yet
+                if dep_mod_name in module_to_job and module_to_job[dep_mod_name] not in job_deps:
+                    job_deps.append(module_to_job[dep_mod_name])
 
         # actually (try to) submit job
         active_job_backend.queue(new_job, job_deps)
         _log.info("job %s for module %s has been submitted", new_job, new_job.module)
 
         # update dictionary
-        module_to_job[new_job.module] = new_job
+        for easyconfig in ec_group:
+            module_to_job[easyconfig['ec'].full_mod_name] = new_job
         jobs.append(new_job)
 
     active_job_backend.complete()
@@ -150,46 +168,129 @@ def submit_jobs(ordered_ecs, cmd_line_opts, testing=False, prepare_first=True):
         return build_easyconfigs_in_parallel(command, ordered_ecs, prepare_first=prepare_first)
 
 
-def create_job(job_backend, build_command, easyconfig, output_dir='easybuild-build'):
+def det_dep_mod_names(easyconfig):
+    """Determine list of module names for dependencies of specified easyconfig (except external modules)."""
+    # filter out dependencies marked as external modules
+    deps = [d for d in easyconfig['ec'].all_dependencies if not d.get('external_module', False)]
+    return [ActiveMNS().det_full_module_name(dep) for dep in deps]
+
+
+def det_build_time_estimate(repo, easyconfig):
+    """
+    Determine estimated build time for specified easyconfig, based on build stats in easyconfigs repository.
+
+    :param repo: easyconfigs repository (Repository instance)
+    :param easyconfig: easyconfig as processed by process_easyconfig
+    :return: build time (in seconds) for most recent build, or None if no build stats are available
+    """
+    # just use latest build stats
+    buildstats = repo.get_buildstats(easyconfig['ec']['name'], det_full_ec_version(easyconfig['ec']))
+    if buildstats:
+        return buildstats[-1]['build_time']
+    else:
+        return None
+
+
+def group_easyconfigs(easyconfigs, build_times, max_time):
+    """
+    Group easyconfigs that can be built one after the other in a single job,
+    to avoid submitting lots of jobs for easyconfigs that only take a short time to build.
+
+    An easyconfig is added to an earlier group if the estimated total build time for that group stays within
+    the specified maximum, and if either the easyconfig depends on that group (i.e. to build linear chains),
+    or if it depends on exactly the same groups (i.e. to build small sets of siblings).
+    This ensures that no unnecessary dependencies are introduced between jobs.
+
+    :param easyconfigs: list of easyconfigs, in the order in which they should be built
+    :param build_times: list of estimated build times (in seconds) for easyconfigs (None if unknown)
+    :param max_time: maximum estimated total build time (in seconds) for a group of easyconfigs
+    :return: list of lists of easyconfigs
+    """
+    groups = []
+    # mapping of module name to index of group in which it is built
+    mod_name_to_group = {}
+    # mapping of set of groups to groups which depend on exactly those groups
+    dep_groups_to_groups = {}
+
+    for easyconfig, build_time in zip(easyconfigs, build_times):
+        dep_groups = frozenset(mod_name_to_group[m] for m in det_dep_mod_names(easyconfig) if m in mod_name_to_group)
+
+        # candidate groups: groups this easyconfig depends on, and groups with exactly the same dependencies
+        cands = [idx for idx in dep_groups if groups[idx]['deps'] == dep_groups - set([idx])]
+        cands.extend(dep_groups_to_groups.get(dep_groups, []))
+
+        target = None
+        if build_time is not None:
+            for idx in sorted(cands, reverse=True):
+                group = groups[idx]
+                # only groups with known build time for all easyconfigs are considered
+                if group['time'] is not None and group['time'] + build_time <= max_time:
+                    if group['easyconfigs'][0]['hidden'] == easyconfig['hidden']:
+                        target = idx
+                        break
+
+        if target is None:
+            target = len(groups)
+            groups.append({'deps': dep_groups, 'easyconfigs': [], 'time': build_time})
+            dep_groups_to_groups.setdefault(dep_groups, []).append(target)
+        else:
+            _log.debug("Building %s in same job as %s", easyconfig['spec'], groups[target]['easyconfigs'][-1]['spec'])
+            groups[target]['time'] += build_time
+
+        groups[target]['easyconfigs'].append(easyconfig)
+        mod_name_to_group[easyconfig['ec'].full_mod_name] = target
+
+    return [group['easyconfigs'] for group in groups]
+
+
+def create_job(job_backend, build_command, easyconfig, output_dir='easybuild-build', build_times=None):
     """
-    Creates a job to build a *single* easyconfig.
+    Creates a job to build a *single* easyconfig, or a group of easyconfigs (one after the other).
 
     :param job_backend: A factory object for querying server parameters and creating actual job objects
     :param build_command: format string for command, full path to an easyconfig file will be substituted in it
-    :param easyconfig: easyconfig as processed by process_easyconfig
+    :param easyconfig: easyconfig as processed by process_easyconfig, or list of such easyconfigs
     :param output_dir: optional output path; --regtest-output-dir will be used inside the job with this variable
+    :param build_times: list of estimated build times for easyconfigs (determined via det_build_time_estimate if None)
 
     returns the job
     """
+    if isinstance(easyconfig, (list, tuple)):
+        easyconfigs = easyconfig
+    else:
+        easyconfigs = [easyconfig]
+
     # obtain unique name based on name/easyconfig version tuple
-    ec_tuple = (easyconfig['ec']['name'], det_full_ec_version(easyconfig['ec']))
+    ec_tuple = (easyconfigs[0]['ec']['name'], det_full_ec_version(easyconfigs[0]['ec']))
     name = '-'.join(ec_tuple)
+    if len(easyconfigs) > 1:
+        name += '-and-%d-more' % (len(easyconfigs) - 1)
 
     # determine whether additional options need to be passed to the 'eb' command
     add_opts = ''
-    if easyconfig['hidden']:
+    if easyconfigs[0]['hidden']:
         add_opts += ' --hidden'
 
     # create command based on build_command template
     command = build_command % {
         'add_opts': add_opts,
         'output_dir': os.path.join(os.path.abspath(output_dir), name),
-        'spec': easyconfig['spec'],
+        'spec': ' '.join(ec['spec'] for ec in easyconfigs),
     }
 
-    # just use latest build stats
-    repo = init_repository(get_repository(), get_repositorypath())
-    buildstats = repo.get_buildstats(*ec_tuple)
+    if build_times is None:
+        repo = init_repository(get_repository(), get_repositorypath())
+        build_times = [det_build_time_estimate(repo, ec) for ec in easyconfigs]
     extra = {}
-    if buildstats:
-        previous_time = buildstats[-1]['build_time']
+    if any(t is not None for t in build_times):
+        previous_time = sum(t for t in build_times if t is not None)
         extra['hours'] = int(math.ceil(previous_time * 2 / 60))
 
     if build_option('job_cores'):
         extra['cores'] = build_option('job_cores')
 
     job = job_backend.make_job(command, name, **extra)
-    job.module = easyconfig['ec'].full_mod_name
+    job.module = ', '.join(ec['ec'].full_mod_name for ec in easyconfigs)
 
     return job
 
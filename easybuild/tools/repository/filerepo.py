@@ -36,18 +36,29 @@ Plain filesystem repository
 :author: Ward Poelmans (Ghent University)
 :author: Fotis Georgatos (Uni.Lu, NTUA)
 """
+import fcntl
+import json
 import os
 import time
+from contextlib import contextmanager
 
 from easybuild.framework.easyconfig.easyconfig import EasyConfig
 from easybuild.framework.easyconfig.format.one import EB_FORMAT_EXTENSION
 from easybuild.framework.easyconfig.format.yeb import YEB_FORMAT_EXTENSION, is_yeb_format
 from easybuild.framework.easyconfig.tools import stats_to_str
-from easybuild.tools.filetools import copy_file, mkdir, read_file, write_file
+from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.filetools import copy_file, mkdir, read_file, write_file, write_file_atomic
 from easybuild.tools.repository.repository import Repository
 from easybuild.tools.version import VERBOSE_VERSION
 
 
+# extension for file next to archived easyconfig file in which build stats are recorded (one JSON record per line)
+BUILDSTATS_FILE_EXT = '.buildstats.jsonl'
+
+# name of lock file used to avoid that archived files are modified concurrently
+LOCK_FILENAME = '.lock'
+
+
 class FileRepository(Repository):
     """Class for file repositories."""
 
@@ -69,6 +80,44 @@ class FileRepository(Repository):
         # for sake of convenience
         self.wc = self.repo
 
+    def stage_file(self, path):
+        """
+        Stage file at specified location in repository for commit (nothing to do for file repositories)
+
+        :param path: location of file to stage
+        """
+        pass
+
+    @contextmanager
+    def locked(self, path):
+        """
+        Context manager to obtain an exclusive lock on specified directory in repository,
+        to avoid that multiple EasyBuild sessions modify archived files at the same time.
+
+        :param path: location of directory to lock
+        """
+        mkdir(path, parents=True)
+        lock_path = os.path.join(path, LOCK_FILENAME)
+        try:
+            with open(lock_path, 'a') as lock_fh:
+                self.log.debug("Obtaining lock via %s...", lock_path)
+                fcntl.flock(lock_fh, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_fh, fcntl.LOCK_UN)
+        except IOError as err:
+            raise EasyBuildError("Failed to obtain lock via %s: %s", lock_path, err)
+
+    def buildstats_file(self, name, version):
+        """
+        Return location of file in which build stats are recorded for specified software name and version.
+
+        :param name: software name
+        :param version: software install version, incl. toolchain & versionsuffix
+        """
+        return os.path.join(self.wc, self.subdir, name, "%s-%s%s" % (name, version, BUILDSTATS_FILE_EXT))
+
     def add_easyconfig(self, cfg, name, version, stats, previous):
         """
         Add easyconfig to repository
@@ -83,6 +132,17 @@ class FileRepository(Repository):
         # create directory for eb file
         full_path = os.path.join(self.wc, self.subdir, name)
 
+        with self.locked(full_path):
+            dest = self._add_easyconfig(cfg, name, version, stats, previous)
+
+        return dest
+
+    def _add_easyconfig(self, cfg, name, version, stats, previous):
+        """
+        Add easyconfig to repository, assumes that a lock is held (see add_easyconfig).
+        """
+        full_path = os.path.join(self.wc, self.subdir, name)
+
         yeb_format = is_yeb_format(cfg, None)
         if yeb_format:
             extension = YEB_FORMAT_EXTENSION
@@ -113,7 +173,21 @@ class FileRepository(Repository):
             statstxt = statscomment + statsprefix + stats_to_str(stats, isyeb=yeb_format) + statssuffix
 
         txt += statstxt
-        write_file(dest, txt)
+
+        # build stats are also recorded in separate file, to which each build only appends a single line;
+        # if that file is not there yet, start with build stats from already archived easyconfig (if any)
+        buildstats_path = self.buildstats_file(name, version)
+        if not os.path.exists(buildstats_path) and os.path.exists(dest):
+            buildstats = EasyConfig(dest, validate=False)['buildstats'] or []
+        else:
+            buildstats = []
+        buildstats.append(stats)
+
+        write_file_atomic(dest, txt)
+
+        buildstats_txt = ''.join(json.dumps(x, sort_keys=True, default=str) + '\n' for x in buildstats)
+        write_file(buildstats_path, buildstats_txt, append=True)
+        self.stage_file(buildstats_path)
 
         return dest
 
@@ -138,10 +212,16 @@ class FileRepository(Repository):
             self.log.debug("module (%s) has not been found in the repo" % name)
             return []
 
-        dest = os.path.join(full_path, "%s.eb" % ec_version)
-        if not os.path.isfile(dest):
-            self.log.debug("version %s for %s has not been found in the repo" % (ec_version, name))
-            return []
+        buildstats_path = self.buildstats_file(name, ec_version)
+        if os.path.isfile(buildstats_path):
+            return [json.loads(line) for line in read_file(buildstats_path).splitlines() if line.strip()]
+
+        # fall back to parsing archived easyconfig file (which was archived before build stats were recorded separately)
+        for extension in [EB_FORMAT_EXTENSION, YEB_FORMAT_EXTENSION]:
+            dest = os.path.join(full_path, "%s-%s%s" % (name, ec_version, extension))
+            if os.path.isfile(dest):
+                eb = EasyConfig(dest, validate=False)
+                return eb['buildstats']
 
-        eb = EasyConfig(dest, validate=False)
-        return eb['buildstats']
+        self.log.debug("version %s for %s has not been found in the repo" % (ec_version, name))
+        return []
@@ -35,12 +35,16 @@ Generic support for dealing with repositories
 :author: Fotis Georgatos (Uni.Lu, NTUA)
 """
 from easybuild.base import fancylogger
-from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.build_log import EasyBuildError, print_warning
 from easybuild.tools.py2vs3 import string_type
 from easybuild.tools.utilities import get_subclasses, import_available_modules
 
 _log = fancylogger.getLogger('repository', fname=False)
 
+# repositories used in the current session, by repository type & path;
+# changes to these repositories are only committed at the end of the session (see commit_session_repositories)
+_session_repositories = {}
+
 
 class Repository(object):
     """
@@ -62,6 +66,7 @@ class Repository(object):
         self.repo = repo_path
         self.wc = None
         self.initialized = False
+        self.queued_commit_msgs = []
 
     def init(self):
         """Prepare repository for use."""
@@ -125,6 +130,21 @@ class Repository(object):
         # does nothing by default
         pass
 
+    def queue_commit(self, msg):
+        """
+        Queue commit for changes made to working copy, with specified message;
+        changes are only actually committed when commit_queued is called.
+        """
+        self.queued_commit_msgs.append(msg)
+
+    def commit_queued(self):
+        """
+        Commit working copy with a single commit for all queued commits (if any).
+        """
+        if self.queued_commit_msgs:
+            self.commit('; '.join(self.queued_commit_msgs))
+            self.queued_commit_msgs = []
+
     def cleanup(self):
         """
         Clean up working copy.
@@ -176,3 +196,32 @@ def init_repository(repository, repository_path):
 
     inited_repo.init()
     return inited_repo
+
+
+def session_repository(repository, repository_path):
+    """
+    Return (initialized) instance of the selected repository class, to use during the current session.
+    The same instance is returned for a particular repository type & path, to avoid that a working copy
+    is created for every installation, and to allow committing all changes in one go.
+    """
+    key = (repository, str(repository_path))
+    if key not in _session_repositories:
+        _session_repositories[key] = init_repository(repository, repository_path)
+    return _session_repositories[key]
+
+
+def commit_session_repositories():
+    """
+    Commit queued changes to repositories used in the current session, and clean them up.
+    Failing to commit or clean up only results in a warning, this function never raises an EasyBuildError.
+    """
+    for key, repo in sorted(_session_repositories.items()):
+        try:
+            repo.commit_queued()
+        except EasyBuildError as err:
+            print_warning("Unable to commit easyconfig to repository: %s" % err)
+        try:
+            repo.cleanup()
+        except EasyBuildError as err:
+            print_warning("Unable to clean up repository working copy: %s" % err)
+        del _session_repositories[key]
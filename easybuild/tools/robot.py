@@ -246,7 +246,8 @@ def dry_run(easyconfigs, modtool, short=False):
         lines.append("Dry run: printing build status of easyconfigs and dependencies")
         all_specs = resolve_dependencies(easyconfigs, modtool, retain_all_deps=True, raise_error_missing_ecs=False)
 
-    unbuilt_specs = skip_available(all_specs, modtool)
+    # compare based on module name, to avoid that full EasyConfig instances are created for compact records
+    unbuilt_mod_names = [spec['full_mod_name'] for spec in skip_available(all_specs, modtool)]
     dry_run_fmt = " * [%1s] %s (module: %s)"  # markdown compatible (list of items with checkboxes in front)
 
     listed_ec_paths = [spec['spec'] for spec in easyconfigs]
@@ -256,7 +257,7 @@ def dry_run(easyconfigs, modtool, short=False):
     # only allow short if common prefix is long enough
     short = short and common_prefix is not None and len(common_prefix) > len(var_name) * 2
     for spec in all_specs:
-        if spec in unbuilt_specs:
+        if spec['full_mod_name'] in unbuilt_mod_names:
             ans = ' '
         elif build_option('force') and spec['spec'] in listed_ec_paths:
             ans = 'F'
@@ -432,14 +433,18 @@ def resolve_dependencies(easyconfigs, modtool, retain_all_deps=False, raise_erro
                         _log.info("Robot: resolving dependency %s with %s" % (cand_dep, path))
                         # build specs should not be passed down to resolved dependencies,
                         # to avoid that e.g. --try-toolchain trickles down into the used toolchain itself
+                        # only compact records are retained for parsed easyconfigs (see EasyConfigRecord),
+                        # to limit memory usage when resolving lots of dependencies
                         hidden = cand_dep.get('hidden', False)
-                        processed_ecs = process_easyconfig(path, validate=not retain_all_deps, hidden=hidden)
+                        processed_ecs = process_easyconfig(path, validate=not retain_all_deps, hidden=hidden,
+                                                           compact=True)
 
                         # ensure that selected easyconfig provides required dependency
                         verify_easyconfig_filename(path, cand_dep, parsed_ec=processed_ecs)
 
+                        known_mod_names = [x['full_mod_name'] for x in easyconfigs + additional]
                         for ec in processed_ecs:
-                            if ec not in easyconfigs + additional:
+                            if ec['full_mod_name'] not in known_mod_names:
                                 additional.append(ec)
                                 _log.debug("Added %s as dependency of %s" % (ec, entry))
                 else:
@@ -43,11 +43,18 @@ import tempfile
 import time
 from datetime import datetime
 
+try:
+    # Python 3.11+
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
+
 import easybuild.tools.asyncprocess as asyncprocess
 from easybuild.base import fancylogger
 from easybuild.tools.build_log import EasyBuildError, dry_run_msg, print_msg, time_str_since
 from easybuild.tools.config import ERROR, IGNORE, WARN, build_option
 from easybuild.tools.py2vs3 import string_type
+from easybuild.tools.timing import TIMING_RUN_CMD, record_timing
 from easybuild.tools.utilities import trace_msg
 
 
@@ -56,6 +63,16 @@ _log = fancylogger.getLogger('run', fname=False)
 
 errors_found_in_log = 0
 
+# regular expression for constructs that prevent combining regular expressions into a single regular expression:
+# global inline flags, backreferences and conditional patterns
+NON_COMBINABLE_REGEX = re.compile(r'\(\?[aiLmsux]+\)|\\[1-9]|\(\?P=|\(\?\(')
+# regular expression for constructs that may look beyond the end of a line (lookaround assertions, \A and \Z),
+# so regular expressions that include these must be applied to individual lines
+NON_LINE_LOCAL_REGEX = re.compile(r'\(\?<?[=!]|\\[AZ]')
+
+# cache for LogErrorMatcher instances, see get_log_error_matcher
+_log_error_matchers = {}
+
 # default strictness level
 strictness = WARN
 
@@ -220,6 +237,7 @@ def run_cmd(cmd, log_ok=True, log_all=False, simple=False, inp=None, regexp=True
             raise EasyBuildError("Don't know how to prefix with /usr/bin/env for commands of type %s", type(cmd))
 
     _log.info('running cmd: %s ' % cmd)
+    cmd_start_time = time.time()
     try:
         proc = subprocess.Popen(cmd, shell=shell, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
                                 stdin=subprocess.PIPE, close_fds=True, executable=exec_cmd)
@@ -258,6 +276,8 @@ def run_cmd(cmd, log_ok=True, log_all=False, simple=False, inp=None, regexp=True
         sys.stdout.write(output)
     stdouterr += output
 
+    record_timing(TIMING_RUN_CMD, cmd_msg, cmd_start_time, exit_code=ec)
+
     if trace:
         trace_msg("command completed: exit %s, ran in %s" % (ec, time_str_since(start_time)))
 
@@ -395,6 +415,7 @@ def run_cmd_qa(cmd, qa, no_qa=None, log_ok=True, log_all=False, simple=False, re
     if cmd_log:
         cmd_log.write("# output for interactive command: %s\n\n" % cmd)
 
+    cmd_start_time = time.time()
     try:
         proc = asyncprocess.Popen(cmd, shell=True, stdout=asyncprocess.PIPE, stderr=asyncprocess.STDOUT,
                                   stdin=asyncprocess.PIPE, close_fds=True, executable='/bin/bash')
@@ -489,6 +510,8 @@ def run_cmd_qa(cmd, qa, no_qa=None, log_ok=True, log_all=False, simple=False, re
     except IOError as err:
         _log.debug("runqanda cmd %s: remaining data read failed: %s", cmd, err)
 
+    record_timing(TIMING_RUN_CMD, cmd.strip(), cmd_start_time, exit_code=ec, interactive=True)
+
     if trace:
         trace_msg("interactive command completed: exit %s, ran in %s" % (ec, time_str_since(start_time)))
 
@@ -579,12 +602,13 @@ def parse_log_for_error(txt, regExp=None, stdout=True, msg=None):
 
     reg = re.compile(regExp, re.I)
 
+    # matching lines are identified first, groups are only determined for those
+    _, hits = get_log_error_matcher([(regExp, ERROR)], flags=re.I).scan(txt)
+
     res = []
-    for l in txt.split('\n'):
-        r = reg.search(l)
-        if r:
-            res.append([l, r.groups()])
-            errors_found_in_log += 1
+    for (_, l) in hits:
+        res.append([l, reg.search(l).groups()])
+        errors_found_in_log += 1
 
     if stdout and res:
         if msg:
@@ -595,52 +619,248 @@ def parse_log_for_error(txt, regExp=None, stdout=True, msg=None):
     return res
 
 
-def extract_errors_from_log(log_txt, reg_exps):
+def det_required_literal(reg_exp):
     """
-    Check provided string (command output) for messages matching specified regular expressions,
-    and return 2-tuple with list of warnings and errors.
-    :param log_txt: String containing the log, will be split into individual lines
-    :param reg_exps: List of: regular expressions (as strings) to error on,
-                    or tuple of regular expression and action (any of [IGNORE, WARN, ERROR])
-    :return (warnings, errors) as lists of lines containing a match
+    Determine longest literal string that is part of every match for the specified (compiled) regular expression.
+
+    :return: literal string (or None if no such string could be determined)
     """
-    actions = (IGNORE, WARN, ERROR)
+    # no literal string search possible if regular expression is case-insensitive
+    if reg_exp.flags & re.I:
+        return None
 
-    # promote single string value to list, since code below expects a list
+    try:
+        parsed = list(sre_parse.parse(reg_exp.pattern, reg_exp.flags))
+    except Exception as err:
+        _log.debug("Failed to parse regular expression '%s': %s", reg_exp.pattern, err)
+        return None
+
+    # only consider literal characters at the top level, since those are always part of a match;
+    # newlines are excluded, since matches are determined per line
+    literal, chars = '', []
+    for op, arg in parsed + [(None, None)]:
+        if op == sre_parse.LITERAL and arg != ord('\n'):
+            chars.append('%c' % arg)
+        else:
+            if len(chars) > len(literal):
+                literal = ''.join(chars)
+            chars = []
+
+    return literal or None
+
+
+class LogErrorMatcher(object):
+    """
+    Matcher for lines in (command) output that match any of a list of regular expressions,
+    each with a corresponding action (any of [IGNORE, WARN, ERROR]).
+
+    The regular expressions are combined into a single regular expression where possible, such that output
+    only has to be scanned once (rather than once for each regular expression).
+
+    A matcher does not hold any state related to the output being scanned (see LogErrorScan),
+    so it can be shared (and used concurrently).
+    """
+
+    def __init__(self, reg_exps, flags=0):
+        """
+        Create matcher for specified regular expressions.
+
+        :param reg_exps: List of: regular expressions (as strings) to error on,
+                        or tuple of regular expression and action (any of [IGNORE, WARN, ERROR])
+        :param flags: flags to use when compiling regular expressions
+        """
+        actions = (IGNORE, WARN, ERROR)
+
+        # promote single string value to list, since code below expects a list
+        if isinstance(reg_exps, string_type):
+            reg_exps = [reg_exps]
+
+        self.re_tuples = []
+        for cur in reg_exps:
+            try:
+                if isinstance(cur, str):
+                    # use ERROR as default action if only regexp pattern is specified
+                    reg_exp, action = cur, ERROR
+                elif isinstance(cur, tuple) and len(cur) == 2:
+                    reg_exp, action = cur
+                else:
+                    raise TypeError("Incorrect type of value, expected string or 2-tuple")
+
+                if not isinstance(reg_exp, str):
+                    raise TypeError("Regular expressions must be passed as string, got %s" % type(reg_exp))
+                if action not in actions:
+                    raise TypeError("action must be one of %s, got %s" % (actions, action))
+
+                self.re_tuples.append((re.compile(reg_exp, flags), action))
+            except Exception as err:
+                raise EasyBuildError("Invalid input: No regexp or tuple of regexp and action '%s': %s", str(cur), err)
+
+        # combine regular expressions into a single one, to quickly identify matching lines;
+        # if possible, this combined regular expression is used to scan output as a whole (rather than line by line),
+        # the individual regular expressions are only used for matching lines (to determine the action)
+        self.combined_regex = None
+        self.line_local = False
+        patterns = [reg_exp.pattern for (reg_exp, _) in self.re_tuples]
+        if patterns and not any(NON_COMBINABLE_REGEX.search(pattern) for pattern in patterns):
+            self.line_local = not any(NON_LINE_LOCAL_REGEX.search(pattern) for pattern in patterns)
+            if self.line_local:
+                # let ^ and $ match at start/end of each line when scanning output as a whole
+                flags |= re.M
+            try:
+                self.combined_regex = re.compile('|'.join('(?:%s)' % pattern for pattern in patterns), flags)
+            except re.error as err:
+                _log.debug("Failed to combine regular expressions %s, using them one by one: %s", patterns, err)
+                self.line_local = False
+
+        # if a literal string is required for a match for each of the regular expressions,
+        # lines to check can be found via (fast) literal string search rather than via the combined regular expression
+        literals = [det_required_literal(reg_exp) for (reg_exp, _) in self.re_tuples]
+        if literals and all(literals):
+            self.literals = sorted(set(literals))
+        else:
+            self.literals = None
+
+    def scan(self, txt):
+        """
+        Scan provided output for matching lines.
+
+        :return (warnings, errors) as lists of (line number, line) tuples
+        """
+        log_scan = LogErrorScan(self)
+        log_scan.feed(txt)
+        return log_scan.finish()
+
+    def check_line(self, line):
+        """Determine action for line that (potentially) matches, using first matching regular expression."""
+        for reg_exp, action in self.re_tuples:
+            if reg_exp.search(line):
+                return action
+        return None
+
+
+class LogErrorScan(object):
+    """
+    Scan of (command) output using a LogErrorMatcher; output can be provided in chunks (via feed),
+    as it is being produced.
+    """
+
+    def __init__(self, matcher):
+        """Start scan of output using specified matcher."""
+        self.matcher = matcher
+        self.errors = []
+        self.warnings = []
+        # number of lines that were scanned already
+        self.line_cnt = 0
+        # trailing part of output that was provided, which does not end with a newline (yet)
+        self.partial_line = ''
+
+    def feed(self, txt):
+        """Scan provided output, only complete lines are considered (remainder is retained until next feed)."""
+        txt = self.partial_line + txt
+        idx = txt.rfind('\n')
+        if idx >= 0:
+            self.partial_line = txt[idx + 1:]
+            self._scan(txt[:idx])
+        else:
+            self.partial_line = txt
+
+    def finish(self):
+        """
+        Scan last line of output, and return result.
+
+        :return (warnings, errors) as lists of (line number, line) tuples
+        """
+        self._scan(self.partial_line)
+        self.partial_line = ''
+        return self.warnings, self.errors
+
+    def _check_line(self, line, line_no):
+        """Check line that (potentially) matches, and record it according to the corresponding action."""
+        action = self.matcher.check_line(line)
+        if action == ERROR:
+            self.errors.append((line_no, line))
+        elif action == WARN:
+            self.warnings.append((line_no, line))
+
+    def _check_lines(self, txt, hits):
+        """Check lines in provided text that include any of the specified (sorted) positions."""
+        line_no, prev_start = self.line_cnt + 1, None
+        for idx in hits:
+            start = txt.rfind('\n', 0, idx) + 1
+            # each line is only checked once, even if there are multiple hits in it
+            if start != prev_start:
+                end = txt.find('\n', idx)
+                if end < 0:
+                    end = len(txt)
+                line_no += txt.count('\n', prev_start or 0, start)
+                prev_start = start
+                self._check_line(txt[start:end], line_no)
+
+    def _scan(self, txt):
+        """Scan lines in provided text, which should not include a trailing newline."""
+        literals, combined_regex = self.matcher.literals, self.matcher.combined_regex
+        if literals or self.matcher.line_local:
+            # determine positions of (potential) matches in text as a whole,
+            # continue searching in the next line after a hit (since the whole line is checked anyway)
+            hits = []
+            if literals:
+                for literal in literals:
+                    idx = txt.find(literal)
+                    while idx >= 0:
+                        hits.append(idx)
+                        end = txt.find('\n', idx)
+                        idx = txt.find(literal, end + 1) if end >= 0 else -1
+                hits.sort()
+            else:
+                res = combined_regex.search(txt)
+                while res:
+                    hits.append(res.start())
+                    end = txt.find('\n', res.start())
+                    res = combined_regex.search(txt, end + 1) if end >= 0 else None
+
+            self._check_lines(txt, hits)
+            self.line_cnt += txt.count('\n') + 1
+        else:
+            for line in txt.split('\n'):
+                self.line_cnt += 1
+                if combined_regex is None or combined_regex.search(line):
+                    self._check_line(line, self.line_cnt)
+
+
+def get_log_error_matcher(reg_exps, flags=0):
+    """
+    Get matcher for specified regular expressions (see LogErrorMatcher), only created once for each configuration.
+    Matchers are stateless, so the same matcher can be used for scanning different output at the same time.
+    """
     if isinstance(reg_exps, string_type):
         reg_exps = [reg_exps]
+    try:
+        key = (tuple(reg_exps), flags)
+        hash(key)
+    except TypeError:
+        # no caching of matchers for unhashable input
+        key = None
 
-    re_tuples = []
-    for cur in reg_exps:
-        try:
-            if isinstance(cur, str):
-                # use ERROR as default action if only regexp pattern is specified
-                reg_exp, action = cur, ERROR
-            elif isinstance(cur, tuple) and len(cur) == 2:
-                reg_exp, action = cur
-            else:
-                raise TypeError("Incorrect type of value, expected string or 2-tuple")
+    matcher = _log_error_matchers.get(key)
+    if matcher is None:
+        matcher = LogErrorMatcher(reg_exps, flags=flags)
+        if key is not None:
+            _log_error_matchers[key] = matcher
 
-            if not isinstance(reg_exp, str):
-                raise TypeError("Regular expressions must be passed as string, got %s" % type(reg_exp))
-            if action not in actions:
-                raise TypeError("action must be one of %s, got %s" % (actions, action))
+    return matcher
 
-            re_tuples.append((re.compile(reg_exp), action))
-        except Exception as err:
-            raise EasyBuildError("Invalid input: No regexp or tuple of regexp and action '%s': %s", str(cur), err)
 
-    warnings = []
-    errors = []
-    for line in log_txt.split('\n'):
-        for reg_exp, action in re_tuples:
-            if reg_exp.search(line):
-                if action == ERROR:
-                    errors.append(line)
-                elif action == WARN:
-                    warnings.append(line)
-                break
-    return warnings, errors
+def extract_errors_from_log(log_txt, reg_exps):
+    """
+    Check provided string (command output) for messages matching specified regular expressions,
+    and return 2-tuple with list of warnings and errors.
+    :param log_txt: String containing the log, will be split into individual lines
+    :param reg_exps: List of: regular expressions (as strings) to error on,
+                    or tuple of regular expression and action (any of [IGNORE, WARN, ERROR])
+    :return (warnings, errors) as lists of lines containing a match
+    """
+    warnings, errors = get_log_error_matcher(reg_exps).scan(log_txt)
+    return [line for (_, line) in warnings], [line for (_, line) in errors]
 
 
 def check_log_for_errors(log_txt, reg_exps):
@@ -651,12 +871,15 @@ def check_log_for_errors(log_txt, reg_exps):
                     or tuple of regular expression and action (any of [IGNORE, WARN, ERROR])
     """
     global errors_found_in_log
-    warnings, errors = extract_errors_from_log(log_txt, reg_exps)
+    warnings, errors = get_log_error_matcher(reg_exps).scan(log_txt)
 
     errors_found_in_log += len(warnings) + len(errors)
     if warnings:
         _log.warning("Found %s potential error(s) in command output (output: %s)",
-                     len(warnings), "\n\t".join(warnings))
+                     len(warnings), "\n\t".join(line for (_, line) in warnings))
+        _log.info("Potential error(s) found in command output at line(s) %s",
+                  ', '.join(str(line_no) for (line_no, _) in warnings))
     if errors:
+        _log.info("Error(s) found in command output at line(s) %s", ', '.join(str(line_no) for (line_no, _) in errors))
         raise EasyBuildError("Found %s error(s) in command output (output: %s)",
-                             len(errors), "\n\t".join(errors))
+                             len(errors), "\n\t".join(line for (_, line) in errors))
@@ -30,7 +30,10 @@ Module with useful functions for getting system information
 """
 import ctypes
 import fcntl
+import functools
 import grp  # @UnresolvedImport
+import json
+import multiprocessing
 import os
 import platform
 import pwd
@@ -44,9 +47,10 @@ from socket import gethostname
 from easybuild.base import fancylogger
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.config import build_option
-from easybuild.tools.filetools import is_readable, read_file, which
+from easybuild.tools.filetools import is_readable, read_file, which, write_file_atomic
 from easybuild.tools.py2vs3 import string_type
 from easybuild.tools.run import run_cmd
+from easybuild.tools.utilities import nub
 
 
 _log = fancylogger.getLogger('systemtools', fname=False)
@@ -101,6 +105,7 @@ UNKNOWN = 'UNKNOWN'
 MAX_FREQ_FP = '/sys/devices/system/cpu/cpu0/cpufreq/scaling_max_freq'
 PROC_CPUINFO_FP = '/proc/cpuinfo'
 PROC_MEMINFO_FP = '/proc/meminfo'
+BOOT_ID_FP = '/proc/sys/kernel/random/boot_id'
 
 CPU_ARCHITECTURES = [AARCH32, AARCH64, POWER, X86_64]
 CPU_FAMILIES = [AMD, ARM, INTEL, POWER, POWER_LE]
@@ -145,11 +150,108 @@ ARM_CORTEX_IDS = {
 RPM = 'rpm'
 DPKG = 'dpkg'
 
+# cache for results of checking availability of OS dependencies (see check_os_dependencies)
+_os_deps_cache = {}
+
+# system facts cached in files specified via --system-facts-cache (see system_fact), by path to cache file
+_system_facts_cache_files = {}
+
 
 class SystemToolsException(Exception):
     """raised when systemtools fails"""
 
 
+def det_system_facts_cache_key():
+    """
+    Determine key for system facts in cache that is persisted across sessions:
+    hostname and boot ID, since system facts may only change when the system is rebooted.
+
+    :return: key (string), or None if boot ID can not be determined
+    """
+    key = None
+    if is_readable(BOOT_ID_FP):
+        boot_id = read_file(BOOT_ID_FP).strip()
+        if boot_id:
+            key = '%s:%s' % (gethostname(), boot_id)
+    return key
+
+
+def load_system_facts_cache(path):
+    """
+    Load system facts cached in specified file (only read once per session).
+    """
+    if path not in _system_facts_cache_files:
+        cached = {}
+        if os.path.exists(path):
+            try:
+                cached = json.loads(read_file(path))
+            except ValueError as err:
+                _log.warning("Ignoring cached system facts in %s, failed to load them: %s", path, err)
+
+        _system_facts_cache_files[path] = cached
+
+    return _system_facts_cache_files[path]
+
+
+def save_system_facts_cache(path, key, facts):
+    """
+    Store system facts in file in which system facts are cached across sessions.
+
+    :param path: path to cache file
+    :param key: key for system facts (see det_system_facts_cache_key)
+    :param facts: dict with system facts for this system (by function name)
+    """
+    cached = {}
+    # also retain entries that were added by other sessions in the meantime (e.g. on other hosts),
+    # except for entries for this host that correspond to an earlier boot (since those are stale)
+    if os.path.exists(path):
+        try:
+            cached = json.loads(read_file(path))
+        except ValueError as err:
+            _log.warning("Overwriting cached system facts in %s, failed to load them: %s", path, err)
+
+    hostname_prefix = key.split(':')[0] + ':'
+    for stale_key in [k for k in cached if k.startswith(hostname_prefix) and k != key]:
+        del cached[stale_key]
+
+    cached.setdefault(key, {}).update(facts)
+
+    # cache file may be shared by concurrent sessions, so make sure it's never seen partially written
+    write_file_atomic(path, json.dumps(cached, indent=1, sort_keys=True), forced=True)
+    _log.info("Cached system facts for %s in %s", key, path)
+
+
+def system_fact(func):
+    """
+    Function decorator to cache system facts across sessions, in the file specified via --system-facts-cache (if any).
+
+    System facts are cached per host and boot ID, since they may only change when the system is rebooted.
+    """
+    @functools.wraps(func)
+    def cache_aware_func():
+        """Look up system fact in cache first, determine and cache it if not available yet."""
+        cache_path = build_option('system_facts_cache', default=None)
+        key = None
+        if cache_path:
+            key = det_system_facts_cache_key()
+
+        if key is None:
+            res = func()
+        else:
+            facts = load_system_facts_cache(cache_path).setdefault(key, {})
+            if func.__name__ in facts:
+                res = facts[func.__name__]
+                _log.debug("Using result of %s cached in %s: %s", func.__name__, cache_path, res)
+            else:
+                res = func()
+                facts[func.__name__] = res
+                save_system_facts_cache(cache_path, key, facts)
+
+        return res
+
+    return cache_aware_func
+
+
 def sched_getaffinity():
     """Determine list of available cores for current process."""
     cpu_mask_t = ctypes.c_ulong
@@ -211,6 +313,7 @@ def get_core_count():
     _log.nosupport("get_core_count() is replaced by get_avail_core_count()", '2.0')
 
 
+@system_fact
 def get_total_memory():
     """
     Try to ascertain this node's total memory
@@ -271,6 +374,7 @@ def get_cpu_architecture():
     return arch
 
 
+@system_fact
 def get_cpu_vendor():
     """
     Try to detect the CPU vendor
@@ -352,6 +456,7 @@ def get_cpu_family():
     return family
 
 
+@system_fact
 def get_cpu_arch_name():
     """
     Determine CPU architecture name via archspec (if available).
@@ -368,6 +473,7 @@ def get_cpu_arch_name():
     return cpu_arch_name
 
 
+@system_fact
 def get_cpu_model():
     """
     Determine CPU model, e.g., Intel(R) Core(TM) i5-2540M CPU @ 2.60GHz
@@ -418,6 +524,7 @@ def get_cpu_model():
     return model
 
 
+@system_fact
 def get_cpu_speed():
     """
     Returns the (maximum) cpu speed in MHz, as a float value.
@@ -462,6 +569,7 @@ def get_cpu_speed():
     return cpu_freq
 
 
+@system_fact
 def get_cpu_features():
     """
     Get list of CPU features
@@ -564,6 +672,7 @@ def get_platform_name(withversion=False):
     return platform_name
 
 
+@system_fact
 def get_os_name():
     """
     Determine system name, e.g., 'redhat' (generic), 'centos', 'debian', 'fedora', 'suse', 'ubuntu',
@@ -599,6 +708,7 @@ def get_os_name():
         return UNKNOWN
 
 
+@system_fact
 def get_os_version():
     """Determine system version."""
 
@@ -651,50 +761,139 @@ def get_os_version():
         return UNKNOWN
 
 
-def check_os_dependency(dep):
+def det_os_pkg_cmds():
     """
-    Check if dependency is available from OS.
+    Determine list of commands to query OS package manager with (in order of preference).
     """
-    # - uses rpm -q and dpkg -s --> can be run as non-root!!
-    # - fallback on which
-    # - should be extended to files later?
-    found = False
-    cmd = None
     os_to_pkg_cmd_map = {
         'centos': RPM,
         'debian': DPKG,
         'redhat': RPM,
         'ubuntu': DPKG,
     }
-    pkg_cmd_flag = {
-        DPKG: '-s',
-        RPM: '-q',
-    }
     os_name = get_os_name()
     if os_name in os_to_pkg_cmd_map:
         pkg_cmds = [os_to_pkg_cmd_map[os_name]]
     else:
         pkg_cmds = [RPM, DPKG]
 
-    for pkg_cmd in pkg_cmds:
-        if which(pkg_cmd):
-            cmd = ' '.join([pkg_cmd, pkg_cmd_flag.get(pkg_cmd), dep])
-            found = run_cmd(cmd, simple=True, log_all=False, log_ok=False,
-                            force_in_dry_run=True, trace=False, stream_output=False)
-            if found:
-                break
+    return [pkg_cmd for pkg_cmd in pkg_cmds if which(pkg_cmd)]
+
+
+def query_os_packages(pkg_cmd, pkgs):
+    """
+    Query OS package manager for specified packages, using a single command.
+
+    If the exit code of that command is not explained by the packages that are reported as not being installed
+    (e.g. because the package database is locked), the packages are checked one by one instead,
+    to avoid that all packages are incorrectly reported as being installed.
+
+    :param pkg_cmd: OS package manager command to use (RPM or DPKG)
+    :param pkgs: list of names of OS packages
+    :return: dict indicating for each package whether it is installed (None if that could not be determined)
+    """
+    pkg_cmd_flag = {
+        DPKG: '-s',
+        RPM: '-q',
+    }
+    # patterns for messages reporting that a package is not installed;
+    # $LC_ALL is set to make sure that the output of the OS package manager is not translated
+    missing_regex = {
+        DPKG: re.compile(r"^dpkg-query: package '(\S+)' is not installed", re.M),
+        RPM: re.compile(r"^package (\S+) is not installed$", re.M),
+    }[pkg_cmd]
+
+    def query(query_pkgs):
+        """Query OS package manager for specified packages, return output, exit code and missing packages."""
+        cmd = ' '.join(['LC_ALL=C', pkg_cmd, pkg_cmd_flag.get(pkg_cmd)] + query_pkgs)
+        # exit code is non-zero if one or more packages are not installed, so we need to look at the output
+        out, ec = run_cmd(cmd, simple=False, log_all=False, log_ok=False, force_in_dry_run=True, trace=False,
+                          stream_output=False)
+        missing = missing_regex.findall(out)
+        # non-zero exit code should be explained by missing packages, and there should be no other errors
+        ok = bool(ec) == bool(missing) and not re.search(r"^error:", out, re.M)
+        if not ok:
+            _log.warning("Unexpected result for '%s' (exit code %s): %s", cmd, ec, out)
+        return out, ok, missing
+
+    out, ok, missing = query(pkgs)
+    if ok:
+        res = dict((pkg, False) for pkg in pkgs)
+        if pkg_cmd == RPM:
+            # 'rpm -q' reports 'package <name> is not installed' for each missing package
+            res.update((pkg, True) for pkg in pkgs if pkg not in missing)
+        else:
+            # 'dpkg -s' prints a stanza with 'Package' and 'Status' fields for each known package
+            pkg = None
+            for line in out.splitlines():
+                if line.startswith('Package:'):
+                    pkg = line.split(':', 1)[1].strip()
+                elif line.startswith('Status:') and line.strip().endswith(' installed'):
+                    res.update((p, True) for p in pkgs if p == pkg or p.split(':')[0] == pkg)
+    else:
+        # fall back to checking packages one by one;
+        # if that fails too for a particular package, we don't know whether or not it is installed
+        _log.info("Checking OS packages one by one: %s", pkgs)
+        res = {}
+        for pkg in pkgs:
+            _, ok, missing = query([pkg])
+            res[pkg] = (not missing) if ok else None
+
+    _log.debug("Installed OS packages according to '%s': %s", pkg_cmd, res)
+    return res
+
+
+def check_os_dependencies(deps):
+    """
+    Check if specified dependencies are available from OS.
+    Results are cached, and the OS package manager is queried for all specified dependencies at once.
+    Results that could not be determined reliably (e.g. because querying the OS package manager failed)
+    are not cached.
+
+    :param deps: list of names of OS dependencies
+    :return: dict with result of check for each dependency
+    """
+    # - uses rpm -q and dpkg -s --> can be run as non-root!!
+    # - fallback on which
+    # - should be extended to files later?
+    to_check = nub([dep for dep in deps if dep not in _os_deps_cache])
+
+    res = {}
+    if to_check:
+        found = dict((dep, False) for dep in to_check)
+        unknown = set()
 
-    if not found:
-        # fallback for when os-dependency is a binary/library
-        found = which(dep)
+        for pkg_cmd in det_os_pkg_cmds():
+            pkgs = [dep for dep in to_check if not found[dep]]
+            if pkgs:
+                for pkg, installed in query_os_packages(pkg_cmd, pkgs).items():
+                    if installed is None:
+                        unknown.add(pkg)
+                    else:
+                        found[pkg] = installed
 
-        # try locate if it's available
-        if not found and which('locate'):
-            cmd = 'locate --regexp "/%s$"' % dep
-            found = run_cmd(cmd, simple=True, log_all=False, log_ok=False, force_in_dry_run=True, trace=False,
-                            stream_output=False)
+        for dep in [dep for dep in to_check if not found[dep]]:
+            # fallback for when os-dependency is a binary/library
+            found[dep] = which(dep)
 
-    return found
+            # try locate if it's available
+            if not found[dep] and which('locate'):
+                cmd = 'locate --regexp "/%s$"' % dep
+                found[dep] = run_cmd(cmd, simple=True, log_all=False, log_ok=False, force_in_dry_run=True,
+                                     trace=False, stream_output=False)
+
+        res.update(found)
+        # only cache results that were determined reliably
+        _os_deps_cache.update((dep, found[dep]) for dep in to_check if found[dep] or dep not in unknown)
+
+    return dict((dep, res[dep] if dep in res else _os_deps_cache[dep]) for dep in deps)
+
+
+def check_os_dependency(dep):
+    """
+    Check if dependency is available from OS.
+    """
+    return check_os_dependencies([dep])[dep]
 
 
 def get_tool_version(tool, version_option='--version'):
@@ -846,6 +1045,36 @@ def det_parallelism(par=None, maxpar=None):
     return par
 
 
+def map_parallel(func, items, chunksize=1, min_items=2):
+    """
+    Apply specified function to all items, using a pool of processes if at least min_items items are specified
+    (and more than one core is available); results are returned in the same order as the items.
+
+    :param func: function to apply to each item
+    :param items: list of items
+    :param chunksize: number of items to pass to a worker process at once
+    :param min_items: minimal number of items for which to use a pool of processes,
+                      to avoid that the overhead of starting one is larger than what is gained by it
+    """
+    pool = None
+    if len(items) >= max(min_items, 2):
+        nprocs = min(det_parallelism(par=build_option('parallel')), len(items))
+        if nprocs > 1:
+            _log.info("Using %d processes to process %d items with %s", nprocs, len(items), func.__name__)
+            pool = multiprocessing.Pool(processes=nprocs)
+
+    if pool is None:
+        results = [func(item) for item in items]
+    else:
+        try:
+            results = pool.map(func, items, chunksize=chunksize)
+        finally:
+            pool.close()
+            pool.join()
+
+    return results
+
+
 def det_terminal_size():
     """
     Determine the current size of the terminal window.
@@ -0,0 +1,158 @@
+# #
+# Copyright 2020-2020 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+# #
+"""
+Tools to keep track of where time is spent during an installation,
+i.e. in installation steps, running (shell/module) commands, downloading files, etc.
+"""
+import json
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from easybuild.base import fancylogger
+from easybuild.tools.py2vs3 import OrderedDict
+
+
+_log = fancylogger.getLogger('tools.timing', fname=False)
+
+# categories of recorded timings
+TIMING_ADJUST_PERMISSIONS = 'adjust_permissions'
+TIMING_DOWNLOAD = 'download'
+TIMING_MODULE_CMD = 'module'
+TIMING_RUN_CMD = 'run_cmd'
+TIMING_STEP = 'step'
+
+# maximum number of retained timings (oldest timings are dropped first)
+MAX_TIMINGS = 100000
+
+# recorded timings, each entry is a dict with category, name, start time & duration (in seconds);
+# timings are reset by build_and_install_one at the start of each installation (see reset_timings),
+# the number of retained timings is limited since timings are also recorded outside of installations
+_timings = deque(maxlen=MAX_TIMINGS)
+
+
+def record_timing(category, name, start_time, end_time=None, **details):
+    """
+    Record timing for an (already completed) operation.
+
+    :param category: category of operation (e.g., TIMING_STEP, TIMING_RUN_CMD, ...)
+    :param name: name of operation (e.g., name of installation step, command that was run, ...)
+    :param start_time: start time of operation (as obtained via time.time())
+    :param end_time: end time of operation (current time is used if None)
+    :param details: additional details to include for this operation
+    """
+    if end_time is None:
+        end_time = time.time()
+
+    timing = {
+        'category': category,
+        'name': name,
+        'start': start_time,
+        'duration': end_time - start_time,
+    }
+    if details:
+        timing['details'] = details
+
+    _timings.append(timing)
+
+
+@contextmanager
+def timed(category, name, **details):
+    """
+    Context manager to record timing for the operation performed in the body of a 'with' statement.
+    Timing is also recorded if the operation fails.
+    """
+    start_time = time.time()
+    try:
+        yield
+    finally:
+        record_timing(category, name, start_time, **details)
+
+
+def get_timings(category=None):
+    """
+    Return (copy of) list of timings that were recorded so far.
+
+    :param category: only return timings for specified category (if not None)
+    """
+    return [t.copy() for t in _timings if category is None or t['category'] == category]
+
+
+def reset_timings():
+    """
+    Forget about all timings recorded so far.
+
+    This is done by build_and_install_one (in easybuild.framework.easyblock) at the start of each installation,
+    so the timings that are reported for an installation only cover that installation.
+    Timings that are recorded outside of an installation (e.g. when resolving dependencies, searching easyconfigs,
+    or interacting with GitHub) are only retained until then, and at most MAX_TIMINGS timings are retained at any time,
+    so recording timings doesn't result in unbounded memory usage in long sessions.
+    """
+    _timings.clear()
+
+
+def timings_summary(timings):
+    """
+    Determine summary of given timings: total time spent and number of operations per category.
+
+    :param timings: list of timings (see get_timings)
+    :return: ordered dict with category as key and (total time, count) tuple as value, sorted by total time
+    """
+    res = {}
+    for timing in timings:
+        total, cnt = res.get(timing['category'], (0, 0))
+        res[timing['category']] = (total + timing['duration'], cnt + 1)
+
+    return OrderedDict(sorted(res.items(), key=lambda x: x[1][0], reverse=True))
+
+
+def timings_to_json(timings):
+    """
+    Convert given timings to JSON, in the Trace Event Format that is supported by the Chrome tracing tool
+    (see chrome://tracing or https://ui.perfetto.dev).
+
+    :param timings: list of timings (see get_timings)
+    :return: string with JSON representation of given timings
+    """
+    pid = os.getpid()
+    events = []
+    for timing in timings:
+        event = {
+            'name': timing['name'],
+            'cat': timing['category'],
+            # complete event, with duration
+            'ph': 'X',
+            # timestamp and duration must be specified in microseconds
+            'ts': int(timing['start'] * 1e6),
+            'dur': int(timing['duration'] * 1e6),
+            'pid': pid,
+            'tid': pid,
+        }
+        if 'details' in timing:
+            event['args'] = timing['details']
+        events.append(event)
+
+    return json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'}, indent=1, sort_keys=True)
@@ -59,7 +59,7 @@ import tempfile
 from easybuild.base import fancylogger
 from easybuild.tools.build_log import EasyBuildError, dry_run_msg
 from easybuild.tools.config import build_option, install_path
-from easybuild.tools.environment import setvar
+from easybuild.tools.environment import env_transaction, setvar, setvars
 from easybuild.tools.filetools import adjust_permissions, find_eb_script, read_file, which, write_file
 from easybuild.tools.module_generator import dependencies_for
 from easybuild.tools.modules import get_software_root, get_software_root_env_var_name
@@ -548,8 +548,7 @@ class Toolchain(object):
         self.log.debug("Defining $EB* environment variables for software named %s", name)
 
         env_vars = env_vars_external_module(name, version, metadata)
-        for key in env_vars:
-            setvar(key, env_vars[key], verbose=verbose)
+        setvars(env_vars, verbose=verbose)
 
     def _load_toolchain_module(self, silent=False):
         """Load toolchain module."""
@@ -1012,19 +1011,24 @@ class Toolchain(object):
         elif isinstance(donotset, list):
             donotsetlist = donotset
 
+        env_vars, ebvar_env_vars = [], []
         for key, val in sorted(self.vars.items()):
             if key in donotsetlist:
                 self.log.debug("_setenv_variables: not setting environment variable %s (value: %s).", key, val)
                 continue
 
-            self.log.debug("_setenv_variables: setting environment variable %s to %s", key, val)
-            setvar(key, val, verbose=verbose)
+            env_vars.append((key, val))
 
             # also set unique named variables that can be used in Makefiles
             # - so you can have 'CFLAGS = $(EBVARCFLAGS)'
             # -- 'CLFLAGS = $(CFLAGS)' gives  '*** Recursive variable `CFLAGS'
             # references itself (eventually).  Stop' error
-            setvar("EBVAR%s" % key, val, verbose=False)
+            ebvar_env_vars.append(("EBVAR%s" % key, val))
+
+        # define all environment variables in a single transaction, to avoid logging every variable separately
+        with env_transaction():
+            setvars(env_vars, verbose=verbose)
+            setvars(ebvar_env_vars, verbose=False)
 
     def get_flag(self, name):
         """Get compiler flag for a certain option."""
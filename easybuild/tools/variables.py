@@ -31,6 +31,7 @@ e.g., in compiling or linking
 """
 import copy
 import os
+import time
 
 from easybuild.base import fancylogger
 from easybuild.tools.build_log import EasyBuildError
@@ -38,6 +39,74 @@ from easybuild.tools.build_log import EasyBuildError
 
 _log = fancylogger.getLogger('variables', fname=False)
 
+# cache for list classes generated by Variables.get_instance, see get_instance_class
+_instance_classes = {}
+
+# cache for contents of directories probed via AbsPathList, see get_dir_entries
+_dir_entries_cache = {}
+
+
+def get_dir_entries(path):
+    """
+    Return (cached) entries in specified directory, as a tuple with set of existing entries and set of subdirectories;
+    (None, None) is returned if the specified path is not an existing directory.
+
+    Cached results are invalidated when the modification time of the directory changes.
+    Results are only cached if the directory was not modified in the last second,
+    to take into account filesystems with a coarse timestamp resolution.
+    """
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        _dir_entries_cache.pop(path, None)
+        return (None, None)
+
+    cached = _dir_entries_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1:]
+
+    try:
+        names = os.listdir(path)
+    except OSError:
+        return (None, None)
+
+    entries, subdirs = set(), set()
+    for name in names:
+        full_path = os.path.join(path, name)
+        # take into account that entries may be (dangling) symlinks
+        if os.path.exists(full_path):
+            entries.add(name)
+            if os.path.isdir(full_path):
+                subdirs.add(name)
+
+    if time.time() - mtime > 1:
+        _dir_entries_cache[path] = (mtime, entries, subdirs)
+    else:
+        _dir_entries_cache.pop(path, None)
+
+    return (entries, subdirs)
+
+
+def path_exists(path, isdir=False):
+    """
+    Check whether specified path exists (and is a directory, if isdir is True),
+    using cached directory entries of the parent directory (see get_dir_entries).
+    """
+    parent, name = os.path.split(os.path.normpath(path))
+    if name in ['', os.curdir, os.pardir]:
+        if isdir:
+            res = os.path.isdir(path)
+        else:
+            res = os.path.exists(path)
+    else:
+        entries, subdirs = get_dir_entries(parent)
+        if isdir:
+            res = subdirs is not None and name in subdirs
+        else:
+            res = entries is not None and name in entries
+
+    return res
+
 
 def get_class(name, default_class, map_class=None):
     """Return class based on default
@@ -124,14 +193,17 @@ class StrList(list):
         xs = [self.BEGIN] + self._str_self() + [self.END]
         return str(self.SEPARATOR).join([str(x) for x in xs if self._str_ok(x)])
 
-    def __getattribute__(self, attr_name):
-        """Filter out function calls from Variables class"""
-        if attr_name == 'nappend_el':
-            return self.append
-        elif attr_name == 'nextend_el':
-            return self.extend
-        else:
-            return super(StrList, self).__getattribute__(attr_name)
+    # filter out function calls from Variables class
+    # (defined as properties rather than by overriding __getattribute__, which slows down every attribute access)
+    @property
+    def nappend_el(self):
+        """Alias for append"""
+        return self.append
+
+    @property
+    def nextend_el(self):
+        """Alias for extend"""
+        return self.extend
 
     def copy(self):
         """Return copy of self"""
@@ -174,7 +246,7 @@ class AbsPathList(StrList):
             abs_path = os.path.join(prefix, path)
             if filename is not None:
                 abs_path = os.path.join(abs_path, filename)
-            if os.path.exists(abs_path):
+            if path_exists(abs_path):
                 self.append(abs_path)
                 self.log.devel("append_exists: added absolute path %s", abs_path)
                 if not append_all:
@@ -194,7 +266,7 @@ class AbsPathList(StrList):
             else:
                 directory = os.path.join(base, subdir)
 
-            if os.path.isdir(directory):
+            if path_exists(directory, isdir=True):
                 self.append(directory)
                 self.log.devel("append_subdirs: added directory %s", directory)
             else:
@@ -465,24 +537,34 @@ class Variables(dict):
         """Return the class associated with the name according to the DEFAULT_CLASS and MAP_CLASS"""
         return get_class(name, self.DEFAULT_CLASS, self.MAP_CLASS)
 
-    def get_instance(self, name=None):
-        """Return an instance of the class"""
-        list_class = self.get_list_class(name)
-        element_class = self.get_element_class(name)
+    def get_instance_class(self, name=None):
+        """Return (cached) list class to use for instances for the specified name, see get_instance"""
+        key = (self.__class__, name)
+        klass = _instance_classes.get(key)
+
+        if klass is None:
+            list_class = self.get_list_class(name)
+            element_class = self.get_element_class(name)
 
-        class klass(list_class):
-            DEFAULT_CLASS = element_class
+            class klass(list_class):
+                DEFAULT_CLASS = element_class
 
-            SEPARATOR = element_class.SEPARATOR
+                SEPARATOR = element_class.SEPARATOR
 
-            SANITIZE_REMOVE_DUPLICATE = element_class.SANITIZE_REMOVE_DUPLICATE_KEEP is not None
-            SANITIZE_REMOVE_DUPLICATE_KEEP = element_class.SANITIZE_REMOVE_DUPLICATE_KEEP
+                SANITIZE_REMOVE_DUPLICATE = element_class.SANITIZE_REMOVE_DUPLICATE_KEEP is not None
+                SANITIZE_REMOVE_DUPLICATE_KEEP = element_class.SANITIZE_REMOVE_DUPLICATE_KEEP
 
-            JOIN_BEGIN_END = element_class.JOIN_BEGIN_END
+                JOIN_BEGIN_END = element_class.JOIN_BEGIN_END
 
-        # better log messages (most use self.__class__.__name__; would give klass otherwise)
-        klass.__name__ = "%s_%s" % (self.__class__.__name__, name)
-        return klass()
+            # better log messages (most use self.__class__.__name__; would give klass otherwise)
+            klass.__name__ = "%s_%s" % (self.__class__.__name__, name)
+            _instance_classes[key] = klass
+
+        return klass
+
+    def get_instance(self, name=None):
+        """Return an instance of the class"""
+        return self.get_instance_class(name)()
 
     def join(self, name, *others):
         """Join all values in others into name
@@ -535,8 +617,9 @@ class Variables(dict):
             self.log.devel("try_function_el: name %s function_name %s", name, function_name)
             self[name].try_function_on_element(function_name, args=args, kwargs=kwargs)
 
-    def __getattribute__(self, attr_name):
+    def __getattr__(self, attr_name):
         # allow for pass-through
+        # (only called for attributes that are not found the usual way, so regular attribute access is not slowed down)
         if attr_name in ['nappend', 'nextend', 'append_empty', 'first', 'get_class']:
             self.log.devel("Passthrough to LISTCLASS function %s", attr_name)
 
@@ -563,5 +646,4 @@ class Variables(dict):
                 return res
             return _passthrough
         else:
-            return super(Variables, self).__getattribute__(attr_name)
-
+            raise AttributeError("'%s' object has no attribute '%s'" % (self.__class__.__name__, attr_name))
@@ -26,13 +26,16 @@
 Unit tests for docs.py.
 """
 import inspect
+import json
 import os
 import re
 import sys
 from unittest import TextTestRunner
 
+from easybuild.framework.easyconfig.tweak import find_matching_easyconfigs
 from easybuild.tools.config import module_classes
 from easybuild.tools.docs import avail_easyconfig_licenses, gen_easyblocks_overview_rst, list_software
+from easybuild.tools.filetools import copy_file, read_file, write_file
 from easybuild.tools.utilities import import_available_modules
 from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered, init_config
 
@@ -286,6 +289,53 @@ class DocsTest(EnhancedTestCase):
         expected_found = any([lines[i:i+len(expected)] == expected for i in range(len(lines))])
         self.assertTrue(expected_found, "%s found in: %s" % (expected, lines))
 
+        # result should be the same when easyconfig files are parsed in a single process
+        build_options.update({'parallel': 1})
+        init_config(build_options=build_options)
+        self.assertEqual(list_software(output_format='rst', detailed=True), txt)
+
+        # also test with multiple worker processes
+        build_options.update({'parallel': 3})
+        init_config(build_options=build_options)
+        self.assertEqual(list_software(output_format='rst', detailed=True), txt)
+
+        # information on software can be cached across sessions
+        cache_path = os.path.join(self.test_prefix, 'list_software_cache.json')
+        build_options.update({'list_software_cache': cache_path})
+        init_config(build_options=build_options)
+        self.assertEqual(list_software(output_format='rst', detailed=True), txt)
+        cached = json.loads(read_file(cache_path))
+        ec_paths = find_matching_easyconfigs('*', '*', build_options['robot_path'])
+        self.assertEqual(len(cached), len(ec_paths))
+        self.assertEqual(list_software(output_format='rst', detailed=True), txt)
+        self.assertEqual(json.loads(read_file(cache_path)), cached)
+
+        # cached information is used, unless easyconfig file was changed
+        toy_ec = os.path.join(self.test_prefix, 'toy-0.0.eb')
+        copy_file(os.path.join(build_options['robot_path'][0], 't', 'toy', 'toy-0.0.eb'), toy_ec)
+        build_options['robot_path'].append(self.test_prefix)
+        init_config(build_options=build_options)
+        txt = list_software(output_format='txt', detailed=True)
+        self.assertTrue("Toy C program, 100% toy." in txt)
+
+        # easyconfig files with same name and contents share the same entry in the cache
+        cached = json.loads(read_file(cache_path))
+        self.assertEqual(len(cached), len(ec_paths))
+        for entry in cached.values():
+            entry[1]['description'] = entry[1]['description'].replace('100% toy', 'cached toy')
+        write_file(cache_path, json.dumps(cached))
+        txt = list_software(output_format='txt', detailed=True)
+        self.assertTrue("Toy C program, cached toy." in txt)
+
+        # description of last easyconfig file that was found is used
+        write_file(toy_ec, "\ndescription = 'changed toy'", append=True)
+        txt = list_software(output_format='txt', detailed=True)
+        self.assertFalse("Toy C program, cached toy." in txt)
+        self.assertTrue("changed toy" in txt)
+        self.assertTrue("  * toy v0.0: gompi/2018a, system" in txt)
+        self.assertEqual(len(json.loads(read_file(cache_path))), len(ec_paths) + 1)
+        self.assertTrue("changed toy" in read_file(cache_path))
+
 
 def suite():
     """ returns all test cases in this module """
@@ -644,6 +644,22 @@ class EasyBlockTest(EnhancedTestCase):
         expected = tc_load + '\n\n' + fftw_load + '\n\n' + lapack_load
         self.assertEqual(eb.make_module_dep(unload_info=unload_info).strip(), expected)
 
+        # dependencies to load are only determined once, and reused for subsequent module files (fake vs final)
+        self.assertEqual(eb.module_load_deps['deps'], ['gompi/2018a', 'FFTW/3.3.7-gompi-2018a',
+                                                       'OpenBLAS/0.2.20-GCC-6.4.0-2.28'])
+
+        def fail_path_to_top(*args, **kwargs):
+            raise EasyBuildError("path_to_top_of_module_tree should not be called again")
+
+        eb.modules_tool.path_to_top_of_module_tree = fail_path_to_top
+        self.assertEqual(eb.make_module_dep(unload_info=unload_info).strip(), expected)
+
+        # changes to list of dependencies are taken into account
+        eb.toolchain.dependencies[0]['build_only'] = True
+        error_pattern = "path_to_top_of_module_tree should not be called again"
+        self.assertErrorRegex(EasyBuildError, error_pattern, eb.make_module_dep)
+        del eb.modules_tool.path_to_top_of_module_tree
+
     def test_make_module_dep_hmns(self):
         """Test for make_module_dep under HMNS"""
         test_ecs_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
@@ -37,6 +37,8 @@ import shutil
 import stat
 import sys
 import tempfile
+import time
+import types
 from distutils.version import LooseVersion
 from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered, init_config
 from unittest import TextTestRunner
@@ -46,9 +48,11 @@ import easybuild.framework.easyconfig as easyconfig
 import easybuild.tools.systemtools as st
 from easybuild.framework.easyblock import EasyBlock
 from easybuild.framework.easyconfig.constants import EXTERNAL_MODULE_MARKER
-from easybuild.framework.easyconfig.easyconfig import ActiveMNS, EasyConfig, create_paths, copy_easyconfigs
+from easybuild.framework.easyconfig.easyconfig import ActiveMNS, EasyConfig, EasyConfigRecord, create_paths
+from easybuild.framework.easyconfig.easyconfig import avail_easyblock_modules, copy_easyconfigs
 from easybuild.framework.easyconfig.easyconfig import det_subtoolchain_version, fix_deprecated_easyconfigs
-from easybuild.framework.easyconfig.easyconfig import is_generic_easyblock, get_easyblock_class, get_module_path
+from easybuild.framework.easyconfig.easyconfig import is_avail_easyblock_module, is_generic_easyblock
+from easybuild.framework.easyconfig.easyconfig import get_easyblock_class, get_module_path
 from easybuild.framework.easyconfig.easyconfig import letter_dir_for, process_easyconfig, resolve_template
 from easybuild.framework.easyconfig.easyconfig import triage_easyconfig_params, verify_easyconfig_filename
 from easybuild.framework.easyconfig.licenses import License, LicenseGPLv3
@@ -56,6 +60,7 @@ from easybuild.framework.easyconfig.parser import EasyConfigParser, fetch_parame
 from easybuild.framework.easyconfig.templates import template_constant_dict, to_template_str
 from easybuild.framework.easyconfig.style import check_easyconfigs_style
 from easybuild.framework.easyconfig.tools import categorize_files_by_type, check_sha256_checksums, dep_graph
+from easybuild.framework.easyconfig.tools import det_easyblock_checksums
 from easybuild.framework.easyconfig.tools import find_related_easyconfigs, get_paths_for, parse_easyconfigs
 from easybuild.framework.easyconfig.tweak import obtain_ec_for, tweak_one
 from easybuild.framework.extension import resolve_exts_filter_template
@@ -66,6 +71,7 @@ from easybuild.tools.configobj import ConfigObj
 from easybuild.tools.docs import avail_easyconfig_constants, avail_easyconfig_templates
 from easybuild.tools.filetools import adjust_permissions, change_dir, copy_file, mkdir, read_file
 from easybuild.tools.filetools import remove_dir, remove_file, symlink, write_file
+from easybuild.tools.module_naming_scheme.easybuild_mns import EasyBuildMNS
 from easybuild.tools.module_naming_scheme.toolchain import det_toolchain_compilers, det_toolchain_mpi
 from easybuild.tools.module_naming_scheme.utilities import det_full_ec_version
 from easybuild.tools.options import parse_external_modules_metadata
@@ -1227,6 +1233,42 @@ class EasyConfigTest(EnhancedTestCase):
         self.mock_stderr(False)
         easybuild.tools.build_log.CURRENT_VERSION = orig_value
 
+    def test_avail_easyblock_modules(self):
+        """Test index of available easyblock modules."""
+        import easybuild.easyblocks
+
+        modules = avail_easyblock_modules()
+        self.assertTrue('toy' in modules)
+        self.assertTrue('generic' in modules)
+        self.assertFalse('gzip' in modules)
+
+        self.assertTrue(is_avail_easyblock_module('easybuild.easyblocks.toy'))
+        self.assertFalse(is_avail_easyblock_module('easybuild.easyblocks.gzip'))
+        # generic easyblocks or modules outside of easyblocks package are not indexed
+        self.assertTrue(is_avail_easyblock_module('easybuild.easyblocks.generic.nosuchgenericeasyblock'))
+        self.assertTrue(is_avail_easyblock_module('easybuild.tools.nosuchmodule'))
+
+        # easyblock added to easyblocks package directory is picked up
+        easyblocks_dir = os.path.join(self.test_prefix, 'easyblocks')
+        write_file(os.path.join(easyblocks_dir, '__init__.py'), '')
+        orig_path = easybuild.easyblocks.__path__[:]
+        easybuild.easyblocks.__path__.insert(0, easyblocks_dir)
+        try:
+            self.assertFalse(is_avail_easyblock_module('easybuild.easyblocks.gzip'))
+            gzip_txt = '\n'.join([
+                "from easybuild.framework.easyblock import EasyBlock",
+                "class EB_gzip(EasyBlock):",
+                "    pass",
+            ])
+            write_file(os.path.join(easyblocks_dir, 'gzip.py'), gzip_txt)
+            # make sure modification time of directory changes, regardless of timestamp resolution
+            os.utime(easyblocks_dir, (time.time() + 10, time.time() + 10))
+            self.assertTrue(is_avail_easyblock_module('easybuild.easyblocks.gzip'))
+            self.assertEqual(get_easyblock_class(None, name='gzip').__name__, 'EB_gzip')
+        finally:
+            easybuild.easyblocks.__path__[:] = orig_path
+            del sys.modules['easybuild.easyblocks.gzip']
+
     def test_letter_dir(self):
         """Test letter_dir_for function."""
         test_cases = {
@@ -1374,6 +1416,7 @@ class EasyConfigTest(EnhancedTestCase):
         # copy classes before reloading, so we can restore them (other isinstance checks fail)
         orig_EasyConfig = copy.deepcopy(easyconfig.easyconfig.EasyConfig)
         orig_ActiveMNS = copy.deepcopy(easyconfig.easyconfig.ActiveMNS)
+        orig_EasyConfigRecord = copy.deepcopy(easyconfig.easyconfig.EasyConfigRecord)
         reload(easyconfig.parser)
 
         for key, (newkey, depr_ver) in easyconfig.parser.DEPRECATED_PARAMETERS.items():
@@ -1401,6 +1444,7 @@ class EasyConfigTest(EnhancedTestCase):
         reload(easyconfig.easyconfig)
         easyconfig.easyconfig.EasyConfig = orig_EasyConfig
         easyconfig.easyconfig.ActiveMNS = orig_ActiveMNS
+        easyconfig.easyconfig.EasyConfigRecord = orig_EasyConfigRecord
 
     def test_unknown_easyconfig_parameter(self):
         """Check behaviour when unknown easyconfig parameters are used."""
@@ -3859,6 +3903,101 @@ class EasyConfigTest(EnhancedTestCase):
             value = resolve_exts_filter_template(exts_filter, TestExtension(ext))
             self.assertEqual(value, expected_value)
 
+    def test_easyconfig_record(self):
+        """Test use of compact records for parsed easyconfigs."""
+        test_ecs_dir = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'easyconfigs', 'test_ecs')
+        ec_file = os.path.join(test_ecs_dir, 'o', 'OpenMPI', 'OpenMPI-2.1.2-GCC-6.4.0-2.28.eb')
+        build_options = {
+            'robot_path': [test_ecs_dir],
+            'valid_module_classes': module_classes(),
+        }
+        init_config(build_options=build_options)
+
+        ecs = process_easyconfig(ec_file, compact=True)
+        self.assertEqual(len(ecs), 1)
+        full_ec = process_easyconfig(ec_file)[0]
+        rec = ecs[0]['ec']
+
+        self.assertTrue(isinstance(rec, EasyConfigRecord))
+        self.assertEqual(ecs[0]['full_mod_name'], 'OpenMPI/2.1.2-GCC-6.4.0-2.28')
+        self.assertEqual(ecs[0]['dependencies'], full_ec['dependencies'])
+
+        # retained information is available without creating a full EasyConfig instance
+        self.assertEqual(rec['name'], 'OpenMPI')
+        self.assertEqual(rec.get('versionsuffix'), '')
+        self.assertEqual(rec['toolchain'], {'name': 'GCC', 'version': '6.4.0-2.28'})
+        self.assertEqual(rec.toolchain_spec, {'name': 'GCC', 'version': '6.4.0-2.28'})
+        self.assertEqual(rec.path, ec_file)
+        self.assertEqual(rec.full_mod_name, 'OpenMPI/2.1.2-GCC-6.4.0-2.28')
+        self.assertEqual(EasyBuildMNS().det_full_module_name(rec), rec.full_mod_name)
+        self.assertEqual(det_full_ec_version(rec), '2.1.2-GCC-6.4.0-2.28')
+        self.assertEqual(rec._ec, None)
+        self.assertEqual(repr(rec), 'EasyConfigRecord(%s)' % ec_file)
+
+        # compact records are cached separately
+        self.assertTrue(process_easyconfig(ec_file, compact=True)[0]['ec'] is rec)
+        self.assertTrue(isinstance(full_ec['ec'], EasyConfig))
+
+        # comparing records and computing hash values doesn't require a full EasyConfig instance
+        rec_bis = EasyConfigRecord(full_ec['ec'])
+        self.assertEqual(rec, rec_bis)
+        self.assertFalse(rec != rec_bis)
+        self.assertEqual(rec, full_ec['ec'])
+        self.assertEqual(len(set([rec, rec_bis])), 1)
+        self.assertTrue(rec_bis in [rec])
+        self.assertNotEqual(rec, EasyConfigRecord(process_easyconfig(ec_file, hidden=True)[0]['ec']))
+        self.assertNotEqual(rec, None)
+        self.assertEqual(rec._ec, None)
+        self.assertEqual(rec_bis._ec, None)
+
+        # retained information is read-only
+        error_pattern = "Attribute 'full_mod_name' of EasyConfigRecord instance can not be changed"
+        self.assertErrorRegex(EasyBuildError, error_pattern, setattr, rec, 'full_mod_name', 'foo')
+        self.assertEqual(rec._ec, None)
+
+        # 'toolchain' attribute is a Toolchain instance, just like for a full EasyConfig instance
+        # (full EasyConfig instance is created on demand for it)
+        self.assertEqual(rec.toolchain.as_dict(), full_ec['ec'].toolchain.as_dict())
+        self.assertTrue(isinstance(rec._ec, EasyConfig))
+        self.assertTrue(rec.toolchain is rec._ec.toolchain)
+
+        # full EasyConfig instance is created on demand
+        object.__setattr__(rec, '_ec', None)
+        self.assertEqual(rec['homepage'], 'http://www.open-mpi.org/')
+        self.assertTrue(isinstance(rec._ec, EasyConfig))
+        self.assertTrue(rec.materialize() is rec._ec)
+        self.assertEqual(rec, full_ec['ec'])
+        self.assertEqual(rec.dependencies(), full_ec['ec'].dependencies())
+
+        rec.set_default_module = True
+        self.assertTrue(rec.materialize().set_default_module)
+        rec['versionsuffix'] = '-test'
+        self.assertEqual(rec['versionsuffix'], '-test')
+        self.assertEqual(rec.versionsuffix, '-test')
+
+        # EasyBlock instance can be created for compact record
+        eb = EasyBlock(rec)
+        self.assertTrue(eb.cfg is rec.materialize())
+
+    def test_det_easyblock_checksums(self):
+        """Test det_easyblock_checksums function."""
+        from easybuild.easyblocks.toy import EB_toy
+
+        res = det_easyblock_checksums(EB_toy)
+        self.assertEqual(len(res), 1)
+        self.assertEqual(res[0][0], 'toy.py')
+        self.assertTrue(re.match('^[0-9a-f]{64}$', res[0][1]))
+
+        # easyblocks for which source file can not be found are not included
+        fake_mod = types.ModuleType('fake_easyblock')
+        fake_mod.__file__ = os.path.join(self.test_prefix, 'fake_easyblock.pyc')
+        sys.modules['fake_easyblock'] = fake_mod
+        try:
+            fake_class = type('EB_fake', (EB_toy,), {'__module__': 'fake_easyblock'})
+            self.assertEqual(det_easyblock_checksums(fake_class), res)
+        finally:
+            del sys.modules['fake_easyblock']
+
 
 def suite():
     """ returns all the testcases in this module """
@@ -32,6 +32,7 @@ import sys
 from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered
 from unittest import TextTestRunner
 
+import easybuild.framework.easyconfig.format.pyheaderconfigobj as pyheaderconfigobj
 import easybuild.tools.build_log
 from easybuild.framework.easyconfig.format.format import Dependency
 from easybuild.framework.easyconfig.format.pyheaderconfigobj import build_easyconfig_constants_dict
@@ -194,6 +195,47 @@ class EasyConfigParserTest(EnhancedTestCase):
         self.assertEqual(constants['GPLv2'], 'LicenseGPLv2')
         self.assertEqual(constants['EXTERNAL_MODULE'], 'EXTERNAL_MODULE')
 
+    def test_pyheader_env_code_cache(self):
+        """Test caching of pyheader environment template and compiled pyheaders."""
+        ec_txt = '\n'.join([
+            "easyblock = 'ConfigureMake'",
+            "name = 'test'",
+            "version = '1.0'",
+            "homepage = 'https://example.com'",
+            "description = 'test'",
+            "toolchain = SYSTEM",
+        ])
+
+        pyheaderconfigobj._pyheader_code_cache.clear()
+
+        ecp = EasyConfigParser(rawcontent=ec_txt)
+        ec = ecp.get_config_dict()
+        self.assertEqual(ec['toolchain'], {'name': 'system', 'version': 'system'})
+        self.assertEqual(len(pyheaderconfigobj._pyheader_code_cache), 1)
+
+        # modifying (mutable) values obtained via constants doesn't affect subsequent parsing
+        ec['toolchain']['name'] = 'GCC'
+        ec2 = EasyConfigParser(rawcontent=ec_txt).get_config_dict()
+        self.assertEqual(ec2['toolchain'], {'name': 'system', 'version': 'system'})
+        self.assertEqual(ecp._formatter.pyheader_env()['SYSTEM'], {'name': 'system', 'version': 'system'})
+
+        # compiled pyheader was reused
+        self.assertEqual(len(pyheaderconfigobj._pyheader_code_cache), 1)
+
+        # constants are not retained as easyconfig parameters
+        self.assertFalse('SYSTEM' in ec2)
+        self.assertFalse('SOURCE_TAR_GZ' in ec2)
+
+        # different pyheader results in another cached code object
+        ec3 = EasyConfigParser(rawcontent=ec_txt.replace("'1.0'", "'2.0'")).get_config_dict()
+        self.assertEqual(ec3['version'], '2.0')
+        self.assertEqual(len(pyheaderconfigobj._pyheader_code_cache), 2)
+
+        # errors are still reported with line numbers
+        error_pattern = "Parsing easyconfig file failed: name 'foo' is not defined \\(line 2\\)"
+        self.assertErrorRegex(EasyBuildError, error_pattern, EasyConfigParser,
+                              rawcontent=ec_txt.replace("name = 'test'", "name = foo"))
+
     def test_check_value_types(self):
         """Test checking of easyconfig parameter value types."""
         test_ec = os.path.join(TESTDIRBASE, 'test_ecs', 'g', 'gzip', 'gzip-1.4-broken.eb')
@@ -131,6 +131,93 @@ class EnvironmentTest(EnhancedTestCase):
         }
         self.assertEqual(res, expected)
 
+    def test_setvars(self):
+        """Test setvars function."""
+        for key in ['TEST_ENV_VAR1', 'TEST_ENV_VAR2']:
+            if key in os.environ:
+                del os.environ[key]
+
+        env.setvars({'TEST_ENV_VAR1': 'foo', 'TEST_ENV_VAR2': 'bar'})
+        self.assertEqual(os.getenv('TEST_ENV_VAR1'), 'foo')
+        self.assertEqual(os.getenv('TEST_ENV_VAR2'), 'bar')
+
+        # list of tuples also works, order is retained
+        env.setvars([('TEST_ENV_VAR1', 'one'), ('TEST_ENV_VAR1', 'two')])
+        self.assertEqual(os.getenv('TEST_ENV_VAR1'), 'two')
+
+        # changes are tracked, just like with setvar
+        changes = env.get_changes()
+        self.assertEqual(changes['TEST_ENV_VAR1'], 'two')
+        self.assertEqual(changes['TEST_ENV_VAR2'], 'bar')
+
+        build_options = {
+            'extended_dry_run': True,
+            'silent': False,
+        }
+        init_config(build_options=build_options)
+        self.mock_stdout(True)
+        env.setvars({'TEST_ENV_VAR2': 'foobar', 'TEST_ENV_VAR1': 'barfoo'})
+        txt = self.get_stdout()
+        self.mock_stdout(False)
+        self.assertEqual(txt, "  export TEST_ENV_VAR1='barfoo'\n  export TEST_ENV_VAR2='foobar'\n")
+
+    def test_env_transaction(self):
+        """Test env_transaction context manager."""
+        os.environ['TEST_ENV_VAR_CHANGED'] = 'old_value'
+        os.environ['TEST_ENV_VAR_TO_UNSET'] = 'foobar'
+        if 'TEST_NEW_ENV_VAR' in os.environ:
+            del os.environ['TEST_NEW_ENV_VAR']
+
+        orig_env = env.snapshot_env()
+
+        with env.env_transaction() as journal:
+            env.setvar('TEST_ENV_VAR_CHANGED', 'new_value')
+            env.setvar('TEST_ENV_VAR_CHANGED', 'newer_value')
+            env.setvar('TEST_NEW_ENV_VAR', 'test123')
+            env.unset_env_vars(['TEST_ENV_VAR_TO_UNSET'])
+
+            # nested transactions are reported by enclosing transaction
+            with env.env_transaction():
+                env.setvar('TEST_NEW_ENV_VAR', 'test1234')
+
+        expected = [
+            ('TEST_ENV_VAR_CHANGED', 'old_value', 'new_value'),
+            ('TEST_ENV_VAR_CHANGED', 'new_value', 'newer_value'),
+            ('TEST_NEW_ENV_VAR', None, 'test123'),
+            ('TEST_ENV_VAR_TO_UNSET', 'foobar', None),
+            ('TEST_NEW_ENV_VAR', 'test123', 'test1234'),
+        ]
+        self.assertEqual(journal, expected)
+        self.assertEqual(os.getenv('TEST_ENV_VAR_CHANGED'), 'newer_value')
+        self.assertEqual(os.getenv('TEST_NEW_ENV_VAR'), 'test1234')
+        self.assertEqual(os.getenv('TEST_ENV_VAR_TO_UNSET'), None)
+
+        # only changed keys are reported when comparing with snapshot
+        to_set, to_unset = env.diff_env(env.snapshot_env(), orig_env)
+        self.assertEqual(to_set, {'TEST_ENV_VAR_CHANGED': 'old_value', 'TEST_ENV_VAR_TO_UNSET': 'foobar'})
+        self.assertEqual(to_unset, ['TEST_NEW_ENV_VAR'])
+
+        env.restore_env(orig_env)
+        self.assertEqual(env.snapshot_env(), orig_env)
+
+        # changes are undone when rollback is enabled
+        with env.env_transaction(rollback=True):
+            env.setvars({'TEST_ENV_VAR_CHANGED': 'foo', 'TEST_NEW_ENV_VAR': 'bar'})
+            env.unset_env_vars(['TEST_ENV_VAR_TO_UNSET'])
+            env.setvar('TEST_ENV_VAR_TO_UNSET', 'baz')
+            self.assertEqual(os.getenv('TEST_ENV_VAR_CHANGED'), 'foo')
+
+        self.assertEqual(env.snapshot_env(), orig_env)
+
+        # changes are also undone when an error occurs
+        try:
+            with env.env_transaction(rollback=True):
+                env.setvar('TEST_NEW_ENV_VAR', 'foo')
+                raise ValueError("oops")
+        except ValueError:
+            pass
+        self.assertEqual(os.getenv('TEST_NEW_ENV_VAR'), None)
+
     def test_sanitize_env(self):
         """Test sanitize_env function."""
 
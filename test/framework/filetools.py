@@ -33,17 +33,22 @@ Unit tests for filetools.py
 """
 import datetime
 import glob
+import json
 import os
 import re
 import shutil
+import socket
 import stat
+import subprocess
 import sys
 import tempfile
+import threading
 import time
 from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered, init_config
 from unittest import TextTestRunner
 
 import easybuild.tools.filetools as ft
+import easybuild.tools.multidiff as mdiff
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.multidiff import multidiff
 from easybuild.tools.py2vs3 import std_urllib
@@ -681,6 +686,74 @@ class FileToolsTest(EnhancedTestCase):
         # test use of 'mode' in read_file
         self.assertEqual(ft.read_file(foo, mode='rb'), b'bar')
 
+    def test_write_file_atomic(self):
+        """Test write_file_atomic function."""
+        fp = os.path.join(self.test_prefix, 'subdir', 'test.json')
+        ft.write_file_atomic(fp, '{}')
+        self.assertEqual(ft.read_file(fp), '{}')
+
+        # existing file is replaced, no temporary files are left behind
+        ft.write_file_atomic(fp, b'{"foo": "bar"}')
+        self.assertEqual(ft.read_file(fp), '{"foo": "bar"}')
+        self.assertEqual(os.listdir(os.path.dirname(fp)), ['test.json'])
+
+        # permissions are determined by umask, not restricted to owner like for temporary files
+        umask = os.umask(0o022)
+        try:
+            ft.write_file_atomic(fp, 'test')
+        finally:
+            os.umask(umask)
+        self.assertEqual(os.stat(fp).st_mode & 0o777, 0o644)
+
+        # umask is process-wide, so it should not be changed (not even temporarily)
+        def fail_umask(*args):
+            raise AssertionError("umask should not be changed")
+
+        orig_umask = os.umask
+        os.umask = fail_umask
+        try:
+            ft.write_file_atomic(fp, 'test')
+        finally:
+            os.umask = orig_umask
+        self.assertEqual(ft.read_file(fp), 'test')
+
+        # no file is written in dry run mode, unless forced
+        init_config(build_options={'extended_dry_run': True, 'silent': True})
+        fp2 = os.path.join(self.test_prefix, 'test2.txt')
+        ft.write_file_atomic(fp2, 'test')
+        self.assertFalse(os.path.exists(fp2))
+        ft.write_file_atomic(fp2, 'test', forced=True)
+        self.assertEqual(ft.read_file(fp2), 'test')
+
+        # failure to write leaves existing file untouched
+        init_config()
+        adjust = os.path.dirname(fp)
+        ft.adjust_permissions(adjust, stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH, add=False, recursive=False)
+        try:
+            self.assertErrorRegex(EasyBuildError, "Failed to write", ft.write_file_atomic, fp, 'foo')
+        finally:
+            ft.adjust_permissions(adjust, stat.S_IWUSR, add=True, recursive=False)
+        self.assertEqual(ft.read_file(fp), 'test')
+
+    def test_copy_file_atomic(self):
+        """Test copy_file_atomic function."""
+        src = os.path.join(self.test_prefix, 'src.bin')
+        ft.write_file(src, b'\x00\x01foo')
+        target = os.path.join(self.test_prefix, 'subdir', 'target.bin')
+        ft.copy_file_atomic(src, target)
+        self.assertEqual(ft.read_file(target, mode='rb'), b'\x00\x01foo')
+
+        # existing file is replaced, no temporary files are left behind
+        ft.write_file(src, 'bar')
+        ft.copy_file_atomic(src, target)
+        self.assertEqual(ft.read_file(target), 'bar')
+        self.assertEqual(os.listdir(os.path.dirname(target)), ['target.bin'])
+
+        # failure to copy leaves no temporary files behind
+        self.assertErrorRegex(EasyBuildError, "Failed to copy", ft.copy_file_atomic, src + 'nosuchfile', target)
+        self.assertEqual(os.listdir(os.path.dirname(target)), ['target.bin'])
+        self.assertEqual(ft.read_file(target), 'bar')
+
     def test_is_binary(self):
         """Test is_binary function."""
 
@@ -954,6 +1027,48 @@ class FileToolsTest(EnhancedTestCase):
 
         self.assertEqual(lines[-1], "=====")
 
+    def test_multidiff_similar(self):
+        """Test selecting most similar files and caching of differences in multidiff."""
+        test_easyconfigs = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
+        toy_ec = os.path.join(test_easyconfigs, 't', 'toy', 'toy-0.0.eb')
+        other_toy_ecs = [
+            os.path.join(test_easyconfigs, 't', 'toy', 'toy-0.0-gompi-2018a-test.eb'),
+            os.path.join(test_easyconfigs, 't', 'toy', 'toy-0.0-deps.eb'),
+        ]
+
+        toy_lines = ft.read_file(toy_ec).split('\n')
+        toy_shingles = mdiff.det_shingles(toy_lines)
+        self.assertEqual(mdiff.det_similarity(toy_shingles, toy_shingles), 1.0)
+        self.assertEqual(mdiff.det_similarity(toy_shingles, mdiff.det_shingles(['foo', 'bar'])), 0.0)
+        self.assertEqual(mdiff.det_similarity(set(), set()), 1.0)
+        # empty lines and leading/trailing whitespace are not relevant
+        self.assertEqual(mdiff.det_shingles(['foo', '', '  bar ']), mdiff.det_shingles(['foo', 'bar']))
+
+        files_lines = [(fp, ft.read_file(fp).split('\n')) for fp in other_toy_ecs + [toy_ec]]
+        res = mdiff.select_similar_files(toy_lines, files_lines, 2)
+        self.assertEqual([fp for (fp, _) in res], [other_toy_ecs[1], toy_ec])
+
+        # only most similar file is considered if only one file should be compared with
+        res = multidiff(toy_ec, other_toy_ecs, colored=False, max_files=1)
+        self.assertTrue(res.startswith("Comparing toy-0.0.eb with toy-0.0-deps.eb\n"))
+        self.assertEqual(res, multidiff(toy_ec, other_toy_ecs[1:], colored=False))
+
+        # differences are cached, based on checksums of files
+        self.assertEqual(len(mdiff._diff_cache), 1)
+        expected = multidiff(toy_ec, other_toy_ecs, colored=False)
+        self.assertEqual(len(mdiff._diff_cache), 2)
+
+        copied_toy_ec = os.path.join(self.test_prefix, 'toy.eb')
+        ft.copy_file(other_toy_ecs[0], copied_toy_ec)
+        res = multidiff(toy_ec, [copied_toy_ec, other_toy_ecs[1]], colored=False)
+        self.assertEqual(len(mdiff._diff_cache), 2)
+        self.assertTrue(res.startswith("Comparing toy-0.0.eb with toy.eb, toy-0.0-deps.eb\n"))
+
+        # same result when differences are determined in parallel
+        mdiff._diff_cache.clear()
+        init_config(build_options={'parallel': 2})
+        self.assertEqual(multidiff(toy_ec, other_toy_ecs, colored=False), expected)
+
     def test_weld_paths(self):
         """Test weld_paths."""
         # works like os.path.join is there's no overlap
@@ -1578,6 +1693,83 @@ class FileToolsTest(EnhancedTestCase):
         self.assertTrue(sorted(os.listdir(to_copy)) == sorted(os.listdir(target_dir)))
         self.assertEqual(txt, '')
 
+    def test_copy_tree(self):
+        """Test copy_tree function, and use of --copy-mode in copy_dir."""
+        srcdir = os.path.join(self.test_prefix, 'src')
+        for idx in range(10):
+            ft.write_file(os.path.join(srcdir, 'sub%d' % (idx % 3), 'file%d.txt' % idx), str(idx) * (idx + 1))
+        script = os.path.join(srcdir, 'bin', 'script.sh')
+        ft.write_file(script, '#!/bin/bash\necho hello')
+        ft.adjust_permissions(script, stat.S_IXUSR)
+        ft.symlink('sub0', os.path.join(srcdir, 'sub_link'), use_abspath_source=False)
+        ft.symlink(os.path.join('..', 'bin', 'script.sh'), os.path.join(srcdir, 'sub1', 'script_link'),
+                   use_abspath_source=False)
+
+        def check_copy(target_dir, symlinks):
+            """Check result of copying source directory."""
+            for idx in range(10):
+                path = os.path.join(target_dir, 'sub%d' % (idx % 3), 'file%d.txt' % idx)
+                self.assertEqual(ft.read_file(path), str(idx) * (idx + 1))
+            copied_script = os.path.join(target_dir, 'bin', 'script.sh')
+            self.assertEqual(ft.read_file(copied_script), '#!/bin/bash\necho hello')
+            self.assertTrue(os.stat(copied_script).st_mode & stat.S_IXUSR)
+            self.assertEqual(os.path.islink(os.path.join(target_dir, 'sub_link')), symlinks)
+            expected = ['file0.txt', 'file3.txt', 'file6.txt', 'file9.txt']
+            self.assertEqual(sorted(os.listdir(os.path.join(target_dir, 'sub_link'))), expected)
+            script_link = os.path.join(target_dir, 'sub1', 'script_link')
+            self.assertEqual(os.path.islink(script_link), symlinks)
+            if symlinks:
+                self.assertEqual(os.readlink(script_link), os.path.join('..', 'bin', 'script.sh'))
+            self.assertEqual(ft.read_file(script_link), '#!/bin/bash\necho hello')
+
+        target_dir = os.path.join(self.test_prefix, 'target')
+        ft.copy_tree(srcdir, target_dir, symlinks=True, threads=4)
+        check_copy(target_dir, True)
+
+        # target directory must not exist yet, unless dirs_exist_ok is enabled
+        self.assertRaises(OSError, ft.copy_tree, srcdir, target_dir)
+        ft.write_file(os.path.join(srcdir, 'sub0', 'file0.txt'), 'updated')
+        ft.copy_tree(srcdir, target_dir, symlinks=True, dirs_exist_ok=True, threads=4)
+        self.assertEqual(ft.read_file(os.path.join(target_dir, 'sub0', 'file0.txt')), 'updated')
+        ft.write_file(os.path.join(srcdir, 'sub0', 'file0.txt'), '0')
+
+        target_dir = os.path.join(self.test_prefix, 'target_nosymlinks')
+        ft.copy_tree(srcdir, target_dir, threads=4)
+        check_copy(target_dir, False)
+
+        # entries can be ignored
+        target_dir = os.path.join(self.test_prefix, 'target_ignore')
+        ft.copy_tree(srcdir, target_dir, ignore=lambda _, names: [x for x in names if x in ['sub2', 'file3.txt']])
+        self.assertEqual(sorted(os.listdir(target_dir)), ['bin', 'sub0', 'sub1', 'sub_link'])
+        self.assertEqual(sorted(os.listdir(os.path.join(target_dir, 'sub0'))), ['file0.txt', 'file6.txt', 'file9.txt'])
+
+        # files are hard linked rather than copied, if requested
+        target_dir = os.path.join(self.test_prefix, 'target_hardlink')
+        ft.copy_tree(srcdir, target_dir, symlinks=True, hardlink=True, threads=4)
+        check_copy(target_dir, True)
+        self.assertTrue(os.path.samefile(script, os.path.join(target_dir, 'bin', 'script.sh')))
+
+        # copy_dir uses copy_tree if --copy-mode is set to 'parallel' or 'hardlink'
+        for copy_mode in ['parallel', 'hardlink']:
+            init_config(build_options={'copy_mode': copy_mode, 'copy_threads': 3})
+            target_dir = os.path.join(self.test_prefix, 'target_copy_dir_%s' % copy_mode)
+            ft.copy_dir(srcdir, target_dir, symlinks=True)
+            check_copy(target_dir, True)
+            self.assertEqual(os.path.samefile(script, os.path.join(target_dir, 'bin', 'script.sh')),
+                             copy_mode == 'hardlink')
+
+            # broken symlinks result in a clean error if symlinks=True is not used
+            ft.symlink(os.path.join(self.test_prefix, 'nosuchfile'), os.path.join(srcdir, 'broken_link'))
+            self.assertErrorRegex(EasyBuildError, "Failed to copy directory", ft.copy_dir, srcdir, target_dir + '_x')
+            ft.remove_file(os.path.join(srcdir, 'broken_link'))
+
+        # files are not hard linked if permissions of copied files are going to be changed
+        init_config(build_options={'copy_mode': 'hardlink', 'read_only_installdir': True})
+        target_dir = os.path.join(self.test_prefix, 'target_copy_dir_hardlink_read_only')
+        ft.copy_dir(srcdir, target_dir, symlinks=True)
+        check_copy(target_dir, True)
+        self.assertFalse(os.path.samefile(script, os.path.join(target_dir, 'bin', 'script.sh')))
+
     def test_copy(self):
         """Test copy function."""
         testdir = os.path.dirname(os.path.abspath(__file__))
@@ -2607,6 +2799,130 @@ class FileToolsTest(EnhancedTestCase):
         self.assertFalse(os.path.exists(lock_path))
         self.assertEqual(os.listdir(locks_dir), [])
 
+    def test_lock_owner_stale_locks(self):
+        """Test lock owner metadata, heartbeat and detection of stale locks."""
+
+        init_config(build_options={'silent': False})
+
+        lock_name = 'test_stale_lock'
+        lock_path = ft.det_lock_path(lock_name)
+
+        # lock owner metadata is recorded when lock is created, heartbeat thread is running while locks are held
+        ft.create_lock(lock_name)
+        self.assertEqual(os.listdir(lock_path), [ft.LOCK_OWNER_FILE])
+        owner = ft.read_lock_owner(lock_path)
+        self.assertEqual(owner['host'], socket.gethostname())
+        self.assertEqual(owner['pid'], os.getpid())
+        self.assertEqual(owner['pid_start'], ft.det_process_identity()['pid_start'])
+        self.assertTrue(owner['heartbeat'] <= time.time())
+        self.assertTrue(ft._lock_heartbeat['thread'].is_alive())
+
+        # lock held by live process is not stale
+        self.assertFalse(ft.is_stale_lock(lock_path))
+        self.assertErrorRegex(EasyBuildError, "Lock .* already exists", ft.check_lock, lock_name)
+
+        heartbeat_thread = ft._lock_heartbeat['thread']
+        ft.remove_lock(lock_name)
+        heartbeat_thread.join(5)
+        self.assertFalse(heartbeat_thread.is_alive())
+        self.assertEqual(ft._lock_heartbeat['thread'], None)
+
+        # lock without owner metadata is never considered stale
+        ft.mkdir(lock_path, parents=True)
+        self.assertEqual(ft.read_lock_owner(lock_path), None)
+        self.assertFalse(ft.is_stale_lock(lock_path))
+        self.assertErrorRegex(EasyBuildError, "Lock .* already exists", ft.check_lock, lock_name)
+
+        # lock created by a process on this host that no longer exists is stale, and is removed by check_lock
+        proc = subprocess.Popen(['true'])
+        proc_identity = ft.det_process_identity(pid=proc.pid)
+        proc.wait()
+        this_proc = ft.det_process_identity()
+        owner = {'host': socket.gethostname(), 'pid': proc.pid, 'start': '2020-01-01 12:34:56'}
+        owner.update(this_proc, pid_start=proc_identity['pid_start'])
+        owner_path = os.path.join(lock_path, ft.LOCK_OWNER_FILE)
+        ft.write_file(owner_path, json.dumps(owner))
+        self.assertTrue(ft.is_stale_lock(lock_path))
+
+        # lock is also stale if PID was reused by another process (different start time)
+        ft.write_file(owner_path, json.dumps(dict(owner, pid=os.getpid(), pid_start=this_proc['pid_start'] - 1)))
+        self.assertTrue(ft.is_stale_lock(lock_path))
+
+        # existence of process is not checked if lock was created in another PID namespace (e.g. in a container),
+        # during another boot, or if process identity was not recorded
+        for key in ['pid_ns', 'boot_id', 'pid_start']:
+            ft.write_file(owner_path, json.dumps(dict(owner, **{key: None})))
+            self.assertFalse(ft.is_stale_lock(lock_path))
+
+        ft.write_file(owner_path, json.dumps(owner))
+        self.mock_stderr(True)
+        ft.check_lock(lock_name)
+        stderr = self.get_stderr()
+        self.mock_stderr(False)
+        self.assertFalse(os.path.exists(lock_path))
+        self.assertEqual(os.listdir(os.path.dirname(lock_path)), [])
+        self.assertTrue("Removing stale lock %s" % lock_path in stderr)
+
+        # lock created on another host is only stale if heartbeat is too old
+        ft.mkdir(lock_path, parents=True)
+        owner_path = os.path.join(lock_path, ft.LOCK_OWNER_FILE)
+        owner = {'host': 'not-' + socket.gethostname(), 'pid': os.getpid(), 'start': '2020-01-01 12:34:56'}
+        ft.write_file(owner_path, json.dumps(owner))
+        self.assertFalse(ft.is_stale_lock(lock_path))
+
+        # some margin is taken into account for clock skew between hosts
+        old_heartbeat = time.time() - ft.LOCK_STALE_TIMEOUT - 10
+        os.utime(owner_path, (old_heartbeat, old_heartbeat))
+        self.assertFalse(ft.is_stale_lock(lock_path))
+
+        old_heartbeat -= ft.LOCK_CLOCK_SKEW_MARGIN
+        os.utime(owner_path, (old_heartbeat, old_heartbeat))
+        self.assertTrue(ft.is_stale_lock(lock_path))
+
+        # stale lock is not removed if it was replaced by another lock in the meantime
+        self.assertFalse(ft.remove_stale_lock(lock_path, dict(owner, pid=os.getpid() + 1)))
+        self.assertEqual(os.listdir(lock_path), [ft.LOCK_OWNER_FILE])
+        self.assertEqual(ft.read_lock_owner(lock_path)['pid'], os.getpid())
+        self.assertEqual(os.listdir(os.path.dirname(lock_path)), [os.path.basename(lock_path)])
+
+        # stale lock is not removed while another session claimed its removal
+        takeover_path = lock_path + ft.LOCK_TAKEOVER_SUFFIX
+        os.mkdir(takeover_path)
+        self.assertFalse(ft.remove_stale_lock(lock_path, ft.read_lock_owner(lock_path)))
+        self.assertTrue(os.path.exists(lock_path))
+        self.assertTrue(os.path.exists(takeover_path))
+
+        # claim is removed if it's too old (session that claimed removal of stale lock died)
+        old_claim = time.time() - ft.LOCK_STALE_TIMEOUT - ft.LOCK_CLOCK_SKEW_MARGIN - 10
+        os.utime(takeover_path, (old_claim, old_claim))
+        self.assertFalse(ft.remove_stale_lock(lock_path, ft.read_lock_owner(lock_path)))
+        self.assertTrue(os.path.exists(lock_path))
+        self.assertFalse(os.path.exists(takeover_path))
+
+        self.mock_stderr(True)
+        ft.check_lock(lock_name)
+        self.mock_stderr(False)
+        self.assertFalse(os.path.exists(lock_path))
+        self.assertEqual(os.listdir(os.path.dirname(lock_path)), [])
+
+    def test_check_lock_quick_release(self):
+        """Test whether release of a lock is noticed quickly, regardless of the waiting interval."""
+
+        init_config(build_options={'silent': True, 'wait_on_lock_interval': 60, 'wait_on_lock_limit': -1})
+
+        lock_name = 'test_quick_release'
+        lock_path = ft.det_lock_path(lock_name)
+        ft.mkdir(lock_path, parents=True)
+
+        timer = threading.Timer(1, ft.remove_dir, args=(lock_path,))
+        timer.start()
+        start = time.time()
+        ft.check_lock(lock_name)
+        timer.join()
+
+        self.assertFalse(os.path.exists(lock_path))
+        self.assertTrue(time.time() - start < 10)
+
 
 def suite():
     """ returns all the testcases in this module """
@@ -33,6 +33,8 @@ import os
 import random
 import re
 import sys
+import tarfile
+import time
 from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered, init_config
 from unittest import TextTestRunner
 
@@ -41,7 +43,7 @@ from easybuild.framework.easyconfig.tools import categorize_files_by_type
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.config import build_option, module_classes
 from easybuild.tools.configobj import ConfigObj
-from easybuild.tools.filetools import read_file, write_file
+from easybuild.tools.filetools import mkdir, read_file, remove_file, write_file
 from easybuild.tools.github import VALID_CLOSE_PR_REASONS
 from easybuild.tools.testing import post_easyconfigs_pr_test_report, session_state
 from easybuild.tools.py2vs3 import HTTPError, URLError, ascii_letters
@@ -374,6 +376,106 @@ class GithubTest(EnhancedTestCase):
         self.assertTrue(re.match('^[0-9a-f]{40}$', read_file(shafile)))
         self.assertTrue(os.path.exists(os.path.join(repodir, 'easybuild', 'easyblocks', '__init__.py')))
 
+    def test_download_repo_cached(self):
+        """Test whether download_repo avoids downloading the same repository archive again."""
+        account, repo = 'easybuilders', 'easybuild-easyblocks'
+
+        # create local stand-in for archives of GitHub repository
+        archive_dir = os.path.join(self.test_prefix, 'github', account, repo, 'archive')
+        mkdir(archive_dir, parents=True)
+
+        def create_archive(branch):
+            """Create archive for specified branch of repository."""
+            write_file(os.path.join(self.test_prefix, 'repo', '%s-%s' % (repo, branch), 'README.rst'), branch)
+            archive = os.path.join(archive_dir, '%s.tar.gz' % branch)
+            tar = tarfile.open(archive, 'w:gz')
+            tar.add(os.path.join(self.test_prefix, 'repo', '%s-%s' % (repo, branch)), arcname='%s-%s' % (repo, branch))
+            tar.close()
+            return archive
+
+        orig_github_url = gh.GITHUB_URL
+        orig_fetch_latest_commit_sha = gh.fetch_latest_commit_sha
+        gh.GITHUB_URL = 'file://%s' % os.path.join(self.test_prefix, 'github')
+        gh.fetch_latest_commit_sha = lambda *args, **kwargs: '1' * 40
+
+        try:
+            archive = create_archive('develop')
+            path1 = os.path.join(self.test_prefix, 'one')
+            res = gh.download_repo(repo=repo, branch='develop', account=account, path=path1)
+            self.assertEqual(res, os.path.join(path1, account, '%s-develop' % repo))
+            self.assertEqual(read_file(os.path.join(res, 'README.rst')), 'develop')
+            self.assertEqual(read_file(os.path.join(res, 'latest-sha')), '1' * 40)
+
+            # archive is not downloaded again for the same commit, a copy of the earlier download is used
+            remove_file(archive)
+            path2 = os.path.join(self.test_prefix, 'two')
+            res = gh.download_repo(repo=repo, branch='develop', account=account, path=path2)
+            self.assertEqual(res, os.path.join(path2, account, '%s-develop' % repo))
+            self.assertEqual(read_file(os.path.join(res, 'README.rst')), 'develop')
+
+            # archive for another branch that points to the same commit is downloaded separately
+            create_archive('master')
+            res = gh.download_repo(repo=repo, branch='master', account=account, path=path2)
+            self.assertEqual(res, os.path.join(path2, account, '%s-master' % repo))
+            self.assertEqual(read_file(os.path.join(res, 'README.rst')), 'master')
+
+            # archive is downloaded again for a different commit
+            gh.fetch_latest_commit_sha = lambda *args, **kwargs: '2' * 40
+            path3 = os.path.join(self.test_prefix, 'three')
+            self.mock_stderr(True)
+            self.assertErrorRegex(EasyBuildError, "Can't extract file", gh.download_repo, repo=repo, branch='develop',
+                                  account=account, path=path3)
+            self.mock_stderr(False)
+
+            # downloaded archives can be cached across sessions via --github-download-cache
+            cache_dir = os.path.join(self.test_prefix, 'cache')
+            init_config(build_options={'github_download_cache': cache_dir})
+            archive = create_archive('develop')
+            res = gh.download_repo(repo=repo, branch='develop', account=account, path=path3)
+            self.assertEqual(read_file(os.path.join(res, 'README.rst')), 'develop')
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+            self.assertTrue(os.listdir(cache_dir)[0].endswith('-develop.tar.gz'))
+
+            # in a new session, the archive is not downloaded again
+            gh._downloaded_files_cache.clear()
+            remove_file(archive)
+            path4 = os.path.join(self.test_prefix, 'four')
+            res = gh.download_repo(repo=repo, branch='develop', account=account, path=path4)
+            self.assertEqual(res, os.path.join(path4, account, '%s-develop' % repo))
+            self.assertEqual(read_file(os.path.join(res, 'README.rst')), 'develop')
+        finally:
+            gh.GITHUB_URL = orig_github_url
+            gh.fetch_latest_commit_sha = orig_fetch_latest_commit_sha
+
+    def test_prune_github_download_cache(self):
+        """Test prune_github_download_cache function."""
+        cache_dir = os.path.join(self.test_prefix, 'cache')
+        init_config(build_options={'github_download_cache': cache_dir, 'github_download_cache_size': 1})
+
+        # create 3 cached files of 400KiB, with least recently used first
+        paths = []
+        for idx in range(3):
+            path = os.path.join(cache_dir, 'file%d.tar.gz' % idx)
+            write_file(path, 'x' * 400 * 1024)
+            os.utime(path, (time.time() - 100 + idx, time.time() - 100 + idx))
+            paths.append(path)
+        # temporary files are never removed
+        write_file(os.path.join(cache_dir, '.file3.tar.gz.1234abcd'), 'x' * 400 * 1024)
+
+        # least recently used file is removed until total size doesn't exceed maximum size
+        gh.prune_github_download_cache(cache_dir)
+        self.assertEqual(sorted(os.listdir(cache_dir)), ['.file3.tar.gz.1234abcd', 'file1.tar.gz', 'file2.tar.gz'])
+
+        # specified file is never removed
+        write_file(paths[0], 'x' * 400 * 1024)
+        os.utime(paths[0], (time.time() - 200, time.time() - 200))
+        gh.prune_github_download_cache(cache_dir, keep=paths[0])
+        self.assertEqual(sorted(os.listdir(cache_dir)), ['.file3.tar.gz.1234abcd', 'file0.tar.gz', 'file2.tar.gz'])
+
+        # nothing is removed if cache is small enough
+        gh.prune_github_download_cache(cache_dir)
+        self.assertEqual(len(os.listdir(cache_dir)), 3)
+
     def test_install_github_token(self):
         """Test for install_github_token function."""
         if self.skip_github_tests:
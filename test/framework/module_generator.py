@@ -1365,6 +1365,18 @@ class ModuleGeneratorTest(EnhancedTestCase):
         # only with depth=0, only direct dependencies are returned
         self.assertEqual(dependencies_for('foss/2018a', self.modtool, depth=0), expected[:-2])
 
+        # module files are located & parsed without running the modules tool
+        def no_module_cmd(*args, **kwargs):
+            """Fail when modules tool is used."""
+            raise AssertionError("Modules tool should not be used: %s" % str(args))
+
+        orig_run_module = self.modtool.run_module
+        self.modtool.run_module = no_module_cmd
+        try:
+            self.assertEqual(dependencies_for('foss/2018a', self.modtool), expected)
+        finally:
+            self.modtool.run_module = orig_run_module
+
         # Lmod 7.6+ is required to use depends-on
         if self.modtool.supports_depends_on:
             # also test on module file that includes depends_on statements
@@ -373,6 +373,43 @@ class ModulesTest(EnhancedTestCase):
             ]))
             self.assertEqual(self.modtool.exist(['OpenMPI/99', 'OpenMPIAlias']), [True, True])
 
+    def test_locate_module_files(self):
+        """Test locate_module_files method."""
+        self.init_testmods()
+        test_modules_path = os.path.abspath(os.path.join(os.path.dirname(__file__), 'modules'))
+
+        # partial module names are not resolved
+        mod_names = ['GCC/6.4.0-2.28', 'toy/.0.0-deps', 'foo/1.2.3', 'OpenMPI', 'Compiler/GCC/6.4.0-2.28']
+        expected = [
+            os.path.join(test_modules_path, 'GCC', '6.4.0-2.28'),
+            os.path.join(test_modules_path, 'toy', '.0.0-deps'),
+            None,
+            None,
+            None,
+        ]
+        self.assertEqual(self.modtool.locate_module_files(mod_names), expected)
+
+        # files that are not module files are not considered
+        write_file(os.path.join(self.test_prefix, 'foo', '1.2.3'), 'this is not a module file')
+        write_file(os.path.join(self.test_prefix, 'bar', '1.0'), '#%Module')
+        self.modtool.use(self.test_prefix)
+        res = self.modtool.locate_module_files(['foo/1.2.3', 'bar/1.0', 'GCC/6.4.0-2.28'])
+        expected = [None, os.path.join(self.test_prefix, 'bar', '1.0'), expected[0]]
+        self.assertEqual(res, expected)
+
+        # module files in Lua syntax are only considered with Lmod
+        write_file(os.path.join(self.test_prefix, 'baz', '2.0.lua'), 'whatis("baz")')
+        res = self.modtool.locate_module_files(['baz/2.0'])
+        if isinstance(self.modtool, Lmod):
+            self.assertEqual(res, [os.path.join(self.test_prefix, 'baz', '2.0.lua')])
+        else:
+            self.assertEqual(res, [None])
+
+        # existence of modules for which a module file is found is checked without running 'module show'
+        reset_module_caches()
+        self.assertEqual(self.modtool.exist(['bar/1.0', 'toy/.0.0-deps'], skip_avail=True), [True, True])
+        self.assertEqual(mod.MODULE_SHOW_CACHE, {})
+
     def test_load(self):
         """ test if we load one module it is in the loaded_modules """
         self.init_testmods()
@@ -836,6 +873,105 @@ class ModulesTest(EnhancedTestCase):
         tcl_str = '[ file join $env(TEST_VAR) "foo/bar" ]'
         self.assertEqual(self.modtool.interpret_raw_path_tcl(tcl_str), 'test123/foo/bar')
 
+    def test_parse_module_file(self):
+        """Test parse_module_file function."""
+        test_modfile = os.path.join(self.test_prefix, 'test', '1.2.3')
+        test_modtxt = '\n'.join([
+            '#%Module',
+            "module load GCC/6.4.0-2.28",
+            "prepend-path PATH /example/bin",
+            "  module load OpenMPI/2.1.2-GCC-6.4.0-2.28",
+            "module use /example/modules",
+        ])
+        write_file(test_modfile, test_modtxt)
+
+        expected = {
+            'loads': ['GCC/6.4.0-2.28', 'OpenMPI/2.1.2-GCC-6.4.0-2.28'],
+            'modpath_exts': [('tcl_use', '/example/modules')],
+            'plain': True,
+        }
+        self.assertEqual(mod.parse_module_file(test_modfile), expected)
+
+        # result is cached, module file is only parsed again when it is modified
+        remove_file(test_modfile)
+        write_file(test_modfile, test_modtxt + '\nmodule load zlib/1.2.11')
+        mtime = os.stat(test_modfile).st_mtime
+        os.utime(test_modfile, (mtime - 100, mtime - 100))
+        self.assertEqual(mod.parse_module_file(test_modfile)['loads'], expected['loads'] + ['zlib/1.2.11'])
+
+        test_modfile_stat = os.stat(test_modfile)
+        key = (test_modfile, mtime - 100, test_modfile_stat.st_size, test_modfile_stat.st_ino)
+        mod.MODULE_FILE_METADATA_CACHE[key]['loads'] = ['cached']
+        self.assertEqual(mod.parse_module_file(test_modfile)['loads'], ['cached'])
+
+        reset_module_caches()
+        self.assertEqual(mod.parse_module_file(test_modfile)['loads'], expected['loads'] + ['zlib/1.2.11'])
+
+        # module file is parsed again if its size changes, even if modification time is not updated
+        write_file(test_modfile, '\nmodule load bzip2/1.0.6', append=True)
+        os.utime(test_modfile, (mtime - 100, mtime - 100))
+        expected_loads = expected['loads'] + ['zlib/1.2.11', 'bzip2/1.0.6']
+        self.assertEqual(mod.parse_module_file(test_modfile)['loads'], expected_loads)
+
+        # help/whatis text and load statements guarded by a check whether the module is loaded are considered plain
+        for modtxt in [
+            '\n'.join([
+                '#%Module',
+                'proc ModulesHelp { } {',
+                '    puts stderr {',
+                '  if this is help text, it can contain anything',
+                '    }',
+                '}',
+                'module-whatis {Description: test',
+                'module}',
+                'conflict test',
+                'set root /example',
+                'if { ![ is-loaded GCC/6.4.0-2.28 ] } {',
+                '    module load GCC/6.4.0-2.28',
+                '}',
+                'if { [ module-info mode remove ] || ![ is-loaded GCC/6.4.0-2.28 ] } {',
+                '    module load GCC/6.4.0-2.28',
+                '}',
+                'setenv EBROOTTEST "$root"',
+            ]),
+            '\n'.join([
+                'help([==[',
+                'if this is help text, it can contain anything',
+                ']==])',
+                'whatis([[Description: test]])',
+                'local root = "/example"',
+                'conflict("test")',
+                'if not ( isloaded("GCC/6.4.0-2.28") ) then',
+                '    load("GCC/6.4.0-2.28")',
+                'end',
+                'if mode() == "unload" or not ( isloaded("GCC/6.4.0-2.28") ) then',
+                '    load("GCC/6.4.0-2.28")',
+                'end',
+                'prepend_path("PATH", pathJoin(root, "bin"))',
+            ]),
+        ]:
+            modfile = test_modfile + ('.lua' if modtxt.startswith('help') else '')
+            write_file(modfile, modtxt)
+            res = mod.parse_module_file(modfile)
+            self.assertEqual(res['loads'], ['GCC/6.4.0-2.28', 'GCC/6.4.0-2.28'])
+            self.assertTrue(res['plain'])
+
+        # conditional logic or swapping/unloading modules is not plain
+        for extra_stmt in ['module swap GCC', 'module unload GCC', 'if { [ is-loaded GCC ] } {']:
+            write_file(test_modfile, test_modtxt + '\n' + extra_stmt)
+            self.assertFalse(mod.parse_module_file(test_modfile)['plain'])
+
+        for extra_stmt in ['if isloaded("GCC") then', 'unload("GCC")']:
+            write_file(test_modfile + '.lua', 'load("GCC")\n' + extra_stmt)
+            self.assertFalse(mod.parse_module_file(test_modfile + '.lua')['plain'])
+
+        # module_file_metadata locates module file in $MODULEPATH
+        self.modtool.use(self.test_prefix)
+        self.assertEqual(self.modtool.module_file_metadata('test/1.2.3')['modpath_exts'], expected['modpath_exts'])
+
+        self.assertErrorRegex(EasyBuildError, "Failed to determine modification time", mod.parse_module_file,
+                              os.path.join(self.test_prefix, 'nosuchmodulefile'))
+
     def test_modpath_extensions_for(self):
         """Test modpath_extensions_for method."""
         self.setup_hierarchical_modules()
@@ -857,6 +993,23 @@ class ModulesTest(EnhancedTestCase):
         res = self.modtool.modpath_extensions_for(['icc/2016.1.150-GCC-4.9.3-2.25', 'ifort/2016.1.150-GCC-4.9.3-2.25'])
         self.assertEqual(res, expected)
 
+        # $MODULEPATH extensions made by modules that are loaded by a module are also taken into account
+        # to locate subsequent modules, like when modules are actually loaded
+        test_modfile = os.path.join(mod_dir, 'Core', 'GCC-OpenMPI', '1.0')
+        write_file(test_modfile, '\n'.join([
+            '#%Module',
+            'module use %s' % os.path.join(mod_dir, 'Compiler', 'GCC', '6.4.0-2.28'),
+            'if { ![is-loaded OpenMPI/2.1.2] } {',
+            '    module load OpenMPI/2.1.2',
+            '}',
+        ]))
+        expected = {
+            'GCC-OpenMPI/1.0': [os.path.join(mod_dir, 'Compiler', 'GCC', '6.4.0-2.28')],
+            'FFTW/3.3.7': [],
+        }
+        self.assertEqual(self.modtool.modpath_extensions_for(['GCC-OpenMPI/1.0', 'FFTW/3.3.7']), expected)
+        remove_file(test_modfile)
+
         # error for non-existing modules
         error_pattern = "Can't get value from a non-existing module"
         self.assertErrorRegex(EasyBuildError, error_pattern, self.modtool.modpath_extensions_for, ['nosuchmodule/1.2'])
@@ -28,6 +28,7 @@ Unit tests for eb command line options.
 @author: Kenneth Hoste (Ghent University)
 """
 import glob
+import json
 import os
 import re
 import shutil
@@ -4544,6 +4545,79 @@ class CommandLineOptionsTest(EnhancedTestCase):
             for pattern in patterns:
                 self.assertTrue(re.search(pattern, stdout, re.M), "Pattern '%s' found in: %s" % (pattern, stdout))
 
+    def test_check_contrib_cache(self):
+        """Test parallel style/contribution checks, and caching of results via --check-contrib-cache."""
+        if not ('pycodestyle' in sys.modules or 'pep8' in sys.modules):
+            print("Skipping test_check_contrib_cache (no pycodestyle or pep8 available)")
+            return
+
+        test_ecs = os.path.join(os.path.dirname(__file__), 'easyconfigs', 'test_ecs')
+        toy = os.path.join(self.test_prefix, 'toy.eb')
+        copy_file(os.path.join(test_ecs, 't', 'toy', 'toy-0.0.eb'), toy)
+        write_file(toy, read_file(toy).replace("name = 'toy'", "name\t='toy'"))
+        gcc = os.path.join(test_ecs, 'g', 'GCC', 'GCC-4.9.2.eb')
+
+        cache_file = os.path.join(self.test_prefix, 'check_contrib_cache.json')
+        args = ['--check-contrib', '--check-contrib-cache=%s' % cache_file, '--parallel=2', gcc, toy]
+
+        def run_check_contrib():
+            """Run --check-contrib, return output."""
+            self.mock_stdout(True)
+            self.mock_stderr(True)
+            error_pattern = "One or more contribution checks FAILED"
+            self.assertErrorRegex(EasyBuildError, error_pattern, self.eb_main, args, raise_error=True)
+            stdout = self.get_stdout()
+            self.mock_stdout(False)
+            self.mock_stderr(False)
+            return stdout
+
+        stdout = run_check_contrib()
+
+        # results are reported in order in which easyconfigs were specified
+        regex = re.compile(r"^\[PASS\] .*/GCC-4.9.2.eb\n" +
+                           r".*toy.eb:1:5: E223 tab before operator\n.*\n\[FAIL\] .*/toy.eb$", re.M)
+        self.assertTrue(regex.search(stdout), "Pattern '%s' found in: %s" % (regex.pattern, stdout))
+
+        cache = json.loads(read_file(cache_file))
+        self.assertEqual(sorted(key.split(':')[0] for key in cache), ['sha256', 'sha256', 'style', 'style'])
+
+        # same results are reported when cached results are used
+        self.assertEqual(run_check_contrib(), stdout)
+
+        # cached results are used for easyconfig file with same name & contents in another location,
+        # output of style check mentions actual location of easyconfig file
+        toy_bis = os.path.join(self.test_prefix, 'elsewhere', 'toy.eb')
+        copy_file(toy, toy_bis)
+        args[-1] = toy_bis
+        stdout_bis = run_check_contrib()
+        self.assertEqual(stdout_bis, stdout.replace(toy + ':', toy_bis + ':').replace('] ' + toy, '] ' + toy_bis))
+        self.assertTrue(toy_bis + ':1:5: E223 tab before operator' in stdout_bis)
+        self.assertFalse(toy + ':' in stdout_bis)
+        self.assertEqual(sorted(json.loads(read_file(cache_file))), sorted(cache))
+        args[-1] = toy
+
+        # easyconfig file with same contents but different name is checked again
+        toy_ter = os.path.join(self.test_prefix, 'toy-bis.eb')
+        copy_file(toy, toy_ter)
+        args[-1] = toy_ter
+        self.assertTrue(toy_ter + ':1:5: E223 tab before operator' in run_check_contrib())
+        self.assertEqual(len(json.loads(read_file(cache_file))), len(cache) + 2)
+        args[-1] = toy
+
+        # make sure cached results are actually used, by tampering with them
+        for key in cache:
+            if key.startswith('style:'):
+                cache[key] = [0, '']
+        write_file(cache_file, json.dumps(cache))
+        stdout = run_check_contrib()
+        self.assertTrue(re.search(r"^\[PASS\] .*/toy.eb$", stdout, re.M))
+        self.assertTrue("All style checks PASSed" in stdout)
+
+        # changing the easyconfig file invalidates the cached results
+        write_file(toy, '\n', append=True)
+        stdout = run_check_contrib()
+        self.assertTrue(re.search(r"^\[FAIL\] .*/toy.eb$", stdout, re.M))
+
     def test_check_contrib_non_style(self):
         """Test non-style checks performed by --check-contrib."""
 
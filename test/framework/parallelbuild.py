@@ -27,6 +27,7 @@ Unit tests for parallelbuild.py
 
 @author: Kenneth Hoste (Ghent University)
 """
+import math
 import os
 import re
 import stat
@@ -41,8 +42,10 @@ from easybuild.tools.config import get_module_syntax
 from easybuild.tools.filetools import adjust_permissions, mkdir, read_file, remove_dir, which, write_file
 from easybuild.tools.job import pbs_python
 from easybuild.tools.job.pbs_python import PbsPython
+from easybuild.tools.job.slurm import Slurm
+import easybuild.tools.parallelbuild as parallelbuild
 from easybuild.tools.options import parse_options
-from easybuild.tools.parallelbuild import build_easyconfigs_in_parallel, submit_jobs
+from easybuild.tools.parallelbuild import build_easyconfigs_in_parallel, group_easyconfigs, submit_jobs
 from easybuild.tools.robot import resolve_dependencies
 
 
@@ -68,6 +71,26 @@ time_cmd = %(time)s
 MOCKED_SBATCH = """#!/bin/bash
 if [[ $1 == '--version' ]]; then
     echo "slurm 17.0"
+elif [[ $1 == '--parsable' ]]; then
+    if [[ ! -z $SBATCH_LOG ]]; then
+        echo "$@" >> $SBATCH_LOG
+    fi
+    # first submission of job named 'flaky' fails with a transient error
+    if [[ "$*" == *"job-name flaky"* ]] && [[ ! -z $SBATCH_LOG ]] && [[ ! -f $SBATCH_LOG.flaky ]]; then
+        touch $SBATCH_LOG.flaky
+        echo "sbatch: error: Batch job submission failed: Socket timed out on send/recv operation" >&2
+        exit 1
+    fi
+    # submission of job named 'broken' always fails
+    if [[ "$*" == *"job-name broken"* ]]; then
+        echo "sbatch: error: Batch job submission failed: Invalid account or account/partition combination" >&2
+        exit 1
+    fi
+    # warning is printed for some jobs (before job ID)
+    if [[ "$*" == *"job-name job1"* ]]; then
+        echo "sbatch: warning: can't run 1 processes on 2 nodes, setting nnodes to 1" >&2
+    fi
+    echo "$$;cluster"
 else
     echo "Submitted batch job $RANDOM"
     echo "(submission args: $@)"
@@ -374,6 +397,180 @@ class ParallelBuildTest(EnhancedTestCase):
         }
         self.assertEqual(jobs[1].job_specs, expected)
 
+    def test_group_easyconfigs(self):
+        """Test grouping of easyconfigs to build in a single job."""
+        topdir = os.path.dirname(os.path.abspath(__file__))
+        test_ecs_dir = os.path.join(topdir, 'easyconfigs', 'test_ecs')
+        build_options = {
+            'external_modules_metadata': {},
+            'robot_path': test_ecs_dir,
+            'valid_module_classes': config.module_classes(),
+            'validate': False,
+        }
+        init_config(build_options=build_options)
+
+        test_ec = os.path.join(test_ecs_dir, 'g', 'gzip', 'gzip-1.5-foss-2018a.eb')
+        ordered_ecs = resolve_dependencies(process_easyconfig(test_ec), self.modtool, retain_all_deps=True)
+        mod_names = [ec['full_mod_name'] for ec in ordered_ecs]
+        expected = ['GCC/6.4.0-2.28', 'OpenBLAS/0.2.20-GCC-6.4.0-2.28', 'hwloc/1.11.8-GCC-6.4.0-2.28',
+                    'FFTW/3.3.7-gompi-2018a', 'OpenMPI/2.1.2-GCC-6.4.0-2.28', 'gompi/2018a',
+                    'ScaLAPACK/2.0.2-gompi-2018a-OpenBLAS-0.2.20', 'foss/2018a', 'gzip/1.5-foss-2018a']
+        self.assertEqual(sorted(mod_names), sorted(expected))
+
+        def group_mod_names(build_times, max_time):
+            """Determine grouping for given build times, return list of lists of module names."""
+            groups = group_easyconfigs(ordered_ecs, build_times, max_time)
+            # easyconfigs remain in the same order
+            self.assertEqual([ec for group in groups for ec in group], ordered_ecs)
+            return [[ec['full_mod_name'] for ec in group] for group in groups]
+
+        # no grouping if build time is unknown or too long
+        self.assertEqual(group_mod_names([None] * len(ordered_ecs), 1000), [[m] for m in mod_names])
+        self.assertEqual(group_mod_names([100] * len(ordered_ecs), 150), [[m] for m in mod_names])
+
+        # all easyconfigs can be built in a single job if total build time is less than maximum
+        self.assertEqual(group_mod_names([100] * len(ordered_ecs), 1000), [mod_names])
+
+        # if build time for a particular easyconfig is unknown, it gets a job of its own
+        # and easyconfigs that depend on it can not be built in the same job as its dependencies
+        build_times = [100] * len(ordered_ecs)
+        build_times[mod_names.index('gompi/2018a')] = None
+        groups = group_mod_names(build_times, 1200)
+        self.assertTrue(['gompi/2018a'] in groups)
+        self.assertTrue(len(groups) > 2)
+        for group in groups:
+            if 'foss/2018a' in group:
+                self.assertFalse('GCC/6.4.0-2.28' in group)
+
+        # install mocked versions of 'sbatch' and 'scontrol' commands, to test actual job submission
+        for cmd, txt in [('sbatch', MOCKED_SBATCH), ('scontrol', MOCKED_SCONTROL)]:
+            cmd_path = os.path.join(self.test_prefix, 'bin', cmd)
+            write_file(cmd_path, txt)
+            adjust_permissions(cmd_path, stat.S_IXUSR, add=True)
+        os.environ['PATH'] = os.path.pathsep.join([os.path.join(self.test_prefix, 'bin'), os.getenv('PATH')])
+
+        # use same maximum build time per job as above (20 minutes)
+        build_options.update({'job_max_walltime': 24, 'job_pack_max_time': 20})
+        init_config(args=['--job-backend=Slurm'], build_options=build_options)
+
+        # mock estimated build times, since no build stats are available in test easyconfigs repository
+        orig_det_build_time_estimate = parallelbuild.det_build_time_estimate
+        build_time_estimates = dict(zip(mod_names, build_times))
+        estimated = []
+
+        def mocked_det_build_time_estimate(_, ec):
+            estimated.append(ec['full_mod_name'])
+            return build_time_estimates[ec['full_mod_name']]
+
+        parallelbuild.det_build_time_estimate = mocked_det_build_time_estimate
+
+        try:
+            self.mock_stdout(True)
+            jobs = build_easyconfigs_in_parallel("echo '%(spec)s'", ordered_ecs, prepare_first=False)
+            self.mock_stdout(False)
+        finally:
+            parallelbuild.det_build_time_estimate = orig_det_build_time_estimate
+
+        self.assertEqual(len(jobs), len(groups))
+        # build time is only estimated once for each easyconfig
+        self.assertEqual(sorted(estimated), sorted(mod_names))
+        gompi_job = [job for job in jobs if job.module == 'gompi/2018a'][0]
+        self.assertEqual(gompi_job.job_specs['job-name'], 'gompi-2018a')
+        self.assertEqual(gompi_job.job_specs['time'], 24 * 60)
+        for job in jobs:
+            self.assertTrue(job.jobid)
+            if 'FFTW/3.3.7-gompi-2018a' in job.module:
+                self.assertTrue(gompi_job.jobid in job.job_specs['dependency'].split(':'))
+            if 'GCC/6.4.0-2.28' in job.module:
+                self.assertTrue(job.job_specs['job-name'].startswith('GCC-6.4.0-2.28-and-'))
+                # hours are estimated from build times of all easyconfigs in the group
+                est_time = sum(build_time_estimates[m] for m in job.module.split(', '))
+                self.assertEqual(job.job_specs['time'], min(int(math.ceil(est_time * 2 / 60)), 24) * 60)
+                specs = [ec['spec'] for ec in ordered_ecs if ec['full_mod_name'] in job.module.split(', ')]
+                self.assertEqual(job.job_specs['wrap'], "echo '%s'" % ' '.join(specs))
+
+    def test_slurm_bulk_submission(self):
+        """Test submitting lots of jobs at once using (mocked) Slurm as backend for --job."""
+        # install mocked versions of 'sbatch' and 'scontrol' commands
+        for cmd, txt in [('sbatch', MOCKED_SBATCH), ('scontrol', MOCKED_SCONTROL)]:
+            cmd_path = os.path.join(self.test_prefix, 'bin', cmd)
+            write_file(cmd_path, txt)
+            adjust_permissions(cmd_path, stat.S_IXUSR, add=True)
+
+        os.environ['PATH'] = os.path.pathsep.join([os.path.join(self.test_prefix, 'bin'), os.getenv('PATH')])
+        sbatch_log = os.path.join(self.test_prefix, 'sbatch.log')
+        os.environ['SBATCH_LOG'] = sbatch_log
+
+        init_config(args=['--job-backend=Slurm'], build_options={'job_max_walltime': 5})
+
+        slurm = Slurm()
+        slurm.SUBMIT_RETRY_WAIT = 0
+        slurm.init()
+
+        # 3 levels of jobs: 10 independent jobs, 10 jobs that depend on 2 of those each, 1 job that depends on all
+        jobs = []
+        for idx in range(10):
+            job = slurm.make_job('echo %d' % idx, 'job%d' % idx)
+            job.module = 'mod%d' % idx
+            slurm.queue(job)
+            jobs.append(job)
+        for idx in range(10):
+            job = slurm.make_job('echo %d' % idx, 'job%d' % (10 + idx))
+            job.module = 'mod%d' % (10 + idx)
+            slurm.queue(job, dependencies=[jobs[idx], jobs[(idx + 1) % 10]])
+            jobs.append(job)
+        last_job = slurm.make_job('echo last', 'flaky')
+        last_job.module = 'flaky'
+        slurm.queue(last_job, dependencies=jobs[10:])
+        jobs.append(last_job)
+
+        # jobs are only submitted when complete is called
+        self.assertTrue(all(job.jobid is None for job in jobs))
+        self.assertFalse(os.path.exists(sbatch_log))
+
+        levels = slurm._det_submission_levels()
+        self.assertEqual([len(level) for level in levels], [10, 10, 1])
+
+        self.mock_stdout(True)
+        slurm.complete()
+        stdout = self.get_stdout()
+        self.mock_stdout(False)
+
+        self.assertTrue(stdout.startswith("== List of submitted jobs (21): job0 (mod0): "))
+        job_ids = [job.jobid for job in jobs]
+        self.assertTrue(all(re.match('^[0-9]+$', job_id) for job_id in job_ids))
+
+        # jobs are submitted in batches, dependencies are always submitted first
+        sbatch_lines = read_file(sbatch_log).strip().split('\n')
+        # 22 submissions, since submitting last job failed with a transient error at first
+        self.assertEqual(len(sbatch_lines), 22)
+        for idx, job in enumerate(jobs[10:20]):
+            self.assertEqual(job.job_specs['dependency'], 'afterok:%s:%s' % (job_ids[idx], job_ids[(idx + 1) % 10]))
+        self.assertEqual(last_job.job_specs['dependency'], 'afterok:' + ':'.join(job_ids[10:20]))
+        self.assertTrue(all('--job-name job' in line for line in sbatch_lines[:20]))
+        self.assertTrue(all('--job-name flaky' in line for line in sbatch_lines[20:]))
+
+        # if submitting a job fails, the user hold is released for jobs that were already submitted
+        slurm.init()
+        jobs = []
+        for name in ['job0', 'broken', 'job2']:
+            job = slurm.make_job('echo %s' % name, name)
+            job.module = name
+            slurm.queue(job)
+            jobs.append(job)
+        slurm.queue(slurm.make_job('echo dep', 'dep'), dependencies=jobs)
+
+        self.mock_stdout(True)
+        error_pattern = "Failed to submit job .*Invalid account"
+        self.assertErrorRegex(EasyBuildError, error_pattern, slurm.complete)
+        stdout = self.get_stdout()
+        self.mock_stdout(False)
+
+        self.assertEqual(jobs[1].jobid, None)
+        regex = re.compile(r"^== List of submitted jobs \(2\): job0 \(job0\): [0-9]+; job2 \(job2\): [0-9]+$", re.M)
+        self.assertTrue(regex.search(stdout), "Pattern '%s' found in: %s" % (regex.pattern, stdout))
+        self.assertEqual(slurm._queued, [])
+
 
 def suite():
     """ returns all the testcases in this module """
@@ -32,18 +32,19 @@ import re
 import shutil
 import sys
 import tempfile
+from multiprocessing.pool import ThreadPool
 from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered
 from unittest import TextTestRunner
 
 import easybuild.tools.build_log
 from easybuild.framework.easyconfig.parser import EasyConfigParser
 from easybuild.tools.build_log import EasyBuildError
-from easybuild.tools.filetools import read_file
+from easybuild.tools.filetools import read_file, remove_file, write_file
 from easybuild.tools.repository.filerepo import FileRepository
 from easybuild.tools.repository.gitrepo import GitRepository
 from easybuild.tools.repository.hgrepo import HgRepository
 from easybuild.tools.repository.svnrepo import SvnRepository
-from easybuild.tools.repository.repository import init_repository
+from easybuild.tools.repository.repository import commit_session_repositories, init_repository, session_repository
 from easybuild.tools.run import run_cmd
 from easybuild.tools.version import VERSION
 
@@ -202,6 +203,87 @@ class RepositoryTest(EnhancedTestCase):
         else:
             print("Skipping .yeb part of test_add_easyconfig (no PyYAML available)")
 
+    def test_buildstats(self):
+        """Test recording of build stats via add_easyconfig, and get_buildstats method."""
+        repo = init_repository('FileRepository', self.path)
+        toy_eb_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs',
+                                   't', 'toy', 'toy-0.0.eb')
+
+        self.assertEqual(repo.get_buildstats('toy', '0.0'), [])
+
+        # build stats in easyconfig files that were archived before build stats were recorded separately are used
+        path = repo.add_easyconfig(toy_eb_file, 'toy', '0.0', {'build_time': 1.23}, [{'build_time': 0.9}])
+        buildstats_path = os.path.join(self.path, 'toy', 'toy-0.0.buildstats.jsonl')
+        remove_file(buildstats_path)
+        self.assertEqual(repo.get_buildstats('toy', '0.0'), [{'build_time': 0.9}, {'build_time': 1.23}])
+
+        # file with build stats is created for archived easyconfig, and then only appended to
+        repo.add_easyconfig(toy_eb_file, 'toy', '0.0', {'build_time': 2.34}, None)
+        expected = [{'build_time': 0.9}, {'build_time': 1.23}, {'build_time': 2.34}]
+        self.assertEqual(repo.get_buildstats('toy', '0.0'), expected)
+        self.assertEqual(len(read_file(buildstats_path).splitlines()), 3)
+
+        # archived easyconfig file is no longer parsed to determine build stats
+        write_file(path, "this is not a valid easyconfig file")
+        self.assertEqual(repo.get_buildstats('toy', '0.0'), expected)
+
+        # files are only written atomically, no (temporary) files are left behind (except for lock file)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.path, 'toy'))),
+                         ['.lock', 'toy-0.0.buildstats.jsonl', 'toy-0.0.eb'])
+
+        # concurrent writers don't trip over each other
+        def add_easyconfig(idx):
+            """Add easyconfig to repository."""
+            repo.add_easyconfig(toy_eb_file, 'toy', '0.0', {'build_time': idx}, None)
+
+        pool = ThreadPool(4)
+        pool.map(add_easyconfig, range(20))
+        pool.close()
+        pool.join()
+
+        buildstats = repo.get_buildstats('toy', '0.0')
+        self.assertEqual(buildstats[:3], expected)
+        self.assertEqual(sorted(x['build_time'] for x in buildstats[3:]), list(range(20)))
+
+    def test_session_repository(self):
+        """Test session_repository and commit_session_repositories functions."""
+        repo = session_repository('FileRepository', self.path)
+        self.assertTrue(isinstance(repo, FileRepository))
+        self.assertTrue(repo is session_repository('FileRepository', self.path))
+        self.assertFalse(repo is session_repository('FileRepository', [self.path, 'subdir']))
+
+        commits = []
+        repo.commit = lambda msg: commits.append(msg)
+
+        repo.queue_commit("Built foo/1.0")
+        repo.queue_commit("Built bar/2.0")
+        self.assertEqual(commits, [])
+
+        commit_session_repositories()
+        self.assertEqual(commits, ["Built foo/1.0; Built bar/2.0"])
+
+        # nothing to commit
+        repo.commit_queued()
+        self.assertEqual(len(commits), 1)
+
+        # a new repository instance is created for the next session
+        self.assertFalse(repo is session_repository('FileRepository', self.path))
+
+        # failing to commit only results in a warning
+        def fail_commit(msg):
+            raise EasyBuildError("commit failed")
+
+        repo = session_repository('FileRepository', self.path)
+        repo.commit = fail_commit
+        repo.queue_commit("Built foo/1.0")
+        self.mock_stderr(True)
+        commit_session_repositories()
+        stderr = self.get_stderr()
+        self.mock_stderr(False)
+        self.assertTrue("WARNING: Unable to commit easyconfig to repository" in stderr)
+        self.assertTrue("commit failed" in stderr)
+        self.assertFalse(repo is session_repository('FileRepository', self.path))
+
     def tearDown(self):
         """Clean up after test."""
         super(RepositoryTest, self).tearDown()
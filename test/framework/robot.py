@@ -28,6 +28,7 @@ Unit tests for robot (dependency resolution).
 @author: Toon Willems (Ghent University)
 """
 
+import json
 import os
 import re
 import shutil
@@ -40,7 +41,7 @@ from unittest import TextTestRunner
 import easybuild.framework.easyconfig.easyconfig as ecec
 import easybuild.tools.build_log
 import easybuild.tools.robot as robot
-from easybuild.framework.easyconfig.easyconfig import process_easyconfig, EasyConfig
+from easybuild.framework.easyconfig.easyconfig import process_easyconfig, EasyConfig, EasyConfigRecord
 from easybuild.framework.easyconfig.tools import alt_easyconfig_paths, find_resolved_modules, parse_easyconfigs
 from easybuild.framework.easyconfig.tweak import tweak
 from easybuild.framework.easyconfig.easyconfig import get_toolchain_hierarchy
@@ -50,7 +51,7 @@ from easybuild.tools import config, modules
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.config import module_classes
 from easybuild.tools.configobj import ConfigObj
-from easybuild.tools.filetools import copy_file, mkdir, read_file, write_file
+from easybuild.tools.filetools import compute_checksum, copy_file, mkdir, read_file, write_file
 from easybuild.tools.github import fetch_github_token
 from easybuild.tools.module_naming_scheme.utilities import det_full_ec_version
 from easybuild.tools.modules import invalidate_module_caches_for, reset_module_caches
@@ -88,6 +89,16 @@ class MockModule(modules.ModulesTool):
             txt = 'Module %s not found' % modname
         return txt
 
+    def locate_module_files(self, mod_names):
+        """Dummy implementation of locate_module_files, consistent with show."""
+        res = []
+        for mod_name in mod_names:
+            if mod_name in self.avail_modules or os.path.basename(mod_name).startswith('.'):
+                res.append(os.path.join('/tmp', mod_name))
+            else:
+                res.append(None)
+        return res
+
     def get_setenv_value_from_modulefile(self, mod_name, var_name):
         """Dummy implementation of get_setenv_value_from_modulefile, always returns None."""
         return None
@@ -185,6 +196,18 @@ class RobotTest(EnhancedTestCase):
         self.assertEqual('gzip/1.4', res[0]['full_mod_name'])
         self.assertEqual('foo/1.2.3', res[-1]['full_mod_name'])
 
+        # only a compact record is retained for easyconfigs of resolved dependencies,
+        # no full EasyConfig instance is created during dependency resolution
+        self.assertTrue(isinstance(res[0]['ec'], EasyConfigRecord))
+        self.assertEqual(res[0]['ec']._ec, None)
+        self.assertEqual(res[0]['ec']['name'], 'gzip')
+
+        # skipping available modules doesn't require a full EasyConfig instance either
+        self.assertEqual(len(skip_available(res, self.modtool)), 2)
+        self.assertTrue(res[0] in res)
+        self.assertEqual(res[0]['ec']._ec, None)
+        self.assertTrue(isinstance(res[0]['ec'].materialize(), EasyConfig))
+
         # hidden dependencies are found too, but only retained if they're not available (or forced to be retained
         hidden_dep = {
             'name': 'toy',
@@ -968,6 +991,82 @@ class RobotTest(EnhancedTestCase):
         error_msg = "Multiple versions of GCC found in dependencies of toolchain gompi: 4.6.4, 6.4.0-2.28"
         self.assertErrorRegex(EasyBuildError, error_msg, get_toolchain_hierarchy, tc)
 
+    def test_toolchain_hierarchy_cache(self):
+        """Test caching of toolchain hierarchies across sessions via --toolchain-hierarchy-cache."""
+        test_easyconfigs = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
+        test_ecs_override = os.path.join(self.test_prefix, 'ecs')
+        mkdir(test_ecs_override)
+        cache_file = os.path.join(self.test_prefix, 'toolchain_hierarchies.json')
+
+        init_config(build_options={
+            'valid_module_classes': module_classes(),
+            'robot_path': [test_ecs_override, test_easyconfigs],
+            'toolchain_hierarchy_cache': cache_file,
+        })
+        get_toolchain_hierarchy.clear()
+
+        foss = {'name': 'foss', 'version': '2018a'}
+        foss_hierarchy = [
+            {'name': 'GCC', 'version': '6.4.0-2.28'},
+            {'name': 'golf', 'version': '2018a'},
+            {'name': 'gompi', 'version': '2018a'},
+            {'name': 'foss', 'version': '2018a'},
+        ]
+        self.assertEqual(get_toolchain_hierarchy(foss), foss_hierarchy)
+
+        # hierarchies for other toolchains may also be cached, since they may be determined when parsing easyconfigs
+        cached = json.loads(read_file(cache_file))
+        entries = [x for x in cached.values() if x['hierarchy'][-1] == foss]
+        self.assertEqual(len(entries), 1)
+        entry = entries[0]
+        self.assertEqual(entry['hierarchy'], foss_hierarchy)
+        gompi_ec = os.path.join(test_easyconfigs, 'g', 'gompi', 'gompi-2018a.eb')
+        self.assertTrue(['gompi', '2018a', gompi_ec, compute_checksum(gompi_ec, 'sha256')] in entry['easyconfigs'])
+
+        def tamper_cache():
+            """Replace cached hierarchy with bogus one, and clear in-memory caches (to mimic a new session)."""
+            cached = json.loads(read_file(cache_file))
+            for key in cached:
+                cached[key]['hierarchy'] = [foss]
+            write_file(cache_file, json.dumps(cached))
+            get_toolchain_hierarchy.clear()
+            ecec._toolchain_hierarchy_cache_files.clear()
+            ecec._easyconfig_files_cache.clear()
+            ecec._easyconfigs_cache.clear()
+
+        # cached hierarchy is used in new session
+        tamper_cache()
+        self.assertEqual(get_toolchain_hierarchy(foss), [foss])
+
+        # cached hierarchy is not used if a different easyconfig file would be used
+        copy_file(gompi_ec, test_ecs_override)
+        tamper_cache()
+        self.assertEqual(get_toolchain_hierarchy(foss), foss_hierarchy)
+
+        # cached hierarchy is not used if one of the easyconfig files was changed
+        write_file(os.path.join(test_ecs_override, 'gompi-2018a.eb'), "\n# changed", append=True)
+        tamper_cache()
+        self.assertEqual(get_toolchain_hierarchy(foss), foss_hierarchy)
+
+        # cached hierarchy is not used if relevant build options change
+        tamper_cache()
+        self.assertEqual(get_toolchain_hierarchy(foss), [foss])
+        init_config(build_options={
+            'add_system_to_minimal_toolchains': True,
+            'valid_module_classes': module_classes(),
+            'robot_path': [test_ecs_override, test_easyconfigs],
+            'toolchain_hierarchy_cache': cache_file,
+        })
+        get_toolchain_hierarchy.clear()
+        foss_hierarchy = [{'name': 'system', 'version': ''}] + foss_hierarchy
+        self.assertEqual(get_toolchain_hierarchy(foss), foss_hierarchy)
+        cached = json.loads(read_file(cache_file))
+        self.assertTrue(any(x['hierarchy'] == foss_hierarchy for x in cached.values()))
+
+        # cache file is written atomically, no temporary files are left behind
+        self.assertEqual(sorted(x for x in os.listdir(self.test_prefix) if 'toolchain_hierarchies' in x),
+                         ['toolchain_hierarchies.json'])
+
     def test_find_resolved_modules(self):
         """Test find_resolved_modules function."""
         nodeps = {
@@ -38,6 +38,7 @@ import stat
 import subprocess
 import sys
 import tempfile
+from multiprocessing.pool import ThreadPool
 from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered, init_config
 from unittest import TextTestRunner
 from easybuild.base.fancylogger import setLogLevelDebug
@@ -47,7 +48,12 @@ import easybuild.tools.utilities
 from easybuild.tools.build_log import EasyBuildError, init_logging, stop_logging
 from easybuild.tools.filetools import adjust_permissions, read_file, write_file
 from easybuild.tools.run import (
+    LogErrorMatcher,
+    LogErrorScan,
     check_log_for_errors,
+    det_required_literal,
+    extract_errors_from_log,
+    get_log_error_matcher,
     get_output_from_process,
     run_cmd,
     run_cmd_qa,
@@ -56,6 +62,20 @@ from easybuild.tools.run import (
 from easybuild.tools.config import ERROR, IGNORE, WARN
 
 
+def extract_errors_and_line_numbers(txt, matcher):
+    """Determine warnings & errors in specified text by checking each line separately with specified matcher."""
+    warnings, errors = [], []
+    for line_no, line in enumerate(txt.split('\n'), 1):
+        for reg_exp, action in matcher.re_tuples:
+            if reg_exp.search(line):
+                if action == ERROR:
+                    errors.append((line_no, line))
+                elif action == WARN:
+                    warnings.append((line_no, line))
+                break
+    return warnings, errors
+
+
 class RunTest(EnhancedTestCase):
     """ Testcase for run module """
 
@@ -603,6 +623,128 @@ class RunTest(EnhancedTestCase):
         expected_msg = "Found 1 potential error(s) in command output (output: the process crashed with 0)"
         self.assertTrue(expected_msg in read_file(logfile))
 
+    def test_det_required_literal(self):
+        """Test det_required_literal function."""
+        test_cases = [
+            (r"error", 'error'),
+            (r"\berror\b", 'error'),
+            (r"^make\[[0-9]+\]: \*\*\*", ']: ***'),
+            (r"\bundefined reference to\b", 'undefined reference to'),
+            (r"(error|failed)", None),
+            (r"[Ee]rror", 'rror'),
+            (r"x+error", 'error'),
+            (r"(?i)error", None),
+            (r"foo\nbarbaz", 'barbaz'),
+            (r"\d+", None),
+        ]
+        for pattern, expected in test_cases:
+            self.assertEqual(det_required_literal(re.compile(pattern)), expected)
+        self.assertEqual(det_required_literal(re.compile("error", re.I)), None)
+
+    def test_log_error_matcher(self):
+        """Test LogErrorMatcher class."""
+        input_text = '\n'.join([
+            "OK",
+            "error found",
+            "test failed",
+            "msg: allowed-test failed",
+            "enabling -Werror",
+            "the process crashed with 0",
+        ])
+        reg_exps = [
+            r"\berror\b",
+            (r"\ballowed-test failed\b", IGNORE),
+            (r"\bcrashed\b", WARN),
+            "fail",
+        ]
+        matcher = LogErrorMatcher(reg_exps)
+        # regular expressions are combined, output is scanned as a whole
+        self.assertTrue(matcher.combined_regex)
+        self.assertTrue(matcher.line_local)
+        # lines to check are determined via literal string search
+        self.assertEqual(matcher.literals, ['allowed-test failed', 'crashed', 'error', 'fail'])
+
+        expected_warnings = [(6, "the process crashed with 0")]
+        expected_errors = [(2, "error found"), (3, "test failed")]
+        self.assertEqual(matcher.scan(input_text), (expected_warnings, expected_errors))
+        # result is not affected by trailing newline
+        self.assertEqual(matcher.scan(input_text + '\n'), (expected_warnings, expected_errors))
+
+        # output can be fed in chunks, which may end halfway a line
+        log_scan = LogErrorScan(matcher)
+        for idx in range(0, len(input_text), 7):
+            log_scan.feed(input_text[idx:idx + 7])
+        self.assertEqual(log_scan.finish(), (expected_warnings, expected_errors))
+
+        # regular expressions that can not be used to scan output as a whole are handled line by line
+        # (^ and $ are fine though, since they're made to match at start/end of each line)
+        test_cases = [
+            (r"^error", True, True),
+            (r"(?i)\bERROR\b", False, False),
+            (r"\Aerror", True, False),
+            (r"(?<!W)error\b", True, False),
+            (r"(o)r\b.*\1", False, False),
+        ]
+        for pattern, combined, line_local in test_cases:
+            matcher = LogErrorMatcher([pattern] + reg_exps[1:])
+            self.assertEqual(bool(matcher.combined_regex), combined)
+            self.assertEqual(matcher.line_local, line_local)
+            self.assertEqual(matcher.scan(input_text), (expected_warnings, expected_errors))
+            self.assertEqual(matcher.scan(input_text), extract_errors_and_line_numbers(input_text, matcher))
+
+        # matches that span multiple lines when scanning output as a whole do not result in false positives
+        matcher = LogErrorMatcher([r"found\s+test", r"crashed[^:]*"])
+        self.assertTrue(matcher.line_local)
+        self.assertEqual(matcher.scan(input_text), ([], [(6, "the process crashed with 0")]))
+
+        # each line is only checked once, also when there are multiple hits in it
+        for pattern, literals in [("error", ['err', 'error']), ("[Ee][Rr][Rr][Oo][Rr]", None)]:
+            matcher = LogErrorMatcher([pattern, "err"])
+            self.assertEqual(matcher.literals, literals)
+            self.assertEqual(matcher.scan("error\nno error, no error\nfoo\nerr"),
+                             ([], [(1, "error"), (2, "no error, no error"), (4, "err")]))
+
+        # flags are taken into account
+        matcher = LogErrorMatcher([r"\bERROR\b"], flags=re.I)
+        self.assertEqual(matcher.scan(input_text), ([], [(2, "error found")]))
+
+        self.assertErrorRegex(EasyBuildError, "Invalid input:", LogErrorMatcher, [("42", "invalid-mode")])
+
+        # matchers are cached per list of regular expressions & flags
+        matcher = get_log_error_matcher(reg_exps)
+        self.assertTrue(get_log_error_matcher(list(reg_exps)) is matcher)
+        self.assertFalse(get_log_error_matcher(reg_exps, flags=re.I) is matcher)
+        # scanning output does not affect the (shared) matcher
+        log_scan = LogErrorScan(matcher)
+        log_scan.feed("error\nfoo")
+        self.assertEqual(get_log_error_matcher(reg_exps).scan("foo\nbar"), ([], []))
+        self.assertEqual(log_scan.finish(), ([], [(1, "error")]))
+
+        self.assertEqual(extract_errors_from_log(input_text, reg_exps),
+                         (["the process crashed with 0"], ["error found", "test failed"]))
+
+    def test_log_error_matcher_threads(self):
+        """Test concurrent use of (cached) matchers to scan command output."""
+
+        def scan_output(idx):
+            """Scan output with specified number of error lines, via shared matchers."""
+            out = '\n'.join(["line %d.%d: %s" % (idx, i, ("failed" if i % 3 == 0 else "ok")) for i in range(idx * 50)])
+            errors = parse_log_for_error(out, True, stdout=False)
+            warnings, _ = extract_errors_from_log(out, [("failed", WARN)])
+            return idx, [e[0] for e in errors], warnings
+
+        pool = ThreadPool(8)
+        try:
+            results = pool.map(scan_output, list(range(1, 241)))
+        finally:
+            pool.close()
+            pool.join()
+
+        for idx, errors, warnings in results:
+            expected = ["line %d.%d: failed" % (idx, i) for i in range(0, idx * 50, 3)]
+            self.assertEqual(errors, expected)
+            self.assertEqual(warnings, expected)
+
 
 def suite():
     """ returns all the testcases in this module """
@@ -28,15 +28,18 @@ Unit tests for systemtools.py
 @author: Kenneth hoste (Ghent University)
 @author: Ward Poelmans (Ghent University)
 """
+import json
+import os
 import re
 import sys
+from socket import gethostname
 
 from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered, init_config
 from unittest import TextTestRunner
 
 import easybuild.tools.systemtools as st
 from easybuild.tools.build_log import EasyBuildError
-from easybuild.tools.filetools import read_file
+from easybuild.tools.filetools import read_file, write_file
 from easybuild.tools.py2vs3 import string_type
 from easybuild.tools.run import run_cmd
 from easybuild.tools.systemtools import CPU_ARCHITECTURES, AARCH32, AARCH64, POWER, X86_64
@@ -337,6 +340,7 @@ class SystemToolsTest(EnhancedTestCase):
         self.orig_run_cmd = st.run_cmd
         self.orig_platform_uname = st.platform.uname
         self.orig_get_tool_version = st.get_tool_version
+        self.orig_det_os_pkg_cmds = st.det_os_pkg_cmds
         self.orig_sys_version_info = st.sys.version_info
         self.orig_HAVE_ARCHSPEC = st.HAVE_ARCHSPEC
         if hasattr(st, 'archspec_cpu_host'):
@@ -353,6 +357,7 @@ class SystemToolsTest(EnhancedTestCase):
         st.run_cmd = self.orig_run_cmd
         st.platform.uname = self.orig_platform_uname
         st.get_tool_version = self.orig_get_tool_version
+        st.det_os_pkg_cmds = self.orig_det_os_pkg_cmds
         st.sys.version_info = self.orig_sys_version_info
         st.HAVE_ARCHSPEC = self.orig_HAVE_ARCHSPEC
         if self.orig_archspec_cpu_host is not None:
@@ -763,11 +768,132 @@ class SystemToolsTest(EnhancedTestCase):
         memtotal = get_total_memory()
         self.assertTrue(isinstance(memtotal, int))
 
+    def test_system_facts_cache(self):
+        """Test caching of system facts across sessions via --system-facts-cache."""
+        mocked_files = {
+            st.BOOT_ID_FP: 'boot1\n',
+            PROC_MEMINFO_FP: 'MemTotal:       1048576 kB\n',
+        }
+        st.get_os_type = lambda: st.LINUX
+        st.read_file = lambda fp, **kwargs: mocked_files[fp] if fp in mocked_files else read_file(fp, **kwargs)
+        st.is_readable = lambda fp: fp in mocked_files
+
+        # without --system-facts-cache, nothing is cached
+        self.assertEqual(get_total_memory(), 1024)
+        mocked_files[PROC_MEMINFO_FP] = 'MemTotal:       2097152 kB\n'
+        self.assertEqual(get_total_memory(), 2048)
+
+        cache_path = os.path.join(self.test_prefix, 'system_facts.json')
+        init_config(build_options={'system_facts_cache': cache_path})
+        key = '%s:boot1' % gethostname()
+
+        self.assertEqual(get_total_memory(), 2048)
+        self.assertEqual(json.loads(read_file(cache_path)), {key: {'get_total_memory': 2048}})
+
+        # cached result is used, also in a new session
+        mocked_files[PROC_MEMINFO_FP] = 'MemTotal:       1048576 kB\n'
+        self.assertEqual(get_total_memory(), 2048)
+        st._system_facts_cache_files.clear()
+        self.assertEqual(get_total_memory(), 2048)
+
+        # entries for other hosts are retained, entries for this host for an earlier boot are removed
+        cached = json.loads(read_file(cache_path))
+        cached['otherhost:boot123'] = {'get_total_memory': 4096}
+        write_file(cache_path, json.dumps(cached))
+        st._system_facts_cache_files.clear()
+
+        mocked_files[st.BOOT_ID_FP] = 'boot2\n'
+        self.assertEqual(get_total_memory(), 1024)
+        expected = {
+            '%s:boot2' % gethostname(): {'get_total_memory': 1024},
+            'otherhost:boot123': {'get_total_memory': 4096},
+        }
+        self.assertEqual(json.loads(read_file(cache_path)), expected)
+
+        # no caching if boot ID is not available
+        del mocked_files[st.BOOT_ID_FP]
+        mocked_files[PROC_MEMINFO_FP] = 'MemTotal:       2097152 kB\n'
+        self.assertEqual(get_total_memory(), 2048)
+        self.assertEqual(json.loads(read_file(cache_path)), expected)
+
     def test_system_info(self):
         """Test getting system info."""
         system_info = get_system_info()
         self.assertTrue(isinstance(system_info, dict))
 
+    def test_check_os_dependencies(self):
+        """Test check_os_dependencies and check_os_dependency functions."""
+        run_cmd_log = []
+
+        rpmdb_locked = []
+
+        def mocked_run_cmd_pkgs(cmd, **kwargs):
+            """Mocked version of run_cmd, to fake querying the OS package manager."""
+            run_cmd_log.append(cmd)
+            if cmd.startswith('LC_ALL=C rpm -q '):
+                out = []
+                pkgs = cmd.split(' ')[3:]
+                if rpmdb_locked and len(pkgs) > 1:
+                    return ("error: rpmdb: Lock table is out of available locker entries", 1)
+                for pkg in pkgs:
+                    if pkg.startswith('nosuch'):
+                        out.append("package %s is not installed" % pkg)
+                    elif pkg in rpmdb_locked:
+                        out.append("error: cannot open Packages database in /var/lib/rpm")
+                    else:
+                        out.append("%s-1.0-1.el7.x86_64" % pkg)
+                return ('\n'.join(out), len([x for x in out if not x.endswith('x86_64')]))
+            elif cmd.startswith('LC_ALL=C dpkg -s '):
+                out = []
+                for pkg in cmd.split(' ')[3:]:
+                    if pkg.startswith('nosuch'):
+                        out.append("dpkg-query: package '%s' is not installed and no information is available" % pkg)
+                    else:
+                        out.extend(["Package: %s" % pkg.split(':')[0], "Status: install ok installed", ''])
+                return ('\n'.join(out), 1)
+            else:
+                return run_cmd(cmd, **kwargs)
+
+        st.run_cmd = mocked_run_cmd_pkgs
+
+        for pkg_cmd in [st.RPM, st.DPKG]:
+            init_config()
+            del run_cmd_log[:]
+            st.det_os_pkg_cmds = lambda: [pkg_cmd]
+
+            deps = ['openssl', 'nosuchosdep', 'zlib:amd64', 'sh']
+            res = st.check_os_dependencies(deps)
+            self.assertEqual(sorted(res.keys()), sorted(deps))
+            self.assertTrue(res['openssl'])
+            self.assertTrue(res['zlib:amd64'])
+            self.assertFalse(res['nosuchosdep'])
+            # OS package manager is only queried once for all dependencies
+            pkg_cmds = [cmd for cmd in run_cmd_log if cmd.startswith('LC_ALL=C %s' % pkg_cmd)]
+            pkg_cmd_flag = '-q' if pkg_cmd == st.RPM else '-s'
+            self.assertEqual(pkg_cmds, ['LC_ALL=C %s %s' % (pkg_cmd, ' '.join([pkg_cmd_flag] + deps))])
+
+            # results are cached
+            del run_cmd_log[:]
+            self.assertTrue(st.check_os_dependency('openssl'))
+            self.assertFalse(st.check_os_dependency('nosuchosdep'))
+            self.assertEqual(run_cmd_log, [])
+
+        # if querying the OS package manager for all packages at once fails for another reason than packages
+        # not being installed, packages are checked one by one, and unreliable results are not cached
+        st._os_deps_cache.clear()
+        del run_cmd_log[:]
+        rpmdb_locked.extend(['libfoo', 'libbar'])
+        st.det_os_pkg_cmds = lambda: [st.RPM]
+        deps = ['openssl', 'nosuchosdep', 'libfoo']
+        res = st.check_os_dependencies(deps)
+        self.assertTrue(res['openssl'])
+        self.assertFalse(res['nosuchosdep'])
+        self.assertFalse(res['libfoo'])
+        pkg_cmds = [cmd for cmd in run_cmd_log if cmd.startswith('LC_ALL=C rpm')]
+        self.assertEqual(pkg_cmds, ['LC_ALL=C rpm -q openssl nosuchosdep libfoo'] +
+                         ['LC_ALL=C rpm -q %s' % dep for dep in deps])
+        self.assertEqual(sorted(st._os_deps_cache.keys()), ['nosuchosdep', 'openssl'])
+
     def test_det_parallelism_native(self):
         """Test det_parallelism function (native calls)."""
         self.assertTrue(det_parallelism() > 0)
@@ -794,6 +920,42 @@ class SystemToolsTest(EnhancedTestCase):
 
         st.get_avail_core_count = orig_get_avail_core_count
 
+    def test_map_parallel(self):
+        """Test map_parallel function."""
+        init_config(build_options={'parallel': 4})
+
+        pools = []
+
+        class MockedPool(object):
+            """Mocked pool of processes, which applies function in current process."""
+            def __init__(self, processes):
+                pools.append(processes)
+
+            def map(self, func, items, chunksize=1):
+                return [func(item) for item in items]
+
+            def close(self):
+                pass
+
+            def join(self):
+                pass
+
+        orig_pool = st.multiprocessing.Pool
+        st.multiprocessing.Pool = MockedPool
+        try:
+            self.assertEqual(st.map_parallel(abs, [-1, 2, -3]), [1, 2, 3])
+            self.assertEqual(pools, [3])
+
+            # no pool of processes is used for a single item, or for less than min_items items
+            self.assertEqual(st.map_parallel(abs, [-1]), [1])
+            self.assertEqual(st.map_parallel(abs, [-1, 2, -3], min_items=4), [1, 2, 3])
+            self.assertEqual(pools, [3])
+
+            self.assertEqual(st.map_parallel(abs, [-1, 2, -3, 4, -5], min_items=4), [1, 2, 3, 4, 5])
+            self.assertEqual(pools, [3, 4])
+        finally:
+            st.multiprocessing.Pool = orig_pool
+
     def test_det_terminal_size(self):
         """Test det_terminal_size function."""
         (height, width) = st.det_terminal_size()
@@ -0,0 +1,149 @@
+# #
+# Copyright 2020-2020 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+# #
+"""
+Unit tests for timing.py
+"""
+import json
+import os
+import sys
+from collections import deque
+from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered
+from unittest import TextTestRunner
+
+from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.filetools import adjust_permissions, write_file
+from easybuild.tools.run import run_cmd
+import easybuild.tools.timing as timing
+from easybuild.tools.timing import TIMING_ADJUST_PERMISSIONS, TIMING_RUN_CMD, TIMING_STEP
+from easybuild.tools.timing import get_timings, record_timing, reset_timings, timed, timings_summary, timings_to_json
+
+
+class TimingTest(EnhancedTestCase):
+    """Tests for recording timings."""
+
+    def setUp(self):
+        """Test setup."""
+        super(TimingTest, self).setUp()
+        reset_timings()
+
+    def test_record_timing(self):
+        """Test record_timing, get_timings and reset_timings functions."""
+        self.assertEqual(get_timings(), [])
+
+        record_timing(TIMING_STEP, 'configure', 100.0, end_time=103.5)
+        record_timing(TIMING_RUN_CMD, 'make', 104.0, end_time=110.0, exit_code=0)
+
+        expected = [
+            {'category': TIMING_STEP, 'name': 'configure', 'start': 100.0, 'duration': 3.5},
+            {'category': TIMING_RUN_CMD, 'name': 'make', 'start': 104.0, 'duration': 6.0,
+             'details': {'exit_code': 0}},
+        ]
+        self.assertEqual(get_timings(), expected)
+        self.assertEqual(get_timings(category=TIMING_RUN_CMD), expected[1:])
+
+        # a copy is returned
+        timings = get_timings()
+        timings[0]['name'] = 'build'
+        self.assertEqual(get_timings()[0]['name'], 'configure')
+
+        reset_timings()
+        self.assertEqual(get_timings(), [])
+
+        # number of retained timings is limited, oldest timings are dropped first
+        self.assertEqual(timing._timings.maxlen, timing.MAX_TIMINGS)
+        orig_timings = timing._timings
+        timing._timings = deque(maxlen=3)
+        try:
+            for idx in range(5):
+                record_timing(TIMING_RUN_CMD, 'cmd%d' % idx, float(idx), end_time=idx + 1.0)
+            self.assertEqual([t['name'] for t in get_timings()], ['cmd2', 'cmd3', 'cmd4'])
+        finally:
+            timing._timings = orig_timings
+
+    def test_timed(self):
+        """Test timed context manager."""
+        with timed(TIMING_STEP, 'build', foo='bar'):
+            pass
+
+        timings = get_timings()
+        self.assertEqual(len(timings), 1)
+        self.assertEqual(timings[0]['category'], TIMING_STEP)
+        self.assertEqual(timings[0]['name'], 'build')
+        self.assertEqual(timings[0]['details'], {'foo': 'bar'})
+        self.assertTrue(timings[0]['duration'] >= 0)
+
+        # timing is also recorded when an error occurs
+        def fail():
+            with timed(TIMING_STEP, 'install'):
+                raise EasyBuildError("oops")
+
+        self.assertErrorRegex(EasyBuildError, "oops", fail)
+        self.assertEqual([t['name'] for t in get_timings()], ['build', 'install'])
+
+    def test_timings_summary_json(self):
+        """Test timings_summary and timings_to_json functions."""
+        record_timing(TIMING_STEP, 'configure', 100.0, end_time=101.0)
+        record_timing(TIMING_STEP, 'build', 101.0, end_time=105.0)
+        record_timing(TIMING_RUN_CMD, 'make', 101.5, end_time=104.5, exit_code=0)
+
+        summary = timings_summary(get_timings())
+        self.assertEqual(list(summary.keys()), [TIMING_STEP, TIMING_RUN_CMD])
+        self.assertEqual(summary[TIMING_STEP], (5.0, 2))
+        self.assertEqual(summary[TIMING_RUN_CMD], (3.0, 1))
+
+        res = json.loads(timings_to_json(get_timings()))
+        events = res['traceEvents']
+        self.assertEqual(len(events), 3)
+        self.assertEqual(events[2]['name'], 'make')
+        self.assertEqual(events[2]['cat'], TIMING_RUN_CMD)
+        self.assertEqual(events[2]['ph'], 'X')
+        self.assertEqual(events[2]['ts'], 101500000)
+        self.assertEqual(events[2]['dur'], 3000000)
+        self.assertEqual(events[2]['args'], {'exit_code': 0})
+        self.assertFalse('args' in events[0])
+
+    def test_instrumented_functions(self):
+        """Test whether timings are recorded by instrumented functions."""
+        run_cmd("echo hello", trace=False)
+
+        test_file = os.path.join(self.test_prefix, 'test.txt')
+        write_file(test_file, 'test')
+        adjust_permissions(test_file, 0o600, relative=False)
+
+        timings = get_timings()
+        self.assertEqual([(t['category'], t['name']) for t in timings],
+                         [(TIMING_RUN_CMD, 'echo hello'), (TIMING_ADJUST_PERMISSIONS, test_file)])
+        self.assertEqual(timings[0]['details'], {'exit_code': 0})
+        self.assertEqual(timings[1]['details'], {'paths': 1})
+
+
+def suite():
+    """ returns all the testcases in this module """
+    return TestLoaderFiltered().loadTestsFromTestCase(TimingTest, sys.argv[1:])
+
+
+if __name__ == '__main__':
+    res = TextTestRunner(verbosity=1).run(suite())
+    sys.exit(len(res.failures))
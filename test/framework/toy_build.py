@@ -32,6 +32,7 @@ Toy build unit test
 import copy
 import glob
 import grp
+import json
 import os
 import re
 import shutil
@@ -1799,6 +1800,76 @@ class ToyBuildTest(EnhancedTestCase):
         load1_regex = re.compile('load.*toy/0.0-one', re.M)
         self.assertTrue(load1_regex.search(mod2_txt), "Pattern '%s' found in: %s" % (load1_regex.pattern, mod2_txt))
 
+    def test_toy_rebuild_if_changed(self):
+        """Test use of --rebuild-if-changed."""
+        topdir = os.path.dirname(os.path.abspath(__file__))
+        toy_ec_txt = read_file(os.path.join(topdir, 'easyconfigs', 'test_ecs', 't', 'toy', 'toy-0.0.eb'))
+
+        ec1 = os.path.join(self.test_prefix, 'toy-0.0.eb')
+        write_file(ec1, toy_ec_txt)
+        ec2 = os.path.join(self.test_prefix, 'toybundle-0.0.eb')
+        write_file(ec2, '\n'.join([
+            "easyblock = 'Toolchain'",
+            "name = 'toybundle'",
+            "version = '0.0'",
+            "homepage = 'https://easybuilders.github.io/easybuild'",
+            "description = 'bundle of toy'",
+            "toolchain = SYSTEM",
+            "dependencies = [('toy', '0.0')]",
+        ]))
+
+        self.test_toy_build(ec_file=self.test_prefix, verify=False)
+
+        installdirs = [os.path.join(self.test_installpath, 'software', n, '0.0') for n in ['toy', 'toybundle']]
+        fingerprints = []
+        for installdir in installdirs:
+            fingerprint_path = os.path.join(installdir, 'easybuild', 'reprod', 'fingerprint.json')
+            fingerprints.append(json.loads(read_file(fingerprint_path)))
+            self.assertTrue(re.match('^[0-9a-f]{64}$', fingerprints[-1]['fingerprint']))
+            expected_keys = ['build_options', 'dependencies', 'easyblocks', 'easyconfig', 'patches']
+            self.assertEqual(sorted(fingerprints[-1]['inputs'].keys()), expected_keys)
+
+        self.assertEqual(fingerprints[0]['inputs']['dependencies'], {})
+        self.assertEqual(fingerprints[0]['inputs']['easyblocks'][0][0], 'toy.py')
+        self.assertEqual(fingerprints[1]['inputs']['dependencies'], {'toy/0.0': fingerprints[0]['fingerprint']})
+        self.assertEqual(fingerprints[1]['inputs']['easyblocks'][0][0], 'toolchain.py')
+
+        def rebuild_if_changed():
+            """Run 'eb --rebuild-if-changed' for 2nd toy easyconfig, return list of rebuilt installations."""
+            for installdir in installdirs:
+                write_file(os.path.join(installdir, 'marker'), '')
+
+            args = [
+                ec2,
+                '--sourcepath=%s' % self.test_sourcepath,
+                '--buildpath=%s' % self.test_buildpath,
+                '--installpath=%s' % self.test_installpath,
+                '--robot=%s' % self.test_prefix,
+                '--rebuild-if-changed',
+            ]
+            self.eb_main(args, do_build=True, raise_error=True)
+
+            # existing installation directory is cleaned up when software is rebuilt
+            return [os.path.basename(os.path.dirname(d)) for d in installdirs
+                    if not os.path.exists(os.path.join(d, 'marker'))]
+
+        # nothing is rebuilt if nothing changed
+        self.assertEqual(rebuild_if_changed(), [])
+
+        # change to easyconfig for dependency also triggers rebuild of software that depends on it
+        write_file(ec1, "\nbuildopts = '-O2'", append=True)
+        self.assertEqual(rebuild_if_changed(), ['toy', 'toybundle'])
+        self.assertEqual(rebuild_if_changed(), [])
+
+        write_file(ec2, "\nmoduleclass = 'tools'", append=True)
+        self.assertEqual(rebuild_if_changed(), ['toybundle'])
+
+        # software is also rebuilt if no fingerprint was recorded,
+        # but that doesn't affect software that depends on it since build inputs are still the same
+        remove_file(os.path.join(installdirs[0], 'easybuild', 'reprod', 'fingerprint.json'))
+        self.assertEqual(rebuild_if_changed(), ['toy'])
+        self.assertEqual(rebuild_if_changed(), [])
+
     def test_toy_sanity_check_commands(self):
         """Test toy build with extra sanity check commands."""
 
@@ -1848,6 +1919,30 @@ class ToyBuildTest(EnhancedTestCase):
 
         self.assertTrue(os.path.exists(toy_modfile))
 
+    def test_toy_sanity_check_commands_parallel(self):
+        """Test running sanity check commands concurrently."""
+        test_ecs = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
+        toy_ec_txt = read_file(os.path.join(test_ecs, 't', 'toy', 'toy-0.0.eb'))
+
+        test_ec = os.path.join(self.test_prefix, 'test.eb')
+        cmds = ["sleep 1 && echo one > one.txt", "sleep 1 && echo two > two.txt", "toy", "ls $EBROOTTOY/bin/toy"]
+        write_file(test_ec, toy_ec_txt + "\nsanity_check_commands = %s" % cmds)
+
+        self.test_toy_build(ec_file=test_ec, extra_args=['--parallel-sanity-check-commands=4'], raise_error=True)
+
+        toy_installdir = os.path.join(self.test_installpath, 'software', 'toy', '0.0')
+        self.assertEqual(read_file(os.path.join(toy_installdir, 'one.txt')), 'one\n')
+        self.assertEqual(read_file(os.path.join(toy_installdir, 'two.txt')), 'two\n')
+
+        # failing sanity check commands are reported in the order in which they were specified
+        cmds = ["sleep 1 && false", "true", "exit 123"]
+        write_file(test_ec, toy_ec_txt + "\nsanity_check_commands = %s" % cmds)
+
+        error_pattern = r"Sanity check failed: sanity check command sleep 1 && false exited with code 1 \(output: \)"
+        error_pattern += r"[\s\S]*sanity check command exit 123 exited with code 123 \(output: \)"
+        self.assertErrorRegex(EasyBuildError, error_pattern, self.test_toy_build, ec_file=test_ec,
+                              extra_args=['--parallel-sanity-check-commands=2'], raise_error=True, verify=False)
+
     def test_sanity_check_paths_lib64(self):
         """Test whether fallback in sanity check for lib64/ equivalents of library files works."""
         test_ecs_dir = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'easyconfigs')
@@ -2301,6 +2396,40 @@ class ToyBuildTest(EnhancedTestCase):
             regex = re.compile(pattern, re.M)
             self.assertTrue(regex.search(stdout), "Pattern '%s' found in: %s" % (regex.pattern, stdout))
 
+    def test_toy_build_dump_timings(self):
+        """Test use of --dump-timings."""
+        self.test_toy_build(extra_args=['--dump-timings'])
+
+        log_dir = os.path.join(self.test_installpath, 'software', 'toy', '0.0', 'easybuild')
+        timings_files = glob.glob(os.path.join(log_dir, 'easybuild-toy-0.0-*_timings.json'))
+        self.assertEqual(len(timings_files), 1)
+        timings_file = timings_files[0]
+
+        events = json.loads(read_file(timings_file))['traceEvents']
+        steps = [e['name'] for e in events if e['cat'] == 'step']
+        for step in ['fetch', 'configure', 'build', 'install', 'sanitycheck', 'module', 'permissions']:
+            self.assertTrue(step in steps, "Step '%s' found in %s" % (step, steps))
+
+        cmds = [e['name'] for e in events if e['cat'] == 'run_cmd']
+        self.assertTrue('gcc toy.c -o toy' in cmds, "'gcc toy.c -o toy' found in %s" % cmds)
+
+        # no timings file is created by default
+        remove_file(timings_file)
+        self.test_toy_build()
+        self.assertFalse(glob.glob(os.path.join(log_dir, '*_timings.json')))
+
+        # timings file can also be dumped when installation directory is made read-only
+        toy_install_dir = os.path.dirname(log_dir)
+        adjust_permissions(toy_install_dir, stat.S_IWUSR, add=True)
+        shutil.rmtree(toy_install_dir)
+        self.test_toy_build(extra_args=['--dump-timings', '--read-only-installdir'])
+        timings_files = glob.glob(os.path.join(log_dir, 'easybuild-toy-0.0-*_timings.json'))
+        self.assertEqual(len(timings_files), 1)
+        self.assertTrue(json.loads(read_file(timings_files[0]))['traceEvents'])
+        for path in [log_dir, timings_files[0]]:
+            self.assertFalse(os.stat(path).st_mode & stat.S_IWUSR, "%s is read-only" % path)
+        adjust_permissions(toy_install_dir, stat.S_IWUSR, add=True)
+
     def test_toy_build_hooks(self):
         """Test use of --hooks."""
         hooks_file = os.path.join(self.test_prefix, 'my_hooks.py')
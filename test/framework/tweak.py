@@ -34,16 +34,20 @@ from unittest import TextTestRunner
 
 from easybuild.framework.easyconfig.easyconfig import get_toolchain_hierarchy, process_easyconfig
 from easybuild.framework.easyconfig.parser import EasyConfigParser
+from easybuild.framework.easyconfig.tools import alt_easyconfig_paths, parse_easyconfigs
 from easybuild.framework.easyconfig.tweak import find_matching_easyconfigs, obtain_ec_for, pick_version, tweak_one
 from easybuild.framework.easyconfig.tweak import check_capability_mapping, match_minimum_tc_specs
 from easybuild.framework.easyconfig.tweak import get_dep_tree_of_toolchain, map_common_versionsuffixes
 from easybuild.framework.easyconfig.tweak import get_matching_easyconfig_candidates, map_toolchain_hierarchies
 from easybuild.framework.easyconfig.tweak import find_potential_version_mappings
 from easybuild.framework.easyconfig.tweak import map_easyconfig_to_target_tc_hierarchy
-from easybuild.framework.easyconfig.tweak import list_deps_versionsuffixes
+from easybuild.framework.easyconfig.tweak import list_deps_versionsuffixes, tweak
+from easybuild.framework.easyconfig.tweak import EasyConfigCatalog, det_regex_literal_prefix, get_easyconfig_catalog
+import easybuild.tools.build_log
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.config import module_classes
-from easybuild.tools.filetools import change_dir, write_file
+from easybuild.tools.filetools import change_dir, copy_file, mkdir, read_file, remove_dir, write_file
+from easybuild.tools.robot import det_robot_path, search_easyconfigs
 
 
 class TweakTest(EnhancedTestCase):
@@ -171,6 +175,94 @@ class TweakTest(EnhancedTestCase):
         tweaked_toy_ec_parsed = EasyConfigParser(tweaked_toy_ec).get_config_dict()
         self.assertEqual(tweaked_toy_ec_parsed['version'], '1.2.3')
 
+    def test_tweak(self):
+        """Test tweak function, incl. generating tweaked easyconfigs in parallel."""
+        test_easyconfigs = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
+        ec_files = [
+            os.path.join(test_easyconfigs, 'o', 'OpenMPI', 'OpenMPI-2.1.2-GCC-4.6.4.eb'),
+            os.path.join(test_easyconfigs, 'h', 'hwloc', 'hwloc-1.11.8-GCC-4.6.4.eb'),
+        ]
+
+        def run_tweak(parallel, build_specs):
+            """Run tweak with specified level of parallelism, return tweaked easyconfigs and their contents."""
+            tweaked_ecs_paths, pr_path = alt_easyconfig_paths(os.path.join(self.test_prefix, str(parallel)),
+                                                              tweaked_ecs=True)
+            for path in tweaked_ecs_paths:
+                remove_dir(path)
+            init_config(build_options={
+                'check_osdeps': False,
+                'map_toolchains': True,
+                'parallel': parallel,
+                'robot_path': det_robot_path([test_easyconfigs], tweaked_ecs_paths, pr_path, auto_robot=True),
+                'valid_module_classes': module_classes(),
+            })
+            get_toolchain_hierarchy.clear()
+            # updating dependency versions is experimental functionality
+            easybuild.tools.build_log.EXPERIMENTAL = True
+            easyconfigs, _ = parse_easyconfigs([(ec_file, False) for ec_file in ec_files])
+            tweaked_ecs = tweak(easyconfigs, build_specs, self.modtool, targetdirs=tweaked_ecs_paths)
+
+            tweaked_ec_files, tweaked_ec_files_txt = [], []
+            for path in tweaked_ecs_paths:
+                if os.path.exists(path):
+                    tweaked_ec_files.extend(sorted(os.listdir(path)))
+                    tweaked_ec_files_txt.extend(read_file(os.path.join(path, fn)) for fn in sorted(os.listdir(path)))
+            tweaked_ecs_txt = [read_file(ec['spec']) for ec in tweaked_ecs]
+
+            return [ec['full_mod_name'] for ec in tweaked_ecs], tweaked_ec_files, tweaked_ecs_txt, tweaked_ec_files_txt
+
+        build_specs = {'toolchain_version': '6.4.0-2.28'}
+        res = run_tweak(1, build_specs)
+        self.assertEqual(res[0], ['hwloc/1.11.8-GCC-6.4.0-2.28', 'OpenMPI/2.1.2-GCC-6.4.0-2.28'])
+        self.assertEqual(res[1], ['OpenMPI-2.1.2-GCC-6.4.0-2.28.eb', 'hwloc-1.11.8-GCC-6.4.0-2.28.eb'])
+        self.assertTrue("toolchain = {'name': 'GCC', 'version': '6.4.0-2.28'}" in res[2][0])
+
+        # same result when tweaked easyconfigs are generated in parallel
+        self.assertEqual(run_tweak(2, build_specs), res)
+
+        # also when dependencies are mapped to the target toolchain hierarchy and their versions are updated
+        test_ec = os.path.join(self.test_prefix, 'test-1.2.3-GCC-4.9.3-2.26.eb')
+        write_file(test_ec, '\n'.join([
+            "easyblock = 'ConfigureMake'",
+            "name = 'test'",
+            "version = '1.2.3'",
+            "versionsuffix = '-Python-2.7.10'",
+            "homepage = 'https://test.org'",
+            "description = 'this is just a test'",
+            "toolchain = {'name': 'GCC', 'version': '4.9.3-2.26'}",
+            "builddependencies = [('gzip', '1.4')]",
+            "dependencies = [('hwloc', '1.6.2')]",
+        ]))
+        build_specs = {'toolchain_version': '6.4.0-2.28', 'update_deps': True}
+        hwloc_ec = ec_files[1]
+        ec_files = [test_ec]
+        res = run_tweak(1, build_specs)
+        self.assertEqual(res[0], ['test/1.2.3-GCC-6.4.0-2.28-Python-2.7.10'])
+        self.assertEqual(res[1], ['test-1.2.3-GCC-6.4.0-2.28-Python-2.7.10.eb', 'gzip-1.4-GCC-6.4.0-2.28.eb',
+                                  'hwloc-1.6.2-GCC-6.4.0-2.28.eb'])
+        self.assertTrue("dependencies = [\n    ('hwloc', '1.11.8'),\n]" in res[2][0])
+        self.assertEqual(run_tweak(2, build_specs), res)
+
+        # errors that occur when generating tweaked easyconfigs are reported
+        test_ec = os.path.join(self.test_prefix, 'hwloc-1.11.8-GCC-4.6.4.eb')
+        copy_file(hwloc_ec, test_ec)
+        init_config(build_options={
+            'map_toolchains': False,
+            'parallel': 2,
+            'robot_path': [test_easyconfigs],
+            'valid_module_classes': module_classes(),
+        })
+        openmpi_ec = os.path.join(test_easyconfigs, 'o', 'OpenMPI', 'OpenMPI-2.1.2-GCC-4.6.4.eb')
+        easyconfigs, _ = parse_easyconfigs([(openmpi_ec, False), (test_ec, False)])
+        write_file(test_ec, "name = 'hwloc'\nversion = '1.11.8'\n")
+
+        error_pattern = "Failed to generate tweaked easyconfig for .*/hwloc-1.11.8-GCC-4.6.4.eb: "
+        error_pattern += "No toolchain found in easyconfig file"
+        targetdirs = (os.path.join(self.test_prefix, 'tweaked'), os.path.join(self.test_prefix, 'tweaked_deps'))
+        build_specs = {'toolchain_version': '6.4.0-2.28'}
+        self.assertErrorRegex(EasyBuildError, error_pattern, tweak, easyconfigs, build_specs, self.modtool,
+                              targetdirs=targetdirs)
+
     def test_check_capability_mapping(self):
         """Test comparing the functionality of two toolchains"""
         test_easyconfigs = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
@@ -326,6 +418,83 @@ class TweakTest(EnhancedTestCase):
         self.assertEqual(paths, [])
         self.assertEqual(toolchain_stub, expected_toolchain_suff)
 
+    def test_det_regex_literal_prefix(self):
+        """Test det_regex_literal_prefix function."""
+        self.assertEqual(det_regex_literal_prefix('^gzip-.*-GCC-4.9.3-2.26'), 'gzip-')
+        self.assertEqual(det_regex_literal_prefix(r'^gzip-1\.4\..*-GCC-4.9.3-2.26.eb'), 'gzip-1.4.')
+        self.assertEqual(det_regex_literal_prefix(r'^libstdc\+\+-1'), 'libstdc++-1')
+        self.assertEqual(det_regex_literal_prefix('^gzip'), 'gzip')
+        self.assertEqual(det_regex_literal_prefix('^gzips?-1'), 'gzip')
+        self.assertEqual(det_regex_literal_prefix('^gzip+-1'), 'gzip')
+        self.assertEqual(det_regex_literal_prefix(r'^gzip-\d'), 'gzip-')
+        self.assertEqual(det_regex_literal_prefix('^(gzip|bzip2)-'), '')
+        self.assertEqual(det_regex_literal_prefix('^gzip-|^bzip2-'), '')
+        self.assertEqual(det_regex_literal_prefix('gzip-'), '')
+
+    def test_easyconfig_catalog(self):
+        """Test EasyConfigCatalog class."""
+        test_easyconfigs = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
+        test_ecs = os.path.join(self.test_prefix, 'test_ecs')
+        archive_dir = os.path.join(test_ecs, '__archive__', 'g', 'gzip')
+        mkdir(archive_dir, parents=True)
+        copy_file(os.path.join(test_easyconfigs, 'g', 'gzip', 'gzip-1.4.eb'), os.path.join(archive_dir, 'gzip-1.2.eb'))
+
+        build_options = {
+            'robot_path': [test_ecs, test_easyconfigs],
+            'valid_module_classes': module_classes(),
+        }
+        init_config(build_options=build_options)
+
+        catalog = get_easyconfig_catalog()
+        self.assertTrue(isinstance(catalog, EasyConfigCatalog))
+        # catalog is only created once for a particular search path
+        self.assertTrue(get_easyconfig_catalog() is catalog)
+
+        queries = [
+            '^gzip-.*',
+            '^gzip-1.*-GCC-4.9.3-2.26.eb',
+            r'^gzip-1\.4\..*.eb',
+            '^toy-.*-gompi-2018a-test.eb',
+            '^GCC-',
+            '^libstdc++-',
+            '^nosuchsoftware-',
+            '.*-GCC-4.9.3-2.26.eb',
+        ]
+        for query in queries:
+            expected = search_easyconfigs(query, consider_extra_paths=False, print_result=False, case_sensitive=True)
+            self.assertEqual(catalog.search(query), expected)
+
+        gzip_ecs = catalog.search('^gzip-1.')
+        self.assertTrue(os.path.join(test_easyconfigs, 'g', 'gzip', 'gzip-1.4.eb') in gzip_ecs)
+        self.assertFalse(any(x.startswith(test_ecs) for x in gzip_ecs))
+
+        # archived easyconfigs are only considered when asked for
+        build_options['consider_archived_easyconfigs'] = True
+        init_config(build_options=build_options)
+        catalog = get_easyconfig_catalog()
+        gzip_ecs = catalog.search('^gzip-1.')
+        self.assertEqual(gzip_ecs[-1], os.path.join(archive_dir, 'gzip-1.2.eb'))
+        self.assertEqual(gzip_ecs, search_easyconfigs('^gzip-1.', consider_extra_paths=False, print_result=False,
+                                                      case_sensitive=True))
+
+        self.assertErrorRegex(EasyBuildError, "Invalid search query", catalog.search, '^gzip-(')
+
+        # easyconfig files that are added after catalog was created must be registered explicitly
+        new_ec = os.path.join(test_ecs, 'g', 'gzip', 'gzip-1.8.eb')
+        write_file(new_ec, "name = 'gzip'\nversion = '1.8'\n")
+        self.assertFalse(new_ec in catalog.search('^gzip-1.'))
+        catalog.add(new_ec)
+        catalog.add(new_ec)
+        self.assertEqual(catalog.search('^gzip-1.8'), [new_ec])
+
+        # values for easyconfig parameters are only obtained once per easyconfig file
+        self.assertEqual(catalog.get_params(new_ec, ['name', 'version']), ['gzip', '1.8'])
+        write_file(new_ec, "name = 'gzip'\nversion = '1.9'\n")
+        self.assertEqual(catalog.get_params(new_ec, ['version']), ['1.8'])
+        # unless easyconfig file is registered again
+        catalog.add(new_ec)
+        self.assertEqual(catalog.get_params(new_ec, ['version', 'versionsuffix']), ['1.9', None])
+
     def test_map_common_versionsuffixes(self):
         """Test mapping between two toolchain hierarchies"""
         test_easyconfigs = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
@@ -40,10 +40,15 @@ import unittest
 from easybuild.base import fancylogger
 from easybuild.base.testing import TestCase
 import easybuild.tools.build_log as eb_build_log
+import easybuild.tools.github as github
+import easybuild.tools.multidiff as multidiff
 import easybuild.tools.options as eboptions
+import easybuild.tools.repository.repository as repository
+import easybuild.tools.systemtools as systemtools
+import easybuild.tools.variables as variables
 import easybuild.tools.toolchain.utilities as tc_utils
 import easybuild.tools.module_naming_scheme.toolchain as mns_toolchain
-from easybuild.framework.easyconfig import easyconfig
+from easybuild.framework.easyconfig import easyconfig, tweak
 from easybuild.framework.easyblock import EasyBlock
 from easybuild.main import main
 from easybuild.tools import config
@@ -415,8 +420,18 @@ def cleanup():
     tc_utils._initial_toolchain_instances.clear()
     easyconfig._easyconfigs_cache.clear()
     easyconfig._easyconfig_files_cache.clear()
+    easyconfig._easyblock_modules_index.clear()
     easyconfig.get_toolchain_hierarchy.clear()
+    easyconfig._toolchain_hierarchy_cache_files.clear()
+    easyconfig._subtoolchain_cands_cache.clear()
+    tweak._easyconfig_catalogs.clear()
     mns_toolchain._toolchain_details_cache.clear()
+    systemtools._os_deps_cache.clear()
+    systemtools._system_facts_cache_files.clear()
+    github._downloaded_files_cache.clear()
+    multidiff._diff_cache.clear()
+    repository._session_repositories.clear()
+    variables._dir_entries_cache.clear()
 
     # reset to make sure tempfile picks up new temporary directory to use
     tempfile.tempdir = None
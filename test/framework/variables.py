@@ -28,12 +28,16 @@ Unit tests for tools/variables.py.
 @author: Kenneth Hoste (Ghent University)
 @author: Stijn De Weirdt (Ghent University)
 """
+import os
 import sys
+import time
 
 from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered
 from unittest import TextTestRunner
 
-from easybuild.tools.variables import CommaList, StrList, Variables
+import easybuild.tools.variables as variables
+from easybuild.tools.filetools import mkdir, write_file
+from easybuild.tools.variables import AbsPathList, CommaList, StrList, Variables, get_dir_entries
 from easybuild.tools.toolchain.variables import CommandFlagList
 
 
@@ -89,6 +93,68 @@ class VariablesTest(EnhancedTestCase):
         v.join('FOOBAR', 'BAR')
         self.assertEqual(v['FOOBAR'], [])
 
+    def test_append_subdirs_exists(self):
+        """Test append_subdirs and append_exists methods of AbsPathList, which use cached directory entries."""
+        root = os.path.join(self.test_prefix, 'root')
+        mkdir(os.path.join(root, 'include'), parents=True)
+        mkdir(os.path.join(root, 'lib64'))
+        write_file(os.path.join(root, 'lib'), 'not a directory')
+        write_file(os.path.join(root, 'lib64', 'libfoo.a'), '')
+
+        # make sure directory entries get cached, by setting modification time in the past
+        past = time.time() - 10
+        os.utime(root, (past, past))
+
+        self.assertEqual(get_dir_entries(root), (set(['include', 'lib', 'lib64']), set(['include', 'lib64'])))
+        self.assertEqual(get_dir_entries(os.path.join(root, 'nosuchdir')), (None, None))
+
+        paths = AbsPathList()
+        self.mock_stderr(True)
+        paths.append_subdirs(root, subdirs=['include', 'lib', 'lib64', 'nosuchdir', 'lib64/'])
+        paths.append_subdirs(os.path.join(root, 'nosuchdir'))
+        self.mock_stderr(False)
+        expected = [os.path.join(root, x) for x in ['include', 'lib64', 'lib64/']]
+        self.assertEqual(paths, expected)
+
+        paths = AbsPathList()
+        paths.append_exists(root, ['lib', 'lib64'], filename='libfoo.a')
+        paths.append_exists(root, ['lib', 'nosuchdir'], suffix='64', append_all=True)
+        # append_exists only checks for existence, so 'lib' file is also retained
+        expected = [os.path.join(root, 'lib64', 'libfoo.a'), os.path.join(root, 'lib64'), os.path.join(root, 'lib')]
+        self.assertEqual(paths, expected)
+
+        # cached entries are invalidated when directory is modified
+        mkdir(os.path.join(root, 'lib32'))
+        paths = AbsPathList()
+        paths.append_subdirs(root, subdirs=['lib32'])
+        self.assertEqual(paths, [os.path.join(root, 'lib32')])
+
+        # recently modified directories are not cached (timestamp resolution may be coarse)
+        self.assertFalse(root in variables._dir_entries_cache)
+        os.utime(root, (past, past))
+        get_dir_entries(root)
+        self.assertTrue(root in variables._dir_entries_cache)
+
+    def test_get_instance_class(self):
+        """Test get_instance_class method of Variables."""
+        class TestVariables(Variables):
+            MAP_CLASS = {'FOO': CommaList}
+
+        v1, v2 = TestVariables(), TestVariables()
+        foo_class = v1.get_instance_class('FOO')
+        self.assertTrue(v2.get_instance_class('FOO') is foo_class)
+        self.assertFalse(v1.get_instance_class('BAR') is foo_class)
+        self.assertEqual(foo_class.__name__, 'TestVariables_FOO')
+        self.assertEqual(foo_class.DEFAULT_CLASS, CommaList)
+
+        # instances are not shared
+        v1['FOO'] = [1, 2]
+        v2['FOO'] = [3]
+        self.assertEqual(str(v1['FOO']), '1,2')
+        self.assertEqual(str(v2['FOO']), '3')
+
+        self.assertErrorRegex(AttributeError, "object has no attribute 'nosuchattr'", getattr, v1, 'nosuchattr')
+
 
 def suite():
     """ return all the tests"""